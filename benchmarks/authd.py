@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+HTTP 认证后端负载基准测试
+
+在临时配置目录中生成用户库，以子进程启动 `python3 -m hy2 auth-server`，
+然后按 Hysteria 的认证协议并发发送请求: 默认 10000 个同时进行的连接尝试，
+每次新建 TCP 连接发送一个 POST /auth (最坏情况，Hysteria 实际会复用连接)，
+输出每秒认证数、p50/p99 延迟和认证服务的 CPU 占用。
+
+指定 --reload-every 时在压测期间定期向用户库添加用户，用于确认热加载
+不影响认证延迟。
+
+使用方法:
+    python3 benchmarks/authd.py
+    python3 benchmarks/authd.py --users 100000 --concurrency 10000 --attempts 50000
+    python3 benchmarks/authd.py --keepalive 100 --reload-every 1 --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+
+def percentile(values, pct):
+    """最近秩百分位数，空列表返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def cpu_seconds(pid):
+    """进程累计 CPU 时间 (用户态 + 内核态)"""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def build_store(count, seed=1):
+    """生成用户库，返回用于请求的 (用户名, 密码) 列表"""
+    from hy2.users import UserStore
+
+    rng = random.Random(seed)
+    store = UserStore()
+    for i in range(count):
+        store.add(f"u{i:07d}", f"{rng.getrandbits(64):016x}")
+    store.save()
+    return [(name, u["password"]) for name, u in store.users.items()]
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"认证服务在 {timeout} 秒内未就绪")
+
+
+def health(port):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(b"GET /health HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+        data = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data.split(b"\r\n\r\n", 1)[1])
+
+
+# ============ 客户端 ============
+
+def _request(auth):
+    body = json.dumps({"addr": "203.0.113.7:40000", "auth": auth, "tx": 0}).encode()
+    return (b"POST /auth HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    return json.loads(await reader.readexactly(length))
+
+
+async def _run_load(port, credentials, attempts, concurrency, keepalive, invalid, seed):
+    """
+    发送 attempts 个认证请求，同时进行的请求数为 concurrency
+
+    Returns:
+        dict: {"latencies": [...], "ok": n, "rejected": n, "errors": n, "wrong": n}
+    """
+    rng = random.Random(seed)
+    result = {"latencies": [], "ok": 0, "rejected": 0, "errors": 0, "wrong": 0}
+    remaining = [attempts]
+
+    def next_request():
+        name, password = rng.choice(credentials)
+        bad = rng.random() < invalid
+        return (f"{name}:{password}x" if bad else f"{name}:{password}"), bad
+
+    async def worker():
+        # 每个 worker 代表一个连续的连接尝试者，keepalive 为每个连接发送的请求数
+        while remaining[0] > 0:
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            except OSError:
+                result["errors"] += 1
+                remaining[0] -= 1
+                await asyncio.sleep(0.01)
+                continue
+            try:
+                for _ in range(keepalive):
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                    auth, bad = next_request()
+                    start = time.perf_counter()
+                    writer.write(_request(auth))
+                    response = await _read_response(reader)
+                    result["latencies"].append(time.perf_counter() - start)
+                    result["ok" if response.get("ok") else "rejected"] += 1
+                    if bool(response.get("ok")) == bad:
+                        result["wrong"] += 1
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                result["errors"] += 1
+            finally:
+                writer.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return result
+
+
+def _load_process(args, queue):
+    raise_fd_limit()
+    queue.put(asyncio.run(_run_load(*args)))
+
+
+def run_load(port, credentials, attempts, concurrency, keepalive, invalid, workers):
+    """在 workers 个进程中分摊负载并汇总结果"""
+    if workers == 1:
+        return asyncio.run(_run_load(port, credentials, attempts, concurrency, keepalive, invalid, 1))
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_load_process, args=(
+        (port, credentials, attempts // workers, concurrency // workers, keepalive, invalid, i + 1),
+        queue)) for i in range(workers)]
+    for p in procs:
+        p.start()
+    parts = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    merged = {"latencies": [], "ok": 0, "rejected": 0, "errors": 0, "wrong": 0}
+    for part in parts:
+        merged["latencies"] += part["latencies"]
+        for key in ("ok", "rejected", "errors", "wrong"):
+            merged[key] += part[key]
+    return merged
+
+
+def reload_loop(interval, stop):
+    """压测期间定期添加用户，触发认证服务热加载"""
+    from hy2.users import UserStore
+
+    n = 0
+    while not stop.wait(interval):
+        store = UserStore.load()
+        store.add(f"reload{n}")
+        store.save()
+        n += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hy2 HTTP 认证后端负载基准测试")
+    parser.add_argument("--users", type=int, default=100000, help="用户库规模")
+    parser.add_argument("--attempts", type=int, default=50000, help="认证请求总数")
+    parser.add_argument("--concurrency", type=int, default=10000, help="同时进行的连接尝试数")
+    parser.add_argument("--keepalive", type=int, default=1, help="每个连接发送的请求数 (1 为每次新建连接)")
+    parser.add_argument("--invalid", type=float, default=0.1, help="错误密码请求的比例")
+    parser.add_argument("--workers", type=int, default=1, help="压测客户端进程数")
+    parser.add_argument("--reload-every", type=float, help="每隔若干秒修改用户库")
+    parser.add_argument("--port", type=int, default=25499, help="认证服务监听端口")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    opts = parser.parse_args()
+
+    fd_limit = raise_fd_limit()
+    workdir = Path(tempfile.mkdtemp(prefix="hy2-authd-"))
+    os.environ["HY2_CONFIG_DIR"] = str(workdir)
+
+    start = time.perf_counter()
+    credentials = build_store(opts.users)
+    build_seconds = time.perf_counter() - start
+
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "hy2", "auth-server", "--listen", f"127.0.0.1:{opts.port}"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        preexec_fn=raise_fd_limit)
+    stop = threading.Event()
+    try:
+        start = time.perf_counter()
+        wait_ready(opts.port)
+        startup_seconds = time.perf_counter() - start
+
+        reloader = None
+        if opts.reload_every:
+            reloader = threading.Thread(target=reload_loop, args=(opts.reload_every, stop), daemon=True)
+            reloader.start()
+
+        cpu_before = cpu_seconds(server.pid)
+        start = time.perf_counter()
+        load = run_load(opts.port, credentials, opts.attempts, opts.concurrency,
+                        opts.keepalive, opts.invalid, opts.workers)
+        elapsed = time.perf_counter() - start
+        cpu = cpu_seconds(server.pid) - cpu_before
+        stop.set()
+        if reloader:
+            reloader.join()
+        server_health = health(opts.port)
+    finally:
+        stop.set()
+        server.terminate()
+        try:
+            server.wait(5)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    latencies = load["latencies"]
+    done = len(latencies)
+    report = {
+        "users": opts.users,
+        "attempts": opts.attempts,
+        "concurrency": opts.concurrency,
+        "keepalive": opts.keepalive,
+        "workers": opts.workers,
+        "fd_limit": fd_limit,
+        "store_build_seconds": round(build_seconds, 2),
+        "server_startup_seconds": round(startup_seconds, 2),
+        "seconds": round(elapsed, 2),
+        "completed": done,
+        "accepted": load["ok"],
+        "rejected": load["rejected"],
+        "errors": load["errors"],
+        "wrong_results": load["wrong"],
+        "auth_per_second": int(done / elapsed) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else None,
+        "server_cpu_seconds": round(cpu, 2),
+        "server_cpu_us_per_auth": round(cpu / done * 1e6, 1) if done else None,
+        "server_reloads": server_health.get("reloads"),
+        "server_users": server_health.get("users"),
+    }
+
+    if opts.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"用户库: {opts.users} 个用户 (生成 {report['store_build_seconds']} s，"
+          f"服务启动 {report['server_startup_seconds']} s)")
+    print(f"负载: {opts.attempts} 次认证，并发 {opts.concurrency}，每连接 {opts.keepalive} 个请求，"
+          f"{opts.workers} 个客户端进程")
+    print(f"吞吐: {report['auth_per_second']} 次/s  ({report['seconds']} s)")
+    print(f"延迟: p50 {report['p50_ms']} ms  p99 {report['p99_ms']} ms  max {report['max_ms']} ms")
+    print(f"结果: 通过 {report['accepted']}  拒绝 {report['rejected']}  "
+          f"连接错误 {report['errors']}  判定错误 {report['wrong_results']}")
+    print(f"认证服务 CPU: {report['server_cpu_seconds']} s "
+          f"({report['server_cpu_us_per_auth']} us/次)  热加载 {report['server_reloads']} 次")
+
+
+if __name__ == "__main__":
+    main()
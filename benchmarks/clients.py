@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+客户端配置导出基准测试
+
+在临时目录中为不同规模的用户导出全部客户端格式，分别测量:
+只渲染不写入 (iter_bundles)、单线程写入、以及 export_clients 的并发写入。
+
+使用方法:
+    python3 benchmarks/clients.py
+    python3 benchmarks/clients.py --users 1000 10000 --workers 1 4 8 --json
+    python3 benchmarks/clients.py --dir /dev/shm     # 排除磁盘影响，只看渲染和调度开销
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from contextlib import redirect_stdout
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench(count, workdir, workers):
+    """
+    测量一种规模
+
+    Returns:
+        dict: 各项耗时 (毫秒)
+    """
+    from hy2.server_config import ServerConfig
+    from hy2.certificate import generate_self_signed_cert
+    from hy2.client import ClientProfile, client_users, iter_bundles, export_clients
+
+    rng = random.Random(count)
+    cert, key, domain = generate_self_signed_cert(
+        "example.com", cert_path=workdir / "cert.crt", key_path=workdir / "private.key")
+    users = [{"name": f"u{i:07d}", "password": f"{rng.getrandbits(48):012x}"} for i in range(count)]
+    config = ServerConfig.build(cert, key, 443, "20000:30000", users, "example.com",
+                                {"up": 1000, "down": 1000, "rtt": 200})
+
+    result = {"users": count}
+    t, profile = timed(ClientProfile.from_config, config, "203.0.113.10", domain)
+    result["profile_ms"] = t
+    t, users = timed(client_users, config)
+    result["users_ms"] = t
+
+    def render():
+        return sum(len(text) for _, bundle in iter_bundles(profile, users)
+                   for text in bundle.values())
+    t, size = timed(render)
+    result["render_ms"] = t
+    result["bytes"] = size
+
+    for n in workers:
+        out_dir = workdir / f"out-{count}-{n}"
+        t, report = timed(export_clients, profile, users, out_dir, workers=n)
+        result[f"export_w{n}_ms"] = t
+        result["files"] = report["files"]
+        shutil.rmtree(out_dir)
+
+    return {k: (round(v * 1000, 1) if k.endswith("_ms") else v) for k, v in result.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hy2 客户端配置导出基准测试")
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000],
+                        help="用户规模 (可多个)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8],
+                        help="写入并发数 (可多个)")
+    parser.add_argument("--dir", help="临时目录所在位置 (默认系统临时目录)")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    opts = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="hy2-clients-", dir=opts.dir))
+    os.environ["HY2_CONFIG_DIR"] = str(workdir / "config")
+    os.environ["HY2_CLIENT_DIR"] = str(workdir / "client")
+    sys.path.insert(0, str(REPO_ROOT))
+
+    results = []
+    try:
+        with redirect_stdout(sys.stderr):
+            for count in opts.users:
+                results.append(bench(count, workdir, opts.workers))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if opts.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = [("users", "用户数"), ("render_ms", "渲染 ms")]
+    columns += [(f"export_w{n}_ms", f"导出 {n} 线程 ms") for n in opts.workers]
+    columns += [("files", "文件数"), ("bytes", "字节")]
+    rows = [[title for _, title in columns]]
+    rows += [[str(r[key]) for key, _ in columns] for r in results]
+    from hy2.utils.output import format_table
+    for line in format_table(rows, right_align=range(len(columns))):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
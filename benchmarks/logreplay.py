@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+日志分析回放基准测试
+
+生成指定大小的合成 Hysteria 日志 (或使用已有日志文件)，用 hy2.logs 的
+完整流水线 (读取 -> 解析 -> 统计) 回放一遍，输出处理速率和峰值内存，
+用于确认分析器能跟上大体量日志，且内存占用不随日志大小增长。
+
+使用方法:
+    python3 benchmarks/logreplay.py --size 512
+    python3 benchmarks/logreplay.py --size 2048 --journal --json
+    python3 benchmarks/logreplay.py --size 512 --color     # 级别带 ANSI 颜色 (console 默认输出)
+    python3 benchmarks/logreplay.py --file /var/log/hysteria.log.gz
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# (权重, 级别, 消息, 是否带错误)
+EVENT_MIX = (
+    (60, "DEBUG", "TCP request", False),
+    (10, "DEBUG", "UDP request", False),
+    (10, "INFO", "client connected", False),
+    (9, "INFO", "client disconnected", True),
+    (8, "WARN", "TCP error", True),
+    (2, "WARN", "authentication failed", False),
+    (1, "ERROR", "failed to serve masquerade", True),
+)
+
+ERRORS = (
+    "dial tcp {ip}:443: i/o timeout",
+    "dial tcp {ip}:80: connect: connection refused",
+    "timeout: no recent network activity",
+    "read udp [::]:{port}->{ip}:{port}: i/o timeout",
+)
+
+
+# zap console 格式的级别颜色
+LEVEL_COLORS = {"DEBUG": 35, "INFO": 34, "WARN": 33, "ERROR": 31}
+
+
+def generate_log(path, size_mb, journal=False, ip_pool=50000, users=200, seed=1, color=False):
+    """
+    生成合成日志文件
+
+    Args:
+        path: 输出路径
+        size_mb: 目标大小 (MiB)
+        journal: 是否为 journalctl -o json 导出格式
+        ip_pool: 客户端 IP 数量 (用于检验排行榜内存上限)
+        users: 用户数量
+        color: 级别是否带 ANSI 颜色 (未设置 HYSTERIA_LOG_DISABLE_COLOR 时的输出)
+
+    Returns:
+        int: 写入的行数
+    """
+    rng = random.Random(seed)
+    ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+           for _ in range(ip_pool)]
+    events = [e for e in EVENT_MIX for _ in range(e[0])]
+    target = size_mb * 1024 * 1024
+    written = lines = 0
+    start = 1714536000.0
+    buffer = []
+
+    with open(path, "w") as f:
+        while written < target:
+            level, message, has_error = rng.choice(events)[1:]
+            ip = rng.choice(ips)
+            fields = {"addr": f"{ip}:{rng.randint(1024, 65535)}", "id": f"user{rng.randrange(users)}"}
+            if message.endswith("request"):
+                fields["reqAddr"] = f"www.example{rng.randrange(1000)}.com:443"
+            if has_error:
+                fields["error"] = rng.choice(ERRORS).format(ip=rng.choice(ips), port=rng.randint(1024, 65535))
+            now = start + lines * 0.002
+            stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)) + f".{int(now * 1000) % 1000:03d}Z"
+            if color:
+                level = f"\x1b[{LEVEL_COLORS[level]}m{level}\x1b[0m"
+            line = f"{stamp}\t{level}\t{message}\t{json.dumps(fields)}"
+            if journal:
+                line = json.dumps({"__REALTIME_TIMESTAMP": str(int(now * 1_000_000)),
+                                   "_SYSTEMD_UNIT": "hysteria-server.service", "MESSAGE": line})
+            buffer.append(line)
+            written += len(line) + 1
+            lines += 1
+            if len(buffer) >= 10000:
+                f.write("\n".join(buffer) + "\n")
+                buffer.clear()
+        if buffer:
+            f.write("\n".join(buffer) + "\n")
+    return lines
+
+
+def replay(path):
+    """
+    用完整流水线回放日志
+
+    Returns:
+        dict: 处理结果和耗时
+    """
+    from hy2.logs import LogStats, file_records, parse_events, analyze
+
+    stats = LogStats()
+    start = time.perf_counter()
+    matched, _ = analyze(parse_events(file_records(path)), stats)
+    elapsed = time.perf_counter() - start
+    return {"events": matched, "seconds": elapsed, "summary": stats.summary(top=5)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hy2 日志分析回放基准测试")
+    parser.add_argument("--size", type=int, default=256, help="合成日志大小 MiB")
+    parser.add_argument("--journal", action="store_true", help="合成 journalctl -o json 导出格式")
+    parser.add_argument("--color", action="store_true", help="合成的日志级别带 ANSI 颜色")
+    parser.add_argument("--file", help="使用已有日志文件，不生成")
+    parser.add_argument("--keep", action="store_true", help="保留生成的日志文件")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    opts = parser.parse_args()
+
+    if opts.file:
+        path = Path(opts.file)
+        generated = None
+    else:
+        fd, name = tempfile.mkstemp(prefix="hy2-log-", suffix=".log")
+        os.close(fd)
+        path = Path(name)
+        start = time.perf_counter()
+        generate_log(path, opts.size, journal=opts.journal, color=opts.color)
+        generated = time.perf_counter() - start
+
+    try:
+        size = path.stat().st_size
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result = replay(path)
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    finally:
+        if generated is not None and not opts.keep:
+            path.unlink()
+
+    seconds = result["seconds"]
+    report = {
+        "file": str(path),
+        "bytes": size,
+        "events": result["events"],
+        "generate_seconds": round(generated, 2) if generated is not None else None,
+        "replay_seconds": round(seconds, 2),
+        "mib_per_second": round(size / 1024 / 1024 / seconds, 1),
+        "events_per_second": int(result["events"] / seconds),
+        "seconds_per_gib": round(seconds * 1024 ** 3 / size, 1),
+        "peak_rss_mib": round(rss_after / 1024, 1),
+        "rss_growth_mib": round((rss_after - rss_before) / 1024, 1),
+        "summary": result["summary"],
+    }
+
+    if opts.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"日志: {report['file']} ({size / 1024 / 1024:.0f} MiB, {report['events']} 条)")
+    print(f"回放: {report['replay_seconds']} s  {report['mib_per_second']} MiB/s  "
+          f"{report['events_per_second']} 条/s  (每 GiB {report['seconds_per_gib']} s)")
+    print(f"峰值内存: {report['peak_rss_mib']} MiB  (回放期间增长 {report['rss_growth_mib']} MiB)")
+    kinds = report["summary"]["kinds"]
+    print("事件类型: " + ", ".join(f"{k}={v}" for k, v in sorted(kinds.items(), key=lambda kv: -kv[1])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+本地回环吞吐与延迟基准测试
+
+用 generate_server_config / generate_client_config 生成一对配置，
+以 BINARY_PATH 启动服务端和客户端，通过客户端的 SOCKS5 监听驱动并发的
+TCP / UDP 流量，输出吞吐量、p50/p99 延迟、连接建立时间和每 Gbps 的 CPU 占用。
+
+默认服务端和客户端都在本机回环上运行；指定 --netns 时服务端运行在独立的
+网络命名空间中，通过 veth 连接，可用 tc netem 模拟延迟和丢包 (需要 root)。
+
+使用方法:
+    python3 benchmarks/loopback.py --tcp 4 --duration 10
+    python3 benchmarks/loopback.py --netns --delay 100 --loss 0.5 --bandwidth 500 --rtt 100
+    python3 benchmarks/loopback.py --udp 2 --udp-rate 50 --json > result.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+NETNS_NAME = "hy2bench"
+VETH_HOST, VETH_NS = "hy2b0", "hy2b1"
+HOST_ADDR, NS_ADDR = "10.200.0.1", "10.200.0.2"
+
+CHUNK = 64 * 1024
+UDP_PAYLOAD = 1200
+PROBE_SIZE = 64
+
+
+# ============ 目标服务 (流量终点) ============
+
+class Targets:
+    """TCP 丢弃/回显服务和 UDP 回显服务，运行在后台线程中"""
+
+    def __init__(self, host):
+        self.host = host
+        self.received = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.sink_port = self._tcp_server(self._sink)
+        self.echo_port = self._tcp_server(self._echo)
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind((host, 0))
+        self.udp_port = self.udp.getsockname()[1]
+        threading.Thread(target=self._udp_echo, daemon=True).start()
+
+    def _tcp_server(self, handler):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, 0))
+        server.listen(128)
+
+        def accept_loop():
+            while not self._stop.is_set():
+                try:
+                    conn, _ = server.accept()
+                except OSError:
+                    return
+                threading.Thread(target=handler, args=(conn,), daemon=True).start()
+
+        threading.Thread(target=accept_loop, daemon=True).start()
+        self._servers = getattr(self, "_servers", []) + [server]
+        return server.getsockname()[1]
+
+    def _sink(self, conn):
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(CHUNK)
+                except OSError:
+                    return
+                if not data:
+                    return
+                with self._lock:
+                    self.received += len(data)
+
+    def _echo(self, conn):
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(CHUNK)
+                    if not data:
+                        return
+                    conn.sendall(data)
+                except OSError:
+                    return
+
+    def _udp_echo(self):
+        while not self._stop.is_set():
+            try:
+                data, addr = self.udp.recvfrom(65535)
+                self.udp.sendto(data, addr)
+            except OSError:
+                return
+
+    def close(self):
+        self._stop.set()
+        for server in self._servers:
+            server.close()
+        self.udp.close()
+
+
+# ============ SOCKS5 ============
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("SOCKS5 连接被关闭")
+        data += chunk
+    return data
+
+
+def _read_reply(sock):
+    """读取 SOCKS5 应答，返回 (绑定地址, 绑定端口)"""
+    version, status, _, atyp = _recv_exact(sock, 4)
+    if version != 5 or status != 0:
+        raise ConnectionError(f"SOCKS5 请求失败 (状态 {status})")
+    if atyp == 1:
+        addr = socket.inet_ntoa(_recv_exact(sock, 4))
+    elif atyp == 4:
+        addr = socket.inet_ntop(socket.AF_INET6, _recv_exact(sock, 16))
+    else:
+        addr = _recv_exact(sock, _recv_exact(sock, 1)[0]).decode()
+    return addr, struct.unpack("!H", _recv_exact(sock, 2))[0]
+
+
+def _address(host, port):
+    return b"\x01" + socket.inet_aton(host) + struct.pack("!H", port)
+
+
+def socks_connect(proxy, host, port, timeout=10):
+    """通过 SOCKS5 建立 TCP 连接"""
+    sock = socket.create_connection(proxy, timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.sendall(b"\x05\x01\x00")
+    if _recv_exact(sock, 2) != b"\x05\x00":
+        sock.close()
+        raise ConnectionError("SOCKS5 认证协商失败")
+    sock.sendall(b"\x05\x01\x00" + _address(host, port))
+    _read_reply(sock)
+    return sock
+
+
+def socks_udp_associate(proxy, timeout=10):
+    """
+    建立 SOCKS5 UDP 关联
+
+    Returns:
+        tuple: (控制连接, UDP socket, 中继地址)
+    """
+    control = socket.create_connection(proxy, timeout=timeout)
+    control.sendall(b"\x05\x01\x00")
+    if _recv_exact(control, 2) != b"\x05\x00":
+        control.close()
+        raise ConnectionError("SOCKS5 认证协商失败")
+    control.sendall(b"\x05\x03\x00" + _address("0.0.0.0", 0))
+    addr, port = _read_reply(control)
+    if addr in ("0.0.0.0", "::"):
+        addr = proxy[0]
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp.settimeout(1)
+    return control, udp, (addr, port)
+
+
+def wait_for_socks(proxy, target, timeout):
+    """等待隧道可用 (SOCKS5 端口可连接且能打通到目标)，返回耗时秒"""
+    start = time.monotonic()
+    deadline = start + timeout
+    last_error = None
+    while time.monotonic() < deadline:
+        try:
+            socks_connect(proxy, *target, timeout=2).close()
+            return time.monotonic() - start
+        except OSError as e:
+            last_error = e
+            time.sleep(0.05)
+    raise RuntimeError(f"隧道在 {timeout} 秒内未就绪: {last_error}")
+
+
+# ============ 流量 ============
+
+def percentile(values, pct):
+    """最近秩百分位数，空列表返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def measure_setup(proxy, target, count):
+    """依次建立 count 个连接，返回每个连接的建立耗时 (SOCKS5 握手 + CONNECT)"""
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        sock = socks_connect(proxy, *target)
+        samples.append(time.perf_counter() - start)
+        sock.close()
+    return samples
+
+
+def tcp_flow(proxy, target, stop, counter, errors):
+    """持续向丢弃服务发送数据"""
+    payload = os.urandom(CHUNK)
+    try:
+        sock = socks_connect(proxy, *target)
+    except OSError as e:
+        errors.append(str(e))
+        return
+    with sock:
+        while not stop.is_set():
+            try:
+                sock.sendall(payload)
+            except OSError as e:
+                errors.append(str(e))
+                return
+            counter[0] += CHUNK
+
+
+def latency_probe(proxy, target, stop, samples, errors, interval=0.01):
+    """在回显连接上测量请求-响应往返时间"""
+    payload = os.urandom(PROBE_SIZE)
+    try:
+        sock = socks_connect(proxy, *target)
+    except OSError as e:
+        errors.append(str(e))
+        return
+    with sock:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                sock.sendall(payload)
+                _recv_exact(sock, PROBE_SIZE)
+            except OSError as e:
+                errors.append(str(e))
+                return
+            samples.append(time.perf_counter() - start)
+            stop.wait(interval)
+
+
+def udp_flow(proxy, target, stop, rate_mbps, stats, errors):
+    """按固定速率发送 UDP 数据报到回显服务，统计往返时间和丢包"""
+    try:
+        control, udp, relay = socks_udp_associate(proxy)
+    except OSError as e:
+        errors.append(str(e))
+        return
+    header = b"\x00\x00\x00" + _address(*target)
+    gap = UDP_PAYLOAD * 8 / (rate_mbps * 1_000_000)
+    sent_at = {}
+
+    def receiver():
+        while not stop.is_set() or sent_at:
+            try:
+                data = udp.recv(65535)
+            except socket.timeout:
+                if stop.is_set():
+                    return
+                continue
+            except OSError:
+                return
+            seq = struct.unpack("!Q", data[len(header):len(header) + 8])[0]
+            start = sent_at.pop(seq, None)
+            if start is not None:
+                stats["rtt"].append(time.perf_counter() - start)
+                stats["received"] += 1
+                stats["bytes"] += len(data) - len(header)
+
+    thread = threading.Thread(target=receiver, daemon=True)
+    thread.start()
+    padding = os.urandom(UDP_PAYLOAD - 8)
+    seq = 0
+    next_send = time.perf_counter()
+    with control:
+        while not stop.is_set():
+            now = time.perf_counter()
+            if now < next_send:
+                time.sleep(min(next_send - now, 0.01))
+                continue
+            sent_at[seq] = time.perf_counter()
+            try:
+                udp.sendto(header + struct.pack("!Q", seq) + padding, relay)
+            except OSError as e:
+                errors.append(str(e))
+                break
+            stats["sent"] += 1
+            seq += 1
+            next_send += gap
+        # 等待在途数据报
+        time.sleep(1)
+        sent_at.clear()
+        thread.join(2)
+        udp.close()
+
+
+def cpu_seconds(pid):
+    """进程累计 CPU 时间 (用户态 + 内核态)"""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+# ============ 环境 ============
+
+def _run(cmd):
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} 失败: {result.stderr.strip()}")
+
+
+def setup_netns(delay, loss, rate):
+    """创建命名空间和 veth，两端各加一半延迟"""
+    teardown_netns()
+    _run(["ip", "netns", "add", NETNS_NAME])
+    _run(["ip", "link", "add", VETH_HOST, "type", "veth", "peer", "name", VETH_NS])
+    _run(["ip", "link", "set", VETH_NS, "netns", NETNS_NAME])
+    _run(["ip", "addr", "add", f"{HOST_ADDR}/24", "dev", VETH_HOST])
+    _run(["ip", "link", "set", VETH_HOST, "up"])
+    _run(["ip", "-n", NETNS_NAME, "addr", "add", f"{NS_ADDR}/24", "dev", VETH_NS])
+    _run(["ip", "-n", NETNS_NAME, "link", "set", VETH_NS, "up"])
+    _run(["ip", "-n", NETNS_NAME, "link", "set", "lo", "up"])
+
+    if delay or loss or rate:
+        netem = ["netem"]
+        if delay:
+            netem += ["delay", f"{delay / 2}ms"]
+        if loss:
+            netem += ["loss", f"{loss}%"]
+        if rate:
+            netem += ["rate", f"{rate}mbit"]
+        _run(["tc", "qdisc", "add", "dev", VETH_HOST, "root", *netem])
+        _run(["ip", "netns", "exec", NETNS_NAME, "tc", "qdisc", "add", "dev", VETH_NS, "root", *netem])
+
+
+def teardown_netns():
+    subprocess.run(["ip", "netns", "del", NETNS_NAME], capture_output=True)
+    subprocess.run(["ip", "link", "del", VETH_HOST], capture_output=True)
+
+
+def generate_configs(workdir, port, socks_port, server_addr, link):
+    """
+    用项目自身的配置生成函数生成服务端和客户端配置
+
+    Returns:
+        tuple: (服务端配置路径, 客户端配置路径)
+    """
+    os.environ["HY2_CONFIG_DIR"] = str(workdir / "server")
+    os.environ["HY2_CLIENT_DIR"] = str(workdir / "client")
+    sys.path.insert(0, str(REPO_ROOT))
+
+    from contextlib import redirect_stdout
+    from hy2.certificate import generate_self_signed_cert
+    from hy2.installer import generate_server_config
+    from hy2.client import generate_client_config
+    from hy2.utils.miniyaml import loads, dumps
+
+    with redirect_stdout(sys.stderr):
+        cert, key, domain = generate_self_signed_cert("bench.hy2.local")
+        config = generate_server_config(cert, key, port, None, [{"password": "bench"}],
+                                        "example.com", link)
+        # 流量统计 API 固定监听 TRAFFIC_STATS_LISTEN，本机已有服务端时会冲突，基准测试不需要它
+        config = config.with_traffic_stats(None)
+        config.save()
+        generate_client_config(server_addr, port, config.client_auth, domain,
+                               link=config.client_link_settings())
+
+    # 客户端改用指定的 SOCKS5 端口，避免与本机已有客户端冲突
+    server_path = workdir / "server" / "config.yaml"
+    client_path = workdir / "client" / "hy-client.yaml"
+    client = loads(client_path.read_text())
+    client["socks5"]["listen"] = f"127.0.0.1:{socks_port}"
+    client_path.write_text(dumps(client))
+    return server_path, client_path
+
+
+def start_process(binary, args, log_path, netns=False):
+    cmd = [str(binary), *args]
+    if netns:
+        cmd = ["ip", "netns", "exec", NETNS_NAME, *cmd]
+    log = open(log_path, "wb")
+    return subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop_process(proc):
+    if proc and proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ============ 主流程 ============
+
+def run_benchmark(opts):
+    from_env = os.getenv("HY2_BINARY_PATH", "/usr/local/bin/hysteria")
+    binary = Path(opts.binary or from_env)
+    if not binary.exists():
+        raise RuntimeError(f"找不到 hysteria 二进制文件: {binary}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="hy2-bench-"))
+    link = None
+    if opts.bandwidth:
+        link = {"up": opts.bandwidth, "down": opts.bandwidth, "rtt": opts.rtt}
+
+    if opts.netns:
+        server_addr, target_host = NS_ADDR, HOST_ADDR
+    else:
+        server_addr, target_host = "127.0.0.1", "127.0.0.1"
+
+    server = client = targets = None
+    try:
+        if opts.netns:
+            setup_netns(opts.delay, opts.loss, opts.rate)
+        server_cfg, client_cfg = generate_configs(workdir, opts.port, opts.socks, server_addr, link)
+        targets = Targets(target_host)
+        proxy = ("127.0.0.1", opts.socks)
+
+        server = start_process(binary, ["server", "-c", str(server_cfg)],
+                               workdir / "server.log", opts.netns)
+        time.sleep(0.2)
+        client_started = time.monotonic()
+        client = start_process(binary, ["client", "-c", str(client_cfg)], workdir / "client.log")
+        tunnel_ready = wait_for_socks(proxy, (target_host, targets.sink_port), opts.timeout)
+        tunnel_ready_from_start = time.monotonic() - client_started
+
+        setup = measure_setup(proxy, (target_host, targets.sink_port), opts.setup_samples)
+
+        # 空载延迟
+        stop = threading.Event()
+        idle, errors = [], []
+        probe = threading.Thread(target=latency_probe,
+                                 args=(proxy, (target_host, targets.echo_port), stop, idle, errors))
+        probe.start()
+        time.sleep(min(2.0, opts.duration / 2))
+        stop.set()
+        probe.join()
+
+        # 负载阶段: TCP 流 + UDP 流 + 延迟探测
+        stop = threading.Event()
+        loaded = []
+        counters = [[0] for _ in range(opts.tcp)]
+        udp_stats = [{"sent": 0, "received": 0, "bytes": 0, "rtt": []} for _ in range(opts.udp)]
+        threads = [threading.Thread(target=tcp_flow, args=(
+            proxy, (target_host, targets.sink_port), stop, counter, errors)) for counter in counters]
+        threads += [threading.Thread(target=udp_flow, args=(
+            proxy, (target_host, targets.udp_port), stop, opts.udp_rate, stats, errors))
+            for stats in udp_stats]
+        threads.append(threading.Thread(target=latency_probe, args=(
+            proxy, (target_host, targets.echo_port), stop, loaded, errors)))
+
+        cpu_before = {"server": cpu_seconds(server.pid), "client": cpu_seconds(client.pid)}
+        received_before = targets.received
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        time.sleep(opts.duration)
+        stop.set()
+        elapsed = time.monotonic() - start
+        received = targets.received - received_before
+        cpu = {name: cpu_seconds(proc.pid) - cpu_before[name]
+               for name, proc in (("server", server), ("client", client))}
+        for thread in threads:
+            thread.join(opts.timeout)
+
+        tcp_gbps = received * 8 / elapsed / 1e9
+        udp_bytes = sum(s["bytes"] for s in udp_stats)
+        udp_sent = sum(s["sent"] for s in udp_stats)
+        udp_received = sum(s["received"] for s in udp_stats)
+        udp_rtt = [r for s in udp_stats for r in s["rtt"]]
+        total_gbps = tcp_gbps + udp_bytes * 8 / elapsed / 1e9
+        cpu_cores = {name: value / elapsed for name, value in cpu.items()}
+
+        return {
+            "binary": str(binary),
+            "mode": "netns" if opts.netns else "loopback",
+            "netem": {"delay_ms": opts.delay, "loss_pct": opts.loss, "rate_mbit": opts.rate}
+            if opts.netns else None,
+            "link": link,
+            "flows": {"tcp": opts.tcp, "udp": opts.udp, "udp_rate_mbps": opts.udp_rate},
+            "duration_s": round(elapsed, 3),
+            "tunnel_ready_ms": _ms(tunnel_ready_from_start),
+            "tunnel_first_connect_ms": _ms(tunnel_ready),
+            "connect_ms": {
+                "p50": _ms(percentile(setup, 50)),
+                "p99": _ms(percentile(setup, 99)),
+                "mean": _ms(statistics.mean(setup)) if setup else None,
+            },
+            "latency_ms": {
+                "idle_p50": _ms(percentile(idle, 50)),
+                "idle_p99": _ms(percentile(idle, 99)),
+                "loaded_p50": _ms(percentile(loaded, 50)),
+                "loaded_p99": _ms(percentile(loaded, 99)),
+            },
+            "throughput": {
+                "tcp_mbps": round(tcp_gbps * 1000, 2),
+                "tcp_sent_mbps": round(sum(c[0] for c in counters) * 8 / elapsed / 1e6, 2),
+                "udp_mbps": round(udp_bytes * 8 / elapsed / 1e6, 2),
+                "udp_loss_pct": round(100 * (1 - udp_received / udp_sent), 3) if udp_sent else None,
+                "udp_rtt_p50_ms": _ms(percentile(udp_rtt, 50)),
+                "udp_rtt_p99_ms": _ms(percentile(udp_rtt, 99)),
+            },
+            "cpu": {
+                "server_cores": round(cpu_cores["server"], 3),
+                "client_cores": round(cpu_cores["client"], 3),
+                "server_cores_per_gbps": round(cpu_cores["server"] / total_gbps, 3) if total_gbps else None,
+                "client_cores_per_gbps": round(cpu_cores["client"] / total_gbps, 3) if total_gbps else None,
+            },
+            "errors": sorted(set(errors))[:10],
+            "workdir": str(workdir),
+        }
+    finally:
+        stop_process(client)
+        stop_process(server)
+        if targets:
+            targets.close()
+        if opts.netns:
+            teardown_netns()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hy2 回环吞吐与延迟基准测试")
+    parser.add_argument("--binary", help="hysteria 二进制文件 (默认 HY2_BINARY_PATH)")
+    parser.add_argument("--port", type=int, default=44300, help="服务端端口")
+    parser.add_argument("--socks", type=int, default=5080, help="客户端 SOCKS5 端口")
+    parser.add_argument("--tcp", type=int, default=4, help="并发 TCP 流数")
+    parser.add_argument("--udp", type=int, default=0, help="并发 UDP 流数")
+    parser.add_argument("--udp-rate", type=float, default=20, help="每个 UDP 流的发送速率 Mbps")
+    parser.add_argument("-d", "--duration", type=float, default=10, help="负载阶段时长（秒）")
+    parser.add_argument("--setup-samples", type=int, default=50, help="连接建立耗时采样次数")
+    parser.add_argument("--bandwidth", type=int, help="写入配置的带宽 Mbps (生成 quic/bandwidth 配置)")
+    parser.add_argument("--rtt", type=int, default=200, help="计算 QUIC 窗口使用的 RTT 毫秒")
+    parser.add_argument("--netns", action="store_true", help="服务端运行在独立网络命名空间 (需要 root)")
+    parser.add_argument("--delay", type=float, default=0, help="netem 往返延迟毫秒 (需要 --netns)")
+    parser.add_argument("--loss", type=float, default=0, help="netem 单向丢包率 %% (需要 --netns)")
+    parser.add_argument("--rate", type=int, default=0, help="netem 带宽限制 Mbit (需要 --netns)")
+    parser.add_argument("--timeout", type=float, default=15, help="等待隧道就绪的超时（秒）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    opts = parser.parse_args()
+
+    if (opts.delay or opts.loss or opts.rate) and not opts.netns:
+        parser.error("--delay / --loss / --rate 需要配合 --netns 使用")
+
+    try:
+        report = run_benchmark(opts)
+    except (RuntimeError, OSError) as e:
+        print(f"基准测试失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if opts.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    thr, lat, cpu = report["throughput"], report["latency_ms"], report["cpu"]
+    print(f"模式: {report['mode']}  TCP 流: {opts.tcp}  UDP 流: {opts.udp}  时长: {report['duration_s']} s")
+    print(f"隧道就绪: {report['tunnel_ready_ms']} ms  "
+          f"连接建立: p50 {report['connect_ms']['p50']} ms / p99 {report['connect_ms']['p99']} ms")
+    print(f"延迟 (空载): p50 {lat['idle_p50']} ms / p99 {lat['idle_p99']} ms")
+    print(f"延迟 (负载): p50 {lat['loaded_p50']} ms / p99 {lat['loaded_p99']} ms")
+    print(f"TCP 吞吐: {thr['tcp_mbps']} Mbps")
+    if opts.udp:
+        print(f"UDP 吞吐: {thr['udp_mbps']} Mbps  丢包: {thr['udp_loss_pct']}%  "
+              f"RTT p50 {thr['udp_rtt_p50_ms']} ms / p99 {thr['udp_rtt_p99_ms']} ms")
+    print(f"CPU: 服务端 {cpu['server_cores']} 核 ({cpu['server_cores_per_gbps']} 核/Gbps)  "
+          f"客户端 {cpu['client_cores']} 核 ({cpu['client_cores_per_gbps']} 核/Gbps)")
+    if report["errors"]:
+        print(f"错误: {'; '.join(report['errors'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准测试
+
+在全新的解释器中多次运行 `python -X importtime -m hy2 --help`，
+统计总耗时和导入耗时最高的模块。
+
+使用方法:
+    python3 benchmarks/startup.py
+    python3 benchmarks/startup.py --runs 20 --top 15 --json
+    python3 benchmarks/startup.py -- status      # 测量其他子命令
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_once(args):
+    """
+    运行一次并解析 -X importtime 输出
+
+    Returns:
+        tuple: (总耗时秒, {模块: 累计导入微秒}, 自身导入总微秒)
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "hy2", *args],
+        capture_output=True, text=True, env=env, stdin=subprocess.DEVNULL
+    )
+    elapsed = time.perf_counter() - start
+
+    modules = {}
+    self_total = 0
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            self_total += int(self_us)
+            modules[name] = max(modules.get(name, 0), int(cumulative_us))
+    return elapsed, modules, self_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hy2 启动耗时基准测试")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="运行次数")
+    parser.add_argument("--top", type=int, default=10, help="显示导入最慢的模块数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    parser.add_argument("args", nargs="*", default=["--help"], help="传给 hy2 的参数")
+    opts = parser.parse_args()
+
+    # 预热一次，生成 .pyc
+    run_once(opts.args)
+
+    walls, imports, merged = [], [], {}
+    for _ in range(opts.runs):
+        elapsed, modules, self_total = run_once(opts.args)
+        walls.append(elapsed)
+        imports.append(self_total)
+        for name, us in modules.items():
+            merged.setdefault(name, []).append(us)
+
+    hy2_modules = sorted(name for name in merged if name == "hy2" or name.startswith("hy2."))
+    slowest = sorted(
+        ((name, statistics.median(values)) for name, values in merged.items()),
+        key=lambda item: item[1], reverse=True
+    )[:opts.top]
+
+    report = {
+        "command": ["python", "-m", "hy2", *opts.args],
+        "runs": opts.runs,
+        "wall_ms": {
+            "min": round(min(walls) * 1000, 2),
+            "median": round(statistics.median(walls) * 1000, 2),
+            "max": round(max(walls) * 1000, 2),
+        },
+        "import_ms_median": round(statistics.median(imports) / 1000, 2),
+        "hy2_modules_loaded": hy2_modules,
+        "slowest_imports_ms": [(name, round(us / 1000, 2)) for name, us in slowest],
+    }
+
+    if opts.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"命令: {' '.join(report['command'])}  ({opts.runs} 次)")
+    wall = report["wall_ms"]
+    print(f"总耗时: 最小 {wall['min']} ms / 中位数 {wall['median']} ms / 最大 {wall['max']} ms")
+    print(f"导入耗时 (中位数): {report['import_ms_median']} ms")
+    print(f"加载的 hy2 模块: {', '.join(hy2_modules) or '-'}")
+    print("-" * 50)
+    for name, ms in report["slowest_imports_ms"]:
+        print(f"{ms:>8.2f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+用户库基准测试
+
+在临时配置目录中生成不同规模的用户，测量批量导入、用户库读写、按用户名查找，
+以及修改一个用户后重新生成配置的耗时: 只替换 auth 段 (sync_auth) 与解析、
+修改、序列化整个 config.yaml (ServerConfig) 两种方式对比。
+
+使用方法:
+    python3 benchmarks/users.py
+    python3 benchmarks/users.py --users 1000 10000 100000 --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from contextlib import redirect_stdout
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench(count, workdir, lookups=100000):
+    """
+    测量一种规模
+
+    Returns:
+        dict: 各项耗时 (毫秒)
+    """
+    from hy2.config import CONFIG_DIR
+    from hy2.server_config import ServerConfig
+    from hy2.users import UserStore, read_records, sync_auth, render_auth
+
+    csv_path = workdir / f"users-{count}.csv"
+    rng = random.Random(count)
+    with open(csv_path, "w") as f:
+        f.write("name,password,quota,expires\n")
+        for i in range(count):
+            quota = rng.choice(("", "50G", "100G"))
+            expires = rng.choice(("", "2099-12-31"))
+            f.write(f"u{i:07d},{rng.getrandbits(48):012x},{quota},{expires}\n")
+
+    base = ServerConfig.build(
+        "/etc/hysteria/cert.crt", "/etc/hysteria/private.key", 443, "20000:30000",
+        [{"name": "admin", "password": "secret"}], "example.com",
+        {"up": 1000, "down": 1000, "rtt": 200})
+    base.save(CONFIG_DIR / "config.yaml")
+
+    result = {"users": count}
+    t, records = timed(read_records, csv_path)
+    result["read_csv_ms"] = t
+    store = UserStore()
+    t, _ = timed(store.import_records, records)
+    result["import_ms"] = t
+    t, _ = timed(store.save)
+    result["store_save_ms"] = t
+    t, store = timed(UserStore.load)
+    result["store_load_ms"] = t
+    result["store_bytes"] = (CONFIG_DIR / "users.json").stat().st_size
+
+    names = [f"u{rng.randrange(count):07d}" for _ in range(lookups)]
+    t, _ = timed(lambda: [store.get(name) for name in names])
+    result["lookup_ns"] = t / lookups * 1e9
+
+    t, _ = timed(sync_auth, store, restart=False)
+    result["initial_sync_ms"] = t
+    result["config_bytes"] = (CONFIG_DIR / "config.yaml").stat().st_size
+
+    # 增量: 加载用户库、添加一个用户、保存并只替换 auth 段
+    def incremental():
+        s = UserStore.load()
+        s.add("newcomer")
+        s.save()
+        return sync_auth(s, restart=False)
+    t, _ = timed(incremental)
+    result["add_user_incremental_ms"] = t
+    t, _ = timed(render_auth, store.auth_section())
+    result["render_auth_ms"] = t
+
+    # 对比: 解析整个配置、替换用户、比较差异后序列化
+    def full():
+        config = ServerConfig.load()
+        users = config.users
+        users["another"] = "pwd"
+        new = config.with_users(users)
+        config.diff(new)
+        new.save()
+    t, _ = timed(full)
+    result["add_user_full_config_ms"] = t
+
+    return {k: (round(v * 1000, 1) if k.endswith("_ms") else round(v, 1) if isinstance(v, float) else v)
+            for k, v in result.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hy2 用户库基准测试")
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="用户规模 (可多个)")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    opts = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="hy2-users-"))
+    os.environ["HY2_CONFIG_DIR"] = str(workdir / "config")
+    sys.path.insert(0, str(REPO_ROOT))
+
+    results = []
+    with redirect_stdout(sys.stderr):
+        for count in opts.users:
+            for path in (workdir / "config").glob("*"):
+                path.unlink()
+            results.append(bench(count, workdir))
+
+    if opts.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = (
+        ("users", "用户数"),
+        ("import_ms", "导入 ms"),
+        ("store_load_ms", "读取库 ms"),
+        ("lookup_ns", "查找 ns"),
+        ("add_user_incremental_ms", "增量添加 ms"),
+        ("add_user_full_config_ms", "整体重写 ms"),
+        ("config_bytes", "配置字节"),
+    )
+    rows = [[title for _, title in columns]]
+    rows += [[str(r[key]) for key, _ in columns] for r in results]
+    from hy2.utils.output import format_table
+    for line in format_table(rows, right_align=range(len(columns))):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,9 @@ Hysteria 2 一键安装脚本
 import os
 import sys
 import subprocess
-import platform
-import secrets
-import string
-import random
-import json
 import re
-import shutil
 import time
 from pathlib import Path
-from urllib.parse import quote
 
 # ============ 配置 ============
 HY2_VERSION = "app/v2.7.0"
@@ -81,6 +74,7 @@ def run_cmd(cmd, check=True, capture=False):
 
 def get_arch():
     """获取系统架构"""
+    import platform
     machine = platform.machine()
     arch_map = {
         "x86_64": "amd64",
@@ -107,6 +101,8 @@ def is_port_available(port):
 
 def generate_password(length=8):
     """生成随机密码"""
+    import secrets
+    import string
     return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(length))
 
 def is_installed():
@@ -185,6 +181,7 @@ def show_loading(msg, delay=0.1):
 
 def backup_config():
     """备份配置文件"""
+    import shutil
     config_file = CONFIG_DIR / "config.yaml"
     if config_file.exists():
         backup_path = CONFIG_DIR / "config.yaml.backup"
@@ -427,6 +424,7 @@ def handle_acme_certificate():
 # ============ 配置收集 ==========
 def collect_config():
     """收集配置信息"""
+    import random
     print("\n" + "="*50)
     yellow("配置向导")
     print("="*50)
@@ -531,6 +529,8 @@ hopPorts:
 
 def generate_client_config(server_ip, port, password, domain, hop_ports=None):
     """生成客户端配置"""
+    import json
+    from urllib.parse import quote
     CLIENT_DIR.mkdir(parents=True, exist_ok=True)
 
     server_addr = f"[{server_ip}]" if is_ipv6(server_ip) else server_ip
@@ -722,6 +722,7 @@ def install_hy2():
 # ============ 卸载 ==========
 def uninstall_hy2(skip_confirm=False):
     """卸载"""
+    import shutil
     if not skip_confirm:
         if input("确认卸载? [y/N]: ").lower() != 'y':
             return
@@ -2,23 +2,15 @@
 Hysteria 2 一键安装脚本 - 模块化版本
 作者: w0x7ce
 支持 Ubuntu VPS
+
+子模块在首次访问对应属性时才导入，`import hy2` 本身不加载任何子模块。
 """
 
+import importlib
+
 __version__ = "2.0.0"
 __author__ = "w0x7ce"
 
-# 导出主要功能
-from .config import *
-from .utils.output import *
-from .utils.helpers import *
-from .system.check import *
-from .system.firewall import *
-from .system.bbr import *
-from .certificate import *
-from .service import *
-from .client import *
-from .installer import *
-
 __all__ = [
     "install_hy2",
     "install_binary",
@@ -27,6 +19,73 @@ __all__ = [
     "change_config",
     "show_config",
     "show_logs",
+    "show_stats",
     "manage_service",
     "main",
 ]
+
+# 常用属性 -> 所在子模块
+_LAZY_ATTRS = {
+    "install_hy2": ".installer",
+    "install_binary": ".installer",
+    "run_config_wizard": ".installer",
+    "uninstall_hy2": ".installer",
+    "change_config": ".installer",
+    "download_hy2": ".installer",
+    "collect_config": ".installer",
+    "generate_server_config": ".installer",
+    "apply_config_change": ".installer",
+    "show_config": ".client",
+    "generate_client_config": ".client",
+    "show_logs": ".service",
+    "manage_service": ".service",
+    "show_stats": ".stats",
+    "create_systemd_service": ".service",
+    "wait_for_service": ".service",
+    "handle_certificate": ".certificate",
+    "generate_self_signed_cert": ".certificate",
+    "main": ".__main__",
+}
+
+# 其余属性按此顺序查找 (与原先 from ... import * 的顺序一致，后者优先)
+_SEARCH_ORDER = (
+    ".installer",
+    ".client",
+    ".service",
+    ".certificate",
+    ".system.bbr",
+    ".system.firewall",
+    ".system.check",
+    ".utils.helpers",
+    ".utils.output",
+    ".config",
+)
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name:
+        value = getattr(importlib.import_module(module_name, __name__), name)
+    else:
+        try:
+            value = importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            for module_name in _SEARCH_ORDER:
+                module = importlib.import_module(module_name, __name__)
+                if hasattr(module, name):
+                    value = getattr(module, name)
+                    break
+            else:
+                raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
@@ -3,24 +3,39 @@ Hysteria 2 一键安装脚本 - 主入口
 作者: w0x7ce
 
 支持:
-    python -m hy2
+    python -m hy2               # 交互式菜单
+    python -m hy2 status        # 子命令，见 python -m hy2 --help
     python hy2/__main__.py
 """
 
 import sys
 
-from hy2.installer import install_hy2, uninstall_hy2, change_config, run_config_wizard
-from hy2.client import show_config
-from hy2.service import manage_service, show_logs
-from hy2.utils.output import print_menu, red, yellow
-from hy2.utils.helpers import get_install_status
 
+def main(argv=None):
+    """
+    主函数 - 带参数时执行子命令 (见 hy2.cli)，否则进入交互式菜单
 
-def main():
-    """主函数 - 交互式菜单"""
+    Returns:
+        int: 退出码
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        from hy2.cli import run
+        return run(argv)
+
+    # 菜单相关函数按需导入，子命令不加载菜单模块
+    from hy2.installer import install_hy2, uninstall_hy2, change_config, run_config_wizard
+    from hy2.client import show_config
+    from hy2.service import manage_service, show_logs
+    from hy2.stats import show_stats
+    from hy2.utils.output import print_menu, red
+    from hy2.utils.helpers import get_install_status, refresh_service_state
+
+    refresh_service_state()
     while True:
         print_menu()
-        choice = input("\n请选择 [0-9]: ").strip()
+        choice = input("\n请选择 [0-10]: ").strip()
 
         install_status = get_install_status()
 
@@ -65,18 +80,25 @@ def main():
             else:
                 red("请先完成安装和配置")
 
+        elif choice == "10":
+            if install_status >= 2:
+                show_stats()
+            else:
+                red("请先完成安装和配置")
+
         elif choice in ["0", "q", "Q"]:
             print("\n再见!")
-            break
+            return 0
         else:
             red("无效选择")
 
+        refresh_service_state()
         input("\n回车返回...")
 
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\n\n已取消")
         sys.exit(0)
@@ -0,0 +1,843 @@
+"""
+内置 ACME v2 客户端 (RFC 8555) - 申请和自动续期证书，不依赖 acme.sh、curl 或 openssl
+
+    AcmeClient          目录、nonce、JWS (ES256) 签名请求、账户、订单、授权、下载证书
+    ChallengeResponder  asyncio 挑战应答: HTTP-01 (TCP 80) 或 TLS-ALPN-01 (TCP 443，RFC 8737)
+    issue_certificate   完整的申请流程，证书和私钥校验后原子替换
+    RenewalScheduler    在有效期的 2/3 处 (加随机抖动) 续期，成功后按设置的重启方式重启 hysteria-server
+
+Hysteria 只监听 UDP，TLS-ALPN-01 使用的 TCP 443 通常空闲，服务运行时也能完成验证。
+
+设置 (CA 目录、挑战方式、端口、域名) 保存在 CONFIG_DIR/acme.json，账户密钥为
+CONFIG_DIR/acme-account.key。测试时可用 --directory 指向本地的 Pebble
+(https://localhost:14000/dir)，并用 --ca-bundle 信任其 HTTPS 证书。
+"""
+
+import os
+import json
+import time
+import base64
+import random
+import asyncio
+import hashlib
+from pathlib import Path
+
+# 轮询订单、授权状态的默认间隔（秒，服务端返回 Retry-After 时以其为准，最长 10 秒）
+POLL_INTERVAL = 1
+
+# 等待单个授权或订单完成的超时（秒）
+ORDER_TIMEOUT = 120
+
+# 续期失败后的最长重试间隔（秒），以及调度器的最长单次休眠（秒，期间证书可能被手动替换）
+MAX_RETRY_INTERVAL = 86400
+MAX_SLEEP = 3600
+
+_HTTP_PREFIX = "/.well-known/acme-challenge/"
+_ALPN_PROTOCOL = "acme-tls/1"
+
+
+class AcmeError(Exception):
+    """ACME 请求失败、授权无效或证书不可用"""
+
+    def __init__(self, message, problem=None):
+        super().__init__(message)
+        self.problem = problem or {}
+
+
+def _b64(data):
+    """base64url，无填充"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+# ============ 设置 ============
+
+def settings_path():
+    """ACME 设置文件"""
+    from .config import CONFIG_DIR
+    return CONFIG_DIR / "acme.json"
+
+
+def account_key_path():
+    """ACME 账户私钥"""
+    from .config import CONFIG_DIR
+    return CONFIG_DIR / "acme-account.key"
+
+
+def load_settings():
+    """
+    ACME 设置
+
+    Returns:
+        dict: {"directory", "email", "ca_bundle", "challenge", "http_port", "tls_port",
+               "domains", "cert", "key"}，续期计划另有 "renew_at"、"planned_for"
+    """
+    from .config import (CONFIG_DIR, ACME_DIRECTORY, ACME_EMAIL, ACME_CA_BUNDLE,
+                         ACME_HTTP_PORT, ACME_TLS_PORT)
+
+    settings = {
+        "directory": ACME_DIRECTORY,
+        "email": ACME_EMAIL,
+        "ca_bundle": ACME_CA_BUNDLE,
+        "challenge": "http-01",
+        "http_port": ACME_HTTP_PORT,
+        "tls_port": ACME_TLS_PORT,
+        "domains": [],
+        "cert": str(CONFIG_DIR / "cert.crt"),
+        "key": str(CONFIG_DIR / "private.key"),
+    }
+    try:
+        settings.update(json.loads(settings_path().read_text()))
+    except (OSError, ValueError):
+        pass
+    return settings
+
+
+def save_settings(**changes):
+    """修改设置并返回新的设置，值为 None 的项保持不变"""
+    from .utils.helpers import write_atomic
+
+    settings = load_settings()
+    settings.update({k: v for k, v in changes.items() if v is not None})
+    write_atomic(settings_path(), json.dumps(settings, indent=2))
+    return settings
+
+
+def load_account_key():
+    """读取账户私钥，不存在时生成 (0600)"""
+    from .utils.crypto import ECKey
+    from .utils.helpers import write_atomic
+
+    path = account_key_path()
+    if path.exists():
+        return ECKey.from_pem(path.read_text())
+    key = ECKey()
+    write_atomic(path, key.to_pem(), mode=0o600)
+    return key
+
+
+# ============ ACME 协议 ============
+
+class AcmeClient:
+    """
+    ACME v2 客户端 (阻塞调用，异步代码中放到线程池中运行)
+
+    所有请求都是 JWS 签名的 POST (读取资源使用 POST-as-GET)；
+    newAccount 使用 jwk，之后使用账户 URL (kid)。
+    """
+
+    def __init__(self, directory_url, account_key, ca_bundle=None, timeout=30):
+        """
+        Args:
+            directory_url: CA 目录地址
+            account_key: 账户私钥 (ECKey)
+            ca_bundle: 信任的 CA 证书文件，默认使用系统证书
+            timeout: 单个请求的超时（秒）
+        """
+        import ssl
+
+        self.directory_url = directory_url
+        self.key = account_key
+        self.timeout = timeout
+        self.context = ssl.create_default_context(cafile=ca_bundle or None)
+        self.kid = None
+        self._directory = None
+        self._nonce = None
+
+    # ============ HTTP ============
+
+    def _http(self, url, data=None, method=None, headers=None):
+        """
+        发送请求，4xx/5xx 也返回响应
+
+        Returns:
+            tuple: (状态码, 响应头, 响应体)
+
+        Raises:
+            AcmeError: 网络错误
+        """
+        import urllib.request
+        import urllib.error
+        from . import __version__
+
+        request = urllib.request.Request(
+            url, data=data, method=method or ("POST" if data is not None else "GET"),
+            headers={"User-Agent": f"hy2/{__version__}", **(headers or {})})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout, context=self.context) as resp:
+                status, response_headers, body = resp.status, resp.headers, resp.read()
+        except urllib.error.HTTPError as e:
+            status, response_headers, body = e.code, e.headers, e.read()
+        except OSError as e:
+            raise AcmeError(f"无法连接 {url}: {getattr(e, 'reason', e)}") from None
+        nonce = response_headers.get("Replay-Nonce")
+        if nonce:
+            self._nonce = nonce
+        return status, response_headers, body
+
+    @property
+    def directory(self):
+        """CA 目录 (newNonce、newAccount、newOrder 等地址)"""
+        if self._directory is None:
+            status, _, body = self._http(self.directory_url)
+            if status != 200:
+                raise AcmeError(f"读取 CA 目录失败: HTTP {status}")
+            self._directory = json.loads(body)
+        return self._directory
+
+    def _take_nonce(self):
+        nonce, self._nonce = self._nonce, None
+        if nonce:
+            return nonce
+        self._http(self.directory["newNonce"], method="HEAD")
+        nonce, self._nonce = self._nonce, None
+        if not nonce:
+            raise AcmeError("CA 未返回 Replay-Nonce")
+        return nonce
+
+    # ============ JWS ============
+
+    def jwk(self):
+        """账户公钥的 JWK"""
+        x, y = self.key.public
+        return {"crv": "P-256", "kty": "EC",
+                "x": _b64(x.to_bytes(32, "big")), "y": _b64(y.to_bytes(32, "big"))}
+
+    def thumbprint(self):
+        """JWK 指纹 (RFC 7638)，用于密钥授权"""
+        canonical = json.dumps(self.jwk(), sort_keys=True, separators=(",", ":"))
+        return _b64(hashlib.sha256(canonical.encode()).digest())
+
+    def key_authorization(self, token):
+        return f"{token}.{self.thumbprint()}"
+
+    def _jws(self, url, payload, nonce):
+        protected = {"alg": "ES256", "nonce": nonce, "url": url}
+        if self.kid:
+            protected["kid"] = self.kid
+        else:
+            protected["jwk"] = self.jwk()
+        protected = _b64(json.dumps(protected).encode())
+        payload = "" if payload is None else _b64(json.dumps(payload).encode())
+        signature = _b64(self.key.sign_raw(f"{protected}.{payload}".encode()))
+        return json.dumps({"protected": protected, "payload": payload, "signature": signature}).encode()
+
+    def post(self, url, payload=None, accept=None):
+        """
+        签名 POST，payload 为 None 时为 POST-as-GET；nonce 失效时自动重试
+
+        Returns:
+            tuple: (响应头, 响应体)
+
+        Raises:
+            AcmeError: CA 返回错误
+        """
+        headers = {"Content-Type": "application/jose+json"}
+        if accept:
+            headers["Accept"] = accept
+        for attempt in range(3):
+            status, response_headers, body = self._http(
+                url, self._jws(url, payload, self._take_nonce()), headers=headers)
+            if status < 400:
+                return response_headers, body
+            try:
+                problem = json.loads(body)
+            except ValueError:
+                problem = {}
+            if problem.get("type") == "urn:ietf:params:acme:error:badNonce" and attempt < 2:
+                continue
+            raise AcmeError(f"{problem.get('detail') or f'HTTP {status}'} ({url})", problem)
+
+    def get(self, url):
+        """POST-as-GET 读取 JSON 资源"""
+        return json.loads(self.post(url)[1])
+
+    def poll(self, url, waiting, timeout=ORDER_TIMEOUT):
+        """
+        轮询资源直到状态不在 waiting 中
+
+        Returns:
+            dict: 资源
+
+        Raises:
+            AcmeError: 超时
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            headers, body = self.post(url)
+            resource = json.loads(body)
+            if resource.get("status") not in waiting:
+                return resource
+            if time.monotonic() >= deadline:
+                raise AcmeError(f"{timeout} 秒内未完成 (状态 {resource.get('status')}): {url}")
+            try:
+                delay = float(headers.get("Retry-After") or POLL_INTERVAL)
+            except ValueError:
+                delay = POLL_INTERVAL
+            time.sleep(min(max(delay, 0.1), 10))
+
+    # ============ 流程 ============
+
+    def register(self, email=None):
+        """创建账户或取回已有账户 (同一密钥重复注册返回原账户)，返回账户 URL"""
+        payload = {"termsOfServiceAgreed": True}
+        if email:
+            payload["contact"] = [f"mailto:{email}"]
+        headers, _ = self.post(self.directory["newAccount"], payload)
+        self.kid = headers.get("Location")
+        if not self.kid:
+            raise AcmeError("CA 未返回账户地址")
+        return self.kid
+
+    def authorize(self, url, responder, on_progress=None):
+        """
+        完成一个授权
+
+        Raises:
+            AcmeError: 不支持所选挑战方式，或验证失败
+        """
+        authz = self.get(url)
+        domain = authz["identifier"]["value"]
+        if authz.get("status") == "valid":
+            return
+        challenge = next((c for c in authz.get("challenges", []) if c.get("type") == responder.challenge), None)
+        if challenge is None:
+            offered = ", ".join(c.get("type", "?") for c in authz.get("challenges", []))
+            raise AcmeError(f"{domain}: CA 不提供 {responder.challenge} 挑战 (可用: {offered})")
+
+        responder.add(domain, challenge["token"], self.key_authorization(challenge["token"]))
+        try:
+            if on_progress:
+                on_progress(f"验证域名 {domain} ({responder.challenge})...")
+            self.post(challenge["url"], {})
+            authz = self.poll(url, ("pending", "processing"))
+        finally:
+            responder.remove(domain, challenge["token"])
+        if authz.get("status") != "valid":
+            errors = [c["error"].get("detail", "") for c in authz.get("challenges", []) if c.get("error")]
+            raise AcmeError(f"{domain} 验证失败: {'; '.join(errors) or authz.get('status')}",
+                            next((c["error"] for c in authz.get("challenges", []) if c.get("error")), None))
+
+    def obtain(self, domains, responder, email=None, on_progress=None):
+        """
+        申请证书 (responder 须已启动)
+
+        Args:
+            domains: 域名列表，第一个为证书 CN
+            responder: ChallengeResponder
+            email: 账户联系邮箱
+            on_progress: 进度回调 (文本)
+
+        Returns:
+            tuple: (证书链 PEM, 证书私钥 ECKey)
+
+        Raises:
+            AcmeError
+        """
+        from .utils.crypto import ECKey, build_csr
+
+        progress = on_progress or (lambda text: None)
+        progress(f"注册 ACME 账户 ({self.directory_url})...")
+        self.register(email)
+        headers, body = self.post(self.directory["newOrder"],
+                                  {"identifiers": [{"type": "dns", "value": d} for d in domains]})
+        order_url, order = headers.get("Location"), json.loads(body)
+        for url in order["authorizations"]:
+            self.authorize(url, responder, progress)
+
+        order = self.poll(order_url, ("pending",))
+        if order.get("status") != "ready":
+            raise AcmeError(f"订单状态异常: {order.get('status')}", order.get("error"))
+        progress("提交证书签名请求...")
+        key = ECKey()
+        self.post(order["finalize"], {"csr": _b64(build_csr(key, domains))})
+        order = self.poll(order_url, ("ready", "processing"))
+        if order.get("status") != "valid" or not order.get("certificate"):
+            raise AcmeError(f"签发失败: {order.get('status')}", order.get("error"))
+        _, chain = self.post(order["certificate"], accept="application/pem-certificate-chain")
+        return chain.decode(), key
+
+
+# ============ 挑战应答 ============
+
+class ChallengeResponder:
+    """
+    asyncio 挑战应答服务
+
+    http-01: 在 /.well-known/acme-challenge/<token> 返回密钥授权
+    tls-alpn-01: ALPN 协商 acme-tls/1，按 SNI 返回带 acmeIdentifier 扩展的自签证书
+
+    add / remove 可在其他线程中调用 (AcmeClient 在线程池中运行)。
+    """
+
+    def __init__(self, challenge="http-01", port=None, host=None):
+        """
+        Args:
+            challenge: http-01 或 tls-alpn-01
+            port: 监听端口，默认 ACME_HTTP_PORT / ACME_TLS_PORT
+            host: 监听地址，默认所有地址
+        """
+        from .config import ACME_HTTP_PORT, ACME_TLS_PORT, ACME_CHALLENGES
+
+        if challenge not in ACME_CHALLENGES:
+            raise ValueError(f"不支持的挑战方式: {challenge}")
+        self.challenge = challenge
+        self.port = port or (ACME_HTTP_PORT if challenge == "http-01" else ACME_TLS_PORT)
+        self.host = host
+        self.tokens = {}
+        self.contexts = {}
+        self.server = None
+        self._tmpdir = None
+
+    def add(self, domain, token, key_authorization):
+        """发布一个挑战的应答"""
+        if self.challenge == "http-01":
+            self.tokens[token] = key_authorization
+        else:
+            self.contexts[domain] = self._alpn_context(domain, key_authorization)
+
+    def remove(self, domain, token):
+        self.tokens.pop(token, None)
+        self.contexts.pop(domain, None)
+
+    def _alpn_context(self, domain, key_authorization):
+        """TLS-ALPN-01 挑战证书的 SSLContext"""
+        import ssl
+        import tempfile
+        from .utils.crypto import ECKey, build_self_signed_cert, acme_identifier_extension, pem_encode
+
+        key = ECKey()
+        cert = build_self_signed_cert(key, domain, days=1,
+                                      extra_extensions=[acme_identifier_extension(key_authorization)])
+        # load_cert_chain 只接受文件路径
+        fd, path = tempfile.mkstemp(dir=self._tmpdir, suffix=".pem")
+        with os.fdopen(fd, "w") as f:
+            f.write(key.to_pem() + pem_encode("CERTIFICATE", cert))
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(path)
+        context.set_alpn_protocols([_ALPN_PROTOCOL])
+        os.unlink(path)
+        return context
+
+    def _select_context(self, sock, server_name, context):
+        """SNI 回调: 换成该域名的挑战证书，未知域名中止握手"""
+        import ssl
+
+        selected = self.contexts.get(server_name)
+        if selected is None:
+            return ssl.ALERT_DESCRIPTION_UNRECOGNIZED_NAME
+        sock.context = selected
+        return None
+
+    async def start(self):
+        """开始监听"""
+        if self.challenge == "http-01":
+            self.server = await asyncio.start_server(
+                self._handle_http, self.host, self.port, reuse_address=True)
+            return
+        import ssl
+        import tempfile
+
+        self._tmpdir = tempfile.mkdtemp(prefix="hy2-acme-")
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.set_alpn_protocols([_ALPN_PROTOCOL])
+        context.sni_callback = self._select_context
+        self.server = await asyncio.start_server(
+            self._handle_tls, self.host, self.port, ssl=context, reuse_address=True)
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self._tmpdir:
+            import shutil
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    async def _handle_http(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            parts = request.split(b"\r\n", 1)[0].decode("latin-1").split()
+            path = parts[1] if len(parts) == 3 else ""
+            body = None
+            if parts and parts[0] in ("GET", "HEAD") and path.startswith(_HTTP_PREFIX):
+                body = self.tokens.get(path[len(_HTTP_PREFIX):])
+            status = "200 OK" if body else "404 Not Found"
+            data = (body or "").encode()
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode())
+            if parts[0] != "HEAD":
+                writer.write(data)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_tls(self, reader, writer):
+        # 验证方只需要握手中的证书
+        writer.close()
+
+
+# ============ 证书 ============
+
+def certificate_validity(cert_path):
+    """
+    证书的有效期
+
+    Returns:
+        tuple: (生效时间戳, 到期时间戳)
+
+    Raises:
+        OSError / ValueError: 无法读取或解析
+    """
+    from .utils.crypto import pem_decode, parse_certificate
+
+    cert = parse_certificate(pem_decode(Path(cert_path).read_text(), "CERTIFICATE"))
+    return cert["not_before"].timestamp(), cert["not_after"].timestamp()
+
+
+def plan_renewal(not_before, not_after, rng=None):
+    """
+    续期时间: 有效期的 ACME_RENEW_AT 处，加上 ±ACME_RENEW_JITTER 的随机抖动
+
+    Let's Encrypt 的 90 天证书在第 60 天前后 4.5 天内续期，避免大量服务器集中在同一时刻。
+    """
+    from .config import ACME_RENEW_AT, ACME_RENEW_JITTER
+
+    lifetime = not_after - not_before
+    jitter = ((rng or random).random() * 2 - 1) * ACME_RENEW_JITTER * lifetime
+    return not_before + lifetime * ACME_RENEW_AT + jitter
+
+
+def install_certificate(cert_path, key_path, chain_pem, key):
+    """
+    校验后原子替换证书和私钥
+
+    两个文件都先写入同目录的临时文件并落盘，全部成功后才依次 rename (先证书后私钥)，
+    写入失败时原证书保持不变。两次 rename 之间读取的证书和私钥不配对；hysteria-server
+    只在启动时读取，替换后由 reload_server 重启，不受影响。
+
+    Raises:
+        AcmeError: 证书与私钥不匹配或已过期
+        OSError: 写入失败
+    """
+    import tempfile
+    from .utils.crypto import pem_decode, parse_certificate, public_key_info
+
+    try:
+        leaf = parse_certificate(pem_decode(chain_pem, "CERTIFICATE"))
+    except ValueError as e:
+        raise AcmeError(f"CA 返回的证书无效: {e}") from None
+    if leaf["public_key"] != public_key_info(key):
+        raise AcmeError("CA 返回的证书与私钥不匹配")
+    if leaf["not_after"].timestamp() <= time.time():
+        raise AcmeError("CA 返回的证书已过期")
+
+    staged = []
+    try:
+        for path, data, mode in ((Path(cert_path), chain_pem, 0o644),
+                                 (Path(key_path), key.to_pem(), 0o600)):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.")
+            staged.append((tmp, path))
+            os.fchmod(fd, mode)
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        for tmp, path in staged:
+            os.replace(tmp, path)
+    finally:
+        for tmp, _ in staged:
+            Path(tmp).unlink(missing_ok=True)
+
+
+async def obtain_certificate(settings, on_progress=None):
+    """
+    启动挑战应答并申请证书，成功后原子替换 settings 中的证书和私钥
+
+    Returns:
+        dict: {"domains", "cert", "key", "not_after", "seconds"}
+
+    Raises:
+        AcmeError: 申请失败
+        OSError: 应答端口被占用或写入失败
+    """
+    start = time.monotonic()
+    domains = list(settings["domains"])
+    if not domains:
+        raise AcmeError("未指定域名")
+    port = settings["http_port"] if settings["challenge"] == "http-01" else settings["tls_port"]
+    responder = ChallengeResponder(settings["challenge"], port)
+    await responder.start()
+    try:
+        client = AcmeClient(settings["directory"], load_account_key(), settings.get("ca_bundle"))
+        loop = asyncio.get_event_loop()
+        chain, key = await loop.run_in_executor(
+            None, client.obtain, domains, responder, settings.get("email"), on_progress)
+    finally:
+        await responder.stop()
+    install_certificate(settings["cert"], settings["key"], chain, key)
+    return {
+        "domains": domains,
+        "cert": settings["cert"],
+        "key": settings["key"],
+        "not_after": int(certificate_validity(settings["cert"])[1]),
+        "seconds": round(time.monotonic() - start, 3),
+    }
+
+
+def issue_certificate(domains=None, on_progress=None, **changes):
+    """
+    申请证书；成功后保存设置 (域名、CA、挑战方式、端口、证书路径)，供自动续期使用
+
+    Args:
+        domains: 域名列表，默认沿用设置
+        on_progress: 进度回调 (文本)
+        changes: 其余设置项 (directory、email、ca_bundle、challenge、http_port、tls_port、cert、key)，
+                 None 表示沿用
+
+    Returns:
+        dict: obtain_certificate 的结果
+
+    Raises:
+        AcmeError / OSError
+    """
+    settings = load_settings()
+    settings.update({k: v for k, v in changes.items() if v is not None})
+    if domains:
+        settings["domains"] = list(domains)
+    result = asyncio.run(obtain_certificate(settings, on_progress))
+    settings.pop("renew_at", None)
+    settings.pop("planned_for", None)
+    save_settings(**settings)
+    return result
+
+
+def reload_server():
+    """
+    证书替换后让 hysteria-server 加载新证书
+
+    按设置的重启方式重启 (见 service.restart_service: graceful 模式平滑重启，已有会话不中断)，
+    服务未运行时跳过。
+
+    Returns:
+        dict: 平滑重启的切换报告；直接重启或跳过时为 None
+
+    Raises:
+        RolloutError: 平滑重启失败 (旧进程保持运行)
+        ServiceError: systemctl restart 失败
+    """
+    from .utils.helpers import get_service_state
+    from .service import restart_service
+
+    if get_service_state(max_age=0) != "active":
+        return None
+    return restart_service(check=True)
+
+
+# ============ 自动续期 ============
+
+class RenewalScheduler:
+    """
+    证书续期调度 (asyncio)
+
+    按 plan_renewal 计划续期时间，计划与证书到期时间一起保存在设置中，
+    同一张证书在服务重启后沿用同一时间。续期成功后原子替换证书并调用 reload；
+    申请或重启失败时从 ACME_RETRY_INTERVAL 开始指数退避重试，最长 MAX_RETRY_INTERVAL。
+    单次休眠不超过 MAX_SLEEP，证书被手动替换后会重新计划。
+    """
+
+    def __init__(self, reload=None, clock=time.time, rng=None, on_event=None):
+        """
+        Args:
+            reload: 证书替换后调用 (阻塞，在线程池中运行)，默认 reload_server
+            clock: 当前时间戳
+            rng: 随机数生成器 (random.Random)
+            on_event: 事件回调 (文本)，默认输出到 stdout
+        """
+        self.reload = reload or reload_server
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.on_event = on_event or (lambda text: print(text, flush=True))
+        self.failures = 0
+        self.retry_at = None
+        self.reload_pending = False
+        self.renewals = 0
+        self._wakeup = None
+
+    def next_run(self):
+        """下一次检查的时间戳 (证书不存在或无法读取时为现在)"""
+        if self.retry_at is not None:
+            return self.retry_at
+        settings = load_settings()
+        try:
+            not_before, not_after = certificate_validity(settings["cert"])
+        except (OSError, ValueError):
+            return self.clock()
+        if settings.get("planned_for") == int(not_after) and settings.get("renew_at"):
+            return settings["renew_at"]
+        renew_at = int(plan_renewal(not_before, not_after, self.rng))
+        save_settings(renew_at=renew_at, planned_for=int(not_after))
+        self.on_event(f"证书到期 {_format_time(not_after)}，计划在 {_format_time(renew_at)} 续期")
+        return renew_at
+
+    def wake(self):
+        """重新计划 (SIGHUP)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _fail(self, message):
+        from .config import ACME_RETRY_INTERVAL
+
+        self.failures += 1
+        delay = min(ACME_RETRY_INTERVAL * 2 ** (self.failures - 1), MAX_RETRY_INTERVAL)
+        self.retry_at = self.clock() + delay
+        self.on_event(f"{message}，{int(delay)} 秒后重试")
+
+    async def run_once(self):
+        """续期一次 (含重启)；失败时安排重试"""
+        from .rollout import RolloutError
+        from .service import ServiceError
+
+        loop = asyncio.get_event_loop()
+        if not self.reload_pending:
+            try:
+                result = await obtain_certificate(load_settings(), self.on_event)
+            except (AcmeError, OSError) as e:
+                self._fail(f"证书续期失败: {e}")
+                return
+            self.renewals += 1
+            self.reload_pending = True
+            self.on_event(f"证书已续期，新证书到期 {_format_time(result['not_after'])}")
+        try:
+            await loop.run_in_executor(None, self.reload)
+        except (RolloutError, ServiceError, OSError) as e:
+            self._fail(f"新证书已写入，但重启服务失败: {e}")
+            return
+        self.reload_pending = False
+        self.failures = 0
+        self.retry_at = None
+
+    async def run(self, stop):
+        """
+        运行直到 stop (asyncio.Event) 被设置
+
+        Args:
+            stop: asyncio.Event
+        """
+        self._wakeup = asyncio.Event()
+        while not stop.is_set():
+            delay = self.next_run() - self.clock()
+            if delay <= 0:
+                await self.run_once()
+                continue
+            self._wakeup.clear()
+            waits = [asyncio.ensure_future(stop.wait()), asyncio.ensure_future(self._wakeup.wait())]
+            await asyncio.wait(waits, timeout=min(delay, MAX_SLEEP), return_when=asyncio.FIRST_COMPLETED)
+            for task in waits:
+                task.cancel()
+
+
+def _format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+def serve():
+    """前台运行续期调度，SIGHUP 重新计划，SIGTERM / Ctrl+C 退出"""
+    import signal
+
+    scheduler = RenewalScheduler()
+
+    async def main():
+        loop = asyncio.get_event_loop()
+        stop = asyncio.Event()
+        loop.add_signal_handler(signal.SIGHUP, scheduler.wake)
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+        print(f"证书续期服务已启动: {', '.join(load_settings()['domains'])}", flush=True)
+        await scheduler.run(stop)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+def status():
+    """
+    证书和续期状态
+
+    Returns:
+        dict: {"domains", "directory", "challenge", "cert", "not_after", "renew_at", "service"}
+    """
+    from .config import ACME_SERVICE_NAME
+    from .utils.helpers import run_cmd
+
+    settings = load_settings()
+    try:
+        not_after = int(certificate_validity(settings["cert"])[1])
+    except (OSError, ValueError):
+        not_after = None
+    renew_at = settings.get("renew_at") if settings.get("planned_for") == not_after else None
+    service = run_cmd(f"systemctl is-active {ACME_SERVICE_NAME}", capture=True, check=False)
+    return {
+        "domains": settings["domains"],
+        "directory": settings["directory"],
+        "challenge": settings["challenge"],
+        "cert": settings["cert"],
+        "not_after": not_after,
+        "renew_at": renew_at,
+        "service": service or "unknown",
+    }
+
+
+# ============ systemd 服务 ============
+
+def render_service_unit():
+    """续期服务的 systemd 单元内容"""
+    import sys
+    from .config import CONFIG_DIR
+
+    package_root = Path(__file__).resolve().parent.parent
+    return f"""[Unit]
+Description=Hysteria 2 certificate renewal (ACME)
+After=network-online.target
+Wants=network-online.target
+
+[Service]
+Type=simple
+Environment=PYTHONPATH={package_root}
+Environment=HY2_CONFIG_DIR={CONFIG_DIR}
+ExecStart={sys.executable} -m hy2 acme daemon
+ExecReload=/bin/kill -HUP $MAINPID
+Restart=on-failure
+RestartSec=60
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+
+def install_service():
+    """写入并启动续期服务"""
+    from .config import ACME_SERVICE_FILE, ACME_SERVICE_NAME
+    from .utils.helpers import run_cmd, write_atomic
+
+    write_atomic(ACME_SERVICE_FILE, render_service_unit())
+    run_cmd("systemctl daemon-reload", check=False)
+    run_cmd(f"systemctl enable {ACME_SERVICE_NAME}", check=False)
+    run_cmd(f"systemctl restart {ACME_SERVICE_NAME}", check=False)
+
+
+def remove_service():
+    """停止并删除续期服务"""
+    from .config import ACME_SERVICE_FILE, ACME_SERVICE_NAME
+    from .utils.helpers import run_cmd
+
+    if not ACME_SERVICE_FILE.exists():
+        return
+    run_cmd(f"systemctl disable --now {ACME_SERVICE_NAME}", check=False)
+    ACME_SERVICE_FILE.unlink(missing_ok=True)
+    run_cmd("systemctl daemon-reload", check=False)
@@ -0,0 +1,349 @@
+"""
+HTTP 认证后端 - 对接 Hysteria 的 auth.type: http
+
+Hysteria 对每个新连接向 auth.http.url 发送 POST 请求:
+
+    {"addr": "1.2.3.4:5678", "auth": "用户名:密码", "tx": 12345}
+
+返回 200 且 {"ok": true, "id": "用户名"} 时允许连接，id 用于流量统计。
+
+用户数据来自用户库 (users.json)，加载后建立以 "用户名:密码" 为键的哈希索引。
+后台定期检查用户库文件，变化时在线程中重新加载并整体替换索引，增删用户、
+修改密码或配额都不需要重启 hysteria-server，现有连接不受影响。
+过期和超出配额在每次认证时检查，无需等待配置重新生成。
+"""
+
+import json
+import time
+import asyncio
+from pathlib import Path
+
+# 请求体上限 (Hysteria 的认证请求不足 1 KiB)
+MAX_BODY = 16 * 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large"}
+
+
+def backend_url(listen=None):
+    """写入 auth.http.url 的地址"""
+    from .config import AUTH_LISTEN
+    return f"http://{listen or AUTH_LISTEN}/auth"
+
+
+class AuthIndex:
+    """
+    认证索引: {"用户名:密码": (用户名, 到期时间, 配额, 已用)}
+
+    由 UserStore 一次性构建，构建后只读，可在线程间安全替换。
+    """
+
+    def __init__(self, store=None):
+        self.entries = {}
+        if store is not None:
+            for name, u in store.users.items():
+                self.entries[f"{name}:{u['password']}"] = (name, u["expires"], u["quota"], u["used"])
+
+    @classmethod
+    def load(cls, path):
+        """直接由用户库文件的行数组构建 (不经过 UserStore，重新加载更快)"""
+        from .users import FIELDS
+
+        data = json.loads(Path(path).read_text())
+        fields = list(data.get("fields", FIELDS))
+        if fields[:len(FIELDS)] != list(FIELDS):
+            from .users import UserStore
+            return cls(UserStore.load(path))
+        index = cls()
+        index.entries = {f"{row[0]}:{row[1]}": (row[0], row[3], row[2], row[4] or 0)
+                         for row in data.get("users", [])}
+        return index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def check(self, auth, now=None):
+        """
+        校验客户端 auth 字段
+
+        Returns:
+            str: 允许登录时返回用户名，否则 None
+        """
+        entry = self.entries.get(auth)
+        if entry is None:
+            return None
+        name, expires, quota, used = entry
+        if expires is not None and expires <= (now or time.time()):
+            return None
+        if quota is not None and used >= quota:
+            return None
+        return name
+
+
+class AuthServer:
+    """
+    asyncio HTTP 认证服务
+
+    POST /auth 按 Hysteria 的协议校验，GET /health 返回用户数和计数。
+    """
+
+    def __init__(self, listen=None, path=None, reload_interval=None):
+        from .config import AUTH_LISTEN, AUTH_RELOAD_INTERVAL
+        from .users import store_path
+
+        self.listen = listen or AUTH_LISTEN
+        self.path = Path(path or store_path())
+        self.reload_interval = reload_interval or AUTH_RELOAD_INTERVAL
+        self.index = AuthIndex()
+        self.signature = None
+        self.loaded_at = None
+        self.counts = {"accepted": 0, "rejected": 0, "reloads": 0, "reload_errors": 0}
+        self.server = None
+        self._watcher = None
+
+    # ============ 用户库 ============
+
+    def _signature(self):
+        """用户库文件的 (inode, 大小, 修改时间)；原子写入会替换 inode"""
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def reload(self, force=False):
+        """
+        用户库变化时重新加载索引
+
+        读取失败时保留原索引，文件被删除时清空索引。
+
+        Returns:
+            bool: 是否替换了索引
+        """
+        signature = self._signature()
+        if signature == self.signature and not force:
+            return False
+        try:
+            index = AuthIndex.load(self.path) if signature else AuthIndex()
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+            self.counts["reload_errors"] += 1
+            print(f"用户库加载失败，沿用原索引: {e}", flush=True)
+            return False
+        self.index, self.signature = index, signature
+        self.loaded_at = time.time()
+        self.counts["reloads"] += 1
+        return True
+
+    async def _watch(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            if self._signature() != self.signature:
+                # 大用户库的加载耗时较长，放到线程中避免阻塞认证请求
+                if await loop.run_in_executor(None, self.reload):
+                    print(f"用户库已重新加载: {len(self.index)} 个用户", flush=True)
+
+    def request_reload(self):
+        """立即重新加载 (SIGHUP)"""
+        loop = asyncio.get_event_loop()
+        loop.run_in_executor(None, lambda: self.reload(force=True))
+
+    # ============ HTTP ============
+
+    def respond(self, method, path, body):
+        """
+        处理一个请求
+
+        Returns:
+            tuple: (状态码, JSON 对象)
+        """
+        path = path.split("?", 1)[0]
+        if path == "/auth":
+            if method != "POST":
+                return 405, {"ok": False}
+            try:
+                request = json.loads(body)
+                auth = request.get("auth")
+            except (ValueError, AttributeError):
+                return 400, {"ok": False}
+            name = self.index.check(auth) if isinstance(auth, str) else None
+            if name is None:
+                self.counts["rejected"] += 1
+                return 200, {"ok": False}
+            self.counts["accepted"] += 1
+            return 200, {"ok": True, "id": name}
+        if path == "/health" and method == "GET":
+            return 200, {"ok": True, "users": len(self.index), "loaded_at": self.loaded_at,
+                         **self.counts}
+        return 404, {"ok": False}
+
+    # ============ 启停 ============
+
+    async def start(self):
+        """加载用户库并开始监听"""
+        host, port = str(self.listen).rsplit(":", 1)
+        self.reload(force=True)
+        loop = asyncio.get_event_loop()
+        self.server = await loop.create_server(
+            lambda: _AuthProtocol(self), host.strip("[]") or None, int(port),
+            backlog=4096, reuse_address=True)
+        self._watcher = asyncio.ensure_future(self._watch())
+        return self.server
+
+    async def stop(self):
+        if self._watcher:
+            self._watcher.cancel()
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+class _AuthProtocol(asyncio.Protocol):
+    """
+    一个连接上的 HTTP/1.1 请求解析 (支持 keep-alive 和流水线)
+
+    认证只是一次字典查找，直接在 data_received 中同步应答，
+    不为每个连接创建协程任务。
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = b""
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.buffer += data
+        while self.transport is not None:
+            end = self.buffer.find(b"\r\n\r\n")
+            if end < 0:
+                if len(self.buffer) > MAX_BODY:
+                    self._reply(413, {"ok": False}, False)
+                return
+            lines = self.buffer[:end].decode("latin-1").split("\r\n")
+            parts = lines[0].split(" ")
+            if len(parts) != 3:
+                self._reply(400, {"ok": False}, False)
+                return
+            method, path, version = parts
+            headers = {}
+            for line in lines[1:]:
+                key, sep, value = line.partition(":")
+                if sep:
+                    headers[key.strip().lower()] = value.strip()
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+            if "chunked" in headers.get("transfer-encoding", "").lower():
+                self._reply(411, {"ok": False}, False)
+                return
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if not 0 <= length <= MAX_BODY:
+                self._reply(413, {"ok": False}, False)
+                return
+            body_start = end + 4
+            if len(self.buffer) < body_start + length:
+                return
+            body = self.buffer[body_start:body_start + length]
+            self.buffer = self.buffer[body_start + length:]
+            status, payload = self.server.respond(method, path, body)
+            self._reply(status, payload, keep_alive)
+
+    def _reply(self, status, payload, keep_alive):
+        data = json.dumps(payload, separators=(",", ":")).encode()
+        header = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                  f"Content-Type: application/json\r\n"
+                  f"Content-Length: {len(data)}\r\n")
+        if not keep_alive:
+            header += "Connection: close\r\n"
+        self.transport.write(header.encode() + b"\r\n" + data)
+        if not keep_alive:
+            self.transport.close()
+            self.transport = None
+
+    def connection_lost(self, exc):
+        self.transport = None
+
+
+def serve(listen=None, path=None):
+    """
+    前台运行认证服务，SIGHUP 立即重新加载用户库，SIGTERM / Ctrl+C 退出
+
+    Args:
+        listen: 监听地址 host:port，默认 AUTH_LISTEN
+        path: 用户库路径，默认 CONFIG_DIR/users.json
+    """
+    import signal
+
+    server = AuthServer(listen, path)
+
+    async def main():
+        loop = asyncio.get_event_loop()
+        stopped = asyncio.Event()
+        await server.start()
+        loop.add_signal_handler(signal.SIGHUP, server.request_reload)
+        loop.add_signal_handler(signal.SIGTERM, stopped.set)
+        print(f"认证服务已启动: {backend_url(server.listen)} ({len(server.index)} 个用户)", flush=True)
+        try:
+            await stopped.wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+# ============ systemd 服务 ============
+
+def render_service_unit(listen=None):
+    """认证服务的 systemd 单元内容"""
+    import sys
+    from .config import AUTH_LISTEN, CONFIG_DIR
+
+    package_root = Path(__file__).resolve().parent.parent
+    return f"""[Unit]
+Description=Hysteria 2 HTTP auth backend
+After=network.target
+
+[Service]
+Type=simple
+Environment=PYTHONPATH={package_root}
+Environment=HY2_CONFIG_DIR={CONFIG_DIR}
+ExecStart={sys.executable} -m hy2 auth-server --listen {listen or AUTH_LISTEN}
+ExecReload=/bin/kill -HUP $MAINPID
+Restart=always
+RestartSec=1
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+
+def install_service(listen=None):
+    """写入并启动认证服务"""
+    from .config import AUTH_SERVICE_FILE, AUTH_SERVICE_NAME
+    from .utils.helpers import run_cmd, write_atomic
+
+    write_atomic(AUTH_SERVICE_FILE, render_service_unit(listen))
+    run_cmd("systemctl daemon-reload", check=False)
+    run_cmd(f"systemctl enable {AUTH_SERVICE_NAME}", check=False)
+    run_cmd(f"systemctl restart {AUTH_SERVICE_NAME}", check=False)
+
+
+def remove_service():
+    """停止并删除认证服务"""
+    from .config import AUTH_SERVICE_FILE, AUTH_SERVICE_NAME
+    from .utils.helpers import run_cmd
+
+    if not AUTH_SERVICE_FILE.exists():
+        return
+    run_cmd(f"systemctl disable --now {AUTH_SERVICE_NAME}", check=False)
+    AUTH_SERVICE_FILE.unlink(missing_ok=True)
+    run_cmd("systemctl daemon-reload", check=False)
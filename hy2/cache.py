@@ -0,0 +1,202 @@
+"""
+二进制文件缓存模块 - 按内容寻址的本地缓存
+
+目录结构:
+    {CACHE_DIR}/blobs/<sha256>                         二进制内容
+    {CACHE_DIR}/refs/<版本>/hysteria-linux-<架构>      指向 blob 的 sha256
+"""
+
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    计算文件 SHA-256
+
+    Args:
+        path: 文件路径
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        十六进制摘要字符串
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def asset_name(arch):
+    """返回指定架构的发布文件名"""
+    return f"hysteria-linux-{arch}"
+
+
+def release_url(version, name):
+    """
+    拼接发布文件下载地址
+
+    Args:
+        version: 版本标签 (如 app/v2.7.0)
+        name: 文件名
+
+    Returns:
+        下载地址
+    """
+    from .config import HY2_DOWNLOAD_BASE
+    return f"{HY2_DOWNLOAD_BASE}/{version}/{name}"
+
+
+def parse_hash_list(text):
+    """
+    解析发布附带的 hashes.txt
+
+    Args:
+        text: 文件内容，每行 "<sha256>  <路径>"
+
+    Returns:
+        dict: 文件名 -> sha256
+    """
+    hashes = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and len(parts[0]) == 64:
+            hashes[parts[-1].lstrip("*").rsplit("/", 1)[-1]] = parts[0].lower()
+    return hashes
+
+
+def fetch_release_hashes(version, timeout=30):
+    """
+    获取发布的 SHA-256 列表
+
+    Args:
+        version: 版本标签
+        timeout: 超时时间（秒）
+
+    Returns:
+        dict: 文件名 -> sha256，获取失败返回空字典
+    """
+    import urllib.request
+    import urllib.error
+
+    try:
+        with urllib.request.urlopen(release_url(version, "hashes.txt"), timeout=timeout) as resp:
+            return parse_hash_list(resp.read().decode("utf-8", "replace"))
+    except (urllib.error.URLError, OSError, ValueError):
+        return {}
+
+
+def _ref_path(cache_dir, version, arch):
+    return Path(cache_dir) / "refs" / version.replace("/", "_") / asset_name(arch)
+
+
+def _blob_path(cache_dir, sha256):
+    return Path(cache_dir) / "blobs" / sha256
+
+
+def cache_lookup(version, arch, cache_dir=None):
+    """
+    查找缓存中已校验的二进制文件
+
+    Args:
+        version: 版本标签
+        arch: 架构
+        cache_dir: 缓存目录，默认 CACHE_DIR
+
+    Returns:
+        Path 或 None (未命中或内容校验失败)
+    """
+    from .config import CACHE_DIR
+
+    cache_dir = cache_dir or CACHE_DIR
+    ref = _ref_path(cache_dir, version, arch)
+    try:
+        sha256 = ref.read_text().strip()
+    except OSError:
+        return None
+
+    blob = _blob_path(cache_dir, sha256)
+    if not blob.exists():
+        return None
+    if file_sha256(blob) != sha256:
+        # 缓存内容已损坏，丢弃
+        blob.unlink(missing_ok=True)
+        ref.unlink(missing_ok=True)
+        return None
+    return blob
+
+
+def cache_store(path, version, arch, sha256, cache_dir=None):
+    """
+    将已校验的文件移入缓存
+
+    Args:
+        path: 已下载的文件 (将被移动)
+        version: 版本标签
+        arch: 架构
+        sha256: 文件摘要
+        cache_dir: 缓存目录，默认 CACHE_DIR
+
+    Returns:
+        缓存中的 blob 路径
+    """
+    from .config import CACHE_DIR
+    from .utils.helpers import write_atomic
+
+    cache_dir = cache_dir or CACHE_DIR
+    blob = _blob_path(cache_dir, sha256)
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(path, blob)
+
+    ref = _ref_path(cache_dir, version, arch)
+    ref.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(ref, sha256 + "\n")
+    return blob
+
+
+def install_atomic(src, dest, mode=0o755):
+    """
+    复制文件到目标路径，写入临时文件后原子重命名
+
+    Args:
+        src: 源文件
+        dest: 目标路径
+        mode: 文件权限
+    """
+    import shutil
+
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(dest.parent), prefix=f".{dest.name}.")
+    try:
+        with os.fdopen(fd, "wb") as fdst, open(src, "rb") as fsrc:
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+        os.chmod(tmp, mode)
+        os.replace(tmp, dest)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """
+    基于 flock 的进程间排它锁，用于多个安装进程共享同一缓存目录
+
+    Args:
+        path: 锁文件路径
+    """
+    import fcntl
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
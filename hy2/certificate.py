@@ -14,9 +14,9 @@ def handle_certificate():
     Returns:
         tuple: (证书路径, 私钥路径, 域名)
     """
-    from ..utils.output import green, yellow, red
-    from ..utils.helpers import run_cmd, get_server_ip
-    from ..config import CONFIG_DIR, DEFAULT_CERT_DOMAIN, ACME_EMAIL
+    from .utils.output import green, yellow, red
+    from .utils.helpers import run_cmd, get_server_ip
+    from .config import CONFIG_DIR, DEFAULT_CERT_DOMAIN, ACME_EMAIL
 
     print("\n" + "="*50)
     green("证书配置方式:")
@@ -46,7 +46,7 @@ def handle_custom_certificate():
     Returns:
         tuple: (证书路径, 私钥路径, 域名)
     """
-    from ..utils.output import red
+    from .utils.output import red
 
     while True:
         cert_path = input("请输入证书路径 [.crt]: ").strip()
@@ -66,46 +66,184 @@ def handle_custom_certificate():
         return cert_path, key_path, domain
 
 
-def generate_self_signed_cert():
+def write_certificate(cert_path, key_path, cert_der, key):
     """
-    生成自签证书
+    原子写入证书和私钥
+
+    Args:
+        cert_path: 证书路径 (0644)
+        key_path: 私钥路径 (0600)
+        cert_der: DER 编码的证书
+        key: ECKey 私钥
+    """
+    from .utils.helpers import write_atomic
+    from .utils.crypto import pem_encode
+
+    write_atomic(key_path, key.to_pem(), mode=0o600)
+    write_atomic(cert_path, pem_encode("CERTIFICATE", cert_der), mode=0o644)
+
+
+def _colon_hex(digest):
+    text = digest.hex().upper()
+    return ":".join(text[i:i + 2] for i in range(0, len(text), 2))
+
+
+def certificate_info(cert_path):
+    """
+    读取证书并计算客户端固定证书所需的指纹
+
+    Args:
+        cert_path: PEM 证书路径，包含证书链时取第一张 (叶子证书)
+
+    Returns:
+        dict: {"sha256": 证书 DER 的 SHA-256 (冒号分隔的大写十六进制，即 Hysteria 的 pinSHA256),
+               "spki_sha256": 公钥 (SubjectPublicKeyInfo) SHA-256 的 base64,
+               "self_signed": 签发者与主体相同, "not_after": 到期时间戳}
+
+    Raises:
+        OSError: 无法读取证书
+        ValueError: 不是 PEM 证书
+    """
+    import base64
+    import hashlib
+    from .utils.crypto import pem_decode, parse_certificate
+
+    der = pem_decode(Path(cert_path).read_text(), "CERTIFICATE")
+    cert = parse_certificate(der)
+    return {
+        "sha256": _colon_hex(hashlib.sha256(der).digest()),
+        "spki_sha256": base64.b64encode(hashlib.sha256(cert["public_key"]).digest()).decode(),
+        "self_signed": cert["issuer"] == cert["subject"],
+        "not_after": int(cert["not_after"].timestamp()),
+    }
+
+
+def certificate_fingerprint(cert_path):
+    """证书的 SHA-256 指纹 (Hysteria 客户端 tls.pinSHA256 的值)，见 certificate_info"""
+    return cached_certificate_info(cert_path)["sha256"]
+
+
+def pin_cache_path():
+    """证书指纹缓存文件路径"""
+    from .config import CONFIG_DIR
+    return CONFIG_DIR / "cert-pin.json"
+
+
+def cached_certificate_info(cert_path):
+    """
+    带缓存的 certificate_info
+
+    缓存按证书路径保存在 CONFIG_DIR/cert-pin.json，证书的修改时间或大小变化时才重新读取，
+    平时只需一次 stat。缓存无法写入时照常返回结果。
+
+    Raises:
+        OSError: 无法读取证书
+        ValueError: 不是 PEM 证书
+    """
+    import json
+    from .utils.helpers import write_atomic
+
+    key = str(cert_path)
+    st = os.stat(key)
+    stamp = [st.st_mtime_ns, st.st_size]
+    try:
+        cache = json.loads(pin_cache_path().read_text())
+    except (OSError, ValueError):
+        cache = {}
+    if not isinstance(cache, dict):
+        cache = {}
+    entry = cache.get(key)
+    if isinstance(entry, dict) and entry.get("stamp") == stamp:
+        return {k: v for k, v in entry.items() if k != "stamp"}
+
+    info = certificate_info(key)
+    cache[key] = {"stamp": stamp, **info}
+    try:
+        write_atomic(pin_cache_path(), json.dumps(cache, indent=2))
+    except OSError:
+        pass
+    return info
+
+
+def generate_self_signed_cert(domain=None, sans=None, days=36500, cert_path=None, key_path=None):
+    """
+    生成自签证书 (P-256 ECDSA)
+
+    Args:
+        domain: 证书 CN，默认 DEFAULT_CERT_DOMAIN
+        sans: 附加的 SubjectAltName (域名或 IP)
+        days: 有效期（天）
+        cert_path: 证书路径，默认 CONFIG_DIR/cert.crt
+        key_path: 私钥路径，默认 CONFIG_DIR/private.key
 
     Returns:
         tuple: (证书路径, 私钥路径, 域名)
     """
-    from ..utils.output import yellow, green
-    from ..utils.helpers import run_cmd
-    from ..config import CONFIG_DIR, DEFAULT_CERT_DOMAIN
+    from .utils.output import yellow, green
+    from .utils.crypto import ECKey, build_self_signed_cert
+    from .config import CONFIG_DIR, DEFAULT_CERT_DOMAIN
 
-    yellow("正在生成自签证书...")
-    cert_path = CONFIG_DIR / "cert.crt"
-    key_path = CONFIG_DIR / "private.key"
+    domain = domain or DEFAULT_CERT_DOMAIN
+    cert_path = Path(cert_path or CONFIG_DIR / "cert.crt")
+    key_path = Path(key_path or CONFIG_DIR / "private.key")
 
+    yellow("正在生成自签证书...")
     yellow("  - 生成私钥...")
-    run_cmd(f"openssl ecparam -genkey -name prime256v1 -out {key_path} 2>/dev/null")
-    key_path.chmod(0o600)
+    key = ECKey()
 
     yellow("  - 生成证书...")
-    run_cmd(
-        f"openssl req -new -x509 -days 36500 -key {key_path} -out {cert_path} "
-        f"-subj '/CN={DEFAULT_CERT_DOMAIN}' 2>/dev/null"
-    )
-    cert_path.chmod(0o644)
+    cert_der = build_self_signed_cert(key, domain, sans=sans, days=days)
+    write_certificate(cert_path, key_path, cert_der, key)
 
     green("证书生成成功!")
-    return str(cert_path), str(key_path), DEFAULT_CERT_DOMAIN
+    yellow(f"  SHA-256 指纹: {certificate_fingerprint(cert_path)}")
+    return str(cert_path), str(key_path), domain
+
+
+def generate_node_certificates(nodes, out_dir, days=36500):
+    """
+    批量生成节点自签证书
+
+    Args:
+        nodes: 节点列表，每项为 {"name": ..., "domain": ..., "sans": [...]}
+               或节点名称字符串 (同时作为 CN)
+        out_dir: 输出目录，每个节点写入 out_dir/<name>/cert.crt 与 private.key
+        days: 有效期（天）
+
+    Returns:
+        dict: 节点名称 -> (证书路径, 私钥路径, 域名)
+    """
+    from .utils.crypto import ECKey, build_self_signed_cert
+    from .config import DEFAULT_CERT_DOMAIN
+
+    out_dir = Path(out_dir)
+    result = {}
+    for node in nodes:
+        if isinstance(node, str):
+            node = {"name": node, "domain": node}
+        name = node["name"]
+        domain = node.get("domain") or DEFAULT_CERT_DOMAIN
+        cert_path = out_dir / name / "cert.crt"
+        key_path = out_dir / name / "private.key"
+
+        key = ECKey()
+        cert_der = build_self_signed_cert(key, domain, sans=node.get("sans"), days=days)
+        write_certificate(cert_path, key_path, cert_der, key)
+        result[name] = (str(cert_path), str(key_path), domain)
+    return result
 
 
 def handle_acme_certificate():
     """
-    使用 Acme 申请证书
+    使用内置 ACME 客户端申请证书 (HTTP-01)，并安装自动续期服务
 
     Returns:
         tuple: (证书路径, 私钥路径, 域名)
     """
-    from ..utils.output import yellow, green, red
-    from ..utils.helpers import run_cmd, get_server_ip
-    from ..config import CONFIG_DIR, ACME_EMAIL
+    from .utils.output import yellow, green, red
+    from .utils.helpers import run_cmd, get_server_ip
+    from .config import CONFIG_DIR
+    from .acme import issue_certificate, install_service, AcmeError
 
     yellow("\nAcme 证书申请需要:")
     print("  - 域名已解析到当前服务器IP")
@@ -126,54 +264,24 @@ def handle_acme_certificate():
         return handle_certificate()
     green("域名解析验证通过!")
 
-    # 安装 acme.sh
-    green("\n正在安装 acme.sh...")
-    run_cmd(f"curl https://get.acme.sh | sh -s email={ACME_EMAIL}", check=False)
-    acme_sh = Path.home() / ".acme.sh" / "acme.sh"
-
-    if not acme_sh.exists():
-        red("acme.sh 安装失败")
-        return handle_certificate()
-
-    # 申请证书
     cert_path = CONFIG_DIR / "cert.crt"
     key_path = CONFIG_DIR / "private.key"
 
     green(f"正在申请证书: {domain}")
-    yellow("(这可能需要 30-60 秒，请耐心等待...)")
-
-    run_cmd(f"{acme_sh} --set-default-ca --server letsencrypt", check=False)
-    result = run_cmd(
-        f"{acme_sh} --issue -d {domain} --standalone -k ec-256 --insecure",
-        check=False
-    )
-
-    if result and ("Domain not" in result or "error" in result.lower()):
-        red("证书申请失败，可能原因:")
+    try:
+        issue_certificate([domain], on_progress=yellow, challenge="http-01",
+                          cert=str(cert_path), key=str(key_path))
+    except (AcmeError, OSError) as e:
+        red(f"证书申请失败: {e}")
+        yellow("可能原因:")
         yellow("  - 域名未正确解析")
         yellow("  - 80 端口被占用")
         yellow("  - 防火墙阻止了 80 端口")
         return handle_certificate()
+    green("证书申请成功!")
 
-    run_cmd(
-        f"{acme_sh} --install-cert -d {domain} --ecc "
-        f"--fullchain-file {cert_path} --key-file {key_path}",
-        check=False
-    )
-
-    if cert_path.exists() and key_path.exists():
-        key_path.chmod(0o600)
-        cert_path.chmod(0o644)
-        green("证书申请成功!")
-
-        # 设置自动续期
-        cron_cmd = f"0 0 * * * {acme_sh} --cron -f >/dev/null 2>&1"
-        run_cmd(
-            f'(crontab -l 2>/dev/null | grep -v "acme.sh"; echo "{cron_cmd}") | crontab -',
-            check=False
-        )
-
-        return str(cert_path), str(key_path), domain
-    else:
-        red("证书申请失败")
-        return handle_certificate()
+    # 自动续期: hy2-acme 服务在有效期 2/3 处续期并重启服务；移除旧版本的 acme.sh 定时任务
+    install_service()
+    run_cmd('crontab -l 2>/dev/null | grep -v "acme.sh" | crontab -', check=False)
+
+    return str(cert_path), str(key_path), domain
@@ -0,0 +1,1287 @@
+"""
+命令行接口 - 菜单中每个操作对应的非交互式子命令
+
+所有参数都通过命令行传入，不会调用 input()，可供脚本和配置管理工具调用。
+加上 --json 后，过程输出写到 stderr，stdout 只输出一个 JSON 结果对象。
+
+使用方法:
+    python3 -m hy2 install --port 443 --password secret --domain www.bing.com
+    python3 -m hy2 configure --port 8443 --hop-ports 20000:30000
+    python3 -m hy2 user add alice --password pwd
+    python3 -m hy2 --json status
+    python3 -m hy2 stats --watch        # 每用户实时流量
+    python3 -m hy2 batch ops.txt        # 在同一进程中依次执行多条命令
+
+批量文件每行一条命令 (与命令行写法相同，不含 hy2 前缀)，# 开头为注释；
+也可以是 JSON 数组，每项为参数列表，如 [["user", "add", "bob"], ["status"]]。
+"""
+
+import sys
+import json
+import time
+from contextlib import contextmanager
+
+# 服务控制子命令
+SERVICE_ACTIONS = ("start", "stop", "restart", "status")
+
+# 自行输出结果的子命令，文本模式下不再逐项显示结果
+SELF_REPORTING = ("logs", "tune", "stats", "auth-server")
+
+
+class CLIError(Exception):
+    """命令执行失败，消息会直接展示给用户"""
+
+
+# ============ 参数解析 ============
+
+def build_parser():
+    """构建命令行参数解析器"""
+    import argparse
+    from . import __version__
+    from .config import CLIENT_FORMATS, ACME_CHALLENGES
+
+    parser = argparse.ArgumentParser(
+        prog="hy2", description="Hysteria 2 一键安装脚本 (不带参数运行进入交互式菜单)"
+    )
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    sub = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    p = sub.add_parser("install", help="安装并配置")
+    p.add_argument("--port", type=_port, help="监听端口 (默认随机)")
+    p.add_argument("--hop-ports", type=_hop_range, help="端口跳跃范围 start:end")
+    p.add_argument("--password", help="单用户密码 (默认随机)")
+    p.add_argument("--user", action="append", default=[], metavar="NAME:PASSWORD",
+                   help="添加用户，可重复，启用多用户模式")
+    p.add_argument("--proxy-site", help="伪装站点")
+    p.add_argument("--domain", help="自签证书域名 / SNI")
+    p.add_argument("--cert", help="已有证书路径 (需同时指定 --key)")
+    p.add_argument("--key", help="已有私钥路径")
+    p.add_argument("--binary", help="使用本地二进制文件，不下载")
+    p.add_argument("--server-ip", help="写入分享链接的服务器地址 (默认自动获取)")
+    _add_link_arguments(p)
+    p.add_argument("--instances", type=int, default=1, help="服务端实例数 (多核分流)")
+    p.add_argument("--bbr", action="store_true", help="启用 BBR")
+    p.add_argument("--skip-deps", action="store_true", help="不安装系统依赖")
+    p.add_argument("--no-firewall", action="store_true", help="不修改防火墙")
+    p.add_argument("--no-start", action="store_true", help="不启动服务")
+    p.set_defaults(handler=cmd_install)
+
+    p = sub.add_parser("configure", help="修改配置")
+    p.add_argument("--port", type=_port, help="新端口")
+    p.add_argument("--password", help="新密码 (多用户模式下修改第一个用户)")
+    p.add_argument("--hop-ports", help="端口跳跃范围 start:end，传 none 关闭")
+    p.add_argument("--proxy-site", help="伪装站点")
+    p.add_argument("--cert", help="证书路径 (需同时指定 --key)")
+    p.add_argument("--key", help="私钥路径")
+    p.add_argument("--self-signed", action="store_true", help="重新生成自签证书")
+    p.add_argument("--domain", help="自签证书域名")
+    _add_link_arguments(p)
+    p.add_argument("--instances", type=int, help="服务端实例数，1 为单实例")
+    p.add_argument("--traffic-stats", choices=("on", "off"), help="开启/关闭流量统计 API")
+    p.add_argument("--auth-backend", choices=("http", "inline"),
+                   help="http: 用户由本机认证服务校验，修改用户无需重启；inline: 用户写入 config.yaml")
+    p.add_argument("--restart-mode", choices=("restart", "graceful"),
+                   help="配置变更后的重启方式: restart 直接重启；graceful 启动新进程并排空旧进程")
+    p.add_argument("--drain", type=int, metavar="SECONDS", help="平滑重启时旧进程的排空窗口")
+    p.add_argument("--server-ip", help="写入分享链接的服务器地址")
+    p.add_argument("--no-firewall", action="store_true", help="不修改防火墙")
+    p.set_defaults(handler=cmd_configure)
+
+    p = sub.add_parser("reload", help="平滑重启: 校验配置，启动新进程，排空旧进程后切换")
+    p.add_argument("--drain", type=int, metavar="SECONDS", help="排空窗口 (默认取设置)")
+    p.add_argument("--no-check", action="store_true", help="跳过试运行校验")
+    p.set_defaults(handler=cmd_reload)
+
+    p = sub.add_parser("auth-server", help="前台运行 HTTP 认证服务 (由 hy2-auth 服务调用)")
+    p.add_argument("--listen", help="监听地址 host:port")
+    p.set_defaults(handler=cmd_auth_server)
+
+    p = sub.add_parser("user", help="多用户管理")
+    user_sub = p.add_subparsers(dest="user_action", metavar="ACTION")
+    u = user_sub.add_parser("add", help="添加用户")
+    u.add_argument("name")
+    u.add_argument("--password", help="密码 (默认随机)")
+    _add_user_limits(u)
+    u.add_argument("--server-ip", help="写入分享链接的服务器地址")
+    u.set_defaults(handler=cmd_user_add)
+    u = user_sub.add_parser("remove", help="删除用户")
+    u.add_argument("name", nargs="+")
+    u.add_argument("--server-ip", help="写入分享链接的服务器地址")
+    u.set_defaults(handler=cmd_user_remove)
+    u = user_sub.add_parser("set", help="修改用户的密码、配额或到期时间")
+    u.add_argument("name")
+    u.add_argument("--password", help="新密码")
+    _add_user_limits(u)
+    u.add_argument("--reset-usage", action="store_true", help="已用流量清零")
+    u.add_argument("--server-ip", help="写入分享链接的服务器地址")
+    u.set_defaults(handler=cmd_user_set)
+    u = user_sub.add_parser("rotate", help="重新生成密码")
+    u.add_argument("name", nargs="*", help="用户名 (与 --all 二选一)")
+    u.add_argument("--all", action="store_true", help="所有用户")
+    u.add_argument("--server-ip", help="写入分享链接的服务器地址")
+    u.set_defaults(handler=cmd_user_rotate)
+    u = user_sub.add_parser("list", help="列出用户")
+    u.add_argument("--limit", type=int, help="最多显示的用户数")
+    u.set_defaults(handler=cmd_user_list)
+    u = user_sub.add_parser("import", help="从 CSV/JSON 批量导入")
+    u.add_argument("file", help="CSV (表头 name,password,quota,expires) 或 JSON 文件，- 表示标准输入")
+    u.add_argument("--format", choices=("csv", "json"), help="文件格式 (默认按扩展名)")
+    u.add_argument("--replace", action="store_true", help="替换全部现有用户")
+    u.add_argument("--update", action="store_true", help="覆盖已存在用户的字段 (默认跳过)")
+    u.add_argument("--server-ip", help="写入分享链接的服务器地址")
+    u.set_defaults(handler=cmd_user_import)
+    u = user_sub.add_parser("export", help="导出为 CSV/JSON (包含明文密码)")
+    u.add_argument("file", help="输出文件，- 表示标准输出")
+    u.add_argument("--format", choices=("csv", "json"), help="文件格式 (默认按扩展名)")
+    u.set_defaults(handler=cmd_user_export)
+    u = user_sub.add_parser("enforce", help="统计用量，停用过期或超出配额的用户 (可由 cron 定期运行)")
+    u.set_defaults(handler=cmd_user_enforce)
+    p.set_defaults(handler=_usage(p))
+
+    p = sub.add_parser("status", help="安装和服务状态")
+    p.set_defaults(handler=cmd_status)
+
+    p = sub.add_parser("show-config", help="显示客户端配置")
+    p.add_argument("--qr", action="store_true", help="在终端显示二维码")
+    p.add_argument("--qr-dir", help="将二维码导出到目录")
+    p.add_argument("--format", choices=("png", "svg"), default="png", help="导出格式")
+    p.set_defaults(handler=cmd_show_config)
+
+    p = sub.add_parser("export-clients",
+                       help="为每个用户导出客户端配置 (Hysteria、sing-box、Clash Meta、v2rayN 订阅)")
+    p.add_argument("--dir", help="输出目录 (默认 ~/hy/users)")
+    p.add_argument("--format", action="append", choices=tuple(CLIENT_FORMATS),
+                   help="导出格式，可重复 (默认全部)")
+    p.add_argument("--user", action="append", metavar="NAME", help="只导出指定用户，可重复")
+    p.add_argument("--sni", help="SNI (默认沿用现有分享链接)")
+    p.add_argument("--server-ip", help="写入配置的服务器地址")
+    p.add_argument("--workers", type=int, help="写入并发数")
+    p.set_defaults(handler=cmd_export_clients)
+
+    p = sub.add_parser("verify", help="校验客户端配置固定的证书指纹与当前服务端证书一致")
+    p.add_argument("paths", nargs="*", metavar="PATH",
+                   help="客户端配置文件或导出目录 (默认 ~/hy 下的配置和分享链接)")
+    p.add_argument("--cert", help="服务端证书 (默认取 config.yaml 中的 tls.cert)")
+    p.set_defaults(handler=cmd_verify)
+
+    p = sub.add_parser("acme", help="内置 ACME 客户端: 申请证书并自动续期")
+    acme_sub = p.add_subparsers(dest="acme_action", metavar="ACTION")
+    a = acme_sub.add_parser("issue", help="申请证书，替换服务端证书并重启服务")
+    a.add_argument("--domain", action="append", required=True, help="域名，可重复 (第一个作为 SNI)")
+    a.add_argument("--email", help="账户联系邮箱")
+    a.add_argument("--directory", help="CA 目录地址 (默认 Let's Encrypt，测试时可指向 Pebble)")
+    a.add_argument("--ca-bundle", help="访问 CA 时信任的证书文件 (如 Pebble 的 pebble.minica.pem)")
+    a.add_argument("--challenge", choices=ACME_CHALLENGES,
+                   help="验证方式: http-01 使用 TCP 80，tls-alpn-01 使用 TCP 443")
+    a.add_argument("--http-port", type=_port, help="HTTP-01 应答端口")
+    a.add_argument("--tls-port", type=_port, help="TLS-ALPN-01 应答端口")
+    a.add_argument("--server-ip", help="写入分享链接的服务器地址")
+    a.add_argument("--no-service", action="store_true", help="不安装自动续期服务")
+    a.set_defaults(handler=cmd_acme_issue)
+    a = acme_sub.add_parser("renew", help="到期需续期时续期证书并重启服务")
+    a.add_argument("--force", action="store_true", help="未到续期时间也续期")
+    a.set_defaults(handler=cmd_acme_renew)
+    a = acme_sub.add_parser("status", help="证书到期时间和续期计划")
+    a.set_defaults(handler=cmd_acme_status)
+    a = acme_sub.add_parser("daemon", help="前台运行续期调度 (由 hy2-acme 服务调用)")
+    a.set_defaults(handler=cmd_acme_daemon)
+    p.set_defaults(handler=_usage(p))
+
+    p = sub.add_parser("service", help="服务控制")
+    p.add_argument("action", choices=SERVICE_ACTIONS)
+    p.set_defaults(handler=cmd_service)
+
+    p = sub.add_parser("logs", help="查看、过滤和统计服务日志")
+    p.add_argument("-n", "--lines", type=int, help="显示最近的 N 条 (无过滤条件时默认 50)")
+    p.add_argument("-f", "--follow", action="store_true", help="持续输出，Ctrl+C 后显示统计摘要")
+    p.add_argument("--summary", action="store_true",
+                   help="统计摘要: 连接速率、认证失败、错误类型和客户端 IP 排行")
+    p.add_argument("--file", help="读取日志文件 (原始日志或 journalctl -o json 导出，支持 .gz)")
+    p.add_argument("--since", help="起始时间 (journalctl --since 格式)")
+    p.add_argument("--since-last", action="store_true", help="只读取上次使用该选项之后的新日志")
+    p.add_argument("--level", choices=("debug", "info", "warn", "error"), help="最低级别")
+    p.add_argument("--event", action="append", metavar="TYPE",
+                   help="事件类型，可重复: connect/disconnect/tcp_error/udp_error/auth_failure/error ...")
+    p.add_argument("--ip", help="客户端 IP")
+    p.add_argument("--user", help="用户名")
+    p.add_argument("--grep", metavar="REGEX", help="匹配消息或字段的正则表达式")
+    p.add_argument("--top", type=int, default=10, help="排行榜数量")
+    p.add_argument("--window", type=int, help="速率统计窗口（秒，默认 60）")
+    p.set_defaults(handler=cmd_logs)
+
+    p = sub.add_parser("stats", help="每用户流量统计")
+    p.add_argument("-w", "--watch", action="store_true", help="持续刷新的 top 视图")
+    p.add_argument("-i", "--interval", type=float, help="采集间隔（秒）")
+    p.add_argument("--limit", type=int, help="最多显示的用户数")
+    p.add_argument("--prometheus", nargs="?", const="", metavar="HOST:PORT",
+                   help="以 Prometheus 格式提供 /metrics (默认 127.0.0.1:9464)")
+    p.set_defaults(handler=cmd_stats)
+
+    p = sub.add_parser("tune", help="UDP/QUIC 内核调优")
+    p.add_argument("--profile", default="auto", choices=("auto", "low-memory", "1g", "10g"),
+                   help="配置档 (默认按内存和网卡速率选择)")
+    p.add_argument("--dry-run", action="store_true", help="只显示与当前值的差异")
+    p.add_argument("--rollback", action="store_true", help="恢复调优前的值")
+    p.add_argument("--root", default="/", help=argparse.SUPPRESS)
+    p.set_defaults(handler=cmd_tune)
+
+    p = sub.add_parser("uninstall", help="卸载")
+    p.add_argument("-y", "--yes", action="store_true", help="确认卸载 (必需)")
+    p.add_argument("--purge", action="store_true", help="同时删除配置文件")
+    p.set_defaults(handler=cmd_uninstall)
+
+    p = sub.add_parser("batch", help="在同一进程中执行批量文件中的命令")
+    p.add_argument("file", help="批量文件路径，- 表示标准输入")
+    p.add_argument("-k", "--continue-on-error", action="store_true", help="出错后继续执行")
+    p.set_defaults(handler=cmd_batch)
+
+    return parser
+
+
+def _add_link_arguments(parser):
+    parser.add_argument("--bandwidth", type=int, metavar="MBPS",
+                        help="服务器带宽 (客户端下载方向)，用于计算 QUIC 窗口，0 表示恢复默认")
+    parser.add_argument("--upload", type=int, metavar="MBPS", help="客户端上传带宽 (默认同 --bandwidth)")
+    parser.add_argument("--rtt", type=int, default=200, metavar="MS", help="客户端往返延迟 (默认 200)")
+
+
+def _add_user_limits(parser):
+    parser.add_argument("--quota", help="流量配额，如 50G，0 表示不限")
+    parser.add_argument("--expires", help="到期时间 YYYY-MM-DD[THH:MM] 或 +30d，never 表示永不过期")
+
+
+def _port(value):
+    import argparse
+    if not value.isdigit() or not 1 <= int(value) <= 65535:
+        raise argparse.ArgumentTypeError("端口范围: 1-65535")
+    return int(value)
+
+
+def _hop_range(value):
+    import argparse
+    try:
+        start, end = (int(p) for p in value.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("格式应为 start:end") from None
+    if not 1 <= start < end <= 65535:
+        raise argparse.ArgumentTypeError("端口范围: 1-65535，且起始端口小于结束端口")
+    return f"{start}:{end}"
+
+
+def _usage(parser):
+    def handler(args):
+        raise CLIError(parser.format_usage().strip())
+    return handler
+
+
+# ============ 公共逻辑 ============
+
+def _require_installed():
+    """读取当前服务端配置，未安装时报错"""
+    from .config import CONFIG_DIR
+    from .server_config import ServerConfig
+
+    config_file = CONFIG_DIR / "config.yaml"
+    if not config_file.exists():
+        raise CLIError("配置文件不存在，请先安装 Hysteria 2")
+    return ServerConfig.load(config_file)
+
+
+def _apply(current, new, server_ip=None, force_restart=False):
+    """写入配置并在客户端相关字段变化时重新生成客户端配置"""
+    from .utils.helpers import backup_config
+    from .installer import apply_config_change, refresh_client_config
+    from .rollout import RolloutError
+    from .service import ServiceError
+
+    backup_config()
+    restart_error = None
+    try:
+        changes = apply_config_change(current, new, force_restart, raise_errors=True)
+    except RolloutError as e:
+        raise CLIError(f"配置未生效，已保持原配置，服务继续运行: {e}") from None
+    except ServiceError as e:
+        # 配置已写入，仍然更新客户端配置和防火墙，由调用方最后报告失败
+        changes = current.diff(new)
+        restart_error = str(e)
+    share_url = None
+    client_fields = ("client_auth", "port", "hop_ports", "client_link_settings")
+    if changes and any(_field(current, f) != _field(new, f) for f in client_fields):
+        share_url = refresh_client_config(new, server_ip)
+    result = {
+        "changes": [{"path": list(path), "old": old, "new": after} for path, old, after in changes],
+        "share_url": share_url,
+    }
+    instance_urls = _instance_urls(new, server_ip) if share_url else {}
+    if instance_urls:
+        result["instance_urls"] = instance_urls
+    if restart_error:
+        result["restart_error"] = restart_error
+    return result
+
+
+def _field(config, name):
+    value = getattr(config, name)
+    return value() if callable(value) else value
+
+
+def _parse_user(value):
+    name, sep, password = value.partition(":")
+    if not sep or not name or not password:
+        raise CLIError(f"用户格式应为 NAME:PASSWORD: {value}")
+    return {"name": name, "password": password}
+
+
+# ============ 子命令 ============
+
+def cmd_install(args):
+    """安装: 非交互式执行完整安装流程"""
+    from .system.check import check_root, install_dependencies
+    from .fleet import provision
+
+    if bool(args.cert) != bool(args.key):
+        raise CLIError("--cert 和 --key 需要同时指定")
+    check_root()
+    if not args.skip_deps:
+        install_dependencies()
+
+    users = [_parse_user(u) for u in args.user]
+    if args.password:
+        users.insert(0, {"password": args.password})
+    return provision({
+        "port": args.port,
+        "hop_ports": args.hop_ports,
+        "users": users,
+        "proxy_site": args.proxy_site,
+        "cert_path": args.cert,
+        "key_path": args.key,
+        "domain": args.domain,
+        "binary_source": args.binary,
+        "server_ip": args.server_ip,
+        "bandwidth": args.bandwidth,
+        "upload": args.upload,
+        "rtt": args.rtt,
+        "instances": args.instances,
+        "bbr": args.bbr,
+        "firewall": not args.no_firewall,
+        "start": not args.no_start,
+    })
+
+
+def cmd_configure(args):
+    """修改配置: 只写入指定的字段"""
+    from .utils.helpers import is_port_available
+    from .system.firewall import setup_firewall
+    from .server_config import link_settings
+    from .installer import certificate_pin, refresh_pinned_clients
+
+    current = _require_installed()
+    new = current
+    force_restart = False
+
+    restart_settings = None
+    if args.restart_mode or args.drain is not None:
+        from .rollout import save_settings
+        if args.drain is not None and args.drain < 0:
+            raise CLIError("--drain 不能为负数")
+        # 先保存，本次修改的重启即按新方式进行
+        restart_settings = save_settings(args.restart_mode, args.drain)
+
+    if args.port is not None:
+        if args.port != current.port and not is_port_available(args.port):
+            raise CLIError(f"端口 {args.port} 已被占用")
+        new = new.with_port(args.port)
+    if args.password:
+        new = new.with_password(args.password)
+    if args.hop_ports is not None:
+        if args.hop_ports.lower() in ("", "none", "off"):
+            new = new.patch({("hopPorts",): None, ("transport", "udp", "hopInterval"): None})
+        else:
+            import argparse
+            try:
+                hop_ports = _hop_range(args.hop_ports)
+            except argparse.ArgumentTypeError as e:
+                raise CLIError(f"--hop-ports: {e}") from None
+            new = new.patch({("hopPorts",): [hop_ports], ("transport", "udp", "hopInterval"): "30s"})
+    if args.proxy_site:
+        new = new.patch({("masquerade", "proxy", "url"): f"https://{args.proxy_site}"})
+    if args.bandwidth is not None:
+        new = new.patch({("quic",): None, ("bandwidth",): None})
+        if args.bandwidth > 0:
+            link = link_settings(args.bandwidth, args.upload or args.bandwidth, args.rtt)
+            new = new.patch({(key,): value for key, value in link.items()})
+    if args.traffic_stats == "on" and not current.traffic_stats:
+        from .server_config import traffic_stats_settings
+        new = new.with_traffic_stats(traffic_stats_settings())
+    elif args.traffic_stats == "off":
+        new = new.with_traffic_stats(None)
+    if args.auth_backend:
+        new = _switch_auth_backend(args.auth_backend, current, new)
+
+    # --self-signed 把新证书写入原路径，先记下原证书的指纹
+    old_pin = certificate_pin(current)
+    sni = args.domain
+    if args.cert or args.key:
+        if not (args.cert and args.key):
+            raise CLIError("--cert 和 --key 需要同时指定")
+        cert_path, key_path = args.cert, args.key
+    elif args.self_signed:
+        from .certificate import generate_self_signed_cert
+        cert_path, key_path, sni = generate_self_signed_cert(args.domain)
+    else:
+        cert_path = key_path = None
+    if cert_path:
+        new = new.patch({("tls", "cert"): str(cert_path), ("tls", "key"): str(key_path)})
+        force_restart = True
+
+    result = _apply(current, new, args.server_ip, force_restart)
+    if cert_path:
+        share_url = refresh_pinned_clients(new, old_pin, args.server_ip, sni)
+        if share_url:
+            result["share_url"] = share_url
+            result["reexport_clients"] = True
+    if restart_settings:
+        result["restart"] = {k: restart_settings[k] for k in ("mode", "drain")}
+    if args.password:
+        from .users import update_primary_password
+        if update_primary_password(new, args.password) and new.auth_backend:
+            from .installer import refresh_client_config
+            result["share_url"] = refresh_client_config(new, args.server_ip)
+    if current.auth_backend and not new.auth_backend:
+        from .authd import remove_service
+        remove_service()
+    if args.bandwidth:
+        from .installer import check_link_limits
+        result["warnings"] = check_link_limits(new)
+    ports_changed = result["changes"] and \
+        (current.port, current.hop_ports) != (new.port, new.hop_ports)
+
+    if args.instances is not None:
+        result["instances"] = _set_instances(args.instances, new)
+        ports_changed = True
+        # 实例划分改变了各实例的端口和端口跳跃段，分享链接随之更新
+        from .installer import refresh_client_config
+        result["share_url"] = refresh_client_config(new, args.server_ip)
+        result["instance_urls"] = _instance_urls(new, args.server_ip)
+    if ports_changed:
+        # 端口跳跃依赖 NAT 规则才能工作，即使不修改防火墙也要更新
+        firewall = setup_firewall(new.port, new.hop_ports, open_ports=not args.no_firewall)
+        if firewall:
+            result["firewall"] = firewall
+    if result.get("restart_error"):
+        raise CLIError(f"配置已写入，但服务重启失败: {result['restart_error']}", result)
+    return result
+
+
+def _switch_auth_backend(mode, current, new):
+    """
+    切换认证方式
+
+    切换到 http 时先建立用户库并启动认证服务，再由 _apply 写入配置并重启一次
+    hysteria-server；之后修改用户只更新用户库，由认证服务自动重新加载。
+    """
+    if mode == "http":
+        if current.auth_backend:
+            return new
+        from .authd import install_service, backend_url
+
+        store = _user_store()
+        if not store.active():
+            raise CLIError("没有可登录的用户 (全部已过期或超出配额)")
+        store.save()
+        install_service()
+        return new.with_auth_backend(backend_url())
+    if not current.auth_backend:
+        return new
+    try:
+        auth = _user_store().auth_section()
+    except ValueError as e:
+        raise CLIError(str(e)) from None
+    return new.with_auth_backend(None, auth["userpass"])
+
+
+def _instance_urls(config, server_ip=None):
+    """各实例的分享链接，单实例或无法确定 SNI 时为空"""
+    from .utils.helpers import get_server_ip
+    from .client import saved_sni
+    from .instances import instance_share_urls, load_manifest
+
+    sni = saved_sni()
+    if not sni or not load_manifest():
+        return {}
+    return instance_share_urls(config, server_ip or get_server_ip(), config.client_auth, sni)
+
+
+def _set_instances(count, config):
+    """切换实例数并重启服务"""
+    from .instances import deploy_instances
+    from .service import manage_service
+
+    if count < 1:
+        raise CLIError("实例数必须大于 0")
+    try:
+        plan = deploy_instances(count, base=config)
+    except ValueError as e:
+        raise CLIError(str(e)) from None
+    manage_service("restart")
+    return plan
+
+
+def _user_store():
+    """读取用户库；尚未建立时由当前配置创建 (单用户配置的用户命名为 user1)"""
+    from .config import CONFIG_DIR
+    from .users import UserStore, store_path
+
+    if not (CONFIG_DIR / "config.yaml").exists():
+        raise CLIError("配置文件不存在，请先安装 Hysteria 2")
+    if store_path().exists():
+        return UserStore.load()
+    return UserStore.from_config(_require_installed())
+
+
+def _sync_users(store, server_ip=None, previous=None):
+    """
+    保存用户库并重新生成 auth 段；主用户凭据变化时重新生成客户端配置
+
+    Args:
+        store: 修改后的 UserStore
+        server_ip: 写入分享链接的服务器地址
+        previous: 修改前的主用户 (用户名, 密码)
+    """
+    from .users import sync_auth
+    from .utils.helpers import backup_config
+
+    backup_config()
+    try:
+        result = sync_auth(store)
+    except ValueError as e:
+        raise CLIError(str(e)) from None
+    store.save()
+    primary = result["primary"]
+    result["share_url"] = None
+    if previous != (primary, store.get(primary)["password"]):
+        from .installer import refresh_client_config
+        result["share_url"] = refresh_client_config(_require_installed(), server_ip)
+    return result
+
+
+def _primary(store):
+    """修改前的主用户 (用户名, 密码)；用户库尚未建立时返回 None (客户端配置需要重新生成)"""
+    from .users import store_path
+
+    if not store_path().exists():
+        return None
+    active = store.active()
+    name = next(iter(active), None)
+    return name, active.get(name)
+
+
+def _user_limits(args):
+    fields = {}
+    if args.quota is not None:
+        fields["quota"] = args.quota
+    if args.expires is not None:
+        fields["expires"] = args.expires
+    return fields
+
+
+def cmd_user_add(args):
+    """添加用户，单用户配置会转换为多用户模式 (原用户命名为 user1)"""
+    store = _user_store()
+    previous = _primary(store)
+    try:
+        record = store.add(args.name, args.password, **_user_limits(args))
+    except ValueError as e:
+        raise CLIError(str(e)) from None
+    result = _sync_users(store, args.server_ip, previous)
+    result.update(name=args.name, password=record["password"])
+    return result
+
+
+def cmd_user_remove(args):
+    """删除用户，至少保留一个可登录的用户"""
+    store = _user_store()
+    previous = _primary(store)
+    missing = [name for name in args.name if name not in store]
+    if missing:
+        raise CLIError(f"用户不存在: {', '.join(missing)}")
+    for name in args.name:
+        store.remove(name)
+    result = _sync_users(store, args.server_ip, previous)
+    result["removed"] = args.name
+    return result
+
+
+def cmd_user_set(args):
+    """修改用户的密码、配额、到期时间"""
+    store = _user_store()
+    previous = _primary(store)
+    if args.name not in store:
+        raise CLIError(f"用户不存在: {args.name}")
+    fields = _user_limits(args)
+    if args.password:
+        fields["password"] = args.password
+    if args.reset_usage:
+        fields["used"] = 0
+    if not fields:
+        raise CLIError("未指定要修改的字段")
+    try:
+        store.update(args.name, **fields)
+    except ValueError as e:
+        raise CLIError(str(e)) from None
+    result = _sync_users(store, args.server_ip, previous)
+    result["user"] = _user_info(store, args.name)
+    return result
+
+
+def cmd_user_rotate(args):
+    """为指定用户或全部用户生成新密码"""
+    store = _user_store()
+    previous = _primary(store)
+    if bool(args.name) == bool(args.all):
+        raise CLIError("请指定用户名或 --all")
+    missing = [name for name in args.name if name not in store]
+    if missing:
+        raise CLIError(f"用户不存在: {', '.join(missing)}")
+    rotated = store.rotate(None if args.all else args.name)
+    result = _sync_users(store, args.server_ip, previous)
+    result["rotated"] = rotated if len(rotated) <= 100 else len(rotated)
+    return result
+
+
+def _user_info(store, name):
+    from .users import format_expiry
+
+    record = store.get(name)
+    return {"name": name, "password": record["password"], "quota": record["quota"],
+            "used": record["used"], "expires": format_expiry(record["expires"]) or None,
+            "status": store.status(name)}
+
+
+def cmd_user_list(args):
+    """列出用户"""
+    from .users import store_path
+
+    current_store = store_path().exists()
+    store = _user_store()
+    if not current_store and len(store) == 1:
+        config = _require_installed()
+        if not config.users:
+            return {"mode": "password", "count": 1,
+                    "users": [{"name": None, "password": config.password}]}
+    names = list(store.users)[:args.limit] if args.limit else list(store.users)
+    users = [_user_info(store, name) for name in names]
+    if args.json:
+        return {"mode": "userpass", "count": len(store), "users": users}
+
+    from .utils.output import format_table
+
+    rows = [("用户名", "密码", "状态", "已用/配额", "到期时间")]
+    for u in users:
+        quota = f"{_size(u['used'])} / {_size(u['quota']) if u['quota'] else '不限'}"
+        rows.append((u["name"], u["password"], u["status"], quota, u["expires"] or "-"))
+    for line in format_table(rows):
+        print(line)
+    return {"mode": "userpass", "count": len(store)}
+
+
+def _size(value):
+    from .stats import format_bytes
+    return format_bytes(value or 0)
+
+
+def cmd_user_import(args):
+    """从 CSV/JSON 批量导入用户"""
+    from .users import read_records
+
+    store = _user_store()
+    previous = _primary(store)
+    try:
+        counts = store.import_records(read_records(args.file, args.format),
+                                      replace=args.replace, update=args.update)
+    except OSError as e:
+        raise CLIError(f"无法读取用户文件: {e}") from None
+    except ValueError as e:
+        raise CLIError(f"用户文件无效: {e}") from None
+    result = _sync_users(store, args.server_ip, previous)
+    result.update(counts, total=len(store))
+    return result
+
+
+def cmd_user_export(args):
+    """导出用户为 CSV/JSON"""
+    from .users import write_records
+
+    store = _user_store()
+    try:
+        write_records(store.export_records(), args.file, args.format)
+    except OSError as e:
+        raise CLIError(f"无法写入 {args.file}: {e}") from None
+    if args.file == "-":
+        # 数据已写到标准输出，不再追加摘要
+        return {}
+    return {"file": args.file, "count": len(store)}
+
+
+def cmd_user_enforce(args):
+    """统计用量并停用过期或超出配额的用户"""
+    from .users import enforce
+
+    store = _user_store()
+    try:
+        return enforce(store)
+    except ValueError as e:
+        raise CLIError(str(e)) from None
+
+
+def cmd_reload(args):
+    """平滑重启"""
+    from .rollout import graceful_restart, RolloutError
+    from .utils.output import yellow
+
+    _require_installed()
+    if args.drain is not None and args.drain < 0:
+        raise CLIError("--drain 不能为负数")
+    try:
+        return graceful_restart(args.drain, check=not args.no_check,
+                                on_progress=None if args.json else yellow)
+    except RolloutError as e:
+        raise CLIError(f"平滑重启失败，服务保持运行: {e}") from None
+
+
+def cmd_auth_server(args):
+    """前台运行 HTTP 认证服务"""
+    from .authd import serve
+
+    try:
+        serve(args.listen)
+    except (OSError, ValueError) as e:
+        raise CLIError(f"认证服务启动失败: {e}") from None
+    return {}
+
+
+def cmd_status(args):
+    """安装和服务状态"""
+    from .config import CONFIG_DIR, CLIENT_DIR, BINARY_PATH
+    from .utils.helpers import get_install_status, get_service_state
+    from .instances import load_manifest
+
+    install_status = get_install_status()
+    result = {
+        "install_status": ("not_installed", "binary_only", "installed")[install_status],
+        "binary": str(BINARY_PATH),
+        "config_file": str(CONFIG_DIR / "config.yaml"),
+        "client_dir": str(CLIENT_DIR),
+    }
+    if install_status >= 2:
+        config = _require_installed()
+        result.update(
+            service=get_service_state(max_age=0),
+            port=config.port,
+            hop_ports=config.hop_ports,
+            user_count=len(config.users) or 1,
+            instances=(load_manifest() or {}).get("instances", []),
+        )
+    return result
+
+
+def cmd_show_config(args):
+    """显示客户端配置和分享链接"""
+    from .config import CLIENT_DIR
+
+    url_file = CLIENT_DIR / "url.txt"
+    if not url_file.exists():
+        raise CLIError("配置文件不存在")
+    share_url = url_file.read_text().strip()
+    result = {
+        "share_url": share_url,
+        "files": [str(p) for p in sorted(CLIENT_DIR.glob("hy-client.*"))],
+    }
+    if args.qr:
+        from .utils.helpers import generate_qrcode
+        print(generate_qrcode(share_url))
+    if args.qr_dir:
+        from .utils.qrcode import export_qrcodes
+        result["qrcodes"] = [str(p) for p in export_qrcodes(
+            {"HY2": share_url}, args.qr_dir, fmt=args.format)]
+    return result
+
+
+def cmd_export_clients(args):
+    """为每个用户导出客户端配置"""
+    from .utils.helpers import get_server_ip
+    from .utils.output import green
+    from .client import client_users, export_clients, saved_sni
+    from .instances import instance_profiles
+
+    config = _require_installed()
+    sni = args.sni or saved_sni()
+    if not sni:
+        raise CLIError("无法确定 SNI，请用 --sni 指定")
+    try:
+        users = client_users(config, args.user)
+    except ValueError as e:
+        raise CLIError(str(e))
+    if not users:
+        raise CLIError("没有可导出的用户")
+    # 多实例时每个用户固定连接一个实例，只使用该实例的端口和端口跳跃段
+    profiles = instance_profiles(config, args.server_ip or get_server_ip(), sni)
+    result = export_clients(profiles if len(profiles) > 1 else profiles[0],
+                            users, args.dir, args.format, args.workers)
+    green(f"已导出 {result['users']} 个用户的客户端配置: {result['dir']}")
+    return result
+
+
+def cmd_verify(args):
+    """校验客户端配置固定的证书指纹"""
+    from .config import CLIENT_DIR
+    from .certificate import cached_certificate_info
+    from .client import verify_client_files
+    from .utils.output import green, red
+
+    cert_path = args.cert or _require_installed().get(("tls", "cert"))
+    if not cert_path:
+        raise CLIError("服务端未配置证书文件 (tls.cert)")
+    try:
+        cert = cached_certificate_info(cert_path)
+    except (OSError, ValueError) as e:
+        raise CLIError(f"无法读取证书 {cert_path}: {e}")
+
+    paths = args.paths or [p for p in (CLIENT_DIR / "url.txt", CLIENT_DIR / "hy-client.yaml",
+                                       CLIENT_DIR / "hy-client.json") if p.exists()]
+    if not paths:
+        raise CLIError("没有要校验的客户端配置")
+    results = verify_client_files(paths, cert)
+    if not results:
+        raise CLIError("没有找到客户端配置")
+    failed = [r for r in results if not r["ok"]]
+    for r in failed:
+        red(f"{r['path']}: {r['reason']}")
+    if failed:
+        raise CLIError(f"{len(failed)}/{len(results)} 个客户端配置未通过校验")
+    green(f"{len(results)} 个客户端配置与当前证书一致")
+    return {"cert": str(cert_path), "sha256": cert["sha256"],
+            "self_signed": cert["self_signed"], "checked": len(results)}
+
+
+def cmd_acme_issue(args):
+    """申请证书并替换服务端正在使用的证书"""
+    from .utils.helpers import get_install_status
+    from .utils.output import green, yellow
+    from .installer import refresh_client_config
+    from .acme import issue_certificate, install_service, AcmeError
+
+    config = _require_installed() if get_install_status() >= 2 else None
+    paths = {}
+    if config:
+        paths = {"cert": config.get(("tls", "cert")), "key": config.get(("tls", "key"))}
+        if not all(paths.values()):
+            raise CLIError("服务端未配置证书文件 (tls.cert / tls.key)")
+    try:
+        result = issue_certificate(
+            args.domain, on_progress=None if args.json else yellow, directory=args.directory,
+            email=args.email, ca_bundle=args.ca_bundle, challenge=args.challenge,
+            http_port=args.http_port, tls_port=args.tls_port, **paths)
+    except (AcmeError, OSError) as e:
+        raise CLIError(f"证书申请失败: {e}") from None
+    green(f"证书已写入: {result['cert']}")
+
+    if config:
+        result["reload"] = _acme_reload()
+        result["share_url"] = refresh_client_config(config, args.server_ip, args.domain[0])
+        yellow("已导出的用户配置需重新导出: hy2 export-clients")
+    if not args.no_service:
+        install_service()
+    return result
+
+
+def cmd_acme_renew(args):
+    """续期证书"""
+    from .utils.output import yellow
+    from .acme import RenewalScheduler, issue_certificate, load_settings, AcmeError
+
+    if not load_settings()["domains"]:
+        raise CLIError("尚未申请证书，请先运行 hy2 acme issue")
+    renew_at = RenewalScheduler().next_run()
+    if not args.force and renew_at > time.time():
+        return {"renewed": False, "renew_at": int(renew_at)}
+    try:
+        result = issue_certificate(on_progress=None if args.json else yellow)
+    except (AcmeError, OSError) as e:
+        raise CLIError(f"证书续期失败: {e}") from None
+    result["renewed"] = True
+    result["reload"] = _acme_reload()
+    return result
+
+
+def _acme_reload():
+    """证书替换后重启服务，返回切换报告"""
+    from .acme import reload_server
+    from .rollout import RolloutError
+    from .service import ServiceError
+
+    try:
+        return reload_server()
+    except RolloutError as e:
+        raise CLIError(f"新证书已写入，但平滑重启失败，服务仍在使用旧证书: {e}") from None
+    except ServiceError as e:
+        raise CLIError(f"新证书已写入，但服务重启失败: {e}") from None
+
+
+def cmd_acme_status(args):
+    """证书和续期状态"""
+    from .acme import status
+
+    return status()
+
+
+def cmd_acme_daemon(args):
+    """前台运行续期调度"""
+    from .acme import serve
+
+    serve()
+    return {}
+
+
+def cmd_service(args):
+    """服务控制"""
+    from .service import manage_service
+    from .utils.helpers import get_service_state
+
+    ready = manage_service(args.action) if args.action != "status" else None
+    if ready is not None and not ready["ready"]:
+        raise CLIError(f"服务未就绪: {ready['reason']}")
+    result = {"action": args.action, "state": get_service_state(max_age=0)}
+    if ready is not None:
+        result["ready_seconds"] = ready["seconds"]
+    return result
+
+
+def cmd_logs(args):
+    """查看服务日志: 过滤 (默认)、持续跟随或统计摘要"""
+    import re
+    from pathlib import Path
+    from .config import LOG_WINDOW, LOG_CURSOR_FILE
+    from .logs import (EVENT_TYPES, LogStats, LogFilter, journal_records, file_records,
+                       parse_events, analyze, format_event, print_summary)
+    from .service import log_units
+
+    unknown = [e for e in args.event or () if e not in EVENT_TYPES]
+    if unknown:
+        raise CLIError(f"未知事件类型: {', '.join(unknown)} (可选: {', '.join(EVENT_TYPES)})")
+    try:
+        matcher = LogFilter(args.level, args.event, args.ip, args.user, args.grep)
+    except re.error as e:
+        raise CLIError(f"--grep 正则表达式无效: {e}") from None
+
+    # 显示最后 N 条匹配的日志；无过滤条件时直接让 journalctl 只输出 N 条，
+    # 有过滤条件或统计摘要时扫描全部 (摘要模式下 -n 限制扫描的条数)
+    keep = args.lines or 50
+    if args.summary:
+        journal_lines = args.lines
+    else:
+        journal_lines = None if matcher.active else keep
+    if args.file:
+        if not Path(args.file).is_file():
+            raise CLIError(f"日志文件不存在: {args.file}")
+        records = file_records(args.file, follow=args.follow)
+    else:
+        cursor_file = None
+        if args.since_last:
+            Path(LOG_CURSOR_FILE).parent.mkdir(parents=True, exist_ok=True)
+            cursor_file = LOG_CURSOR_FILE
+        records = journal_records(log_units(), follow=args.follow,
+                                  lines=journal_lines,
+                                  since=args.since, cursor_file=cursor_file)
+
+    stats = LogStats(args.window or LOG_WINDOW)
+    events = parse_events(records)
+    try:
+        if args.follow:
+            try:
+                analyze(events, stats, matcher, on_match=lambda event: print(
+                    format_event(event, color=not args.json), flush=True))
+            except KeyboardInterrupt:
+                print()
+            summary = stats.summary(args.top)
+            print_summary(summary)
+            return summary
+        if args.summary:
+            analyze(events, stats, matcher)
+            summary = stats.summary(args.top)
+            if not args.json:
+                print_summary(summary)
+            return summary
+        matched, kept = analyze(events, None, matcher, keep=keep)
+    except FileNotFoundError:
+        raise CLIError("未找到 journalctl") from None
+
+    lines = [format_event(event) for event in kept]
+    for event in kept:
+        print(format_event(event, color=not args.json))
+    return {"matched": matched, "lines": lines}
+
+
+def cmd_stats(args):
+    """每用户流量统计: 单次采样、top 视图或 Prometheus 指标服务"""
+    from .config import STATS_INTERVAL, METRICS_LISTEN
+    from .stats import stats_endpoints, MetricsCollector, render_top, watch, serve_metrics
+    from .utils.output import green
+
+    clients = stats_endpoints(_require_installed())
+    if not clients:
+        raise CLIError("未启用流量统计 API，请先运行 hy2 configure --traffic-stats on")
+    collector = MetricsCollector(clients)
+    interval = args.interval or STATS_INTERVAL
+
+    if args.prometheus is not None:
+        listen = args.prometheus or METRICS_LISTEN
+        try:
+            server = serve_metrics(collector, listen)
+        except (OSError, ValueError) as e:
+            raise CLIError(f"无法监听 {listen}: {e}") from None
+        collector.start(interval)
+        green(f"Prometheus 指标: http://{listen}/metrics (Ctrl+C 退出)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            collector.stop()
+            server.server_close()
+        return {}
+    if args.watch:
+        watch(collector, interval, args.limit)
+        return {}
+
+    # 两次采样之间的差值即为速率
+    collector.poll()
+    time.sleep(interval)
+    snapshot = collector.poll()
+    if len(snapshot["errors"]) == len(clients):
+        raise CLIError("无法连接流量统计 API，服务是否在运行?", snapshot)
+    if not args.json:
+        print(render_top(snapshot, args.limit))
+    return snapshot
+
+
+def cmd_tune(args):
+    """应用或回滚内核调优配置档"""
+    from .system.tuning import tune, rollback, print_report
+    from .utils.output import green
+
+    if args.rollback:
+        result = rollback(root=args.root)
+        green(f"已恢复 {len(result['restored'])} 项内核参数")
+        return result
+    report = tune(args.profile, root=args.root, dry_run=args.dry_run)
+    print_report(report)
+    return report
+
+
+def cmd_uninstall(args):
+    """卸载"""
+    from .installer import uninstall_hy2
+
+    if not args.yes:
+        raise CLIError("卸载需要 --yes 确认")
+    uninstall_hy2(skip_confirm=True, purge=args.purge)
+    return {"purged": args.purge}
+
+
+def cmd_batch(args):
+    """依次执行批量文件中的命令"""
+    import shlex
+
+    text = sys.stdin.read() if args.file == "-" else _read_text(args.file)
+    if text.lstrip().startswith("["):
+        try:
+            commands = [[str(a) for a in item] for item in json.loads(text)]
+        except (ValueError, TypeError) as e:
+            raise CLIError(f"批量文件不是有效的 JSON 数组: {e}") from None
+    else:
+        commands = []
+        for line in text.splitlines():
+            try:
+                argv = shlex.split(line, comments=True)
+            except ValueError as e:
+                raise CLIError(f"无法解析: {line.strip()} ({e})") from None
+            if argv:
+                commands.append(argv)
+
+    results = []
+    failed = 0
+    for argv in commands:
+        if argv[0] == "batch":
+            outcome = {"ok": False, "error": "批量文件中不能嵌套 batch"}
+        else:
+            outcome = execute(argv, json_output=args.json)
+        outcome["argv"] = argv
+        results.append(outcome)
+        if not outcome["ok"]:
+            failed += 1
+            if not args.continue_on_error:
+                break
+
+    if failed:
+        raise CLIError(f"{failed} 条命令执行失败", {"results": results})
+    return {"results": results}
+
+
+def _read_text(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError as e:
+        raise CLIError(f"无法读取批量文件: {e}") from None
+
+
+# ============ 执行 ============
+
+def execute(argv, json_output=False):
+    """
+    在当前进程中执行一条命令
+
+    Args:
+        argv: 参数列表 (不含程序名)
+        json_output: 过程输出是否写到 stderr (命令本身带 --json 时也写到 stderr)
+
+    Returns:
+        dict: {"ok": bool, "command": 子命令, "result": ... 或 "error": ..., "seconds": 耗时}
+    """
+    return _execute(argv, json_output)[0]
+
+
+def _execute(argv, json_output=False):
+    """
+    execute 的实现
+
+    Returns:
+        tuple: (结果, 是否为 JSON 模式)；JSON 模式取自解析后的参数，
+               参数无法解析时按子命令之前是否有 --json 判断
+    """
+    import io
+    from contextlib import redirect_stdout, nullcontext
+
+    parser = build_parser()
+    start = time.monotonic()
+    outcome = {"ok": False, "command": None}
+    # argparse 的帮助信息先缓存，确定输出方式后再写出
+    usage = io.StringIO()
+    try:
+        with redirect_stdout(usage):
+            args = parser.parse_args(argv)
+    except SystemExit as e:
+        json_output = json_output or _json_requested(argv)
+        (sys.stderr if json_output else sys.stdout).write(usage.getvalue())
+        _exit_outcome(outcome, e)
+        outcome["seconds"] = round(time.monotonic() - start, 3)
+        return outcome, json_output
+
+    json_output = args.json = json_output or args.json
+    outcome["command"] = args.command
+    with _stdout_to_stderr() if json_output else nullcontext():
+        try:
+            if not args.command:
+                raise CLIError(parser.format_usage().strip())
+            outcome["result"] = args.handler(args)
+            outcome["ok"] = True
+        except CLIError as e:
+            outcome["error"] = e.args[0]
+            if len(e.args) > 1:
+                outcome["result"] = e.args[1]
+        except SystemExit as e:
+            # 安装流程中的 sys.exit
+            _exit_outcome(outcome, e)
+    outcome["seconds"] = round(time.monotonic() - start, 3)
+    return outcome, json_output
+
+
+def _exit_outcome(outcome, exc):
+    """SystemExit (argparse 的 --help / 参数错误，或 sys.exit) 计入结果"""
+    if exc.code in (0, None):
+        outcome["ok"] = True
+        outcome["result"] = {}
+    else:
+        outcome["error"] = exc.code if isinstance(exc.code, str) else f"退出码 {exc.code}"
+
+
+def _json_requested(argv):
+    """子命令之前是否有 --json (顶层选项都不带值；子命令之后的 --json 可能是参数值)"""
+    for arg in argv:
+        if not arg.startswith("-"):
+            return False
+        if arg == "--json":
+            return True
+    return False
+
+
+@contextmanager
+def _stdout_to_stderr():
+    """
+    过程输出改写到 stderr，包括子进程 (如 apt-get) 直接写入 fd 1 的输出
+
+    redirect_stdout 只替换 sys.stdout，子进程继承的仍是原来的 fd 1，
+    因此同时把 fd 1 指向 stderr，结束后恢复。
+    """
+    import os
+    from contextlib import redirect_stdout
+
+    sys.stdout.flush()
+    try:
+        saved = os.dup(1)
+        os.dup2(2, 1)
+    except OSError:
+        saved = None
+    try:
+        with redirect_stdout(sys.stderr):
+            yield
+    finally:
+        sys.stderr.flush()
+        if saved is not None:
+            os.dup2(saved, 1)
+            os.close(saved)
+
+
+def _print_human(outcome):
+    """以文本形式显示结果"""
+    from .utils.output import red, green
+
+    if not outcome["ok"]:
+        red(f"错误: {outcome['error']}")
+    result = outcome.get("result") or {}
+    if outcome.get("command") == "batch":
+        for item in result.get("results", []):
+            mark = "OK  " if item["ok"] else "FAIL"
+            print(f"[{mark}] {' '.join(item['argv'])} ({item['seconds']}s)"
+                  + ("" if item["ok"] else f": {item['error']}"))
+        return
+    if outcome["ok"] and outcome.get("command") not in SELF_REPORTING + (None,):
+        for key, value in result.items():
+            if key == "changes":
+                continue
+            if isinstance(value, list):
+                value = ", ".join(v if isinstance(v, str) else json.dumps(v, ensure_ascii=False)
+                                  for v in value) or "-"
+            elif isinstance(value, dict):
+                value = json.dumps(value, ensure_ascii=False)
+            green(f"{key}: {'-' if value is None else value}")
+
+
+def run(argv):
+    """
+    命令行入口
+
+    Args:
+        argv: 参数列表 (不含程序名)
+
+    Returns:
+        int: 退出码 (0 成功，1 失败)
+    """
+    outcome, json_output = _execute(argv)
+    if json_output:
+        print(json.dumps(outcome, ensure_ascii=False, indent=2))
+    else:
+        _print_human(outcome)
+    return 0 if outcome["ok"] else 1
@@ -1,72 +1,636 @@
 """
 客户端配置生成模块
+
+服务端配置解析一次得到 ClientProfile，之后为每个用户渲染各种客户端格式:
+
+    hy-client.yaml / hy-client.json   Hysteria 官方客户端
+    sing-box.json                     sing-box (hysteria2 出站 + 本机 mixed 入站)
+    clash.yaml                        Clash Meta (mihomo)
+    subscription.txt                  v2rayN 订阅 (分享链接的 base64)
+    url.txt                           hysteria2:// 分享链接 (含 mport、pinSHA256)
+
+自签证书跳过证书链校验，所有格式都固定其指纹 (见 certificate.cached_certificate_info)，
+客户端只接受指纹一致的证书；CA 签发的证书会自动续期，只做证书链校验。
+
+export_clients 将用户分批交给线程池渲染和写入，用户再多内存中也只有少量待写入的文件。
+多实例部署时每个实例一个 ClientProfile，用户按用户名固定分配到其中一个实例。
 """
 
+import os
+import re
 import json
+import time
+import base64
 from pathlib import Path
 from urllib.parse import quote
 
+# 客户端本机代理端口 (Hysteria socks5、sing-box / Clash 的 mixed 端口)
+LOCAL_PROXY_PORT = 5080
+
+DEFAULT_HOP_INTERVAL = "30s"
+
+# 模板占位符 (YAML 中无需引号，JSON 中为普通字符串)
+_AUTH_MARK = "HY2-AUTH-PLACEHOLDER"
+_NAME_MARK = "HY2-NAME-PLACEHOLDER"
+_MARK_RE = re.compile(r'("?HY2-(?:AUTH|NAME)-PLACEHOLDER"?)')
+
+
+def _hop_range(hop_ports):
+    """端口跳跃范围 "start:end" (或 start-end) -> (start, end)，未启用时返回 None"""
+    if not hop_ports:
+        return None
+    start, _, end = str(hop_ports).replace("-", ":").partition(":")
+    return int(start), int(end or start)
+
+
+def _mbps(value):
+    """Hysteria 带宽字符串 "100 mbps" -> 100，无法解析时返回 None"""
+    parts = str(value or "").split()
+    return int(parts[0]) if len(parts) == 2 and parts[0].isdigit() else None
+
+
+class ClientProfile:
+    """
+    一台服务器的客户端参数
+
+    与用户无关的部分 (地址、端口跳跃、TLS、链路参数) 在构造时计算一次，
+    渲染单个用户时只填入 auth 和名称。
+    """
+
+    def __init__(self, server_ip, port, sni, hop_ports=None, link=None, cert=None,
+                 hop_interval=None):
+        """
+        Args:
+            server_ip: 服务器IP
+            port: 端口
+            sni: 域名/SNI
+            hop_ports: 端口跳跃范围 start:end
+            link: 客户端 quic / bandwidth 配置块 (见 ServerConfig.client_link_settings)
+            cert: 服务端证书信息 (见 certificate.certificate_info)；自签证书跳过证书链校验
+                  并固定指纹，CA 证书只做证书链校验。为 None 时不固定证书并跳过校验
+            hop_interval: 端口跳跃间隔，默认 30s
+        """
+        from .utils.helpers import is_ipv6
+
+        self.server_ip = server_ip
+        self.host = f"[{server_ip}]" if is_ipv6(server_ip) else server_ip
+        self.port = int(port)
+        self.sni = sni
+        self.hop = _hop_range(hop_ports)
+        self.link = link or {}
+        # 自签证书无法通过证书链校验，由 pinSHA256 保证只接受这张证书；
+        # CA 签发的证书会自动续期 (见 acme)，只做证书链校验，不固定指纹
+        pinned = cert if cert and cert["self_signed"] else None
+        self.pin = pinned["sha256"] if pinned else None
+        self.spki_pin = pinned["spki_sha256"] if pinned else None
+        self.insecure = cert["self_signed"] if cert else True
+        self.hop_interval = hop_interval or DEFAULT_HOP_INTERVAL
+        self._templates = {}
+
+        bandwidth = self.link.get("bandwidth") or {}
+        self.up_mbps = _mbps(bandwidth.get("up"))
+        self.down_mbps = _mbps(bandwidth.get("down"))
+        self.mport = f"{self.hop[0]}-{self.hop[1]}" if self.hop else None
+        self.server = f"{self.host}:{self.port}" + (f",{self.mport}" if self.mport else "")
+        self.tls = {"sni": sni, "insecure": self.insecure}
+        if self.pin:
+            self.tls["pinSHA256"] = self.pin
+
+        query = []
+        if self.insecure:
+            query.append("insecure=1")
+        query.append(f"sni={sni}")
+        if self.mport:
+            query.append(f"mport={self.mport}")
+        if self.pin:
+            query.append(f"pinSHA256={quote(self.pin, safe=':')}")
+        self.url_prefix = f"@{self.host}:{self.port}/?" + "&".join(query) + "#"
+
+    @classmethod
+    def from_config(cls, config, server_ip, sni):
+        """
+        由服务端配置创建
+
+        Args:
+            config: ServerConfig
+            server_ip: 写入客户端配置的服务器地址
+            sni: 域名/SNI
+        """
+        return cls(server_ip, config.port, sni, config.hop_ports, config.client_link_settings(),
+                   cert=server_certificate(config),
+                   hop_interval=config.get(("transport", "udp", "hopInterval")))
+
+    # ============ 渲染 ============
+
+    def share_url(self, auth, name="HY2"):
+        """hysteria2:// 分享链接"""
+        return f"hysteria2://{quote(auth, safe='')}{self.url_prefix}{quote(name)}"
+
+    def hysteria(self, auth):
+        """Hysteria 客户端配置 (dict)"""
+        config = {
+            "server": self.server,
+            "auth": auth,
+            "tls": dict(self.tls),
+            "fastOpen": True,
+            "socks5": {"listen": f"127.0.0.1:{LOCAL_PROXY_PORT}"},
+        }
+        if self.hop:
+            config["transport"] = {"udp": {"hopInterval": self.hop_interval}}
+        config.update(self.link)
+        return config
+
+    def sing_box(self, auth, name):
+        """
+        sing-box 配置 (dict)
+
+        sing-box 固定的是证书公钥而不是证书本身，写入 certificate_public_key_sha256。
+        """
+        outbound = {
+            "type": "hysteria2",
+            "tag": name,
+            "server": self.server_ip,
+            "server_port": self.port,
+        }
+        if self.hop:
+            outbound["server_ports"] = [f"{self.hop[0]}:{self.hop[1]}"]
+            outbound["hop_interval"] = self.hop_interval
+        if self.up_mbps:
+            outbound["up_mbps"] = self.up_mbps
+        if self.down_mbps:
+            outbound["down_mbps"] = self.down_mbps
+        outbound["password"] = auth
+        outbound["tls"] = {"enabled": True, "server_name": self.sni, "insecure": self.insecure}
+        if self.spki_pin:
+            outbound["tls"]["certificate_public_key_sha256"] = [self.spki_pin]
+        return {
+            "log": {"level": "warn"},
+            "inbounds": [{"type": "mixed", "tag": "mixed-in", "listen": "127.0.0.1",
+                          "listen_port": LOCAL_PROXY_PORT}],
+            "outbounds": [outbound, {"type": "direct", "tag": "direct"}],
+            "route": {"final": name},
+        }
+
+    def clash(self, auth, name):
+        """Clash Meta (mihomo) 配置 (dict)"""
+        proxy = {"name": name, "type": "hysteria2", "server": self.server_ip, "port": self.port}
+        if self.mport:
+            proxy["ports"] = self.mport
+        proxy["password"] = auth
+        if self.up_mbps:
+            proxy["up"] = f"{self.up_mbps} Mbps"
+        if self.down_mbps:
+            proxy["down"] = f"{self.down_mbps} Mbps"
+        proxy["sni"] = self.sni
+        proxy["skip-cert-verify"] = self.insecure
+        if self.pin:
+            proxy["fingerprint"] = self.pin.replace(":", "").lower()
+        return {
+            "mixed-port": LOCAL_PROXY_PORT,
+            "allow-lan": False,
+            "mode": "rule",
+            "proxies": [proxy],
+            "proxy-groups": [{"name": "PROXY", "type": "select", "proxies": [name]}],
+            "rules": ["MATCH,PROXY"],
+        }
+
+    def _template(self, fmt):
+        """
+        格式的文本模板: 用占位符渲染一次，按占位符切分
+
+        各用户的文件只有 auth 和名称不同，之后每个用户只需拼接字符串，
+        不再重复构建和序列化整个配置。
+        """
+        template = self._templates.get(fmt)
+        if template is None:
+            from .utils.miniyaml import dumps, format_scalar
+
+            if fmt == "hysteria-yaml":
+                text, encode = dumps(self.hysteria(_AUTH_MARK)), format_scalar
+            elif fmt == "hysteria-json":
+                text, encode = json.dumps(self.hysteria(_AUTH_MARK), indent=2), json.dumps
+            elif fmt == "sing-box":
+                text, encode = json.dumps(self.sing_box(_AUTH_MARK, _NAME_MARK), indent=2), json.dumps
+            elif fmt == "clash":
+                text, encode = dumps(self.clash(_AUTH_MARK, _NAME_MARK)), format_scalar
+            else:
+                raise ValueError(f"未知的导出格式: {fmt}")
+            marks = {encode(_AUTH_MARK): "auth", encode(_NAME_MARK): "name"}
+            parts = _MARK_RE.split(text)
+            template = self._templates[fmt] = ([marks.get(p) for p in parts], parts, encode)
+        return template
+
+    def render(self, fmt, auth, name="HY2"):
+        """
+        渲染一种格式的文本
+
+        Args:
+            fmt: CLIENT_FORMATS 中的格式 (v2rayn 为只含该用户的订阅)
+            auth: 客户端 auth 字段
+            name: 链接备注 / 代理名称
+        """
+        if fmt == "v2rayn":
+            return subscription([self.share_url(auth, name)])
+        slots, parts, encode = self._template(fmt)
+        values = {"auth": encode(auth), "name": encode(name)}
+        return "".join(values[slot] if slot else part for slot, part in zip(slots, parts))
+
+    def bundle(self, auth, name, formats=None):
+        """
+        一个用户的全部文件
+
+        Args:
+            auth: 客户端 auth 字段
+            name: 链接备注 / 代理名称
+            formats: CLIENT_FORMATS 中的格式，默认全部
+
+        Returns:
+            dict: {文件名: 内容}
+        """
+        from .config import CLIENT_FORMATS
+
+        files = {"url.txt": self.share_url(auth, name)}
+        for fmt in formats or CLIENT_FORMATS:
+            files[CLIENT_FORMATS[fmt]] = self.render(fmt, auth, name)
+        return files
 
-def generate_client_config(server_ip, port, password, domain, hop_ports=None):
+
+def subscription(urls):
+    """v2rayN 订阅内容: 每行一个分享链接，整体 base64 编码"""
+    return base64.b64encode("\n".join(urls).encode()).decode() + "\n"
+
+
+def server_certificate(config):
+    """
+    服务端证书信息 (带缓存，见 certificate.cached_certificate_info)
+
+    Returns:
+        dict 或 None (未配置证书文件或无法读取)
+    """
+    from .certificate import cached_certificate_info
+
+    cert = config.get(("tls", "cert"))
+    if not cert:
+        return None
+    try:
+        return cached_certificate_info(cert)
+    except (OSError, ValueError):
+        return None
+
+
+def saved_sni():
+    """现有分享链接中的 SNI，没有时返回 None"""
+    import re
+    from .config import CLIENT_DIR
+
+    url_file = CLIENT_DIR / "url.txt"
+    match = re.search(r"sni=([^#&]+)", url_file.read_text()) if url_file.exists() else None
+    return match.group(1) if match else None
+
+
+def build_share_url(server_ip, port, auth, domain, name="HY2", hop_ports=None, cert=None):
+    """
+    构建 hysteria2:// 分享链接
+
+    Args:
+        server_ip: 服务器IP
+        port: 端口
+        auth: 认证信息 (密码，或多用户模式下的 "用户名:密码")
+        domain: 域名/SNI
+        name: 链接备注
+        hop_ports: 端口跳跃范围，写入 mport 参数
+        cert: 服务端证书信息，自签证书写入 pinSHA256 参数
+
+    Returns:
+        分享链接字符串
+    """
+    return ClientProfile(server_ip, port, domain, hop_ports, cert=cert).share_url(auth, name)
+
+
+def generate_client_config(server_ip, port, password, domain, hop_ports=None, link=None, cert=None):
     """
     生成客户端配置
 
     Args:
         server_ip: 服务器IP
         port: 端口
-        password: 密码
+        password: 认证信息 (密码，或多用户模式下的 "用户名:密码")
         domain: 域名/SNI
         hop_ports: 端口跳跃范围
+        link: 客户端 quic / bandwidth 配置块 (见 ServerConfig.client_link_settings)
+        cert: 服务端证书信息 (见 server_certificate)
 
     Returns:
         分享链接字符串
     """
-    from ..config import CLIENT_DIR
-    from ..utils.helpers import is_ipv6
-    from ..utils.output import yellow
+    from .config import CLIENT_DIR
 
     CLIENT_DIR.mkdir(parents=True, exist_ok=True)
+    profile = ClientProfile(server_ip, port, domain, hop_ports, link, cert=cert)
+    (CLIENT_DIR / "hy-client.yaml").write_text(profile.render("hysteria-yaml", password))
+    (CLIENT_DIR / "hy-client.json").write_text(profile.render("hysteria-json", password))
+    share_url = profile.share_url(password)
+    (CLIENT_DIR / "url.txt").write_text(share_url)
+    return share_url
 
-    server_addr = f"[{server_ip}]" if is_ipv6(server_ip) else server_ip
 
-    # 端口跳跃
-    port_str = f"{port},{hop_ports}" if hop_ports else str(port)
+# ============ 多用户导出 ============
 
-    # YAML 配置
-    yaml_config = f"""server: {server_addr}:{port_str}
-auth: {password}
-tls:
-  sni: {domain}
-  insecure: true
-fastOpen: true
-socks5:
-  listen: 127.0.0.1:5080
-"""
-    (CLIENT_DIR / "hy-client.yaml").write_text(yaml_config)
-
-    # JSON 配置
-    json_config = {
-        "server": f"{server_addr}:{port_str}",
-        "auth": password,
-        "tls": {"sni": domain, "insecure": True},
-        "fastOpen": True,
-        "socks5": {"listen": "127.0.0.1:5080"}
+def client_users(config, names=None):
+    """
+    需要导出的用户
+
+    HTTP 认证后端模式取用户库中可登录的用户，userpass 模式取配置中的用户，
+    单用户 (password) 模式为 user1，其 auth 只有密码。
+
+    Args:
+        config: ServerConfig
+        names: 只导出这些用户，默认全部
+
+    Returns:
+        dict: {用户名: 客户端 auth}
+
+    Raises:
+        ValueError: 指定的用户不存在
+    """
+    if config.auth_backend:
+        from .users import UserStore
+        users = {name: f"{name}:{pwd}" for name, pwd in UserStore.load().active().items()}
+    elif config.users:
+        users = {name: f"{name}:{pwd}" for name, pwd in config.users.items()}
+    else:
+        users = {"user1": config.password} if config.password else {}
+    if names:
+        missing = [name for name in names if name not in users]
+        if missing:
+            raise ValueError(f"用户不存在或不可登录: {', '.join(missing)}")
+        users = {name: users[name] for name in names}
+    return users
+
+
+def profile_for(profiles, name):
+    """
+    用户所连接实例的 ClientProfile
+
+    按用户名的 CRC32 分配，用户增减时其他用户的实例不变。
+
+    Args:
+        profiles: ClientProfile，或每个实例一个 ClientProfile 的列表
+        name: 用户名
+    """
+    import zlib
+
+    if isinstance(profiles, ClientProfile):
+        return profiles
+    return profiles[zlib.crc32(name.encode()) % len(profiles)]
+
+
+def iter_bundles(profile, users, formats=None):
+    """
+    逐个用户渲染 (生成器)
+
+    Args:
+        profile: ClientProfile，多实例时为每个实例一个的列表 (见 profile_for)
+        users: {用户名: 客户端 auth}
+        formats: 导出格式，默认全部
+
+    Yields:
+        tuple: (用户名, {文件名: 内容})
+    """
+    for name, auth in users.items():
+        yield name, profile_for(profile, name).bundle(auth, f"HY2-{name}", formats)
+
+
+def _dir_name(name):
+    """用户名 -> 目录名 (转义路径分隔符，避免 . 和 ..)"""
+    text = quote(name, safe="")
+    return "%2E" + text[1:] if text.startswith(".") else text
+
+
+def _write_private(path, text):
+    """写入只有所有者可读的文件 (内容包含密码)"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+
+
+def _export_chunk(profile, users, out_dir, formats):
+    """
+    渲染并写入一批用户
+
+    Returns:
+        tuple: (分享链接列表, 文件数)
+    """
+    urls = []
+    files = 0
+    for name, bundle in iter_bundles(profile, users, formats):
+        directory = out_dir / _dir_name(name)
+        directory.mkdir(mode=0o700, exist_ok=True)
+        for filename, text in bundle.items():
+            _write_private(directory / filename, text)
+        urls.append(bundle["url.txt"])
+        files += len(bundle)
+    return urls, files
+
+
+def export_clients(profile, users, out_dir=None, formats=None, workers=None, chunk=64):
+    """
+    为每个用户导出一组客户端配置
+
+    目录结构:
+        out_dir/<用户名>/          url.txt 和各格式的配置文件
+        out_dir/urls.txt           全部分享链接，每行一个
+        out_dir/subscription.txt   全部用户的 v2rayN 订阅
+
+    用户按 chunk 个一批交给线程池渲染和写入，进行中的批次不超过 workers 的 2 倍，
+    用户再多内存中也只有少量待写入的文件。
+
+    Args:
+        profile: ClientProfile，多实例时为每个实例一个的列表 (见 profile_for)
+        users: {用户名: 客户端 auth} (见 client_users)
+        out_dir: 输出目录，默认 CLIENT_EXPORT_DIR
+        formats: 导出格式，默认全部
+        workers: 写入并发数，默认 CLIENT_EXPORT_WORKERS
+        chunk: 每批用户数
+
+    Returns:
+        dict: {"dir", "users", "files", "ms"}
+    """
+    from collections import deque
+    from itertools import islice
+    from concurrent.futures import ThreadPoolExecutor
+    from .config import CLIENT_EXPORT_DIR, CLIENT_EXPORT_WORKERS, CLIENT_FORMATS
+
+    start = time.perf_counter()
+    out_dir = Path(out_dir or CLIENT_EXPORT_DIR)
+    out_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+    workers = workers or CLIENT_EXPORT_WORKERS
+    # 先在当前线程中构建模板，格式无效时不写入任何文件
+    for fmt in formats or CLIENT_FORMATS:
+        for each in ([profile] if isinstance(profile, ClientProfile) else profile):
+            each.render(fmt, "", "")
+    items = iter(users.items())
+    urls = []
+    files = 0
+
+    def collect(future):
+        nonlocal files
+        chunk_urls, chunk_files = future.result()
+        urls.extend(chunk_urls)
+        files += chunk_files
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        while True:
+            batch = dict(islice(items, chunk))
+            if not batch:
+                break
+            pending.append(pool.submit(_export_chunk, profile, batch, out_dir, formats))
+            if len(pending) >= workers * 2:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+
+    _write_private(out_dir / "urls.txt", "\n".join(urls) + "\n" if urls else "")
+    _write_private(out_dir / "subscription.txt", subscription(urls))
+    return {
+        "dir": str(out_dir),
+        "users": len(urls),
+        "files": files + 2,
+        "ms": round((time.perf_counter() - start) * 1000, 1),
     }
-    (CLIENT_DIR / "hy-client.json").write_text(json.dumps(json_config, indent=2))
 
-    # 分享链接
-    encoded_password = quote(password, safe='')
-    share_url = f"hysteria2://{encoded_password}@{server_addr}:{port}/?insecure=1&sni={domain}#HY2"
-    (CLIENT_DIR / "url.txt").write_text(share_url)
 
-    return share_url
+# ============ 校验 ============
+
+def _normalize_pin(value):
+    return str(value).replace(":", "").strip().lower()
+
+
+def _url_pins(lines):
+    from urllib.parse import urlsplit, parse_qs
+
+    pins = []
+    for line in lines:
+        if line.startswith(("hysteria2://", "hy2://")):
+            values = parse_qs(urlsplit(line).query).get("pinSHA256")
+            pins.append(("sha256", values[0] if values else None))
+    return pins
+
+
+def client_pins(text):
+    """
+    识别客户端配置的格式并取出其中固定的证书指纹
+
+    Args:
+        text: 文件内容 (分享链接、v2rayN 订阅、Hysteria YAML/JSON、sing-box、Clash Meta)
+
+    Returns:
+        tuple: (格式, [(类型, 值)])；类型为 sha256 (证书) 或 spki (公钥)，
+               未固定证书时值为 None；无法识别时格式为 None
+    """
+    import binascii
+    from .utils.miniyaml import loads, YAMLError
+
+    text = text.strip()
+    if text.startswith(("hysteria2://", "hy2://")):
+        return "url", _url_pins(text.splitlines())
+    if text.startswith("{"):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None, []
+        if isinstance(data.get("outbounds"), list):
+            return "sing-box", [
+                ("spki", (ob.get("tls") or {}).get("certificate_public_key_sha256"))
+                for ob in data["outbounds"] if isinstance(ob, dict) and ob.get("type") == "hysteria2"]
+        if "server" in data:
+            return "hysteria-json", [("sha256", (data.get("tls") or {}).get("pinSHA256"))]
+        return None, []
+    try:
+        decoded = base64.b64decode("".join(text.split()), validate=True).decode()
+    except (binascii.Error, ValueError):
+        decoded = ""
+    if decoded.startswith(("hysteria2://", "hy2://")):
+        return "v2rayn", _url_pins(decoded.splitlines())
+    try:
+        data = loads(text)
+    except YAMLError:
+        return None, []
+    if not isinstance(data, dict):
+        return None, []
+    if isinstance(data.get("proxies"), list):
+        return "clash", [("sha256", p.get("fingerprint")) for p in data["proxies"]
+                         if isinstance(p, dict) and p.get("type") == "hysteria2"]
+    if "server" in data:
+        return "hysteria-yaml", [("sha256", (data.get("tls") or {}).get("pinSHA256"))]
+    return None, []
+
+
+def verify_client_file(path, cert):
+    """
+    校验一个客户端配置固定的证书与服务端证书一致
+
+    Args:
+        path: 客户端配置文件
+        cert: 服务端证书信息 (见 certificate.cached_certificate_info)
+
+    Returns:
+        dict: {"path", "format", "ok", "reason"}
+    """
+    result = {"path": str(path), "format": None, "ok": False, "reason": None}
+    try:
+        text = Path(path).read_text()
+    except (OSError, UnicodeDecodeError) as e:
+        result["reason"] = f"无法读取: {e}"
+        return result
+    result["format"], pins = client_pins(text)
+    if result["format"] is None:
+        result["reason"] = "无法识别的客户端配置"
+    elif not pins:
+        result["reason"] = "没有 hysteria2 节点"
+    elif cert["self_signed"] and any(not value for _, value in pins):
+        result["reason"] = "未固定证书 (缺少 pinSHA256)"
+    else:
+        # CA 签发的证书不要求固定指纹，但已固定的必须与当前证书一致
+        expected = {"sha256": _normalize_pin(cert["sha256"]), "spki": cert["spki_sha256"]}
+        for kind, value in ((k, v) for k, v in pins if v):
+            matched = (expected["spki"] in value if kind == "spki"
+                       else _normalize_pin(value) == expected["sha256"])
+            if not matched:
+                result["reason"] = "证书指纹与服务端证书不一致"
+                break
+        else:
+            result["ok"] = True
+    return result
+
+
+def verify_client_files(paths, cert):
+    """
+    校验多个客户端配置，目录中递归查找导出的文件 (CLIENT_FORMATS 中的文件名、url.txt、urls.txt)
+
+    Returns:
+        list: 每个文件的 verify_client_file 结果
+    """
+    from .config import CLIENT_FORMATS
+
+    names = set(CLIENT_FORMATS.values()) | {"url.txt", "urls.txt"}
+    results = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files = sorted(p for p in path.rglob("*") if p.name in names and p.is_file())
+        else:
+            files = [path]
+        results.extend(verify_client_file(f, cert) for f in files)
+    return results
 
 
 def show_config():
     """显示客户端配置"""
-    from ..config import CLIENT_DIR
-    from ..utils.output import red, yellow
-    from ..utils.helpers import generate_qrcode
+    from .config import CLIENT_DIR
+    from .utils.output import red, yellow
+    from .utils.helpers import generate_qrcode
 
     url_file = CLIENT_DIR / "url.txt"
     if url_file.exists():
@@ -9,8 +9,13 @@ import os
 HY2_VERSION = "app/v2.7.0"
 HY2_REPO = "apernet/hysteria"
 
+# 发布文件下载地址 - 可通过环境变量指向内部镜像
+HY2_DOWNLOAD_BASE = os.getenv(
+    "HY2_DOWNLOAD_BASE", f"https://github.com/{HY2_REPO}/releases/download"
+).rstrip("/")
+
 # 路径配置
-SERVICE_FILE = Path("/etc/systemd/system/hysteria-server.service")
+SERVICE_FILE = Path(os.getenv("HY2_SERVICE_FILE", "/etc/systemd/system/hysteria-server.service"))
 
 # 配置目录 - 优先使用环境变量，否则使用 /etc/hysteria
 CONFIG_DIR = Path(os.getenv("HY2_CONFIG_DIR", "/etc/hysteria"))
@@ -19,20 +24,110 @@ CONFIG_DIR = Path(os.getenv("HY2_CONFIG_DIR", "/etc/hysteria"))
 _home_dir = Path.home()
 CLIENT_DIR = Path(os.getenv("HY2_CLIENT_DIR", _home_dir / "hy"))
 
+# 每用户客户端配置的导出目录，以及写入文件的并发数
+CLIENT_EXPORT_DIR = CLIENT_DIR / "users"
+CLIENT_EXPORT_WORKERS = 8
+
+# 客户端导出格式 -> 每个用户目录中的文件名 (url.txt 总是导出)
+CLIENT_FORMATS = {
+    "hysteria-yaml": "hy-client.yaml",
+    "hysteria-json": "hy-client.json",
+    "sing-box": "sing-box.json",
+    "clash": "clash.yaml",
+    "v2rayn": "subscription.txt",
+}
+
 # 二进制文件路径
 BINARY_PATH = Path(os.getenv("HY2_BINARY_PATH", "/usr/local/bin/hysteria"))
 
+# 二进制文件缓存目录
+CACHE_DIR = Path(os.getenv("HY2_CACHE_DIR", "/var/cache/hy2"))
+
+# 二进制文件下载并发连接数
+DOWNLOAD_CONNECTIONS = int(os.getenv("HY2_DOWNLOAD_CONNECTIONS", "4"))
+
+# 无法获取发布校验值时是否仍安装未校验的二进制文件 (HY2_ALLOW_UNVERIFIED=1，不会存入缓存)
+ALLOW_UNVERIFIED_BINARY = os.getenv("HY2_ALLOW_UNVERIFIED", "") == "1"
+
 # 伪装站点默认值
 DEFAULT_PROXY_SITE = "maimai.sega.jp"
 
 # 默认证书域名
 DEFAULT_CERT_DOMAIN = "www.bing.com"
 
-# Acme 邮箱
-ACME_EMAIL = "acme@hy2.local"
+# Acme 账户邮箱 (为空时不提供联系方式；CA 会拒绝 .local 等保留域名)
+ACME_EMAIL = os.getenv("HY2_ACME_EMAIL", "")
+
+# 公网 IP 探测: 回显服务 (逗号分隔，可用 HY2_IP_SOURCES 覆盖)、总超时（秒）、缓存有效期（秒）
+PUBLIC_IP_SOURCES = tuple(s.strip() for s in os.getenv(
+    "HY2_IP_SOURCES", "https://ip.sb,https://icanhazip.com,https://ifconfig.me/ip,https://api64.ipify.org"
+).split(",") if s.strip())
+PUBLIC_IP_TIMEOUT = 8
+PUBLIC_IP_TTL = int(os.getenv("HY2_IP_TTL", "3600"))
 
 # 服务名称
 SERVICE_NAME = "hysteria-server"
 
+# 平滑重启时旧进程的默认排空窗口（秒）
+ROLLOUT_DRAIN = 30
+
+# 服务启动后等待就绪的超时，以及端口就绪后确认进程稳定的时间（秒）
+SERVICE_READY_TIMEOUT = 15
+SERVICE_READY_SETTLE = 0.5
+
+# 菜单中服务状态的缓存时间（秒）
+STATUS_CACHE_TTL = 5
+
 # BBR 配置文件
 BBR_CONFIG_FILE = "/etc/sysctl.d/99-hy2-bbr.conf"
+
+# 内核调优配置文件，以及调优前原值的备份 (用于回滚)
+TUNING_CONFIG_FILE = "/etc/sysctl.d/99-hy2-tuning.conf"
+TUNING_BACKUP_FILE = "/var/lib/hy2/tuning-backup.json"
+
+# 流量统计 API 监听地址 (仅本机)，多实例模式下实例 N 使用端口 +N
+TRAFFIC_STATS_LISTEN = os.getenv("HY2_STATS_LISTEN", "127.0.0.1:25413")
+
+# 流量统计采集间隔（秒）和每个用户保留的采样数
+STATS_INTERVAL = 2
+STATS_HISTORY = 60
+
+# Prometheus 指标默认监听地址
+METRICS_LISTEN = "127.0.0.1:9464"
+
+# HTTP 认证后端 (auth.type: http) 监听地址、systemd 服务，以及用户库变化的检查间隔（秒）
+AUTH_LISTEN = os.getenv("HY2_AUTH_LISTEN", "127.0.0.1:25414")
+AUTH_SERVICE_NAME = "hy2-auth"
+AUTH_SERVICE_FILE = Path(os.getenv("HY2_AUTH_SERVICE_FILE", "/etc/systemd/system/hy2-auth.service"))
+AUTH_RELOAD_INTERVAL = 1
+
+# 内置 ACME 客户端: CA 目录地址 (可用 HY2_ACME_DIRECTORY 指向 Pebble 等测试 CA)、
+# 信任的 CA 证书文件 (为空时用系统证书)，HTTP-01 / TLS-ALPN-01 应答端口和支持的挑战方式，
+# 在有效期的 2/3 处续期、随机抖动 (有效期的比例)，续期失败的首次重试间隔（秒），
+# 以及续期服务
+ACME_DIRECTORY = os.getenv("HY2_ACME_DIRECTORY", "https://acme-v02.api.letsencrypt.org/directory")
+ACME_CA_BUNDLE = os.getenv("HY2_ACME_CA_BUNDLE", "")
+ACME_HTTP_PORT = int(os.getenv("HY2_ACME_HTTP_PORT", "80"))
+ACME_TLS_PORT = int(os.getenv("HY2_ACME_TLS_PORT", "443"))
+ACME_CHALLENGES = ("http-01", "tls-alpn-01")
+ACME_RENEW_AT = 2 / 3
+ACME_RENEW_JITTER = 0.05
+ACME_RETRY_INTERVAL = 600
+ACME_SERVICE_NAME = "hy2-acme"
+ACME_SERVICE_FILE = Path(os.getenv("HY2_ACME_SERVICE_FILE", "/etc/systemd/system/hy2-acme.service"))
+
+# 防火墙: 本工具管理的 nftables 表、iptables 自定义链，ufw 规则注释，
+# 以及开机恢复 nftables/iptables 规则的 systemd 服务
+FIREWALL_TABLE = "hy2"
+FIREWALL_INPUT_CHAIN = "HY2_INPUT"
+FIREWALL_HOP_CHAIN = "HY2_HOP"
+FIREWALL_COMMENT = "hy2"
+FIREWALL_SERVICE_NAME = "hy2-firewall"
+FIREWALL_SERVICE_FILE = Path(os.getenv("HY2_FIREWALL_SERVICE_FILE", "/etc/systemd/system/hy2-firewall.service"))
+
+# 日志分析: 速率统计窗口（秒），以及 --since-last 使用的 journal 游标文件
+LOG_WINDOW = 60
+LOG_CURSOR_FILE = "/var/lib/hy2/journal.cursor"
+
+# 批量部署默认并发数
+FLEET_MAX_WORKERS = 8
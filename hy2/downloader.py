@@ -0,0 +1,290 @@
+"""
+下载模块 - 支持断点续传、多连接分段下载和失败重试
+
+未完成的下载保存在 <目标>.part，分段进度保存在 <目标>.part.state，
+中断后再次调用会从已下载的位置继续。
+"""
+
+import os
+import json
+import time
+import random
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+USER_AGENT = "hy2-installer"
+
+# 每次读取的字节数
+READ_SIZE = 64 * 1024
+
+# 分段的最小字节数，小文件不会拆成太多连接
+MIN_SEGMENT_SIZE = 1024 * 1024
+
+# 这些错误重试也无法恢复
+_FATAL_HTTP_CODES = {400, 401, 403, 404, 410}
+
+_RETRYABLE = (urllib.error.URLError, http.client.HTTPException, ConnectionError, OSError)
+
+
+class DownloadError(Exception):
+    """下载失败 (重试次数用尽或服务器拒绝)"""
+
+
+class _Progress:
+    """线程安全的字节计数器"""
+
+    def __init__(self, done=0):
+        self.done = done
+        self._lock = threading.Lock()
+
+    def add(self, n):
+        with self._lock:
+            self.done += n
+
+
+def _open(url, start=None, end=None, timeout=30):
+    headers = {"User-Agent": USER_AGENT}
+    if start is not None:
+        headers["Range"] = f"bytes={start}-" if end is None else f"bytes={start}-{end}"
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout)
+
+
+def _check_fatal(error):
+    if isinstance(error, urllib.error.HTTPError) and error.code in _FATAL_HTTP_CODES:
+        raise DownloadError(f"HTTP {error.code}: {error.reason}") from error
+
+
+def _retry_delay(backoff, attempt):
+    return backoff * (2 ** (attempt - 1)) * (0.5 + random.random())
+
+
+def probe(url, timeout=30):
+    """
+    探测下载地址
+
+    Args:
+        url: 下载地址
+        timeout: 超时时间（秒）
+
+    Returns:
+        tuple: (重定向后的地址, 文件大小或None, 是否支持 Range)
+    """
+    with _open(url, 0, 0, timeout) as resp:
+        final_url = resp.geturl()
+        if resp.status == 206:
+            content_range = resp.headers.get("Content-Range", "")
+            total = content_range.rsplit("/", 1)[-1]
+            return final_url, int(total) if total.isdigit() else None, total.isdigit()
+        length = resp.headers.get("Content-Length")
+        return final_url, int(length) if length and length.isdigit() else None, False
+
+
+def split_segments(size, connections):
+    """
+    将文件划分为若干分段
+
+    Args:
+        size: 文件大小
+        connections: 最大连接数
+
+    Returns:
+        list: [[起始, 结束(含), 当前位置], ...]
+    """
+    count = max(1, min(connections, size // MIN_SEGMENT_SIZE or 1))
+    step = -(-size // count)
+    return [[start, min(start + step, size) - 1, start] for start in range(0, size, step)]
+
+
+def _load_state(state_path, url, size):
+    try:
+        state = json.loads(state_path.read_text())
+    except (OSError, ValueError):
+        return None
+    if state.get("url") != url or state.get("size") != size:
+        return None
+    return state.get("segments")
+
+
+def _save_state(state_path, url, size, segments):
+    tmp = state_path.with_name(state_path.name + ".tmp")
+    tmp.write_text(json.dumps({"url": url, "size": size, "segments": segments}))
+    os.replace(tmp, state_path)
+
+
+def _fetch_segment(url, fd, segment, progress, cancel, retries, backoff, timeout):
+    """下载单个分段，断开后从当前位置继续"""
+    attempt = 0
+    while segment[2] <= segment[1] and not cancel.is_set():
+        try:
+            with _open(url, segment[2], segment[1], timeout) as resp:
+                if resp.status != 206:
+                    raise DownloadError("服务器未按 Range 返回分段内容")
+                while segment[2] <= segment[1] and not cancel.is_set():
+                    chunk = resp.read(min(READ_SIZE, segment[1] - segment[2] + 1))
+                    if not chunk:
+                        raise ConnectionError("连接提前关闭")
+                    os.pwrite(fd, chunk, segment[2])
+                    segment[2] += len(chunk)
+                    progress.add(len(chunk))
+                    attempt = 0
+        except DownloadError:
+            raise
+        except _RETRYABLE as e:
+            _check_fatal(e)
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"分段 {segment[0]}-{segment[1]} 下载失败: {e}") from e
+            cancel.wait(_retry_delay(backoff, attempt))
+
+
+def _download_single(url, part, progress, cancel, retries, backoff, timeout):
+    """服务器不支持 Range 时整体下载，失败后从头重试"""
+    attempt = 0
+    while not cancel.is_set():
+        progress.done = 0
+        try:
+            with _open(url, timeout=timeout) as resp, open(part, "wb") as f:
+                length = resp.headers.get("Content-Length")
+                for chunk in iter(lambda: resp.read(READ_SIZE), b""):
+                    if cancel.is_set():
+                        return
+                    f.write(chunk)
+                    progress.add(len(chunk))
+                # http.client 在连接提前关闭时不报错，只返回空数据
+                if length and length.isdigit() and progress.done < int(length):
+                    raise ConnectionError("连接提前关闭")
+            return
+        except _RETRYABLE as e:
+            _check_fatal(e)
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"下载失败: {e}") from e
+            cancel.wait(_retry_delay(backoff, attempt))
+
+
+def _run_workers(tasks, interval, on_tick):
+    """
+    并发执行下载任务，定期回调 on_tick；任一任务失败时通知其余任务退出
+
+    Args:
+        tasks: 可调用对象列表，每个接收 cancel 事件
+        interval: 回调间隔（秒）
+        on_tick: 周期回调
+    """
+    cancel = threading.Event()
+    with ThreadPoolExecutor(max_workers=max(1, len(tasks))) as pool:
+        futures = [pool.submit(task, cancel) for task in tasks]
+        try:
+            while True:
+                done, not_done = wait(futures, timeout=interval, return_when=FIRST_EXCEPTION)
+                on_tick()
+                for future in done:
+                    if future.exception():
+                        raise future.exception()
+                if not not_done:
+                    return
+        finally:
+            cancel.set()
+
+
+def download_file(url, dest, connections=4, retries=5, backoff=1.0, timeout=30,
+                  show=True, interval=0.5):
+    """
+    下载文件到 dest
+
+    Args:
+        url: 下载地址
+        dest: 目标路径，下载完成后原子重命名到此路径
+        connections: 并发连接数
+        retries: 每个分段的最大连续重试次数
+        backoff: 重试退避基数（秒），按指数增长并带随机抖动
+        timeout: 单次连接超时时间（秒）
+        show: 是否显示进度
+        interval: 进度刷新间隔（秒）
+
+    Returns:
+        Path: 目标路径
+
+    Raises:
+        DownloadError: 重试次数用尽或服务器拒绝
+    """
+    from .utils.output import show_progress
+
+    dest = Path(dest)
+    part = dest.with_name(dest.name + ".part")
+    state_path = dest.with_name(dest.name + ".part.state")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    attempt = 0
+    while True:
+        try:
+            final_url, size, ranges = probe(url, timeout)
+            break
+        except _RETRYABLE as e:
+            _check_fatal(e)
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"无法连接下载地址: {e}") from e
+            time.sleep(_retry_delay(backoff, attempt))
+
+    started = time.monotonic()
+
+    def report(progress, start_done):
+        if show:
+            elapsed = time.monotonic() - started
+            speed = (progress.done - start_done) / elapsed if elapsed > 0 else None
+            show_progress(progress.done, size, speed)
+
+    if not ranges or not size:
+        progress = _Progress()
+        try:
+            _run_workers(
+                [lambda cancel: _download_single(final_url, part, progress, cancel,
+                                                 retries, backoff, timeout)],
+                interval, lambda: report(progress, 0)
+            )
+        finally:
+            if show:
+                print()
+        os.replace(part, dest)
+        return dest
+
+    segments = _load_state(state_path, url, size) if part.exists() else None
+    if segments is None:
+        segments = split_segments(size, connections)
+
+    fd = os.open(part, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.fstat(fd).st_size != size:
+            os.ftruncate(fd, size)
+
+        start_done = sum(seg[2] - seg[0] for seg in segments)
+        progress = _Progress(start_done)
+        tasks = [
+            (lambda seg: lambda cancel: _fetch_segment(
+                final_url, fd, seg, progress, cancel, retries, backoff, timeout
+            ))(seg)
+            for seg in segments if seg[2] <= seg[1]
+        ]
+
+        def tick():
+            _save_state(state_path, url, size, segments)
+            report(progress, start_done)
+
+        try:
+            _run_workers(tasks, interval, tick)
+        finally:
+            _save_state(state_path, url, size, segments)
+            if show:
+                print()
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+    os.replace(part, dest)
+    state_path.unlink(missing_ok=True)
+    return dest
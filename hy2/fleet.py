@@ -0,0 +1,423 @@
+"""
+批量部署模块 - 按主机清单并发安装 Hysteria 2
+
+清单格式 (JSON):
+    {
+        "defaults": {"proxy_site": "maimai.sega.jp", "bbr": true},
+        "hosts": [
+            {"name": "node1", "address": "1.2.3.4", "port": 443, "instances": 4},
+            {"name": "node2", "address": "root@5.6.7.8", "hop_ports": "20000:30000",
+             "users": ["pwd1", "pwd2"]}
+        ]
+    }
+
+使用方法:
+    python3 -m hy2.fleet inventory.json --workers 8
+    python3 -m hy2.fleet inventory.json --local /tmp/hy2-fleet   # 本地模拟
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 子进程输出中结果行的前缀
+RESULT_MARKER = "HY2_FLEET_RESULT "
+
+# 主机参数的默认值
+HOST_DEFAULTS = {
+    "port": None,
+    "hop_ports": None,
+    "users": None,
+    "proxy_site": None,
+    "cert_path": None,
+    "key_path": None,
+    "domain": None,
+    "binary_source": None,
+    # 链路参数: bandwidth 为服务端上行 (客户端下载) Mbps，upload 为客户端上传 Mbps
+    # (默认同 bandwidth)，rtt 为往返时延毫秒；未设置 bandwidth 时使用 Hysteria 默认窗口
+    "bandwidth": None,
+    "upload": None,
+    "rtt": 200,
+    "instances": 1,
+    "bbr": False,
+    "firewall": True,
+    # 端口跳跃的 NAT 规则: firewall 为 False 时仍然安装 (端口跳跃依赖它)，本地模拟时关闭
+    "nat": True,
+    "start": True,
+}
+
+
+def load_inventory(path):
+    """
+    读取主机清单
+
+    Args:
+        path: 清单文件路径
+
+    Returns:
+        list: 合并默认值后的主机参数列表
+    """
+    data = json.loads(Path(path).read_text())
+    if isinstance(data, list):
+        data = {"hosts": data}
+
+    defaults = dict(HOST_DEFAULTS)
+    defaults.update(data.get("defaults", {}))
+
+    hosts = []
+    for i, entry in enumerate(data.get("hosts", [])):
+        if isinstance(entry, str):
+            entry = {"address": entry}
+        host = dict(defaults)
+        host.update(entry)
+        host.setdefault("address", host.get("name"))
+        if not host.get("address"):
+            raise ValueError(f"第 {i + 1} 台主机缺少 address")
+        host.setdefault("name", host["address"])
+        hosts.append(host)
+    return hosts
+
+
+def _normalize_users(users):
+    """将用户参数统一为 [{"password": ...}] 格式"""
+    from .utils.helpers import generate_password
+
+    if not users:
+        return [{"password": generate_password(8)}]
+    return [u if isinstance(u, dict) else {"password": str(u)} for u in users]
+
+
+def provision(params):
+    """
+    在当前主机上非交互式执行安装流程
+
+    下载 -> 证书 -> 服务端配置 -> systemd 服务 (多实例) -> 客户端配置 -> 防火墙 -> 启动
+
+    Args:
+        params: 主机参数字典 (见 HOST_DEFAULTS)
+
+    Returns:
+        dict: 执行结果，包含各步骤耗时与分享链接
+    """
+    from .config import BINARY_PATH, CONFIG_DIR, SERVICE_FILE, DEFAULT_PROXY_SITE
+    from .utils.helpers import run_cmd, random_available_port, get_server_ip, split_host_address
+    from .installer import download_hy2, generate_server_config
+    from .certificate import generate_self_signed_cert
+    from .client import generate_client_config, server_certificate
+    from .service import create_systemd_service, service_unit
+    from .instances import deploy_instances, client_config, instance_share_urls
+    from .system.firewall import setup_firewall
+    from .system.bbr import enable_bbr
+
+    params = dict(HOST_DEFAULTS, **params)
+    steps = {}
+
+    def step(name, func, *args):
+        start = time.monotonic()
+        value = func(*args)
+        steps[name] = round(time.monotonic() - start, 3)
+        return value
+
+    def fetch_binary():
+        if params["binary_source"]:
+            BINARY_PATH.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(params["binary_source"], BINARY_PATH)
+            BINARY_PATH.chmod(0o755)
+        elif not BINARY_PATH.exists():
+            download_hy2()
+
+    step("download", fetch_binary)
+
+    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    if params["cert_path"] and params["key_path"]:
+        cert_path, key_path = params["cert_path"], params["key_path"]
+        domain = params["domain"] or params.get("address")
+    else:
+        cert_path, key_path, domain = step("certificate", generate_self_signed_cert, params["domain"])
+
+    port = params["port"]
+    port = int(port) if port else random_available_port()
+
+    users = _normalize_users(params["users"])
+    proxy_site = params["proxy_site"] or DEFAULT_PROXY_SITE
+    hop_ports = params["hop_ports"]
+
+    if params["bbr"]:
+        step("bbr", enable_bbr)
+
+    link = None
+    if params["bandwidth"]:
+        down = int(params["upload"] or params["bandwidth"])
+        link = {"up": int(params["bandwidth"]), "down": down, "rtt": int(params["rtt"])}
+
+    config = step("server_config", generate_server_config,
+                  cert_path, key_path, port, hop_ports, users, proxy_site, link)
+
+    server_ip = params.get("server_ip")
+    if not server_ip and params.get("address"):
+        server_ip = split_host_address(params["address"])
+    server_ip = server_ip or get_server_ip()
+
+    SERVICE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    step("service", create_systemd_service)
+    instances = int(params["instances"] or 1)
+    plan = step("instances", deploy_instances, instances, None, config) if instances > 1 else []
+
+    # 多实例时客户端只能使用所连接实例的端口跳跃段
+    client = client_config(config, plan=plan)
+    share_url = step("client_config", generate_client_config,
+                     server_ip, client.port, config.client_auth, domain, client.hop_ports,
+                     config.client_link_settings(), server_certificate(config))
+
+    if params["firewall"] or (hop_ports and params["nat"]):
+        # 端口跳跃依赖 NAT 规则，不修改防火墙时也要安装
+        step("firewall", setup_firewall, port, hop_ports, params["firewall"])
+
+    if params["start"]:
+        def start_service():
+            unit = service_unit()
+            run_cmd(f"systemctl enable {unit}", check=False)
+            run_cmd(f"systemctl restart {unit}", check=False)
+        step("start", start_service)
+
+    return {
+        "port": port,
+        "hop_ports": hop_ports,
+        "users": [u["password"] for u in users],
+        "share_url": share_url,
+        "instances": plan,
+        "instance_urls": instance_share_urls(config, server_ip, config.client_auth, domain, plan),
+        "steps": steps,
+    }
+
+
+def _parse_result(output):
+    """从子进程输出中提取结果行"""
+    for line in reversed(output.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    return None
+
+
+class LocalExecutor:
+    """
+    本地模拟执行器
+
+    每台"主机"在独立的临时根目录中运行 (通过 HY2_CONFIG_DIR、HY2_BINARY_PATH、
+    HY2_CLIENT_DIR 和各 systemd 单元路径重定向)，默认不修改防火墙和 NAT、不启动服务，
+    可离线验证批量部署流程。
+    """
+
+    def __init__(self, root, overrides=None):
+        self.root = Path(root)
+        self.overrides = {"firewall": False, "nat": False, "start": False}
+        self.overrides.update(overrides or {})
+
+    def host_root(self, host):
+        """返回主机对应的模拟根目录"""
+        return self.root / str(host["name"]).replace("/", "_")
+
+    def run(self, host, timeout):
+        """
+        执行单台主机的安装
+
+        Returns:
+            tuple: (返回码, 输出文本)
+        """
+        root = self.host_root(host)
+        units = root / "etc" / "systemd" / "system"
+        env = dict(os.environ)
+        env.update({
+            "HY2_CONFIG_DIR": str(root / "etc" / "hysteria"),
+            "HY2_BINARY_PATH": str(root / "usr" / "local" / "bin" / "hysteria"),
+            "HY2_CLIENT_DIR": str(root / "root" / "hy"),
+            "HY2_SERVICE_FILE": str(units / "hysteria-server.service"),
+            "HY2_FIREWALL_SERVICE_FILE": str(units / "hy2-firewall.service"),
+            "HY2_AUTH_SERVICE_FILE": str(units / "hy2-auth.service"),
+            "HY2_ACME_SERVICE_FILE": str(units / "hy2-acme.service"),
+        })
+        params = dict(host, **self.overrides)
+        package_root = str(Path(__file__).resolve().parent.parent)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+
+        result = subprocess.run(
+            [sys.executable, "-m", "hy2.fleet", "--provision"],
+            input=json.dumps(params), capture_output=True, text=True,
+            env=env, timeout=timeout
+        )
+        return result.returncode, result.stdout + result.stderr
+
+
+class SSHExecutor:
+    """
+    SSH 执行器
+
+    要求目标主机已安装 python3 和 hy2 包，参数通过标准输入传递。
+    """
+
+    def __init__(self, ssh_options=None, python="python3"):
+        self.ssh_options = ssh_options or ["-o", "BatchMode=yes", "-o", "ConnectTimeout=10"]
+        self.python = python
+
+    def run(self, host, timeout):
+        """
+        执行单台主机的安装
+
+        Returns:
+            tuple: (返回码, 输出文本)
+        """
+        cmd = ["ssh", *self.ssh_options]
+        if host.get("ssh_port"):
+            cmd += ["-p", str(host["ssh_port"])]
+        cmd += [host["address"], f"{self.python} -m hy2.fleet --provision"]
+
+        result = subprocess.run(
+            cmd, input=json.dumps(host), capture_output=True, text=True, timeout=timeout
+        )
+        return result.returncode, result.stdout + result.stderr
+
+
+def run_fleet(hosts, executor, workers=None, timeout=600, log_dir=None):
+    """
+    并发部署多台主机
+
+    Args:
+        hosts: 主机参数列表 (见 load_inventory)
+        executor: 执行器 (LocalExecutor / SSHExecutor)
+        workers: 最大并发数
+        timeout: 单台主机超时时间（秒）
+        log_dir: 每台主机完整输出的保存目录
+
+    Returns:
+        list: 每台主机的结果字典，顺序与 hosts 一致
+    """
+    from .config import FLEET_MAX_WORKERS
+    from .utils.output import green, red
+
+    workers = workers or FLEET_MAX_WORKERS
+    if log_dir:
+        log_dir = Path(log_dir)
+        log_dir.mkdir(parents=True, exist_ok=True)
+
+    def _one(host):
+        start = time.monotonic()
+        try:
+            code, output = executor.run(host, timeout)
+        except subprocess.TimeoutExpired:
+            code, output = -1, f"超时 ({timeout}秒)"
+        except OSError as e:
+            code, output = -1, str(e)
+        elapsed = time.monotonic() - start
+
+        if log_dir:
+            (log_dir / f"{host['name']}.log").write_text(output)
+
+        result = _parse_result(output) if code == 0 else None
+        record = {"name": host["name"], "address": host["address"],
+                  "ok": result is not None, "elapsed": round(elapsed, 2)}
+        if result is not None:
+            record.update(result)
+        else:
+            lines = [line for line in output.strip().splitlines() if line.strip()]
+            record["error"] = lines[-1] if lines else f"退出码 {code}"
+        return record
+
+    results = {}
+    total = len(hosts)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, total or 1))) as pool:
+        futures = {pool.submit(_one, host): i for i, host in enumerate(hosts)}
+        for done, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            results[futures[future]] = record
+            if record["ok"]:
+                green(f"[{done}/{total}] {record['name']} 完成 ({record['elapsed']:.1f}秒)")
+            else:
+                red(f"[{done}/{total}] {record['name']} 失败 ({record['elapsed']:.1f}秒): {record['error']}")
+
+    return [results[i] for i in range(total)]
+
+
+def print_summary(results):
+    """
+    打印部署汇总表
+
+    Args:
+        results: run_fleet 返回的结果列表
+    """
+    from .utils.output import green, red, yellow
+
+    print("\n" + "="*60)
+    yellow("部署汇总")
+    print("="*60)
+    print(f"{'主机':<20} {'状态':<6} {'耗时':>8}  {'端口':>6}  详情")
+    print("-"*60)
+    for r in results:
+        status = "成功" if r["ok"] else "失败"
+        port = str(r.get("port", "-"))
+        detail = " ".join(f"{k}={v:.2f}s" for k, v in r.get("steps", {}).items()) \
+            if r["ok"] else r.get("error", "")
+        print(f"{r['name']:<20} {status:<6} {r['elapsed']:>7.1f}s  {port:>6}  {detail}")
+    print("-"*60)
+
+    failed = [r for r in results if not r["ok"]]
+    total_time = max((r["elapsed"] for r in results), default=0)
+    if failed:
+        red(f"共 {len(results)} 台，失败 {len(failed)} 台，总耗时 {total_time:.1f}秒")
+    else:
+        green(f"共 {len(results)} 台，全部成功，总耗时 {total_time:.1f}秒")
+
+
+def _provision_from_stdin():
+    """子进程入口 - 从标准输入读取参数并执行安装"""
+    params = json.loads(sys.stdin.read() or "{}")
+    result = provision(params)
+    sys.stdout.flush()
+    print(RESULT_MARKER + json.dumps(result, ensure_ascii=False))
+
+
+def main(argv=None):
+    """批量部署命令行入口"""
+    import argparse
+    from .utils.output import red
+
+    parser = argparse.ArgumentParser(prog="hy2.fleet", description="Hysteria 2 批量部署")
+    parser.add_argument("inventory", nargs="?", help="主机清单 (JSON)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="最大并发数")
+    parser.add_argument("-t", "--timeout", type=int, default=600, help="单台主机超时（秒）")
+    parser.add_argument("--local", metavar="ROOT", help="本地模拟模式，在 ROOT 下为每台主机创建独立目录")
+    parser.add_argument("--log-dir", help="保存每台主机的完整输出")
+    parser.add_argument("-o", "--output", help="将结果写入 JSON 文件")
+    parser.add_argument("--provision", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.provision:
+        _provision_from_stdin()
+        return 0
+
+    if not args.inventory:
+        parser.error("需要指定主机清单")
+
+    try:
+        hosts = load_inventory(args.inventory)
+    except (OSError, ValueError) as e:
+        red(f"读取主机清单失败: {e}")
+        return 1
+
+    executor = LocalExecutor(args.local) if args.local else SSHExecutor()
+    results = run_fleet(hosts, executor, workers=args.workers,
+                        timeout=args.timeout, log_dir=args.log_dir)
+    print_summary(results)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,47 +3,81 @@
 """
 
 import os
-import re
-import random
 import shutil
 import subprocess
 from pathlib import Path
 
 
 def download_hy2():
-    """下载 Hysteria 2 二进制文件"""
-    from ..config import HY2_VERSION, HY2_REPO, BINARY_PATH
-    from ..utils.output import green, yellow, red
-    from ..utils.helpers import get_arch
+    """
+    下载 Hysteria 2 二进制文件
 
-    green(f"正在下载 Hysteria 2 {HY2_VERSION}...")
+    优先使用本地缓存；下载的文件按发布的 SHA-256 列表校验后存入缓存，
+    再通过原子重命名安装到 BINARY_PATH。无法获取校验值时中止，
+    除非设置了 HY2_ALLOW_UNVERIFIED=1 (此时安装但不缓存)。
+    """
+    import sys
+    from .config import (
+        HY2_VERSION, BINARY_PATH, CACHE_DIR, DOWNLOAD_CONNECTIONS, ALLOW_UNVERIFIED_BINARY
+    )
+    from .utils.output import green, yellow, red
+    from .utils.helpers import get_arch
+    from .cache import (
+        asset_name, release_url, fetch_release_hashes, file_sha256,
+        cache_lookup, cache_store, install_atomic, file_lock
+    )
+    from .downloader import download_file, DownloadError
 
     arch = get_arch()
-    url = f"https://github.com/{HY2_REPO}/releases/download/{HY2_VERSION}/hysteria-linux-{arch}"
-
-    yellow(f"  下载地址: {url}")
-    yellow("  开始下载...")
-
-    try:
-        subprocess.run(
-            f"wget --progress=bar:force -O {BINARY_PATH} {url}",
-            shell=True, check=True, timeout=300
-        )
-    except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
-        red("下载失败，请检查网络或稍后重试")
-        import sys
-        sys.exit(1)
+    name = asset_name(arch)
+    staging = CACHE_DIR / "tmp"
+    version_tag = HY2_VERSION.replace("/", "_")
+
+    with file_lock(staging / f"{version_tag}-{name}.lock"):
+        cached = cache_lookup(HY2_VERSION, arch)
+        if cached:
+            install_atomic(cached, BINARY_PATH)
+            green(f"使用缓存的 Hysteria 2 {HY2_VERSION} ({cached.name[:12]})")
+            return
 
-    BINARY_PATH.chmod(0o755)
+        green(f"正在下载 Hysteria 2 {HY2_VERSION}...")
+        url = release_url(HY2_VERSION, name)
+
+        yellow(f"  下载地址: {url}")
+        expected = fetch_release_hashes(HY2_VERSION).get(name)
+        if not expected:
+            if not ALLOW_UNVERIFIED_BINARY:
+                red(f"无法获取 {name} 的发布校验值 (hashes.txt)，已中止安装")
+                red("确认下载来源可信后，可设置 HY2_ALLOW_UNVERIFIED=1 跳过校验")
+                sys.exit(1)
+            yellow("  无法获取发布校验值，按 HY2_ALLOW_UNVERIFIED 跳过校验，不存入缓存")
+        yellow(f"  开始下载 ({DOWNLOAD_CONNECTIONS} 个连接)...")
+
+        tmp_path = staging / f"{version_tag}-{name}"
+        try:
+            download_file(url, tmp_path, connections=DOWNLOAD_CONNECTIONS)
+        except DownloadError as e:
+            red(f"下载失败: {e}")
+            red("请检查网络或稍后重试，已下载的部分会在下次安装时继续")
+            sys.exit(1)
+
+        actual = file_sha256(tmp_path)
+        if expected and actual != expected:
+            tmp_path.unlink(missing_ok=True)
+            red(f"校验失败: 期望 {expected}，实际 {actual}")
+            sys.exit(1)
+
+        if expected:
+            blob = cache_store(tmp_path, HY2_VERSION, arch, actual)
+            install_atomic(blob, BINARY_PATH)
+            green("  SHA-256 校验通过，已缓存")
+        else:
+            install_atomic(tmp_path, BINARY_PATH)
+            tmp_path.unlink(missing_ok=True)
 
-    if BINARY_PATH.exists():
-        size = BINARY_PATH.stat().st_size / 1024
-        green(f"  下载完成! 文件大小: {size:.1f} KB")
-        green("Hysteria 2 下载成功!")
-    else:
-        red("Hysteria 2 下载失败!")
-        import sys
-        sys.exit(1)
+    size = BINARY_PATH.stat().st_size / 1024
+    green(f"  下载完成! 文件大小: {size:.1f} KB")
+    green("Hysteria 2 下载成功!")
 
 
 def collect_config():
@@ -51,36 +85,40 @@ def collect_config():
     收集配置信息
 
     Returns:
-        tuple: (端口, 端口跳跃范围, 用户列表, 伪装站点)
+        tuple: (端口, 端口跳跃范围, 用户列表, 伪装站点, 链路参数)
+        链路参数为 {"up": Mbps, "down": Mbps, "rtt": 毫秒}，未设置带宽时为 None
     """
-    from ..utils.output import yellow, green, red
-    from ..utils.helpers import (
-        is_port_available, generate_password, input_with_default
+    from .utils.output import yellow, green, red
+    from .utils.helpers import (
+        is_port_available, generate_password, input_with_default,
+        get_bound_udp_ports, find_used_ports, random_available_port
     )
-    from ..config import DEFAULT_PROXY_SITE
+    from .config import DEFAULT_PROXY_SITE
 
     print("\n" + "="*50)
     yellow("配置向导")
     print("="*50)
 
-    # 端口
+    # 端口 - 一次读取已占用端口，后续查询都在内存中完成
+    bound = get_bound_udp_ports()
+
     def validate_port(value):
         return value.isdigit() and 1 <= int(value) <= 65535
 
     port = input_with_default(
         "\n端口 [1-65535] (回车随机): ",
-        default=str(random.randint(2000, 65535)),
+        default=str(random_available_port(bound=bound)),
         validator=validate_port,
         error_msg="端口范围: 1-65535"
     )
     port = int(port)
     yellow(f"随机端口: {port}")
 
-    while not is_port_available(port):
+    while not is_port_available(port, bound):
         red(f"端口 {port} 已被占用")
         port = int(input_with_default(
             "\n端口 [1-65535] (回车随机): ",
-            default=str(random.randint(2000, 65535)),
+            default=str(random_available_port(bound=bound)),
             validator=validate_port,
             error_msg="端口范围: 1-65535"
         ))
@@ -91,16 +129,23 @@ def collect_config():
         def validate_hop_port(value):
             return value.isdigit() and 10000 <= int(value) <= 65535
 
-        hop_start = int(input_with_default(
-            "跳跃起始端口 [10000-65535]: ",
-            validator=validate_hop_port,
-            error_msg="端口范围: 10000-65535"
-        ))
-        hop_end = int(input_with_default(
-            "跳跃结束端口 [10000-65535]: ",
-            validator=lambda v: validate_hop_port(v) and int(v) > hop_start,
-            error_msg=f"端口范围: 10000-65535，且大于起始端口({hop_start})"
-        ))
+        while True:
+            hop_start = int(input_with_default(
+                "跳跃起始端口 [10000-65535]: ",
+                validator=validate_hop_port,
+                error_msg="端口范围: 10000-65535"
+            ))
+            hop_end = int(input_with_default(
+                "跳跃结束端口 [10000-65535]: ",
+                validator=lambda v: validate_hop_port(v) and int(v) > hop_start,
+                error_msg=f"端口范围: 10000-65535，且大于起始端口({hop_start})"
+            ))
+            used = find_used_ports(hop_start, hop_end, bound)
+            if not used:
+                break
+            shown = ", ".join(str(p) for p in used[:10]) + (" ..." if len(used) > 10 else "")
+            red(f"端口范围内有 {len(used)} 个端口已被占用: {shown}")
+
         hop_ports = f"{hop_start}:{hop_end}"
         yellow(f"端口跳跃范围: {hop_ports}")
 
@@ -119,17 +164,65 @@ def collect_config():
     # 多用户
     users = [{"password": pwd}]
     if input("\n添加多用户? [y/N]: ").lower() == 'y':
-        while True:
-            user_pwd = input("输入用户密码 (回车跳过): ").strip()
-            if not user_pwd:
-                break
-            users.append({"password": user_pwd})
-            green(f"已添加用户，当前用户数: {len(users)}")
+        users += collect_users()
+
+    # 链路带宽 - 用于计算 QUIC 接收窗口 (带宽时延积) 和带宽提示
+    link = None
+    bandwidth = input_with_default(
+        "\n服务器带宽 Mbps (回车使用 Hysteria 默认窗口): ",
+        default="",
+        validator=lambda v: v.isdigit() and int(v) > 0,
+        error_msg="请输入正整数"
+    )
+    if bandwidth:
+        rtt = input_with_default(
+            "客户端往返延迟 RTT 毫秒 [200]: ",
+            default="200",
+            validator=lambda v: v.isdigit() and int(v) > 0,
+            error_msg="请输入正整数"
+        )
+        link = {"up": int(bandwidth), "down": int(bandwidth), "rtt": int(rtt)}
 
-    return port, hop_ports, users, proxy_site
+    return port, hop_ports, users, proxy_site, link
 
 
-def generate_server_config(cert_path, key_path, port, hop_ports, users, proxy_site):
+def collect_users():
+    """
+    交互式收集额外用户: 从 CSV/JSON 文件导入，或逐个输入
+
+    Returns:
+        list: [{"name", "password", ...}]
+    """
+    from .utils.output import green, red
+    from .utils.helpers import generate_password
+    from .users import read_records, validate_name
+
+    path = input("用户文件 CSV/JSON (表头 name,password,quota,expires，回车逐个输入): ").strip()
+    if path:
+        try:
+            records = read_records(path)
+        except (OSError, ValueError) as e:
+            red(f"无法读取用户文件: {e}")
+        else:
+            green(f"已读取 {len(records)} 个用户")
+            return records
+
+    users = []
+    while True:
+        name = input("用户名 (回车结束): ").strip()
+        if not name:
+            return users
+        try:
+            validate_name(name)
+        except ValueError as e:
+            red(str(e))
+            continue
+        password = input("密码 (回车随机): ").strip() or generate_password(8)
+        users.append({"name": name, "password": password})
+        green(f"已添加用户 {name}，密码: {password}")
+
+
+def generate_server_config(cert_path, key_path, port, hop_ports, users, proxy_site, link=None):
     """
     生成服务端配置
 
@@ -138,61 +231,124 @@ def generate_server_config(cert_path, key_path, port, hop_ports, users, proxy_si
         key_path: 私钥路径
         port: 端口
         hop_ports: 端口跳跃范围
-        users: 用户列表
+        users: 用户列表，多用户时同时写入用户库 (可带 quota / expires)
         proxy_site: 伪装站点
+        link: 链路参数 {"up": Mbps, "down": Mbps, "rtt": 毫秒}
+
+    Returns:
+        ServerConfig: 生成的配置
     """
-    from ..config import CONFIG_DIR
-    from ..utils.output import yellow
-
-    if len(users) == 1:
-        # 单用户
-        config = f"""listen: :{port}
-tls:
-  cert: {cert_path}
-  key: {key_path}
-auth:
-  type: password
-  password: {users[0]['password']}
-"""
+    from .utils.output import yellow
+    from .server_config import ServerConfig, traffic_stats_settings
+    from .users import UserStore, store_path
+
+    if len(users) > 1 or users[0].get("name"):
+        store = UserStore.from_records(users)
+        store.save()
+        users = [{"name": name, "password": pwd}
+                 for name, pwd in store.auth_section()["userpass"].items()]
     else:
-        # 多用户
-        users_str = "\n".join([f"  - \"{u['password']}\"" for u in users])
-        config = f"""listen: :{port}
-tls:
-  cert: {cert_path}
-  key: {key_path}
-auth:
-  type: userpass
-  userpass:
-{users_str}
-"""
+        store_path().unlink(missing_ok=True)
 
-    # 伪装
-    config += f"""masquerade:
-  type: proxy
-  proxy:
-    url: https://{proxy_site}
-    rewriteHost: true
-"""
+    config = ServerConfig.build(cert_path, key_path, port, hop_ports, users, proxy_site, link,
+                                traffic_stats=traffic_stats_settings())
+    path = config.save()
+    yellow(f"服务端配置已生成: {path}")
+    if link:
+        check_link_limits(config)
+    return config
 
-    # 端口跳跃
-    if hop_ports:
-        config += f"""transport:
-  udp:
-    hopInterval: 30s
-hopPorts:
-  - {hop_ports}
-"""
 
-    (CONFIG_DIR / "config.yaml").write_text(config)
-    yellow(f"服务端配置已生成: {CONFIG_DIR}/config.yaml")
+def check_link_limits(config):
+    """
+    检查 QUIC 窗口与内核缓冲区限制，不满足时提示调优
+
+    Args:
+        config: ServerConfig
+
+    Returns:
+        list: 警告信息
+    """
+    from .utils.output import yellow
+    from .system.tuning import check_buffer_limits
+
+    window = config.get(("quic", "maxConnReceiveWindow"))
+    if not isinstance(window, int):
+        return []
+    warnings = check_buffer_limits(window)
+    for warning in warnings:
+        yellow(f"  注意: {warning}")
+    if warnings:
+        yellow("  可运行 python3 -m hy2 tune 调整内核参数")
+    return warnings
+
+
+def refresh_client_config(config, server_ip=None, domain=None):
+    """
+    按当前服务端配置重新生成客户端配置
+
+    SNI 默认沿用现有分享链接中的值。多实例模式下连接实例 0，
+    只包含该实例的端口跳跃段 (见 instances.client_config)。
+
+    Args:
+        config: ServerConfig
+        server_ip: 服务器IP，默认自动获取
+        domain: SNI (如新申请证书的域名)
+
+    Returns:
+        新的分享链接，无法确定 SNI 时返回 None
+    """
+    from .utils.helpers import get_server_ip
+    from .client import generate_client_config, saved_sni, server_certificate
+    from .instances import client_config
+
+    domain = domain or saved_sni()
+    if not domain:
+        return None
+    config = client_config(config)
+    return generate_client_config(
+        server_ip or get_server_ip(), config.port, config.client_auth,
+        domain, config.hop_ports, config.client_link_settings(), server_certificate(config)
+    )
+
+
+def certificate_pin(config):
+    """配置中证书的 SHA256 指纹，未配置或无法读取时返回 None"""
+    from .client import server_certificate
+    return (server_certificate(config) or {}).get("sha256")
+
+
+def refresh_pinned_clients(config, old_pin, server_ip=None, domain=None):
+    """
+    证书更换后重新生成客户端配置
+
+    客户端配置固定了证书指纹 (pinSHA256)，自签证书还带有 insecure，证书更换后
+    不重新生成，客户端会拒绝新证书。新证书写入原路径时配置本身没有变化，
+    因此按指纹而不是按配置差异判断。
+
+    Args:
+        config: 已生效的 ServerConfig
+        old_pin: 更换前的证书指纹 (见 certificate_pin)
+        server_ip: 服务器IP，默认自动获取
+        domain: 新证书的域名，作为 SNI
+
+    Returns:
+        新的分享链接；证书未变化或无法确定 SNI 时返回 None
+    """
+    from .utils.output import yellow
+
+    if certificate_pin(config) == old_pin:
+        return None
+    share_url = refresh_client_config(config, server_ip, domain)
+    yellow("证书已更换，已导出的用户配置需重新导出: python3 -m hy2 export-clients")
+    return share_url
 
 
 def install_binary():
     """仅安装二进制文件和依赖"""
-    from ..system.check import install_dependencies
-    from ..utils.output import print_step, green
-    from ..config import BINARY_PATH
+    from .system.check import install_dependencies
+    from .utils.output import print_step, green
+    from .config import BINARY_PATH
     from . import download_hy2
 
     print_step(1, 2, "安装依赖和下载")
@@ -206,33 +362,38 @@ def install_binary():
 
 def run_config_wizard():
     """运行配置向导"""
-    from ..system.bbr import enable_bbr
-    from ..utils.output import print_step, green, red
-    from ..utils.helpers import get_server_ip
-    from ..config import SERVICE_NAME
+    from .system.bbr import enable_bbr
+    from .utils.output import print_step, green, red
+    from .utils.helpers import get_server_ip
+    from .config import SERVICE_NAME
     from .certificate import handle_certificate
     from .service import create_systemd_service, wait_for_service
-    from .client import generate_client_config
+    from .client import generate_client_config, server_certificate
     from . import collect_config, generate_server_config
-    from ..system.firewall import setup_firewall
-    from ..utils.output import print_result
+    from .system.firewall import setup_firewall
+    from .utils.output import print_result
 
     print_step(2, 2, "配置 Hysteria 2")
 
+    # 公网 IP 在用户填写配置期间后台探测
+    from .utils.publicip import prefetch
+    prefetch()
+
     # 证书
     cert_path, key_path, domain = handle_certificate()
 
     # 配置参数
-    port, hop_ports, users, proxy_site = collect_config()
+    port, hop_ports, users, proxy_site, link = collect_config()
 
     # BBR 加速
     if input("\n启用 BBR 加速? [Y/n]: ").lower() != 'n':
         enable_bbr()
 
     # 生成配置
-    generate_server_config(cert_path, key_path, port, hop_ports, users, proxy_site)
+    config = generate_server_config(cert_path, key_path, port, hop_ports, users, proxy_site, link)
     server_ip = get_server_ip()
-    share_url = generate_client_config(server_ip, port, users[0]['password'], domain, hop_ports)
+    share_url = generate_client_config(server_ip, port, config.client_auth, domain, hop_ports,
+                                       config.client_link_settings(), server_certificate(config))
     green("配置文件已生成")
 
     # 防火墙
@@ -243,25 +404,27 @@ def run_config_wizard():
     create_systemd_service()
 
     print("\n" + "-"*60)
-    from ..utils.output import blue
+    from .utils.output import blue
     blue("启动服务")
     print("-"*60)
     green("正在启用并启动服务...")
     import subprocess
+    from .rollout import reset
+    reset()
     subprocess.run(f"systemctl enable {SERVICE_NAME}", shell=True)
     subprocess.run(f"systemctl restart {SERVICE_NAME}", shell=True)
 
     if wait_for_service():
-        print_result(server_ip, port, users[0]['password'], domain, share_url)
+        print_result(server_ip, port, config.client_auth, domain, share_url)
     else:
         red("服务启动失败，请检查日志: journalctl -u hysteria-server")
 
 
 def install_hy2():
     """完整安装流程"""
-    from ..system.check import check_root, check_system
-    from ..utils.output import print_header, yellow
-    from ..utils.helpers import get_install_status
+    from .system.check import check_root, check_system
+    from .utils.output import print_header, yellow
+    from .utils.helpers import get_install_status
 
     print_header()
 
@@ -288,27 +451,44 @@ def install_hy2():
             yellow("已取消")
 
 
-def uninstall_hy2(skip_confirm=False):
+def uninstall_hy2(skip_confirm=False, purge=None):
     """
     卸载 Hysteria 2
 
     Args:
         skip_confirm: 是否跳过确认
+        purge: 是否删除配置文件，None 时交互询问 (跳过确认时不删除)
     """
-    from ..config import SERVICE_FILE, BINARY_PATH, CONFIG_DIR, CLIENT_DIR, SERVICE_NAME
-    from ..utils.output import green
-    from ..utils.helpers import run_cmd
+    from .config import SERVICE_FILE, BINARY_PATH, CONFIG_DIR, CLIENT_DIR, SERVICE_NAME
+    from .utils.output import green
+    from .utils.helpers import run_cmd
+    from .instances import load_manifest, remove_instance_units
+    from .authd import remove_service as remove_auth_service
+    from .acme import remove_service as remove_acme_service
+    from .rollout import reset as rollout_reset, slot_unit_path as rollout_unit_path
+    from .system.firewall import remove_rules as remove_firewall_rules
 
     if not skip_confirm:
         if input("确认卸载? [y/N]: ").lower() != 'y':
             return
 
+    manifest = load_manifest()
+    if manifest:
+        run_cmd(f"systemctl disable --now {SERVICE_NAME}.target", check=False)
+        remove_instance_units(inst["index"] for inst in manifest["instances"])
     run_cmd(f"systemctl stop {SERVICE_NAME}", check=False)
     run_cmd(f"systemctl disable {SERVICE_NAME}", check=False)
     SERVICE_FILE.unlink(missing_ok=True)
+    remove_auth_service()
+    remove_acme_service()
+    rollout_reset()
+    rollout_unit_path().unlink(missing_ok=True)
+    remove_firewall_rules()
     BINARY_PATH.unlink(missing_ok=True)
 
-    if not skip_confirm and input("删除配置文件? [y/N]: ").lower() == 'y':
+    if purge is None:
+        purge = not skip_confirm and input("删除配置文件? [y/N]: ").lower() == 'y'
+    if purge:
         shutil.rmtree(CONFIG_DIR, ignore_errors=True)
         shutil.rmtree(CLIENT_DIR, ignore_errors=True)
 
@@ -316,14 +496,93 @@ def uninstall_hy2(skip_confirm=False):
     green("已卸载")
 
 
+def apply_config_change(old, new, force_restart=False, raise_errors=False):
+    """
+    写入修改后的配置，仅在必要时重启服务
+
+    平滑重启模式下先用二进制试运行新配置，通过后才写入；之后切换失败时恢复原配置文件。
+    磁盘上的配置因此总是服务实际运行的配置，崩溃重启或重启系统不会加载未生效的配置。
+
+    Args:
+        old: 修改前的 ServerConfig
+        new: 修改后的 ServerConfig
+        force_restart: 配置引用的文件内容有变化 (如证书) 时强制重启
+        raise_errors: 校验或平滑重启失败时抛出 RolloutError，直接重启失败时抛出
+                      ServiceError (默认只显示错误)
+
+    Returns:
+        list: 变更列表 (见 ServerConfig.diff)，未写入时为空
+    """
+    from .config import CONFIG_DIR
+    from .utils.output import green, yellow, red
+    from .utils.helpers import write_atomic
+    from .server_config import needs_restart, format_path
+    from .instances import sync_instance_configs
+    from .rollout import RolloutError, graceful_enabled, check_config, format_report
+
+    changes = old.diff(new)
+    if not changes and not force_restart:
+        yellow("配置未变化，无需重启服务")
+        return changes
+
+    # 切换认证方式等操作可能涉及大量用户，只显示前若干项
+    for path, before, after in changes[:20]:
+        yellow(f"  {format_path(path)}: {before} -> {after}")
+    if len(changes) > 20:
+        yellow(f"  ... 共 {len(changes)} 项修改")
+
+    restart = force_restart or needs_restart(changes)
+    verified = restart and graceful_enabled()
+    if verified:
+        yellow("试运行校验新配置...")
+        try:
+            check_config(new)
+        except RolloutError as e:
+            if raise_errors:
+                raise
+            red(f"新配置未通过校验，未写入，服务继续使用原配置: {e}")
+            return []
+
+    config_file = CONFIG_DIR / "config.yaml"
+    previous = config_file.read_text() if changes else None
+    if changes:
+        new.save()
+        sync_instance_configs(new)
+
+    if restart:
+        from .service import restart_service, ServiceError
+        try:
+            report = restart_service(on_progress=yellow, check=True, verified=verified)
+        except RolloutError as e:
+            if changes:
+                write_atomic(config_file, previous, mode=0o600)
+                sync_instance_configs(old)
+            if raise_errors:
+                raise
+            red(f"平滑重启失败，已恢复原配置，服务继续运行: {e}")
+            return []
+        except ServiceError as e:
+            # 配置已写入，调用方继续更新客户端配置和防火墙
+            if raise_errors:
+                raise
+            red(f"配置已写入，但服务重启失败: {e}")
+            return changes
+        if report:
+            green(format_report(report))
+        green("服务已重启")
+    else:
+        yellow("修改的配置项无需重启服务")
+    return changes
+
+
 def change_config():
     """修改配置"""
-    from ..config import CONFIG_DIR, CLIENT_DIR
-    from ..utils.output import green, yellow, red
-    from ..utils.helpers import backup_config, run_cmd, get_server_ip, is_port_available
-    from ..certificate import handle_certificate
-    from ..client import generate_client_config
-    from ..system.firewall import setup_firewall
+    from .config import CONFIG_DIR
+    from .utils.output import green, yellow, red
+    from .utils.helpers import backup_config, is_port_available, get_bound_udp_ports
+    from .certificate import handle_certificate
+    from .system.firewall import setup_firewall
+    from .server_config import ServerConfig
 
     print("\n" + "="*50)
     green("修改配置")
@@ -340,59 +599,60 @@ def change_config():
         red("配置文件不存在，请先安装 Hysteria 2")
         return
 
-    backup_config()
+    current = ServerConfig.load(config_file)
 
     if choice == "1":
+        bound = get_bound_udp_ports()
         while True:
             port = input(f"\n新端口 [1-65535]: ").strip()
             if port.isdigit() and 1 <= int(port) <= 65535:
                 port = int(port)
-                if is_port_available(port):
+                if port == current.port or is_port_available(port, bound):
                     break
                 red(f"端口 {port} 已被占用")
-        content = config_file.read_text()
-        content = re.sub(r'listen: :\d+', f'listen: :{port}', content)
-        config_file.write_text(content)
-        green(f"端口已修改为: {port}")
-        setup_firewall(port)
-        run_cmd("systemctl restart hysteria-server")
+        backup_config()
+        if apply_config_change(current, current.with_port(port)):
+            green(f"端口已修改为: {port}")
+            setup_firewall(port, current.hop_ports)
 
     elif choice == "2":
-        from ..utils.helpers import generate_password
+        from .utils.helpers import generate_password
         new_pwd = input(f"\n新密码 (回车随机): ").strip() or generate_password(8)
-        content = config_file.read_text()
-        content = re.sub(r'password: \S+', f'password: {new_pwd}', content)
-        config_file.write_text(content)
-        green(f"密码已修改为: {new_pwd}")
-
-        # 更新客户端配置
-        old_url = (CLIENT_DIR / "url.txt").read_text().strip()
-        domain = re.search(r'sni=([^#&]+)', old_url)
-        if domain:
-            domain = domain.group(1)
-            server_ip = get_server_ip()
-            port = re.search(r'listen: :(\d+)', content)
-            port = int(port.group(1)) if port else 443
-            share_url = generate_client_config(server_ip, port, new_pwd, domain)
-            yellow("\n新的分享链接:")
-            print(share_url)
-
-        run_cmd("systemctl restart hysteria-server")
+        backup_config()
+        updated = current.with_password(new_pwd)
+        from .users import update_primary_password
+        # HTTP 认证后端模式下密码只保存在用户库中，配置不变
+        changes = apply_config_change(current, updated)
+        if update_primary_password(updated, new_pwd) or changes:
+            green(f"密码已修改为: {new_pwd}")
+
+            # 更新客户端配置
+            share_url = refresh_client_config(updated)
+            if share_url:
+                yellow("\n新的分享链接:")
+                print(share_url)
 
     elif choice == "3":
+        # 新证书可能写入原路径，先记下原证书的指纹
+        old_pin = certificate_pin(current)
         cert_path, key_path, domain = handle_certificate()
-        content = config_file.read_text()
-        content = re.sub(r'cert: .*', f'cert: {cert_path}', content)
-        content = re.sub(r'key: .*', f'key: {key_path}', content)
-        config_file.write_text(content)
+        backup_config()
+        apply_config_change(current, current.patch({
+            ("tls", "cert"): str(cert_path),
+            ("tls", "key"): str(key_path),
+        }), force_restart=True)
         green("证书已更新")
-        run_cmd("systemctl restart hysteria-server")
+        # 按实际生效的配置判断: 平滑重启失败时已恢复原配置
+        share_url = refresh_pinned_clients(ServerConfig.load(config_file), old_pin, domain=domain)
+        if share_url:
+            yellow("\n新的分享链接:")
+            print(share_url)
 
     elif choice == "4":
         proxy_site = input("\n新伪装站点: ").strip()
         if proxy_site:
-            content = config_file.read_text()
-            content = re.sub(r'url: https://\S+', f'url: https://{proxy_site}', content)
-            config_file.write_text(content)
-            green(f"伪装站点已更新为: {proxy_site}")
-            run_cmd("systemctl restart hysteria-server")
+            backup_config()
+            if apply_config_change(current, current.patch({
+                ("masquerade", "proxy", "url"): f"https://{proxy_site}",
+            })):
+                green(f"伪装站点已更新为: {proxy_site}")
@@ -0,0 +1,461 @@
+"""
+多实例部署 - 将服务端拆分为多个进程，分布到不同 CPU 核心
+
+单个 hysteria 进程在多核机器上会先于网卡达到瓶颈。多实例模式下:
+
+- 每个实例使用独立的监听端口 (主端口起依次分配) 和端口跳跃范围中互不重叠的一段，
+  NAT 只把这一段转发到该实例。客户端配置因此只能包含所连接实例自己的一段
+  (见 client_config)，跳到其他段的包会被转发到另一个进程，连接随之中断；
+- 使用 systemd 模板单元 hysteria-server@.service，实例 N 读取
+  CONFIG_DIR/instances/N.yaml，并通过 drop-in 设置 CPUAffinity 和 GOMAXPROCS；
+- 所有实例 PartOf=hysteria-server.target，启动/停止/重启该 target 即控制整组。
+
+hysteria 本身不设置 SO_REUSEPORT，因此各实例不能共享同一个端口，
+通过端口划分代替内核的 REUSEPORT 分流。
+
+实例清单保存在 CONFIG_DIR/instances.json，主配置 config.yaml 作为所有实例的模板，
+修改主配置后调用 sync_instance_configs 重新生成各实例配置。
+"""
+
+import os
+import json
+
+
+def manifest_path():
+    """实例清单路径"""
+    from .config import CONFIG_DIR
+    return CONFIG_DIR / "instances.json"
+
+
+def instances_dir():
+    """各实例配置目录"""
+    from .config import CONFIG_DIR
+    return CONFIG_DIR / "instances"
+
+
+def template_unit_path():
+    """模板单元 hysteria-server@.service 路径"""
+    from .config import SERVICE_FILE, SERVICE_NAME
+    return SERVICE_FILE.parent / f"{SERVICE_NAME}@.service"
+
+
+def target_unit_path():
+    """实例组 hysteria-server.target 路径"""
+    from .config import SERVICE_FILE, SERVICE_NAME
+    return SERVICE_FILE.parent / f"{SERVICE_NAME}.target"
+
+
+def dropin_dir(index):
+    """实例 drop-in 目录"""
+    from .config import SERVICE_FILE, SERVICE_NAME
+    return SERVICE_FILE.parent / f"{SERVICE_NAME}@{index}.service.d"
+
+
+def is_multi_instance():
+    """是否已部署为多实例模式"""
+    return manifest_path().exists()
+
+
+def load_manifest():
+    """
+    读取实例清单
+
+    Returns:
+        dict 或 None (单实例模式)
+    """
+    path = manifest_path()
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+# ============ 划分 ============
+
+def partition_range(hop_ports, count):
+    """
+    将端口跳跃范围划分为 count 段连续且互不重叠的子范围
+
+    Args:
+        hop_ports: "start:end" (含两端)
+        count: 段数
+
+    Returns:
+        list: ["start:end", ...]，前面的段在不能整除时多分一个端口
+    """
+    start, end = (int(p) for p in str(hop_ports).split(":"))
+    total = end - start + 1
+    if count < 1:
+        raise ValueError("实例数必须大于 0")
+    if total < count:
+        raise ValueError(f"端口跳跃范围 {hop_ports} 只有 {total} 个端口，不足 {count} 个实例")
+
+    size, extra = divmod(total, count)
+    ranges = []
+    for i in range(count):
+        length = size + (1 if i < extra else 0)
+        ranges.append(f"{start}:{start + length - 1}")
+        start += length
+    return ranges
+
+
+def allocate_ports(port, count, hop_ports=None, bound=None):
+    """
+    为各实例分配监听端口: 从主端口起依次选取未占用、且不在跳跃范围内的端口
+
+    Args:
+        port: 主端口 (实例 0)
+        count: 实例数
+        hop_ports: 端口跳跃范围
+        bound: 已占用端口集合，默认读取 /proc
+
+    Returns:
+        list: 端口列表
+    """
+    from .utils.helpers import get_bound_udp_ports
+
+    if bound is None:
+        bound = get_bound_udp_ports()
+    hop = tuple(int(p) for p in hop_ports.split(":")) if hop_ports else None
+
+    ports = [int(port)]
+    candidate = int(port)
+    while len(ports) < count:
+        candidate += 1
+        if candidate > 65535:
+            raise ValueError(f"端口 {port} 之后没有足够的空闲端口")
+        if hop and hop[0] <= candidate <= hop[1]:
+            continue
+        if candidate not in bound:
+            ports.append(candidate)
+    return ports
+
+
+def available_cpus():
+    """当前进程可用的 CPU 编号"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def assign_cpus(count, cpus=None):
+    """
+    将 CPU 平均分配给各实例 (相邻编号分到同一实例)
+
+    实例数多于 CPU 数时循环复用。
+
+    Args:
+        count: 实例数
+        cpus: CPU 编号列表，默认当前进程可用的 CPU
+
+    Returns:
+        list: 每个实例的 CPU 列表
+    """
+    cpus = list(cpus if cpus is not None else available_cpus())
+    if count >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(count)]
+
+    size, extra = divmod(len(cpus), count)
+    groups, pos = [], 0
+    for i in range(count):
+        length = size + (1 if i < extra else 0)
+        groups.append(cpus[pos:pos + length])
+        pos += length
+    return groups
+
+
+def plan_instances(port, hop_ports, count, cpus=None, bound=None):
+    """
+    计算多实例部署方案
+
+    Args:
+        port: 主端口
+        hop_ports: 端口跳跃范围或 None
+        count: 实例数
+        cpus: 可用 CPU 列表
+        bound: 已占用端口集合
+
+    Returns:
+        list: [{"index", "port", "hop_ports", "cpus"}]
+    """
+    hop_ranges = partition_range(hop_ports, count) if hop_ports else [None] * count
+    ports = allocate_ports(port, count, hop_ports, bound)
+    cpu_groups = assign_cpus(count, cpus)
+    return [
+        {"index": i, "port": ports[i], "hop_ports": hop_ranges[i], "cpus": cpu_groups[i]}
+        for i in range(count)
+    ]
+
+
+# ============ 生成文件 ============
+
+def render_template_unit():
+    """模板单元内容"""
+    from .config import BINARY_PATH, SERVICE_NAME
+
+    return f"""[Unit]
+Description=Hysteria 2 Service (instance %i)
+After=network.target
+PartOf={SERVICE_NAME}.target
+
+[Service]
+Type=simple
+Environment=HYSTERIA_LOG_DISABLE_COLOR=true
+ExecStart={BINARY_PATH} server -c {instances_dir()}/%i.yaml
+Restart=always
+RestartSec=3
+
+[Install]
+WantedBy={SERVICE_NAME}.target
+"""
+
+
+def render_target_unit(count):
+    """实例组 target 内容"""
+    wants = " ".join(f"{_instance_unit(i)}" for i in range(count))
+    return f"""[Unit]
+Description=Hysteria 2 Service ({count} instances)
+Wants={wants}
+After=network.target
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+
+def render_dropin(instance):
+    """实例 drop-in: CPU 亲和性与 Go 调度线程数"""
+    cpus = " ".join(str(c) for c in instance["cpus"])
+    return f"""[Service]
+CPUAffinity={cpus}
+Environment=GOMAXPROCS={len(instance["cpus"])}
+"""
+
+
+def _instance_unit(index):
+    from .config import SERVICE_NAME
+    return f"{SERVICE_NAME}@{index}.service"
+
+
+def instance_config(base, instance):
+    """
+    由主配置派生实例配置
+
+    Args:
+        base: 主配置 ServerConfig
+        instance: plan_instances 的一项
+
+    Returns:
+        ServerConfig
+    """
+    config = base.with_port(instance["port"])
+    stats = base.traffic_stats
+    if stats:
+        host, port = stats["listen"].rsplit(":", 1)
+        listen = f"{host}:{int(port) + instance['index']}"
+        config = config.with_traffic_stats({**stats, "listen": listen})
+    if instance["hop_ports"]:
+        return config.patch({("hopPorts",): [instance["hop_ports"]]})
+    return config.patch({("hopPorts",): None, ("transport", "udp", "hopInterval"): None})
+
+
+def sync_instance_configs(base=None):
+    """
+    按主配置重新生成各实例配置
+
+    主端口或端口跳跃范围变化时重新划分端口，并更新 systemd 单元和清单
+    (CPU 分配保持不变)。
+
+    Args:
+        base: 主配置 ServerConfig，默认读取 config.yaml
+
+    Returns:
+        list: 写入的路径，单实例模式返回空列表
+    """
+    from .server_config import ServerConfig
+
+    manifest = load_manifest()
+    if not manifest:
+        return []
+    base = base or ServerConfig.load()
+    plan = manifest["instances"]
+    if (base.port, base.hop_ports) != (manifest["port"], manifest["hop_ports"]):
+        bound = _bound_ports_excluding(plan)
+        cpus = [inst["cpus"] for inst in plan]
+        plan = plan_instances(base.port, base.hop_ports, len(plan), bound=bound)
+        for inst, cpu_group in zip(plan, cpus):
+            inst["cpus"] = cpu_group
+        _write_plan(base, plan)
+    return _write_configs(base, plan)
+
+
+def _bound_ports_excluding(plan):
+    """已占用的 UDP 端口，不含各实例自身监听的端口"""
+    from .utils.helpers import get_bound_udp_ports
+    return get_bound_udp_ports() - {inst["port"] for inst in plan}
+
+
+def _write_configs(base, plan):
+    import shutil
+
+    shutil.rmtree(instances_dir(), ignore_errors=True)
+    return [
+        instance_config(base, inst).save(instances_dir() / f"{inst['index']}.yaml")
+        for inst in plan
+    ]
+
+
+def _write_plan(base, plan):
+    """写入 systemd 单元和实例清单"""
+    from .utils.helpers import run_cmd, write_atomic
+
+    write_instance_units(plan)
+    write_atomic(manifest_path(), json.dumps({
+        "count": len(plan),
+        "port": base.port,
+        "hop_ports": base.hop_ports,
+        "instances": plan,
+    }, indent=2))
+    run_cmd("systemctl daemon-reload", check=False)
+
+
+def write_instance_units(plan):
+    """写入模板单元、target 和各实例的 drop-in"""
+    from .utils.helpers import write_atomic
+
+    write_atomic(template_unit_path(), render_template_unit())
+    write_atomic(target_unit_path(), render_target_unit(len(plan)))
+    for inst in plan:
+        write_atomic(dropin_dir(inst["index"]) / "10-affinity.conf", render_dropin(inst))
+
+
+def remove_instance_units(indexes):
+    """删除模板单元、target 和指定实例的 drop-in"""
+    import shutil
+
+    template_unit_path().unlink(missing_ok=True)
+    target_unit_path().unlink(missing_ok=True)
+    for index in indexes:
+        shutil.rmtree(dropin_dir(index), ignore_errors=True)
+
+
+def deploy_instances(count, cpus=None, base=None):
+    """
+    部署为多实例模式 (count 为 1 时恢复单实例)
+
+    写入实例配置、systemd 单元和清单，停用单实例服务。不启动服务。
+
+    Args:
+        count: 实例数
+        cpus: 可用 CPU 列表，默认当前进程可用的 CPU
+        base: 主配置 ServerConfig，默认读取 config.yaml
+
+    Returns:
+        list: 部署方案 (见 plan_instances)
+    """
+    import shutil
+    from .config import SERVICE_NAME, SERVICE_FILE
+    from .server_config import ServerConfig
+    from .service import create_systemd_service
+    from .utils.helpers import run_cmd
+    from .utils.output import yellow, green
+
+    base = base or ServerConfig.load()
+    old = load_manifest()
+    old_indexes = [inst["index"] for inst in old["instances"]] if old else []
+
+    if count <= 1:
+        if old:
+            run_cmd(f"systemctl disable --now {SERVICE_NAME}.target", check=False)
+            remove_instance_units(old_indexes)
+            shutil.rmtree(instances_dir(), ignore_errors=True)
+            manifest_path().unlink(missing_ok=True)
+            create_systemd_service()
+            green("已恢复单实例模式")
+        return []
+
+    # 当前服务自身占用的端口不算冲突
+    bound = _bound_ports_excluding(old["instances"] if old else [{"port": base.port}])
+    plan = plan_instances(base.port, base.hop_ports, count, cpus, bound)
+
+    run_cmd(f"systemctl disable --now {SERVICE_NAME}", check=False)
+    SERVICE_FILE.unlink(missing_ok=True)
+
+    remove_instance_units(i for i in old_indexes if i >= count)
+    _write_plan(base, plan)
+    _write_configs(base, plan)
+    run_cmd(f"systemctl enable {SERVICE_NAME}.target", check=False)
+
+    for inst in plan:
+        yellow(f"  实例 {inst['index']}: 端口 {inst['port']}"
+               f"{'，跳跃 ' + inst['hop_ports'] if inst['hop_ports'] else ''}"
+               f"，CPU {','.join(str(c) for c in inst['cpus'])}")
+    green(f"已生成 {count} 个实例的 systemd 单元")
+    return plan
+
+
+def client_config(base, index=0, plan=None):
+    """
+    生成客户端配置所用的服务端配置
+
+    多实例模式下为指定实例的配置 (该实例的端口和端口跳跃段)，单实例模式为主配置本身。
+
+    Args:
+        base: 主配置 ServerConfig
+        index: 实例序号
+        plan: 部署方案，默认读取清单
+
+    Returns:
+        ServerConfig
+    """
+    if plan is None:
+        plan = (load_manifest() or {}).get("instances", [])
+    if not plan:
+        return base
+    return instance_config(base, plan[index])
+
+
+def instance_profiles(base, server_ip, sni, plan=None):
+    """
+    每个实例的客户端参数
+
+    Args:
+        base: 主配置 ServerConfig
+        server_ip: 写入客户端配置的服务器地址
+        sni: 域名/SNI
+        plan: 部署方案，默认读取清单
+
+    Returns:
+        list: 每个实例一个 ClientProfile，单实例模式只有主配置的一个
+    """
+    from .client import ClientProfile
+
+    if plan is None:
+        plan = (load_manifest() or {}).get("instances", [])
+    configs = [instance_config(base, inst) for inst in plan] or [base]
+    return [ClientProfile.from_config(config, server_ip, sni) for config in configs]
+
+
+def instance_share_urls(base, server_ip, auth, sni, plan=None):
+    """
+    每个实例的分享链接 (各自的端口和端口跳跃段)
+
+    Args:
+        base: 主配置 ServerConfig
+        server_ip: 服务器IP
+        auth: 客户端认证信息
+        sni: 域名/SNI
+        plan: 部署方案，默认读取清单
+
+    Returns:
+        dict: {"HY2-<index>": 分享链接}，单实例模式为空
+    """
+    if plan is None:
+        plan = (load_manifest() or {}).get("instances", [])
+    if not plan:
+        return {}
+    profiles = instance_profiles(base, server_ip, sni, plan)
+    return {
+        f"HY2-{inst['index']}": profile.share_url(auth, f"HY2-{inst['index']}")
+        for inst, profile in zip(plan, profiles)
+    }
@@ -0,0 +1,543 @@
+"""
+日志分析 - 流式解析 Hysteria 服务端日志并维护滚动统计
+
+数据流:
+
+    journal_records / file_records   读取 (时间戳, 日志行)，可持续跟随
+        -> parse_events               解析为 LogEvent (生成器)
+        -> LogFilter                  按级别/事件/IP/用户/正则过滤
+        -> LogStats                   滚动计数，占用内存有上限
+
+Hysteria 默认输出 zap console 格式，每行为制表符分隔的
+"时间  级别  消息  {JSON 字段}"，也支持 json 格式 (HYSTERIA_LOG_FORMAT=json)。
+console 格式默认给级别加 ANSI 颜色，生成的单元设置了 HYSTERIA_LOG_DISABLE_COLOR，
+其他方式运行的服务端的彩色日志在解析时去掉颜色。
+journal 来源使用 journalctl -o json，文件来源既可以是原始日志，
+也可以是 journalctl -o json 导出的文件 (支持 .gz)。
+"""
+
+import re
+import json
+import heapq
+from collections import namedtuple, deque
+
+# 级别从低到高
+LEVELS = ("DEBUG", "INFO", "WARN", "ERROR", "DPANIC", "PANIC", "FATAL")
+_LEVEL_RANK = {name: i for i, name in enumerate(LEVELS)}
+
+# 消息 -> 事件类型
+_EVENT_MESSAGES = {
+    "client connected": "connect",
+    "client disconnected": "disconnect",
+    "TCP request": "tcp_request",
+    "UDP request": "udp_request",
+    "TCP error": "tcp_error",
+    "UDP error": "udp_error",
+}
+EVENT_TYPES = tuple(_EVENT_MESSAGES.values()) + ("auth_failure", "error", "other")
+
+# 计入错误率的事件
+ERROR_EVENTS = frozenset(("tcp_error", "udp_error", "error"))
+
+_SGR_RE = re.compile(r"\x1b\[[0-9;]*m")
+_AUTH_FAILURE_RE = re.compile(r"auth\w*\s+(fail|invalid|reject|denied)", re.IGNORECASE)
+_VARIABLE_RE = re.compile(r"\[[0-9a-fA-F:.]+\](:\d+)?|\b\d(?:[\w.:-]*\w)?")
+
+LogEvent = namedtuple("LogEvent", "time level message fields kind")
+
+
+# ============ 来源 ============
+
+def journal_records(unit, follow=False, lines=None, since=None, cursor_file=None):
+    """
+    从 journalctl -o json 逐条读取日志
+
+    Args:
+        unit: systemd 单元 (可含通配符)
+        follow: 是否持续跟随
+        lines: 只读取最近的行数
+        since: journalctl --since 参数
+        cursor_file: 游标文件，只读取上次之后的新日志并更新游标
+
+    Yields:
+        tuple: (时间戳秒, 日志行)
+    """
+    import subprocess
+
+    cmd = ["journalctl", "-u", unit, "-o", "json", "--no-pager"]
+    if follow:
+        cmd.append("-f")
+    if lines is not None:
+        cmd += ["-n", str(lines)]
+    if since:
+        cmd += ["--since", since]
+    if cursor_file:
+        cmd.append(f"--cursor-file={cursor_file}")
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            text=True, encoding="utf-8", errors="replace")
+    try:
+        for line in proc.stdout:
+            record = _journal_record(line)
+            if record:
+                yield record
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+        proc.wait()
+
+
+def _journal_record(line):
+    """解析 journalctl -o json 的一行，返回 (时间戳秒, 消息)"""
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    message = entry.get("MESSAGE")
+    if isinstance(message, list):
+        # 非 UTF-8 内容以字节数组形式输出
+        message = bytes(message).decode("utf-8", "replace")
+    if not isinstance(message, str):
+        return None
+    timestamp = entry.get("__REALTIME_TIMESTAMP")
+    return (int(timestamp) / 1_000_000 if timestamp else None), message
+
+
+def file_records(path, follow=False, poll_interval=0.5):
+    """
+    从文件逐行读取日志，自动识别 journalctl -o json 导出格式
+
+    Args:
+        path: 文件路径，.gz 结尾按 gzip 读取
+        follow: 读到末尾后继续等待新内容 (类似 tail -f)
+        poll_interval: 跟随时的轮询间隔（秒）
+
+    Yields:
+        tuple: (时间戳秒或 None, 日志行)
+    """
+    import time
+
+    if str(path).endswith(".gz"):
+        import gzip
+        f = gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    else:
+        f = open(path, encoding="utf-8", errors="replace")
+    with f:
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    return
+                time.sleep(poll_interval)
+                continue
+            if line.startswith("{") and '"MESSAGE"' in line:
+                record = _journal_record(line)
+                if record:
+                    yield record
+            else:
+                yield None, line.rstrip("\n")
+
+
+# ============ 解析 ============
+
+def _parse_time(text, _cache={}):
+    """
+    解析 ISO 8601 时间，如 2024-05-01T12:00:00.123+0800
+
+    去掉小数部分后按字符串缓存，同一秒内的行只调用一次 strptime。
+    """
+    from datetime import datetime
+
+    rest = text[19:]
+    zone = rest.lstrip(".0123456789")
+    digits = rest[:len(rest) - len(zone)]
+    fraction = float(digits) if len(digits) > 1 else 0.0
+    key = text[:19] + zone
+    base = _cache.get(key)
+    if base is None:
+        try:
+            if len(key) > 19:
+                base = datetime.strptime(key, "%Y-%m-%dT%H:%M:%S%z").timestamp()
+            else:
+                base = datetime.strptime(key, "%Y-%m-%dT%H:%M:%S").timestamp()
+        except ValueError:
+            return None
+        if len(_cache) > 4096:
+            _cache.clear()
+        _cache[key] = base
+    return base + fraction
+
+
+def classify(level, message):
+    """
+    判断事件类型
+
+    Returns:
+        str: EVENT_TYPES 之一
+    """
+    kind = _EVENT_MESSAGES.get(message)
+    if kind:
+        return kind
+    if _AUTH_FAILURE_RE.search(message):
+        return "auth_failure"
+    if _LEVEL_RANK.get(level, 0) >= _LEVEL_RANK["ERROR"]:
+        return "error"
+    return "other"
+
+
+def parse_line(text, timestamp=None):
+    """
+    解析一行 Hysteria 日志
+
+    Args:
+        text: 日志行 (console 或 json 格式)
+        timestamp: 来源提供的时间戳 (journal)，优先于行内时间
+
+    Returns:
+        LogEvent；无法识别格式的行作为级别为空的 other 事件返回
+    """
+    text = text.rstrip("\r\n")
+    if text.startswith("{"):
+        try:
+            fields = json.loads(text)
+        except ValueError:
+            fields = None
+        if isinstance(fields, dict):
+            level = str(fields.pop("level", "")).upper()
+            message = str(fields.pop("msg", ""))
+            ts = fields.pop("ts", None)
+            if timestamp is None and isinstance(ts, (int, float)):
+                timestamp = float(ts)
+            elif timestamp is None and isinstance(ts, str):
+                timestamp = _parse_time(ts)
+            return LogEvent(timestamp, level, message, fields, classify(level, message))
+
+    if "\x1b" in text:
+        text = _SGR_RE.sub("", text)
+    parts = text.split("\t", 3)
+    if len(parts) < 3 or parts[1] not in _LEVEL_RANK:
+        return LogEvent(timestamp, "", text, {}, classify("", text))
+    level, message = parts[1], parts[2]
+    fields = {}
+    if len(parts) == 4:
+        try:
+            fields = json.loads(parts[3])
+        except ValueError:
+            fields = {"extra": parts[3]}
+    if timestamp is None:
+        timestamp = _parse_time(parts[0])
+    return LogEvent(timestamp, level, message, fields, classify(level, message))
+
+
+def parse_events(records):
+    """
+    将 (时间戳, 日志行) 流解析为 LogEvent 流
+
+    Args:
+        records: journal_records / file_records 等产生的可迭代对象
+
+    Yields:
+        LogEvent
+    """
+    for timestamp, text in records:
+        if text:
+            yield parse_line(text, timestamp)
+
+
+def client_ip(event):
+    """事件中的客户端 IP (addr 字段去掉端口)，没有时返回 None"""
+    addr = event.fields.get("addr")
+    if not isinstance(addr, str) or not addr:
+        return None
+    if addr.startswith("["):
+        return addr[1:addr.find("]")]
+    host, sep, port = addr.rpartition(":")
+    return host if sep and port.isdigit() and ":" not in host else addr
+
+
+def error_type(event):
+    """
+    错误归类: 去掉地址、端口和数字后的错误信息
+
+    例如 "dial tcp 1.2.3.4:443: i/o timeout" 归为 "dial tcp N: i/o timeout"。
+    """
+    text = event.fields.get("error") or event.message
+    return _VARIABLE_RE.sub("N", str(text))[:100]
+
+
+# ============ 统计 ============
+
+class BoundedCounter:
+    """
+    近似计数，只保留计数最高的若干个键
+
+    键数超过 capacity 的两倍时裁剪为 capacity 个，低频键会被丢弃，
+    内存占用与输入规模无关。
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.pruned = False
+
+    def add(self, key, n=1):
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + n
+        if len(counts) > self.capacity * 2:
+            self.counts = dict(heapq.nlargest(self.capacity, counts.items(), key=lambda kv: kv[1]))
+            self.pruned = True
+
+    def top(self, n):
+        """计数最高的 n 个 [(键, 计数)]"""
+        return heapq.nlargest(n, self.counts.items(), key=lambda kv: kv[1])
+
+
+class RollingCounter:
+    """按秒分桶的滑动窗口计数，桶数固定"""
+
+    def __init__(self, seconds):
+        self.size = seconds
+        self.stamps = [None] * seconds
+        self.counts = [0] * seconds
+
+    def add(self, timestamp, n=1):
+        second = int(timestamp)
+        index = second % self.size
+        if self.stamps[index] != second:
+            self.stamps[index] = second
+            self.counts[index] = 0
+        self.counts[index] += n
+
+    def total(self, start, end):
+        """[start, end] 秒范围内的计数 (只能查询最近 size 秒)"""
+        start, end = int(start), int(end)
+        return sum(c for s, c in zip(self.stamps, self.counts)
+                   if s is not None and start <= s <= end)
+
+
+class LogStats:
+    """
+    日志滚动统计
+
+    速率和趋势按日志自身的时间计算 (最后一条事件的时间为“现在”)，
+    因此回放历史日志与实时跟随得到的结果一致。
+    """
+
+    def __init__(self, window=60, capacity=1000):
+        """
+        Args:
+            window: 速率统计窗口（秒）
+            capacity: 每个排行榜保留的键数量
+        """
+        self.window = window
+        self.events = 0
+        self.levels = {}
+        self.kinds = {}
+        self.first = None
+        self.last = None
+        self.client_ips = BoundedCounter(capacity)
+        self.auth_failure_ips = BoundedCounter(capacity)
+        self.error_types = BoundedCounter(capacity)
+        self.users = BoundedCounter(capacity)
+        # 保留两个窗口，用于比较错误率趋势
+        self.rates = {name: RollingCounter(window * 2) for name in ("connect", "auth_failure", "error")}
+
+    def add(self, event):
+        self.events += 1
+        self.levels[event.level] = self.levels.get(event.level, 0) + 1
+        kind = event.kind
+        self.kinds[kind] = self.kinds.get(kind, 0) + 1
+
+        timestamp = event.time
+        if timestamp is not None:
+            if self.first is None:
+                self.first = timestamp
+            if self.last is None or timestamp > self.last:
+                self.last = timestamp
+
+        rate_key = "error" if kind in ERROR_EVENTS else kind
+        if timestamp is not None and rate_key in self.rates:
+            self.rates[rate_key].add(timestamp)
+
+        if kind == "connect":
+            ip = client_ip(event)
+            if ip:
+                self.client_ips.add(ip)
+            user = event.fields.get("id")
+            if user:
+                self.users.add(str(user))
+        elif kind == "auth_failure":
+            ip = client_ip(event)
+            if ip:
+                self.auth_failure_ips.add(ip)
+        elif kind in ERROR_EVENTS or (kind == "disconnect" and event.fields.get("error")):
+            self.error_types.add(error_type(event))
+
+    def rate(self, name, offset=0):
+        """最近一个窗口 (offset=1 为上一个窗口) 内每分钟的事件数"""
+        if self.last is None:
+            return 0.0
+        end = int(self.last) - offset * self.window
+        count = self.rates[name].total(end - self.window + 1, end)
+        return round(count * 60 / self.window, 2)
+
+    def summary(self, top=10):
+        """
+        统计摘要
+
+        Args:
+            top: 每个排行榜显示的数量
+
+        Returns:
+            dict
+        """
+        error_now, error_before = self.rate("error"), self.rate("error", offset=1)
+        if error_now > error_before * 1.5 and error_now * self.window / 60 >= 5:
+            trend = "rising"
+        elif error_now < error_before / 1.5:
+            trend = "falling"
+        else:
+            trend = "steady"
+        return {
+            "events": self.events,
+            "first": self.first,
+            "last": self.last,
+            "levels": dict(self.levels),
+            "kinds": dict(self.kinds),
+            "window_seconds": self.window,
+            "per_minute": {
+                "connect": self.rate("connect"),
+                "auth_failure": self.rate("auth_failure"),
+                "error": error_now,
+                "error_previous": error_before,
+            },
+            "error_trend": trend,
+            "top_client_ips": self.client_ips.top(top),
+            "top_users": self.users.top(top),
+            "top_auth_failure_ips": self.auth_failure_ips.top(top),
+            "top_errors": self.error_types.top(top),
+            "approximate": any(c.pruned for c in (
+                self.client_ips, self.auth_failure_ips, self.error_types, self.users)),
+        }
+
+
+# ============ 过滤与输出 ============
+
+class LogFilter:
+    """日志事件过滤条件，所有条件同时满足才匹配"""
+
+    def __init__(self, level=None, kinds=None, ip=None, user=None, pattern=None):
+        """
+        Args:
+            level: 最低级别 (debug/info/warn/error)
+            kinds: 事件类型集合
+            ip: 客户端 IP
+            user: 用户名 (id 字段)
+            pattern: 正则表达式，匹配消息或字段
+        """
+        self.min_rank = _LEVEL_RANK[level.upper()] if level else None
+        self.kinds = set(kinds) if kinds else None
+        self.ip = ip
+        self.user = user
+        self.pattern = re.compile(pattern) if pattern else None
+
+    @property
+    def active(self):
+        return any(v is not None for v in (self.min_rank, self.kinds, self.ip, self.user, self.pattern))
+
+    def __call__(self, event):
+        if self.min_rank is not None and _LEVEL_RANK.get(event.level, -1) < self.min_rank:
+            return False
+        if self.kinds is not None and event.kind not in self.kinds:
+            return False
+        if self.ip is not None and client_ip(event) != self.ip:
+            return False
+        if self.user is not None and str(event.fields.get("id")) != self.user:
+            return False
+        if self.pattern is not None and not (
+                self.pattern.search(event.message)
+                or any(self.pattern.search(str(v)) for v in event.fields.values())):
+            return False
+        return True
+
+
+def format_event(event, color=False):
+    """
+    格式化为单行文本
+
+    Args:
+        event: LogEvent
+        color: 是否按级别着色
+    """
+    import time
+    from .utils.output import Colors
+
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event.time)) if event.time else "-"
+    fields = " ".join(f"{k}={v}" for k, v in event.fields.items())
+    line = f"{stamp} {event.level or '-':5} {event.message}" + (f"  {fields}" if fields else "")
+    if color:
+        rank = _LEVEL_RANK.get(event.level, 1)
+        if rank >= _LEVEL_RANK["ERROR"]:
+            return f"{Colors.RED}{line}{Colors.PLAIN}"
+        if rank == _LEVEL_RANK["WARN"]:
+            return f"{Colors.YELLOW}{line}{Colors.PLAIN}"
+    return line
+
+
+def analyze(events, stats=None, matcher=None, on_match=None, keep=None):
+    """
+    消费事件流: 匹配的事件计入统计并回调
+
+    Args:
+        events: LogEvent 可迭代对象
+        stats: LogStats，None 表示不统计
+        matcher: LogFilter 或任意可调用对象，None 表示全部匹配
+        on_match: 匹配时的回调
+        keep: 保留最后 N 条匹配的事件 (有界)
+
+    Returns:
+        tuple: (匹配数, 保留的事件列表)
+    """
+    matched = 0
+    kept = deque(maxlen=keep) if keep else None
+    for event in events:
+        if matcher is not None and not matcher(event):
+            continue
+        matched += 1
+        if stats is not None:
+            stats.add(event)
+        if on_match is not None:
+            on_match(event)
+        if kept is not None:
+            kept.append(event)
+    return matched, list(kept or ())
+
+
+def print_summary(summary):
+    """显示统计摘要"""
+    import time
+    from .utils.output import green, yellow, red, blue
+
+    def stamp(value):
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(value)) if value else "-"
+
+    green(f"事件数: {summary['events']}  时间范围: {stamp(summary['first'])} ~ {stamp(summary['last'])}")
+    kinds = ", ".join(f"{k}={v}" for k, v in sorted(summary["kinds"].items(), key=lambda kv: -kv[1]))
+    print(f"事件类型: {kinds or '-'}")
+    rates = summary["per_minute"]
+    print(f"最近 {summary['window_seconds']} 秒 (每分钟): 连接 {rates['connect']}  "
+          f"认证失败 {rates['auth_failure']}  错误 {rates['error']} (上一窗口 {rates['error_previous']})")
+    trend = summary["error_trend"]
+    if trend == "rising":
+        red("错误率上升")
+    else:
+        yellow(f"错误趋势: {'下降' if trend == 'falling' else '平稳'}")
+
+    for title, key in (("客户端 IP", "top_client_ips"), ("用户", "top_users"),
+                       ("认证失败 IP", "top_auth_failure_ips"), ("错误类型", "top_errors")):
+        if summary[key]:
+            blue(f"{title}:")
+            for name, count in summary[key]:
+                print(f"  {count:>8}  {name}")
+    if summary["approximate"]:
+        yellow("注意: 不同键过多，排行榜为近似值")
@@ -0,0 +1,244 @@
+"""
+服务就绪探测 - 启动或重启后等待服务真正可用，就绪即返回
+
+每个单元的就绪条件:
+    1. systemd 报告 ActiveState=active，且有 MainPID
+    2. 主进程持有监听端口的 UDP 套接字 (/proc/<pid>/net/udp、udp6 与 /proc/<pid>/fd 对照)
+    3. 该端口回复 QUIC 版本协商 (rollout.quic_probe)
+    4. 之后 SERVICE_READY_SETTLE 秒内主进程和 NRestarts 不变
+
+等待期间 NRestarts 增加、MainPID 更换、单元进入 failed / auto-restart，
+都说明进程在崩溃重启，立即判定失败，不必等到超时。
+
+标准库没有 D-Bus 客户端，而且 systemd 只在有客户端订阅时才发送 PropertiesChanged 信号，
+因此状态跟踪采用 /proc 轮询: 每 POLL_INTERVAL 秒读取 /proc (不启动子进程)，
+主进程消失或每隔 SHOW_INTERVAL 秒才调用一次 systemctl show。
+
+与 systemd 的交互集中在 Systemd.show 中，测试时可传入实现同样方法的假对象，
+并用 proc_root 指向伪造的 /proc 目录。
+"""
+
+import os
+import time
+from pathlib import Path
+
+# /proc 检查间隔（秒）
+POLL_INTERVAL = 0.02
+
+# systemctl show 的最长间隔（秒）
+SHOW_INTERVAL = 0.25
+
+PROPERTIES = ("ActiveState", "SubState", "Result", "MainPID", "NRestarts")
+
+
+class Systemd:
+    """systemctl 查询"""
+
+    def show(self, unit):
+        """
+        读取单元属性
+
+        Returns:
+            dict: PROPERTIES 中各属性的字符串值，查询失败时为空 dict
+        """
+        from .utils.helpers import run_cmd
+
+        options = " ".join(f"-p {name}" for name in PROPERTIES)
+        output = run_cmd(f"systemctl show {unit} {options}", capture=True, check=False) or ""
+        props = {}
+        for line in output.splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                props[key] = value
+        return props
+
+
+# ============ /proc ============
+
+def udp_inodes(pid, port, proc_root="/proc"):
+    """
+    进程所在网络命名空间中绑定在 port 上的 UDP 套接字
+
+    Returns:
+        set: 套接字 inode (字符串)
+    """
+    inodes = set()
+    for name in ("udp", "udp6"):
+        try:
+            lines = (Path(proc_root) / str(pid) / "net" / name).read_text().splitlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            # sl local_address rem_address st tx:rx tr:when retrnsmt uid timeout inode ...
+            fields = line.split()
+            if len(fields) > 9 and int(fields[1].rsplit(":", 1)[1], 16) == port:
+                inodes.add(fields[9])
+    return inodes
+
+
+def process_sockets(pid, proc_root="/proc"):
+    """
+    进程打开的套接字
+
+    Returns:
+        set: 套接字 inode (字符串)
+    """
+    fd_dir = Path(proc_root) / str(pid) / "fd"
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return set()
+    sockets = set()
+    for fd in fds:
+        try:
+            target = os.readlink(fd_dir / fd)
+        except OSError:
+            continue
+        if target.startswith("socket:["):
+            sockets.add(target[8:-1])
+    return sockets
+
+
+def udp_bound(pid, port, proc_root="/proc"):
+    """主进程是否已绑定 UDP 端口"""
+    inodes = udp_inodes(pid, port, proc_root)
+    return bool(inodes) and bool(inodes & process_sockets(pid, proc_root))
+
+
+# ============ 等待 ============
+
+def service_targets():
+    """
+    当前部署需要等待的单元
+
+    Returns:
+        list: [{"unit", "port", "host"}]，host 为 QUIC 探测地址
+    """
+    from .config import SERVICE_NAME
+    from .server_config import ServerConfig
+    from .instances import load_manifest
+    from .rollout import active_slot, slot_unit, slot_config_path, probe_address
+
+    manifest = load_manifest()
+    if manifest:
+        host = probe_address(ServerConfig.load(slot_config_path("a")))[0]
+        return [{"unit": f"{SERVICE_NAME}@{inst['index']}.service", "port": inst["port"], "host": host}
+                for inst in manifest["instances"]]
+    slot = active_slot()
+    host, port = probe_address(ServerConfig.load(slot_config_path(slot)))
+    return [{"unit": slot_unit(slot), "port": port, "host": host}]
+
+
+class _Watch:
+    """一个单元的等待状态"""
+
+    def __init__(self, target):
+        self.unit = target["unit"]
+        self.port = target["port"]
+        self.host = target.get("host")
+        self.props = {}
+        self.pid = 0
+        self.baseline = None
+        self.restarts = 0
+        self.shown_at = None
+        self.bound_at = None
+        self.ready = False
+        self.reason = None
+
+    def update(self, props, now):
+        """
+        根据 systemctl show 的结果更新状态
+
+        Returns:
+            str: 失败原因，仍可能就绪时返回 None
+        """
+        self.props, self.shown_at = props, now
+        state, sub = props.get("ActiveState", ""), props.get("SubState", "")
+        restarts = int(props.get("NRestarts") or 0)
+        pid = int(props.get("MainPID") or 0)
+        if self.baseline is None:
+            self.baseline = restarts
+        self.restarts = restarts - self.baseline
+        if self.restarts > 0:
+            return f"启动过程中被 systemd 自动重启 {self.restarts} 次 (进程崩溃循环)"
+        if state == "failed":
+            return f"单元进入 failed 状态 ({props.get('Result') or '未知原因'})"
+        if sub == "auto-restart":
+            return "进程已退出，systemd 正在等待自动重启"
+        if state == "inactive":
+            return "单元未运行"
+        if self.pid and pid != self.pid:
+            return f"主进程已更换 ({self.pid} -> {pid or '无'})"
+        self.pid = pid
+        return None
+
+    def summary(self):
+        return {"unit": self.unit, "port": self.port, "pid": self.pid or None,
+                "state": self.props.get("ActiveState"), "restarts": self.restarts,
+                "ready": self.ready, "reason": self.reason}
+
+
+def wait_ready(targets, timeout=None, settle=None, systemd=None, proc_root="/proc", probe=True):
+    """
+    等待单元就绪，全部就绪或任一单元失败时立即返回
+
+    Args:
+        targets: [{"unit", "port", "host"}]，默认 service_targets()
+        timeout: 超时（秒），默认 SERVICE_READY_TIMEOUT
+        settle: 端口就绪后确认进程稳定的时间（秒），默认 SERVICE_READY_SETTLE
+        systemd: 提供 show(unit) 的对象，默认 Systemd()
+        proc_root: /proc 路径
+        probe: 是否用 QUIC 版本协商确认监听 (host 为空时跳过)
+
+    Returns:
+        dict: {"ready", "seconds", "reason", "units": [各单元状态]}
+    """
+    from .config import SERVICE_READY_TIMEOUT, SERVICE_READY_SETTLE
+    from .rollout import quic_probe
+
+    watches = [_Watch(t) for t in (service_targets() if targets is None else targets)]
+    timeout = SERVICE_READY_TIMEOUT if timeout is None else timeout
+    settle = SERVICE_READY_SETTLE if settle is None else settle
+    systemd = systemd or Systemd()
+    start = time.monotonic()
+    deadline = start + timeout
+    failure = None
+
+    while failure is None:
+        now = time.monotonic()
+        for w in watches:
+            if w.ready:
+                continue
+            gone = w.pid and not (Path(proc_root) / str(w.pid)).exists()
+            if w.shown_at is None or gone or now - w.shown_at >= SHOW_INTERVAL:
+                w.reason = w.update(systemd.show(w.unit), now)
+                if w.reason:
+                    failure = w
+                    break
+            if w.props.get("ActiveState") != "active" or not w.pid:
+                continue
+            if w.bound_at is None:
+                if not udp_bound(w.pid, w.port, proc_root):
+                    continue
+                if probe and w.host and not quic_probe(w.host, w.port):
+                    continue
+                w.bound_at = now
+            # 稳定时间结束后再确认一次 systemd 状态
+            if now - w.bound_at >= settle and w.shown_at > w.bound_at + settle:
+                w.ready = True
+        if failure is not None or all(w.ready for w in watches):
+            break
+        if now >= deadline:
+            failure = next(w for w in watches if not w.ready)
+            state = failure.props.get("ActiveState") or "未知"
+            listening = "已监听" if failure.bound_at is not None else "未监听"
+            failure.reason = f"{timeout} 秒内未就绪 (状态 {state}，端口 {failure.port} {listening})"
+            break
+        time.sleep(POLL_INTERVAL)
+
+    return {
+        "ready": failure is None,
+        "seconds": round(time.monotonic() - start, 3),
+        "reason": f"{failure.unit}: {failure.reason}" if failure else None,
+        "units": [w.summary() for w in watches],
+    }
@@ -0,0 +1,470 @@
+"""
+平滑重启 - 配置变更时不中断已有 QUIC 会话
+
+Hysteria 监听 UDP 时不设置 SO_REUSEPORT，两个进程不能同时绑定同一端口，
+因此使用两个槽位交替运行:
+
+    槽位 a: hysteria-server    监听主端口 P，使用 config.yaml
+    槽位 b: hysteria-server-b  监听备用端口 Q，使用 config-b.yaml；
+            nat PREROUTING 中的一条 REDIRECT 规则把发往 P 的新流量转到 Q
+
+切换流程:
+    1. 用二进制在回环地址上试运行新配置，确认能启动并响应 QUIC
+    2. 启动另一个槽位，等待就绪 (readiness: 进程绑定端口并回复 QUIC 版本协商)
+    3. 添加或删除 REDIRECT 规则，端口跳跃范围的 NAT 规则也转到新槽位的端口。
+       NAT 只作用于新建的 conntrack 条目，已有会话继续发往旧进程，新连接进入新进程
+    4. 排空: 旧进程在线连接数降为 0 (需开启 trafficStats) 或排空窗口结束后停止
+
+任何一步失败都会停止新进程并保留旧进程，服务不中断。
+槽位 b 不开机自启，REDIRECT 规则也不持久化，重启系统后自动回到槽位 a。
+"""
+
+import os
+import json
+import time
+import socket
+import subprocess
+from pathlib import Path
+
+# 槽位 b 的 trafficStats 监听端口相对主配置的偏移 (两个槽位同时运行时不能冲突)
+STATS_PORT_OFFSET = 100
+
+# QUIC 客户端 Initial 包的最小长度，服务端只对不小于该长度的未知版本包回复版本协商
+_QUIC_MIN_PACKET = 1200
+
+
+class RolloutError(Exception):
+    """平滑重启失败 (旧进程保持运行)"""
+
+
+# ============ 设置与槽位 ============
+
+def settings_path():
+    """重启方式设置文件"""
+    from .config import CONFIG_DIR
+    return CONFIG_DIR / "rollout.json"
+
+
+def load_settings():
+    """
+    重启方式设置
+
+    Returns:
+        dict: {"mode": "restart" | "graceful", "drain": 排空窗口秒数}
+    """
+    from .config import ROLLOUT_DRAIN
+
+    settings = {"mode": "restart", "drain": ROLLOUT_DRAIN}
+    try:
+        settings.update(json.loads(settings_path().read_text()))
+    except (OSError, ValueError):
+        pass
+    return settings
+
+
+def graceful_enabled():
+    """配置变更后是否平滑重启 (单实例且重启方式为 graceful)"""
+    from .instances import is_multi_instance
+
+    return not is_multi_instance() and load_settings()["mode"] == "graceful"
+
+
+def save_settings(mode=None, drain=None, **state):
+    """
+    修改重启方式或排空窗口，返回新的设置
+
+    其余关键字参数为切换状态 (如 redirect: 当前生效的 [端口, 目标端口])，None 表示删除。
+    """
+    from .utils.helpers import write_atomic
+
+    settings = load_settings()
+    if mode is not None:
+        settings["mode"] = mode
+    if drain is not None:
+        settings["drain"] = int(drain)
+    for key, value in state.items():
+        if value is None:
+            settings.pop(key, None)
+        else:
+            settings[key] = value
+    write_atomic(settings_path(), json.dumps(settings, indent=2))
+    return settings
+
+
+def slot_unit(slot):
+    """槽位对应的 systemd 单元名"""
+    from .config import SERVICE_NAME
+    return SERVICE_NAME if slot == "a" else f"{SERVICE_NAME}-b"
+
+
+def slot_unit_path():
+    """槽位 b 的单元文件 (与主服务文件同目录)"""
+    from .config import SERVICE_FILE, SERVICE_NAME
+    return SERVICE_FILE.with_name(f"{SERVICE_NAME}-b.service")
+
+
+def slot_config_path(slot):
+    """槽位对应的配置文件"""
+    from .config import CONFIG_DIR
+    return CONFIG_DIR / ("config.yaml" if slot == "a" else "config-b.yaml")
+
+
+def active_slot():
+    """
+    当前运行的槽位
+
+    只有槽位 b 的单元文件存在时才查询 systemd，未使用过平滑重启时没有额外开销。
+    """
+    from .utils.helpers import run_cmd
+
+    if not slot_unit_path().exists():
+        return "a"
+    state = run_cmd(f"systemctl is-active {slot_unit('b')}", capture=True, check=False)
+    return "b" if state == "active" else "a"
+
+
+def slot_config(base, slot, port=None):
+    """
+    由主配置派生槽位配置
+
+    Args:
+        base: 主配置 ServerConfig
+        slot: a / b
+        port: 槽位 b 的监听端口
+    """
+    if slot == "a":
+        return base
+    config = base.with_port(port)
+    stats = base.traffic_stats
+    if stats:
+        host, stats_port = stats["listen"].rsplit(":", 1)
+        config = config.with_traffic_stats(
+            {**stats, "listen": f"{host}:{int(stats_port) + STATS_PORT_OFFSET}"})
+    return config
+
+
+def render_slot_unit():
+    """槽位 b 的单元内容 (不设置 [Install]，不开机自启)"""
+    from .config import BINARY_PATH
+
+    return f"""[Unit]
+Description=Hysteria 2 Service (graceful restart slot b)
+After=network.target
+
+[Service]
+Type=simple
+Environment=HYSTERIA_LOG_DISABLE_COLOR=true
+ExecStart={BINARY_PATH} server -c {slot_config_path("b")}
+Restart=on-failure
+RestartSec=3
+"""
+
+
+def _spare_port(config):
+    """槽位 b 的监听端口: 未被占用，且不在端口跳跃范围内"""
+    from .utils.helpers import random_available_port, get_bound_udp_ports
+
+    bound = get_bound_udp_ports()
+    hop = config.hop_ports
+    low, high = (int(p) for p in hop.split(":")) if hop else (0, -1)
+    while True:
+        port = random_available_port(10000, 60000, bound)
+        if port != config.port and not low <= port <= high:
+            return port
+
+
+# ============ 就绪探测 ============
+
+def quic_probe(host, port, timeout=0.3):
+    """
+    发送未知版本号的 QUIC Initial 包，收到版本协商包即说明 QUIC 监听已就绪
+
+    Returns:
+        bool
+    """
+    scid = os.urandom(8)
+    dcid = os.urandom(8)
+    # 长包头 | 固定位；版本 0x?a?a?a?a 为保留值，服务端必然回复版本协商
+    packet = bytes([0xC0]) + b"\x1a\x2a\x3a\x4a" + bytes([len(dcid)]) + dcid + bytes([len(scid)]) + scid
+    packet += b"\x00" * (_QUIC_MIN_PACKET - len(packet))
+
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    try:
+        sock.sendto(packet, (host, port))
+        data = sock.recv(2048)
+    except OSError:
+        return False
+    finally:
+        sock.close()
+    # 版本协商: 长包头、版本为 0、目标连接 ID 为我们的源连接 ID
+    return (len(data) >= 6 + len(scid) and data[0] & 0x80 and data[1:5] == b"\x00\x00\x00\x00"
+            and data[6:6 + data[5]] == scid)
+
+
+def probe_address(config, port=None):
+    """配置监听地址对应的本机探测地址 (host, port)"""
+    listen = str(config.get(("listen",), ":443"))
+    host = listen.rsplit(":", 1)[0].strip("[]") if ":" in listen else ""
+    if host in ("", "0.0.0.0"):
+        host = "127.0.0.1"
+    elif host == "::":
+        host = "::1"
+    return host, port or config.port
+
+
+def wait_quic(host, port, timeout=10, process=None):
+    """
+    等待 QUIC 监听就绪
+
+    Args:
+        process: 被探测的 Popen，进程退出时立即返回 False
+
+    Returns:
+        bool
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        if quic_probe(host, port):
+            return True
+        # 端口未监听时 ICMP 不可达会让探测立即失败，稍作等待
+        time.sleep(0.05)
+    return False
+
+
+def check_config(config, timeout=10):
+    """
+    用二进制试运行配置: 在回环地址的空闲端口启动，探测就绪后退出
+
+    trafficStats 等 TCP 监听在试运行时关闭，避免与运行中的服务冲突。
+
+    Args:
+        config: ServerConfig
+
+    Returns:
+        float: 就绪耗时（秒）
+
+    Raises:
+        RolloutError: 二进制不存在、进程退出或超时未就绪
+    """
+    import tempfile
+    from .config import BINARY_PATH
+    from .utils.helpers import random_available_port
+
+    if not Path(BINARY_PATH).exists():
+        raise RolloutError(f"二进制文件不存在: {BINARY_PATH}")
+    port = random_available_port(20000, 60000)
+    trial = config.with_traffic_stats(None).patch({("listen",): f"127.0.0.1:{port}"})
+    fd, path = tempfile.mkstemp(prefix="hy2-check-", suffix=".yaml")
+    os.close(fd)
+    trial.save(path)
+    start = time.monotonic()
+    process = subprocess.Popen([str(BINARY_PATH), "server", "-c", path],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        if wait_quic("127.0.0.1", port, timeout, process):
+            return time.monotonic() - start
+        if process.poll() is None:
+            raise RolloutError(f"试运行 {timeout} 秒内未就绪")
+        error = process.stderr.read().decode(errors="replace").strip().splitlines()
+        raise RolloutError("配置校验失败: " + (error[-1] if error else f"退出码 {process.returncode}"))
+    finally:
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        process.stderr.close()
+        os.unlink(path)
+
+
+# ============ 流量切换 ============
+
+def redirect_commands(port, target, add=True):
+    """
+    把 UDP port 的新流量转到 target 的 iptables / ip6tables 命令
+
+    filter 表只放行经过 REDIRECT 的流量，target 端口不对外直接开放。
+    """
+    commands = []
+    for tool in ("iptables", "ip6tables"):
+        nat = f"-t nat {{}} PREROUTING -p udp --dport {port} -j REDIRECT --to-ports {target}"
+        accept = f"{{}} INPUT -p udp --dport {target} -m conntrack --ctstate DNAT -j ACCEPT"
+        if add:
+            commands += [f"{tool} {nat.format('-I')}", f"{tool} {accept.format('-I')}"]
+        else:
+            commands += [f"{tool} {nat.format('-D')}", f"{tool} {accept.format('-D')}"]
+    return commands
+
+
+def set_redirect(port, target, add=True):
+    """
+    添加或删除 REDIRECT 规则
+
+    Raises:
+        RolloutError: 添加时 iptables 不可用或 IPv4 规则写入失败
+    """
+    for command in redirect_commands(port, target, add):
+        result = subprocess.run(command, shell=True, capture_output=True, text=True)
+        # 没有 IPv6 时 ip6tables 失败不影响切换
+        if add and result.returncode != 0 and command.startswith("iptables"):
+            raise RolloutError(f"{command}: {result.stderr.strip() or '执行失败'}")
+
+
+def online_sessions(config):
+    """
+    槽位配置对应进程的在线连接数
+
+    Returns:
+        int，未开启 trafficStats 或无法连接时为 None
+    """
+    from .stats import StatsClient, StatsError
+
+    stats = config.traffic_stats
+    if not stats:
+        return None
+    try:
+        return sum(int(n) for n in StatsClient(stats["listen"], stats["secret"], timeout=1)
+                   .online().values())
+    except (StatsError, ValueError, TypeError):
+        return None
+
+
+def _retarget_hop_nat(base):
+    """端口跳跃范围的 NAT 规则转到当前槽位的端口"""
+    from .system.firewall import FirewallError, sync_firewall
+
+    try:
+        sync_firewall(base.port, base.hop_ports, open_ports=False)
+    except FirewallError as e:
+        raise RolloutError(f"端口跳跃转发规则更新失败: {e}") from None
+
+
+def _remove_redirect(settings=None):
+    """删除记录中生效的 REDIRECT 规则"""
+    settings = settings or load_settings()
+    redirect = settings.get("redirect")
+    if redirect:
+        set_redirect(redirect[0], redirect[1], add=False)
+        save_settings(redirect=None)
+
+
+def graceful_restart(drain=None, check=True, on_progress=None):
+    """
+    平滑重启: 启动另一槽位并切换新连接，旧进程排空后停止
+
+    Args:
+        drain: 排空窗口（秒），默认取设置
+        check: 是否先试运行校验配置
+        on_progress: 进度回调 (文本)
+
+    Returns:
+        dict: 切换报告 (各阶段耗时、切换时和停止时旧进程的在线连接数)
+
+    Raises:
+        RolloutError: 任一步失败 (旧进程保持运行)
+    """
+    from .server_config import ServerConfig
+    from .utils.helpers import run_cmd, write_atomic
+    from .instances import is_multi_instance
+    from .readiness import wait_ready
+
+    if is_multi_instance():
+        raise RolloutError("多实例模式不支持平滑重启")
+    report_progress = on_progress or (lambda text: None)
+    settings = load_settings()
+    drain = settings["drain"] if drain is None else drain
+    base = ServerConfig.load(slot_config_path("a"))
+    old = active_slot()
+    new = "b" if old == "a" else "a"
+    old_config = ServerConfig.load(slot_config_path(old)) if old == "b" else base
+    report = {"from": slot_unit(old), "to": slot_unit(new)}
+    start = time.monotonic()
+
+    if check:
+        report_progress("试运行校验配置...")
+        report["check_seconds"] = round(check_config(base), 3)
+
+    port_b = _spare_port(base) if new == "b" else old_config.port
+    new_config = slot_config(base, new, port_b)
+    if new == "b":
+        new_config.save(slot_config_path("b"))
+        write_atomic(slot_unit_path(), render_slot_unit())
+        run_cmd("systemctl daemon-reload", check=False)
+
+    report_progress(f"启动 {slot_unit(new)} (端口 {new_config.port})...")
+    switch_start = time.monotonic()
+    run_cmd(f"systemctl start {slot_unit(new)}", check=False)
+    host, port = probe_address(new_config)
+    ready = wait_ready([{"unit": slot_unit(new), "port": port, "host": host}])
+    if not ready["ready"]:
+        run_cmd(f"systemctl stop {slot_unit(new)}", check=False)
+        raise RolloutError(f"{ready['reason']}，新进程已停止，原服务继续运行")
+    report["ready_seconds"] = round(time.monotonic() - switch_start, 3)
+
+    try:
+        if new == "b":
+            set_redirect(base.port, port_b)
+            save_settings(redirect=[base.port, port_b])
+        else:
+            _remove_redirect(settings)
+        if base.hop_ports:
+            _retarget_hop_nat(base)
+    except RolloutError:
+        # 恢复到切换前: 主端口和跳跃范围仍转到旧进程
+        if new == "b":
+            set_redirect(base.port, port_b, add=False)
+            save_settings(redirect=None)
+        elif settings.get("redirect"):
+            set_redirect(*settings["redirect"])
+            save_settings(redirect=settings["redirect"])
+        run_cmd(f"systemctl stop {slot_unit(new)}", check=False)
+        raise
+    report["switch_seconds"] = round(time.monotonic() - switch_start, 3)
+    report["port"] = new_config.port
+
+    sessions = report["sessions_at_switch"] = online_sessions(old_config)
+    report_progress(f"新连接已切换，排空 {slot_unit(old)} (最长 {drain} 秒，"
+                    f"在线连接: {'未知' if sessions is None else sessions})...")
+    drain_start = time.monotonic()
+    while time.monotonic() - drain_start < drain:
+        if sessions == 0:
+            break
+        time.sleep(1)
+        sessions = online_sessions(old_config)
+    report["drain_seconds"] = round(time.monotonic() - drain_start, 3)
+    report["sessions_dropped"] = sessions
+    run_cmd(f"systemctl stop {slot_unit(old)}", check=False)
+    report["total_seconds"] = round(time.monotonic() - start, 3)
+    return report
+
+
+def format_report(report):
+    """切换报告的单行文本"""
+    dropped = report.get("sessions_dropped")
+    return (f"平滑重启完成: {report['from']} -> {report['to']} (端口 {report['port']})，"
+            f"新进程就绪 {report['ready_seconds']} s，切换 {report['switch_seconds']} s，"
+            f"排空 {report['drain_seconds']} s，断开会话 {'未知' if dropped is None else dropped}")
+
+
+def reset():
+    """回到槽位 a: 删除 REDIRECT 规则，停止槽位 b (停止服务或卸载时调用)"""
+    from .utils.helpers import run_cmd
+
+    if not slot_unit_path().exists():
+        return
+    run_cmd(f"systemctl stop {slot_unit('b')}", check=False)
+    settings = load_settings()
+    _remove_redirect(settings)
+    if settings.get("redirect"):
+        from .server_config import ServerConfig
+        try:
+            base = ServerConfig.load(slot_config_path("a"))
+            if base.hop_ports:
+                _retarget_hop_nat(base)
+        except (OSError, ValueError, RolloutError):
+            pass
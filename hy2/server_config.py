@@ -0,0 +1,489 @@
+"""
+服务端配置模型 - 解析、修改、序列化 config.yaml 并计算语义差异
+"""
+
+import copy
+from pathlib import Path
+
+# Hysteria 默认的 QUIC 接收窗口 (字节)
+DEFAULT_STREAM_WINDOW = 8 * 1024 * 1024
+DEFAULT_CONN_WINDOW = 20 * 1024 * 1024
+# 窗口上限，避免配置错误的带宽导致单连接占用过多内存
+MAX_CONN_WINDOW = 512 * 1024 * 1024
+DEFAULT_MAX_INCOMING_STREAMS = 1024
+
+# 修改后不需要重启服务的配置项 (路径前缀)
+# hopPorts 只用于防火墙规则和客户端链接，服务端进程不读取
+NO_RESTART_PATHS = (
+    ("hopPorts",),
+)
+
+
+def format_path(path):
+    """将路径元组格式化为 a.b.c"""
+    return ".".join(str(p) for p in path)
+
+
+def bandwidth_delay_product(mbps, rtt_ms):
+    """
+    带宽时延积
+
+    Args:
+        mbps: 带宽 (Mbps)
+        rtt_ms: 往返时延 (毫秒)
+
+    Returns:
+        int: 字节数
+    """
+    return int(mbps * 1_000_000 / 8 * rtt_ms / 1000)
+
+
+def derive_quic_windows(mbps, rtt_ms):
+    """
+    按带宽时延积计算 QUIC 接收窗口
+
+    连接窗口取 1.5 倍 BDP (留出重传和抖动余量)，流窗口与连接窗口保持
+    Hysteria 默认的 2:5 比例；都不低于默认值，按 MiB 向上取整。
+
+    Args:
+        mbps: 接收方向的带宽 (Mbps)
+        rtt_ms: 往返时延 (毫秒)
+
+    Returns:
+        dict: Hysteria quic 配置块中的窗口字段
+    """
+    mib = 1024 * 1024
+    conn = max(DEFAULT_CONN_WINDOW, bandwidth_delay_product(mbps, rtt_ms) * 3 // 2)
+    conn = min(MAX_CONN_WINDOW, -(-conn // mib) * mib)
+    stream = max(DEFAULT_STREAM_WINDOW, -(-(conn * 2 // 5) // mib) * mib)
+    return {
+        "initStreamReceiveWindow": stream,
+        "maxStreamReceiveWindow": stream,
+        "initConnReceiveWindow": conn,
+        "maxConnReceiveWindow": conn,
+    }
+
+
+def format_bandwidth(mbps):
+    """Hysteria 带宽字符串，如 100 mbps"""
+    return f"{mbps} mbps"
+
+
+def link_settings(up, down, rtt_ms):
+    """
+    服务端的 quic / bandwidth 配置块
+
+    接收窗口按上下行中较大的带宽计算，客户端沿用同样的窗口 (见
+    ServerConfig.client_link_settings)，两个方向都不会受窗口限制。
+
+    Args:
+        up: 服务端上行 (发往客户端) 带宽 Mbps
+        down: 服务端下行 (来自客户端) 带宽 Mbps
+        rtt_ms: 往返时延 (毫秒)
+
+    Returns:
+        dict: {"quic": ..., "bandwidth": ...}
+    """
+    quic = derive_quic_windows(max(up, down), rtt_ms)
+    quic["maxIncomingStreams"] = DEFAULT_MAX_INCOMING_STREAMS
+    return {
+        "quic": quic,
+        "bandwidth": {"up": format_bandwidth(up), "down": format_bandwidth(down)},
+    }
+
+
+def traffic_stats_settings(listen=None, secret=None):
+    """
+    流量统计 API 配置块 (trafficStats)
+
+    Args:
+        listen: 监听地址，默认 TRAFFIC_STATS_LISTEN
+        secret: 访问密钥，默认随机生成
+
+    Returns:
+        dict: {"listen": ..., "secret": ...}
+    """
+    from .config import TRAFFIC_STATS_LISTEN
+    from .utils.helpers import generate_password
+
+    return {"listen": listen or TRAFFIC_STATS_LISTEN, "secret": secret or generate_password(32)}
+
+
+class ServerConfig:
+    """
+    Hysteria 服务端配置
+
+    以嵌套字典保存完整配置，未建模的字段原样保留；常用字段提供属性访问。
+    """
+
+    def __init__(self, data=None):
+        self.data = data if data is not None else {}
+
+    # ============ 读写 ============
+
+    @classmethod
+    def from_yaml(cls, text):
+        """从 YAML 文本解析"""
+        from .utils.miniyaml import loads
+        data = loads(text)
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            raise ValueError("配置文件顶层必须是映射")
+        return cls(data)
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        读取配置文件
+
+        Args:
+            path: 配置文件路径，默认 CONFIG_DIR/config.yaml
+        """
+        from .config import CONFIG_DIR
+        return cls.from_yaml(Path(path or CONFIG_DIR / "config.yaml").read_text())
+
+    def to_yaml(self):
+        """序列化为 YAML 文本"""
+        from .utils.miniyaml import dumps
+        return dumps(self.data)
+
+    def save(self, path=None):
+        """
+        原子写入配置文件
+
+        Args:
+            path: 配置文件路径，默认 CONFIG_DIR/config.yaml
+
+        Returns:
+            Path: 写入的路径
+        """
+        from .config import CONFIG_DIR
+        from .utils.helpers import write_atomic
+
+        path = Path(path or CONFIG_DIR / "config.yaml")
+        write_atomic(path, self.to_yaml(), mode=0o600)
+        return path
+
+    @classmethod
+    def build(cls, cert_path, key_path, port, hop_ports, users, proxy_site, link=None,
+              traffic_stats=None):
+        """
+        按安装向导的参数构建配置
+
+        Args:
+            cert_path: 证书路径
+            key_path: 私钥路径
+            port: 端口
+            hop_ports: 端口跳跃范围
+            users: 用户列表 [{"password": ..., "name": ...}]，多用户时未命名的
+                   用户依次命名为 user1、user2 ...
+            proxy_site: 伪装站点
+            link: 链路参数 {"up": Mbps, "down": Mbps, "rtt": 毫秒}，
+                  为 None 时使用 Hysteria 默认的窗口且不限速
+            traffic_stats: 流量统计 API 配置块，见 traffic_stats_settings
+        """
+        data = {
+            "listen": f":{port}",
+            "tls": {"cert": str(cert_path), "key": str(key_path)},
+        }
+        if len(users) == 1 and not users[0].get("name"):
+            data["auth"] = {"type": "password", "password": users[0]["password"]}
+        else:
+            data["auth"] = {"type": "userpass", "userpass": {
+                u.get("name") or f"user{i + 1}": u["password"] for i, u in enumerate(users)
+            }}
+
+        data["masquerade"] = {
+            "type": "proxy",
+            "proxy": {"url": f"https://{proxy_site}", "rewriteHost": True},
+        }
+        if link:
+            data.update(link_settings(link["up"], link["down"], link["rtt"]))
+        if traffic_stats:
+            data["trafficStats"] = dict(traffic_stats)
+        if hop_ports:
+            data["transport"] = {"udp": {"hopInterval": "30s"}}
+            data["hopPorts"] = [hop_ports]
+        return cls(data)
+
+    # ============ 路径访问 ============
+
+    def get(self, path, default=None):
+        """
+        按路径读取字段
+
+        Args:
+            path: 路径元组，如 ("tls", "cert")
+            default: 不存在时的默认值
+        """
+        node = self.data
+        for part in path:
+            if not isinstance(node, dict) or part not in node:
+                return default
+            node = node[part]
+        return node
+
+    def set(self, path, value):
+        """
+        按路径设置字段，value 为 None 时删除该字段
+
+        Args:
+            path: 路径元组
+            value: 新值
+        """
+        node = self.data
+        for part in path[:-1]:
+            if not isinstance(node.get(part), dict):
+                if value is None:
+                    return
+                node[part] = {}
+            node = node[part]
+        if value is None:
+            node.pop(path[-1], None)
+        else:
+            node[path[-1]] = value
+
+    def copy(self):
+        """深拷贝"""
+        return ServerConfig(copy.deepcopy(self.data))
+
+    def patch(self, changes):
+        """
+        应用字段级修改，返回新配置 (不修改自身)
+
+        Args:
+            changes: {路径元组: 新值}
+        """
+        new = self.copy()
+        for path, value in changes.items():
+            new.set(path, value)
+        return new
+
+    def flatten(self):
+        """
+        展开为 {路径元组: 叶子值}，列表作为整体比较
+        """
+        result = {}
+
+        def walk(node, prefix):
+            if isinstance(node, dict) and node:
+                for key, value in node.items():
+                    walk(value, prefix + (key,))
+            else:
+                result[prefix] = node
+
+        walk(self.data, ())
+        return result
+
+    def diff(self, other):
+        """
+        计算语义差异
+
+        Args:
+            other: 新配置
+
+        Returns:
+            list: [(路径元组, 旧值, 新值)]，按路径排序
+        """
+        old, new = self.flatten(), other.flatten()
+        changes = []
+        for path in sorted(set(old) | set(new), key=format_path):
+            if old.get(path) != new.get(path):
+                changes.append((path, old.get(path), new.get(path)))
+        return changes
+
+    # ============ 常用字段 ============
+
+    @property
+    def port(self):
+        """监听端口"""
+        listen = str(self.get(("listen",), ":443"))
+        return int(listen.rsplit(":", 1)[-1])
+
+    def with_port(self, port):
+        """返回修改端口后的配置，保留监听地址部分"""
+        listen = str(self.get(("listen",), ""))
+        host = listen.rsplit(":", 1)[0] if ":" in listen else ""
+        return self.patch({("listen",): f"{host}:{port}"})
+
+    @property
+    def password_path(self):
+        """主用户 (分享链接使用的用户) 密码所在路径"""
+        if self.get(("auth", "type")) == "userpass":
+            userpass = self.get(("auth", "userpass"))
+            if isinstance(userpass, dict) and userpass:
+                return ("auth", "userpass", next(iter(userpass)))
+            return ("auth", "userpass")
+        return ("auth", "password")
+
+    @property
+    def password(self):
+        """主用户密码"""
+        value = self.get(self.password_path)
+        if isinstance(value, list):
+            return str(value[0]) if value else None
+        return None if value is None else str(value)
+
+    def with_password(self, password):
+        """
+        返回修改主用户密码后的配置，其他用户保持不变
+
+        HTTP 认证后端模式下密码保存在用户库中，配置不变 (见 users.update_primary_password)。
+        """
+        if self.auth_backend:
+            return self
+        path = self.password_path
+        value = self.get(path)
+        if isinstance(value, list):
+            return self.patch({path: [password] + value[1:]})
+        return self.patch({path: password})
+
+    @property
+    def hop_ports(self):
+        """端口跳跃范围 (start:end) 或 None"""
+        hop = self.get(("hopPorts",))
+        if isinstance(hop, list):
+            return str(hop[0]) if hop else None
+        return None if hop is None else str(hop)
+
+    @property
+    def link(self):
+        """
+        链路参数 {"up": Mbps, "down": Mbps}，未设置 bandwidth 时返回 None
+
+        供生成客户端配置使用，只支持 mbps 单位。
+        """
+        bandwidth = self.get(("bandwidth",))
+        if not isinstance(bandwidth, dict):
+            return None
+        result = {}
+        for key in ("up", "down"):
+            value = str(bandwidth.get(key, "")).split()
+            if len(value) == 2 and value[1].lower() == "mbps" and value[0].isdigit():
+                result[key] = int(value[0])
+        return result if len(result) == 2 else None
+
+    def client_link_settings(self):
+        """
+        与服务端匹配的客户端 quic / bandwidth 配置块
+
+        客户端的上下行与服务端相反，接收窗口沿用服务端的值。
+
+        Returns:
+            dict 或 None (服务端未设置 bandwidth)
+        """
+        link = self.link
+        if not link:
+            return None
+        quic = self.get(("quic",)) or {}
+        windows = {k: v for k, v in quic.items() if k.endswith("ReceiveWindow")}
+        settings = {"bandwidth": {"up": format_bandwidth(link["down"]),
+                                  "down": format_bandwidth(link["up"])}}
+        if windows:
+            settings["quic"] = windows
+        return settings
+
+    @property
+    def users(self):
+        """
+        多用户模式下的 {用户名: 密码}
+
+        旧版本生成的 userpass 列表 (仅密码) 依次命名为 user1、user2 ...；
+        单用户 (password) 模式返回空字典。
+        """
+        if self.get(("auth", "type")) != "userpass":
+            return {}
+        userpass = self.get(("auth", "userpass"))
+        if isinstance(userpass, dict):
+            return {str(k): str(v) for k, v in userpass.items()}
+        if isinstance(userpass, list):
+            return {f"user{i + 1}": str(p) for i, p in enumerate(userpass)}
+        return {}
+
+    def with_users(self, users):
+        """
+        返回替换全部用户后的配置 (切换为 userpass 模式)
+
+        Args:
+            users: {用户名: 密码}，不能为空
+        """
+        if not users:
+            raise ValueError("至少需要保留一个用户")
+        new = self.patch({("auth", "password"): None})
+        new.set(("auth", "type"), "userpass")
+        new.set(("auth", "userpass"), dict(users))
+        return new
+
+    @property
+    def traffic_stats(self):
+        """流量统计 API 配置 {"listen", "secret"}，未启用时返回 None"""
+        stats = self.get(("trafficStats",))
+        if not isinstance(stats, dict) or not stats.get("listen"):
+            return None
+        return {"listen": str(stats["listen"]), "secret": str(stats.get("secret") or "")}
+
+    def with_traffic_stats(self, settings):
+        """
+        返回启用或关闭流量统计 API 后的配置
+
+        Args:
+            settings: traffic_stats_settings 的结果，None 表示关闭
+        """
+        return self.patch({("trafficStats",): dict(settings) if settings else None})
+
+    @property
+    def auth_backend(self):
+        """HTTP 认证后端地址 (auth.type: http)，未使用时返回 None"""
+        if self.get(("auth", "type")) != "http":
+            return None
+        url = self.get(("auth", "http", "url"))
+        return str(url) if url else None
+
+    def with_auth_backend(self, url, users=None):
+        """
+        返回切换认证方式后的配置
+
+        Args:
+            url: HTTP 认证后端地址；None 表示改回内联 userpass
+            users: 改回内联时写入的 {用户名: 密码}
+        """
+        if url:
+            return self.patch({("auth",): {"type": "http", "http": {"url": url}}})
+        if not users:
+            raise ValueError("至少需要保留一个用户")
+        return self.patch({("auth",): {"type": "userpass", "userpass": dict(users)}})
+
+    @property
+    def client_auth(self):
+        """
+        客户端 auth 字段: 单用户为密码，多用户为 "用户名:密码" (第一个用户)
+
+        HTTP 认证后端模式下取用户库中第一个可登录的用户。
+        """
+        if self.auth_backend:
+            from .users import UserStore
+            active = UserStore.load().active()
+            name = next(iter(active), None)
+            return f"{name}:{active[name]}" if name else None
+        users = self.users
+        if users:
+            name, password = next(iter(users.items()))
+            return f"{name}:{password}"
+        return self.password
+
+
+def needs_restart(changes):
+    """
+    判断修改是否需要重启服务
+
+    Args:
+        changes: ServerConfig.diff 的结果
+
+    Returns:
+        bool
+    """
+    for path, _, _ in changes:
+        if not any(path[:len(prefix)] == prefix for prefix in NO_RESTART_PATHS):
+            return True
+    return False
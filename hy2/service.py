@@ -2,15 +2,19 @@
 服务管理模块
 """
 
-import time
+import subprocess
 from pathlib import Path
 
 
+class ServiceError(Exception):
+    """systemctl 操作失败"""
+
+
 def create_systemd_service():
     """创建 systemd 服务"""
-    from ..config import SERVICE_FILE, BINARY_PATH, CONFIG_DIR, SERVICE_NAME
-    from ..utils.output import yellow, green
-    from ..utils.helpers import run_cmd
+    from .config import SERVICE_FILE, BINARY_PATH, CONFIG_DIR, SERVICE_NAME
+    from .utils.output import yellow, green
+    from .utils.helpers import run_cmd
 
     service_content = f"""[Unit]
 Description=Hysteria 2 Service
@@ -18,6 +22,7 @@ After=network.target
 
 [Service]
 Type=simple
+Environment=HYSTERIA_LOG_DISABLE_COLOR=true
 ExecStart={BINARY_PATH} server -c {CONFIG_DIR}/config.yaml
 Restart=always
 RestartSec=3
@@ -32,58 +37,173 @@ WantedBy=multi-user.target
     green("systemd 服务已创建")
 
 
-def wait_for_service():
+def service_unit():
+    """
+    当前部署对应的 systemd 单元
+
+    Returns:
+        多实例模式为 hysteria-server.target；平滑重启切换到槽位 b 后为 hysteria-server-b，
+        否则为 hysteria-server
+    """
+    from .config import SERVICE_NAME
+    from .instances import is_multi_instance
+    from .rollout import active_slot, slot_unit
+
+    if is_multi_instance():
+        return f"{SERVICE_NAME}.target"
+    return slot_unit(active_slot())
+
+
+def restart_service(on_progress=None, check=False, verified=False):
+    """
+    按设置的重启方式重启服务
+
+    graceful 模式 (单实例) 启动另一槽位并排空旧进程，失败时保留旧进程；
+    否则直接 systemctl restart (槽位 b 运行中时先停止槽位 b，回到 hysteria-server)。
+
+    Args:
+        on_progress: 平滑重启的进度回调 (文本)
+        check: 直接重启时 systemctl 失败是否抛出 ServiceError
+        verified: 配置已经试运行校验过，平滑重启时不再重复校验
+
+    Returns:
+        dict: 平滑重启的切换报告，直接重启时为 None
+
+    Raises:
+        RolloutError: 平滑重启失败 (服务保持运行)
+        ServiceError: check 为 True 且 systemctl restart 失败
+    """
+    from .instances import is_multi_instance
+    from .rollout import graceful_enabled, graceful_restart, reset
+
+    if graceful_enabled():
+        return graceful_restart(check=not verified, on_progress=on_progress)
+    if not is_multi_instance():
+        reset()
+    unit = service_unit()
+    try:
+        result = subprocess.run(["systemctl", "restart", unit], capture_output=True, text=True,
+                                timeout=300)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        result = None
+        error = str(e)
+    else:
+        error = result.stderr.strip() or f"退出码 {result.returncode}"
+    if check and (result is None or result.returncode != 0):
+        raise ServiceError(f"systemctl restart {unit} 失败: {error}")
+    return None
+
+
+def wait_for_service(timeout=None):
     """
     等待服务启动
 
     Returns:
         服务是否成功启动
     """
-    from ..utils.output import yellow
-    from ..utils.helpers import run_cmd
-    from ..config import SERVICE_NAME
+    return wait_service_ready(timeout)["ready"]
 
-    yellow("等待服务启动...")
-    for i in range(3, 0, -1):
-        import sys
-        from ..utils.output import Colors
-        sys.stdout.write(f"\r{Colors.YELLOW}等待服务启动... {i}秒{Colors.PLAIN}")
-        sys.stdout.flush()
-        time.sleep(1)
-    print()
 
-    result = run_cmd(f"systemctl is-active {SERVICE_NAME}", capture=True, check=False)
-    return result == "active"
+def wait_service_ready(timeout=None):
+    """
+    等待服务就绪并输出结果 (UDP 监听和 QUIC 应答确认后立即返回)
+
+    Args:
+        timeout: 超时（秒），默认 SERVICE_READY_TIMEOUT
+
+    Returns:
+        dict: readiness.wait_ready 的结果
+    """
+    from .utils.output import yellow, green, red
+    from .readiness import wait_ready
+
+    yellow("等待服务启动...")
+    report = wait_ready(None, timeout)
+    if report["ready"]:
+        green(f"服务已就绪 ({report['seconds']} 秒)")
+    else:
+        red(f"服务未就绪: {report['reason']}")
+    return report
 
 
 def manage_service(action):
     """
     服务控制
 
+    多实例模式下操作 hysteria-server.target，所有实例作为一组启停。
+
     Args:
         action: 操作类型 (start/stop/restart/status)
+
+    Returns:
+        dict: start 和直接 restart 时为就绪探测结果，其余为 None
     """
-    from ..config import SERVICE_NAME
-    from ..utils.output import green
-    from ..utils.helpers import run_cmd
+    from .config import SERVICE_NAME
+    from .utils.output import green, yellow, red
+    from .utils.helpers import run_cmd
 
+    unit = service_unit()
     if action == "start":
-        run_cmd(f"systemctl start {SERVICE_NAME}", check=False)
-        run_cmd(f"systemctl enable {SERVICE_NAME}", check=False)
-        green("已启动")
+        run_cmd(f"systemctl start {unit}", check=False)
+        # 槽位 b 不开机自启，重启系统后由 hysteria-server 接管
+        run_cmd(f"systemctl enable {unit if unit.endswith('.target') else SERVICE_NAME}", check=False)
+        ready = wait_service_ready()
+        if ready["ready"]:
+            green("已启动")
+        return ready
     elif action == "stop":
-        run_cmd(f"systemctl stop {SERVICE_NAME}", check=False)
+        from .rollout import reset
+        run_cmd(f"systemctl stop {unit}", check=False)
+        reset()
         green("已停止")
     elif action == "restart":
-        run_cmd(f"systemctl restart {SERVICE_NAME}", check=False)
-        green("已重启")
+        from .rollout import RolloutError, format_report
+        try:
+            report = restart_service(on_progress=yellow)
+        except RolloutError as e:
+            red(f"平滑重启失败，服务保持运行: {e}")
+            return None
+        if report:
+            green(format_report(report))
+            green("已重启")
+            return None
+        ready = wait_service_ready()
+        if ready["ready"]:
+            green("已重启")
+        return ready
     elif action == "status":
         import os
-        os.system(f"systemctl status {SERVICE_NAME}")
+        if not unit.endswith(".target"):
+            os.system(f"systemctl status {unit}")
+        else:
+            os.system(f"systemctl status {unit} '{SERVICE_NAME}@*'")
+    return None
+
+
+def log_units():
+    """日志对应的单元匹配模式 (journalctl -u)"""
+    from .config import SERVICE_NAME
+    from .instances import is_multi_instance
+    from .rollout import slot_unit_path
+
+    if is_multi_instance():
+        return f"{SERVICE_NAME}@*"
+    # 使用过平滑重启时两个槽位的日志都要包含
+    return f"{SERVICE_NAME}*" if slot_unit_path().exists() else SERVICE_NAME
 
 
 def show_logs():
-    """查看服务日志"""
-    from ..config import SERVICE_NAME
-    import os
-    os.system(f"journalctl -u {SERVICE_NAME} -f --lines 50")
+    """查看服务日志: 持续输出最近 50 行及新日志，Ctrl+C 退出后显示统计摘要"""
+    from .logs import LogStats, journal_records, parse_events, analyze, format_event, print_summary
+
+    stats = LogStats()
+    try:
+        analyze(parse_events(journal_records(log_units(), follow=True, lines=50)), stats,
+                on_match=lambda event: print(format_event(event, color=True), flush=True))
+    except KeyboardInterrupt:
+        print()
+    except FileNotFoundError:
+        from .utils.output import red
+        red("未找到 journalctl")
+        return
+    print_summary(stats.summary())
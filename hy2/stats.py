@@ -0,0 +1,486 @@
+"""
+流量统计 - 采集 Hysteria trafficStats API，计算每个用户的实时速率
+
+服务端配置中的 trafficStats 开启一个 HTTP API (默认只监听本机):
+
+    GET /traffic    {"用户": {"tx": 发往客户端字节数, "rx": 来自客户端字节数}}
+    GET /online     {"用户": 在线连接数}
+
+请求需带 Authorization: <secret> 头。MetricsCollector 按固定间隔轮询所有
+实例 (多实例模式下每个实例一个端点)，把累计值合并为单调递增的计数
+(服务重启导致计数归零时按新值累加)，每个用户的采样保存在固定大小的环形
+缓冲区中，由此计算最近一个间隔的速率和整个窗口的平均速率。
+
+累计值到增量的换算由 CounterDeltas 完成，配额统计 (users.enforce) 也使用它，
+因此两者都不清零服务端计数，互不影响。
+
+结果可以渲染为终端 top 视图 (render_top)，或 Prometheus 文本格式
+(render_prometheus / serve_metrics)。
+"""
+
+import json
+import time
+import threading
+
+
+class StatsError(Exception):
+    """流量统计 API 请求失败"""
+
+
+# ============ 端点 ============
+
+class StatsClient:
+    """单个 trafficStats API 端点"""
+
+    def __init__(self, listen, secret, timeout=3, name=None):
+        """
+        Args:
+            listen: 服务端配置中的监听地址，如 127.0.0.1:25413 或 :25413
+            secret: 访问密钥
+            timeout: 请求超时（秒）
+            name: 端点名称，用于错误信息
+        """
+        host, port = str(listen).rsplit(":", 1)
+        host = host.strip("[]")
+        if host in ("", "0.0.0.0"):
+            host = "127.0.0.1"
+        elif host == "::":
+            host = "::1"
+        if ":" in host:
+            host = f"[{host}]"
+        self.base_url = f"http://{host}:{port}"
+        self.secret = secret
+        self.timeout = timeout
+        self.name = name or str(listen)
+
+    def _request(self, path, data=None):
+        from urllib.request import Request, urlopen
+        from urllib.error import URLError
+
+        headers = {"Authorization": self.secret}
+        if data is not None:
+            data = json.dumps(data).encode()
+            headers["Content-Type"] = "application/json"
+        request = Request(self.base_url + path, data=data, headers=headers)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode() or "{}")
+        except (URLError, OSError, ValueError) as e:
+            raise StatsError(f"{self.name}: {getattr(e, 'reason', e)}") from None
+
+    def traffic(self, clear=False):
+        """
+        累计流量 {用户: {"tx": int, "rx": int}}
+
+        Args:
+            clear: 读取后清零服务端计数 (会使其他读取者把下一次的值当作重启后的计数，
+                   MetricsCollector 和配额统计都不使用)
+        """
+        return self._request("/traffic?clear=1" if clear else "/traffic") or {}
+
+    def online(self):
+        """在线连接数 {用户: int}"""
+        return self._request("/online") or {}
+
+    def kick(self, users):
+        """断开指定用户的所有连接"""
+        self._request("/kick", list(users))
+
+
+def stats_endpoints(config=None):
+    """
+    当前部署的流量统计端点
+
+    多实例模式下每个实例一个端点 (实例配置中的监听端口各不相同)；
+    平滑重启切换到槽位 b 时使用槽位 b 的端点。
+
+    Args:
+        config: 主配置 ServerConfig，默认读取 config.yaml
+
+    Returns:
+        list: [StatsClient]，未启用 trafficStats 时为空列表
+    """
+    from .server_config import ServerConfig
+    from .instances import load_manifest, instances_dir
+
+    manifest = load_manifest()
+    if manifest:
+        configs = []
+        for inst in manifest["instances"]:
+            path = instances_dir() / f"{inst['index']}.yaml"
+            if path.exists():
+                configs.append((f"@{inst['index']}", ServerConfig.load(path)))
+    else:
+        from .rollout import active_slot, slot_config_path
+        # 平滑重启切换到槽位 b 后，统计 API 在槽位 b 的配置中
+        if active_slot() == "b":
+            config = ServerConfig.load(slot_config_path("b"))
+        configs = [(None, config or ServerConfig.load())]
+
+    clients = []
+    for name, cfg in configs:
+        stats = cfg.traffic_stats
+        if stats:
+            clients.append(StatsClient(stats["listen"], stats["secret"], name=name))
+    return clients
+
+
+# ============ 采集 ============
+
+class RingBuffer:
+    """固定大小的环形缓冲区，写满后覆盖最旧的数据"""
+
+    def __init__(self, size):
+        if size < 2:
+            raise ValueError("环形缓冲区至少需要 2 个位置")
+        self._items = [None] * size
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, item):
+        self._items[self._next] = item
+        self._next = (self._next + 1) % len(self._items)
+        self._count = min(self._count + 1, len(self._items))
+
+    def items(self):
+        """按时间顺序 (最旧在前) 返回全部数据"""
+        size = len(self._items)
+        start = (self._next - self._count) % size
+        return [self._items[(start + i) % size] for i in range(self._count)]
+
+
+class CounterDeltas:
+    """
+    把各端点的累计计数换算为增量
+
+    计数变小说明服务重启过，新值即为重启后的增量。state 可以序列化为 JSON
+    保存，下次从上次读到的计数继续换算。
+    """
+
+    def __init__(self, state=None):
+        """
+        Args:
+            state: {端点: {用户: [tx, rx]}}，上次读到的计数
+        """
+        self.state = {endpoint: dict(users) for endpoint, users in (state or {}).items()}
+
+    def update(self, endpoint, users):
+        """
+        记录一个端点的最新计数
+
+        Args:
+            endpoint: 端点名称
+            users: /traffic 的结果 {用户: {"tx", "rx"}}
+
+        Returns:
+            dict: {用户: (tx 增量, rx 增量)}
+        """
+        seen = self.state.setdefault(endpoint, {})
+        deltas = {}
+        for user, counters in users.items():
+            tx, rx = int(counters.get("tx", 0)), int(counters.get("rx", 0))
+            last_tx, last_rx = seen.get(user, (0, 0))
+            deltas[user] = (tx - last_tx if tx >= last_tx else tx,
+                            rx - last_rx if rx >= last_rx else rx)
+            seen[user] = [tx, rx]
+        return deltas
+
+
+def _rate(older, newer):
+    """两个 (时间, tx, rx) 采样之间的速率 (字节/秒)"""
+    elapsed = newer[0] - older[0]
+    if elapsed <= 0:
+        return 0.0, 0.0
+    return (newer[1] - older[1]) / elapsed, (newer[2] - older[2]) / elapsed
+
+
+class MetricsCollector:
+    """
+    轮询流量统计端点，维护每个用户的累计流量和速率
+
+    clients 只需要提供 traffic() / online() 方法和 name 属性，
+    clock 可替换以便在测试中控制时间。
+    """
+
+    def __init__(self, clients, history=None, clock=time.monotonic):
+        from .config import STATS_HISTORY
+
+        self.clients = list(clients)
+        self.history = history or STATS_HISTORY
+        self.clock = clock
+        self.polls = 0
+        self.failures = 0
+        self._deltas = CounterDeltas()
+        self._totals = {}     # 用户 -> [tx, rx] 单调累计
+        self._series = {}     # 用户 -> RingBuffer[(时间, tx, rx)]
+        self._online = {}
+        self._errors = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        采集一次所有端点
+
+        Returns:
+            dict: 采集后的快照，见 snapshot
+        """
+        traffic, online, errors = [], {}, []
+        for client in self.clients:
+            try:
+                traffic.append((client.name, client.traffic()))
+                for user, count in client.online().items():
+                    online[user] = online.get(user, 0) + int(count)
+            except StatsError as e:
+                errors.append(str(e))
+        now = self.clock()
+
+        with self._lock:
+            self.polls += 1
+            if errors:
+                self.failures += 1
+            for endpoint, users in traffic:
+                for user, (delta_tx, delta_rx) in self._deltas.update(endpoint, users).items():
+                    total = self._totals.setdefault(user, [0, 0])
+                    total[0] += delta_tx
+                    total[1] += delta_rx
+            for user in set(self._totals) | set(online):
+                total = self._totals.setdefault(user, [0, 0])
+                series = self._series.get(user)
+                if series is None:
+                    series = self._series[user] = RingBuffer(self.history)
+                series.append((now, total[0], total[1]))
+            self._online = online
+            self._errors = errors
+        return self.snapshot()
+
+    def snapshot(self):
+        """
+        当前统计快照
+
+        Returns:
+            dict: {"users": [{user, online, tx, rx, tx_rate, rx_rate, tx_avg, rx_avg}],
+                   "total": {...}, "errors": [...], "polls": int, "failures": int}
+            用户按当前总速率从高到低排序，速率单位为字节/秒，
+            只有一次采样时速率为 None
+        """
+        with self._lock:
+            users = []
+            for user, series in self._series.items():
+                samples = series.items()
+                tx_rate = rx_rate = tx_avg = rx_avg = None
+                if len(samples) >= 2:
+                    tx_rate, rx_rate = _rate(samples[-2], samples[-1])
+                    tx_avg, rx_avg = _rate(samples[0], samples[-1])
+                users.append({
+                    "user": user,
+                    "online": self._online.get(user, 0),
+                    "tx": samples[-1][1],
+                    "rx": samples[-1][2],
+                    "tx_rate": tx_rate,
+                    "rx_rate": rx_rate,
+                    "tx_avg": tx_avg,
+                    "rx_avg": rx_avg,
+                })
+            errors, polls, failures = list(self._errors), self.polls, self.failures
+
+        users.sort(key=lambda u: (-((u["tx_rate"] or 0) + (u["rx_rate"] or 0)), u["user"]))
+        total = {"online": sum(u["online"] for u in users)}
+        for key in ("tx", "rx", "tx_rate", "rx_rate"):
+            values = [u[key] for u in users if u[key] is not None]
+            total[key] = sum(values) if values or key in ("tx", "rx") else None
+        return {"users": users, "total": total, "errors": errors,
+                "polls": polls, "failures": failures}
+
+    def start(self, interval=None):
+        """在后台线程中按间隔轮询"""
+        from .config import STATS_INTERVAL
+
+        interval = interval or STATS_INTERVAL
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                self.poll()
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="hy2-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台轮询"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+# ============ 输出 ============
+
+def format_bytes(value):
+    """字节数格式化为 KiB/MiB/GiB"""
+    value = float(value)
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if abs(value) < 1024 or unit == "TiB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def format_rate(bytes_per_second):
+    """速率 (字节/秒) 格式化为 bps/Kbps/Mbps/Gbps"""
+    if bytes_per_second is None:
+        return "-"
+    value = bytes_per_second * 8
+    for unit in ("bps", "Kbps", "Mbps"):
+        if value < 1000:
+            return f"{value:.1f} {unit}"
+        value /= 1000
+    return f"{value:.2f} Gbps"
+
+
+def render_top(snapshot, limit=None):
+    """
+    渲染 top 风格的终端视图
+
+    Args:
+        snapshot: MetricsCollector.snapshot 的结果
+        limit: 最多显示的用户数
+
+    Returns:
+        str
+    """
+    rows = [("用户", "在线", "下行速率", "上行速率", "平均下行", "平均上行", "累计下行", "累计上行")]
+    users = snapshot["users"][:limit] if limit else snapshot["users"]
+    for u in users:
+        rows.append((u["user"], str(u["online"]), format_rate(u["tx_rate"]),
+                     format_rate(u["rx_rate"]), format_rate(u["tx_avg"]),
+                     format_rate(u["rx_avg"]), format_bytes(u["tx"]), format_bytes(u["rx"])))
+    total = snapshot["total"]
+    rows.append(("合计", str(total["online"]), format_rate(total["tx_rate"]),
+                 format_rate(total["rx_rate"]), "", "",
+                 format_bytes(total["tx"]), format_bytes(total["rx"])))
+
+    from .utils.output import format_table, display_width
+
+    lines = format_table(rows, right_align=range(1, len(rows[0])))
+    rule = "-" * max(display_width(line) for line in lines)
+    lines.insert(1, rule)
+    lines.insert(len(lines) - 1, rule)
+    for error in snapshot["errors"]:
+        lines.append(f"采集失败: {error}")
+    return "\n".join(lines)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(snapshot):
+    """
+    渲染 Prometheus 文本格式 (text/plain; version=0.0.4)
+
+    Args:
+        snapshot: MetricsCollector.snapshot 的结果
+
+    Returns:
+        str
+    """
+    metrics = (
+        ("hy2_user_tx_bytes_total", "counter", "发往客户端的累计字节数", "tx"),
+        ("hy2_user_rx_bytes_total", "counter", "来自客户端的累计字节数", "rx"),
+        ("hy2_user_tx_bytes_per_second", "gauge", "最近一个采集间隔的下行速率", "tx_rate"),
+        ("hy2_user_rx_bytes_per_second", "gauge", "最近一个采集间隔的上行速率", "rx_rate"),
+        ("hy2_user_online_connections", "gauge", "在线连接数", "online"),
+    )
+    lines = []
+    for name, kind, help_text, key in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for u in snapshot["users"]:
+            if u[key] is not None:
+                value = u[key] if isinstance(u[key], int) else round(u[key], 3)
+                lines.append(f'{name}{{user="{_label(u["user"])}"}} {value}')
+    lines += [
+        "# HELP hy2_stats_up 最近一次采集是否全部成功",
+        "# TYPE hy2_stats_up gauge",
+        f"hy2_stats_up {0 if snapshot['errors'] else 1}",
+        "# HELP hy2_stats_poll_failures_total 采集失败次数",
+        "# TYPE hy2_stats_poll_failures_total counter",
+        f"hy2_stats_poll_failures_total {snapshot['failures']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def serve_metrics(collector, listen):
+    """
+    启动 Prometheus 指标 HTTP 服务 (GET /metrics)
+
+    采集由 collector 的后台线程完成，请求只读取最近的快照。
+
+    Args:
+        collector: 已启动的 MetricsCollector
+        listen: 监听地址 host:port
+
+    Returns:
+        ThreadingHTTPServer，调用方负责 serve_forever / shutdown
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus(collector.snapshot()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    host, port = str(listen).rsplit(":", 1)
+    return ThreadingHTTPServer((host.strip("[]") or "0.0.0.0", int(port)), Handler)
+
+
+def watch(collector, interval=None, limit=None):
+    """
+    持续刷新的 top 视图，Ctrl+C 退出
+
+    Args:
+        collector: MetricsCollector
+        interval: 刷新间隔（秒）
+        limit: 最多显示的用户数
+    """
+    import sys
+    from .config import STATS_INTERVAL
+    from .utils.output import yellow
+
+    interval = interval or STATS_INTERVAL
+    try:
+        while True:
+            snapshot = collector.poll()
+            sys.stdout.write("\033[H\033[2J")
+            yellow(f"Hysteria 2 流量统计  (每 {interval} 秒刷新，Ctrl+C 退出)")
+            print(render_top(snapshot, limit))
+            sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print()
+
+
+def show_stats():
+    """菜单: 实时流量统计"""
+    from .utils.output import red
+
+    clients = stats_endpoints()
+    if not clients:
+        red("未启用流量统计 API，可运行 python3 -m hy2 configure --traffic-stats on")
+        return
+    watch(MetricsCollector(clients))
@@ -1,7 +1,21 @@
 """
 系统相关模块
+
+check / firewall / bbr / tuning 中的函数在首次访问时才导入。
 """
 
-from .check import *
-from .firewall import *
-from .bbr import *
+import importlib
+
+_MODULES = (".bbr", ".firewall", ".check", ".tuning")
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    for module_name in _MODULES:
+        module = importlib.import_module(module_name, __name__)
+        if hasattr(module, name):
+            value = getattr(module, name)
+            globals()[name] = value
+            return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
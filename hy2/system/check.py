@@ -45,6 +45,6 @@ def install_dependencies():
     green("正在安装依赖包...")
     run_cmd(
         "DEBIAN_FRONTEND=noninteractive apt-get install -y "
-        "curl wget qrencode openssl socat cron",
+        "curl wget socat cron",
         check=False
     )
@@ -1,45 +1,622 @@
 """
 防火墙配置模块
+
+按当前部署计算期望的规则集 (开放的 UDP 端口、端口跳跃 NAT 映射)，与各后端中
+本工具拥有的现有规则比较，只应用差异，并清理不再需要的规则:
+
+    ufw        开放端口，规则带注释 hy2 用于识别
+    firewalld  开放端口，一次 --permanent 命令和一次运行时命令完成全部增删，不做 --reload
+    nftables   inet hy2 表 (开放端口集合 + 端口跳跃 map)，一次 nft -f 事务整体替换
+    iptables   HY2_INPUT / HY2_HOP 自定义链，每个地址族一次 iptables-restore --noflush
+
+有 ufw 或 firewalld 时由它们开放端口，否则由 nftables (优先) 或 iptables 开放。
+端口跳跃 NAT 总是由 nftables 或 iptables 负责: 服务端二进制不处理配置中的 hopPorts，
+客户端发往跳跃范围的数据包需要由内核转到实际监听的端口。整个范围只用一条规则，
+匹配开销与范围大小无关。nftables/iptables 规则保存在 CONFIG_DIR，由 hy2-firewall
+服务开机时恢复；ufw 和 firewalld 的规则由它们自身持久化。
 """
 
+import re
+import abc
+import json
+import time
+import shutil
+import subprocess
+
 from ..utils.output import yellow, green, red
 from ..utils.helpers import run_cmd
 
 
-def setup_firewall(port, hop_ports=None):
+class FirewallError(Exception):
+    """防火墙规则应用失败"""
+
+
+# ============ 规则集 ============
+
+def _interval(spec):
+    start, _, end = str(spec).replace("-", ":").partition(":")
+    return int(start), int(end or start)
+
+
+def _spec(start, end):
+    return str(start) if start == end else f"{start}:{end}"
+
+
+def merge_ports(specs):
+    """
+    合并端口和端口范围 (重叠或相邻的合为一个)
+
+    Args:
+        specs: "443"、"20000:30000" 或 "20000-30000" 形式的字符串
+
+    Returns:
+        frozenset: "443" / "20000:30000" 形式
+    """
+    merged = []
+    for start, end in sorted(_interval(s) for s in specs):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return frozenset(_spec(start, end) for start, end in merged)
+
+
+def ruleset(open_ports=(), hop=()):
+    """
+    规则集: {"open": 开放的 UDP 端口, "hop": ((起始端口, 结束端口, 目标端口), ...)}
+    """
+    return {"open": merge_ports(open_ports), "hop": tuple(sorted(set(hop)))}
+
+
+def desired_ports(port, hop_ports):
+    """需要开放的端口: 主端口、端口跳跃范围，以及多实例模式下各实例的端口"""
+    from ..instances import load_manifest
+
+    specs = [str(port)]
+    if hop_ports:
+        specs.append(str(hop_ports))
+    specs += [str(inst["port"]) for inst in (load_manifest() or {}).get("instances", [])]
+    return merge_ports(specs)
+
+
+def hop_mappings(port, hop_ports, active=True):
     """
-    配置防火墙开放端口
+    端口跳跃范围到监听端口的映射
+
+    多实例模式下每个实例的跳跃子范围转到该实例的端口。平滑重启切换到槽位 b 时
+    转到槽位 b 的端口: 一个连接只做一次 NAT，转到主端口后不会再经过主端口的 REDIRECT。
 
     Args:
         port: 主端口
-        hop_ports: 端口跳跃范围 (格式: "start:end")
+        hop_ports: 端口跳跃范围 "start:end"
+        active: 是否按当前运行的槽位；False 时为开机后的状态 (槽位 a)
+
+    Returns:
+        list: [(起始端口, 结束端口, 目标端口)]
     """
-    yellow("正在配置防火墙...")
+    from ..instances import load_manifest
+    from ..rollout import load_settings
 
-    # ufw
-    if run_cmd("which ufw", capture=True, check=False):
-        yellow("检测到 ufw，正在添加规则...")
-        run_cmd(f"ufw allow {port}/udp", check=False)
-        green(f"已开放端口: {port}/udp")
-        if hop_ports:
-            run_cmd(f"ufw allow {hop_ports}/udp", check=False)
-            green(f"已开放端口范围: {hop_ports}/udp")
-        green("ufw 防火墙规则已添加!")
+    manifest = load_manifest()
+    if manifest and manifest.get("hop_ports"):
+        return [(*_interval(inst["hop_ports"]), inst["port"])
+                for inst in manifest["instances"] if inst["hop_ports"]]
+    redirect = load_settings().get("redirect") if active else None
+    target = redirect[1] if redirect and redirect[0] == port else port
+    return [(*_interval(hop_ports), target)]
+
+
+def _run(command, stdin=None):
+    result = subprocess.run(command, shell=True, input=stdin, capture_output=True, text=True)
+    return result.returncode, result.stdout, result.stderr.strip()
+
+
+def _check(command, stdin=None, label=None):
+    code, _, error = _run(command, stdin)
+    if code != 0:
+        raise FirewallError(f"{label or command.split()[0]}: {error or '执行失败'}")
+
+
+def state_path():
+    """记录本工具在 firewalld 中开放的端口 (firewalld 的端口不能附带注释)"""
+    from ..config import CONFIG_DIR
+    return CONFIG_DIR / "firewall.json"
+
+
+def _load_state():
+    try:
+        return json.loads(state_path().read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(**values):
+    from ..utils.helpers import write_atomic
+
+    state = _load_state()
+    state.update(values)
+    write_atomic(state_path(), json.dumps(state, indent=2))
+
+
+# ============ 后端 ============
+
+class Backend(abc.ABC):
+    """
+    防火墙后端
+
+    live() 读取本工具拥有的现有规则，apply() 把差异一次性应用到系统。
+    """
+
+    name = None
+    tool = None
+    # 是否支持端口跳跃 NAT (同时需要写入开机恢复的规则文件)
+    nat = False
+
+    def available(self):
+        return bool(shutil.which(self.tool))
+
+    @abc.abstractmethod
+    def live(self):
+        """
+        Returns:
+            dict: ruleset()
+        """
+
+    @abc.abstractmethod
+    def apply(self, desired, live):
+        """
+        Returns:
+            int: 执行的命令数
+
+        Raises:
+            FirewallError
+        """
+
+
+class Ufw(Backend):
+    """ufw: 没有批量接口，只对差异逐条执行"""
+
+    name = tool = "ufw"
+
+    def live(self):
+        from ..config import FIREWALL_COMMENT
+
+        output = run_cmd("ufw show added", capture=True, check=False) or ""
+        pattern = re.compile(rf"^ufw allow (\S+)/udp comment '{re.escape(FIREWALL_COMMENT)}'$")
+        return ruleset(m.group(1) for m in map(pattern.match, output.splitlines()) if m)
+
+    def apply(self, desired, live):
+        from ..config import FIREWALL_COMMENT
+
+        commands = [f"ufw allow {spec}/udp comment '{FIREWALL_COMMENT}'"
+                    for spec in sorted(desired["open"] - live["open"])]
+        commands += [f"ufw delete allow {spec}/udp" for spec in sorted(live["open"] - desired["open"])]
+        for command in commands:
+            _check(command)
+        return len(commands)
+
+
+class Firewalld(Backend):
+    """firewalld: 永久配置和运行时配置各一条命令，避免 --reload 重建整个规则集"""
+
+    name = "firewalld"
+    tool = "firewall-cmd"
+
+    def __init__(self):
+        self.present = set()
+
+    def live(self):
+        output = run_cmd("firewall-cmd --list-ports", capture=True, check=False) or ""
+        self.present = {_spec(*_interval(p[:-4])) for p in output.split() if p.endswith("/udp")}
+        return ruleset(self.present & set(_load_state().get("firewalld", [])))
+
+    def apply(self, desired, live):
+        # 已由他人开放的端口不重复添加，也不记为本工具所有
+        added = desired["open"] - self.present
+        removed = live["open"] - desired["open"]
+        flags = [f"--add-port={spec.replace(':', '-')}/udp" for spec in sorted(added)]
+        flags += [f"--remove-port={spec.replace(':', '-')}/udp" for spec in sorted(removed)]
+        if flags:
+            _check(f"firewall-cmd --permanent {' '.join(flags)}")
+            _check(f"firewall-cmd {' '.join(flags)}")
+        _save_state(firewalld=sorted((live["open"] - removed) | added))
+        return 2 if flags else 0
+
+
+class Nftables(Backend):
+    """nftables: inet hy2 表，在一个事务中整体替换"""
+
+    name = "nftables"
+    tool = "nft"
+    nat = True
+
+    def live(self):
+        from ..config import FIREWALL_TABLE
+
+        code, output, _ = _run(f"nft list table inet {FIREWALL_TABLE}")
+        if code != 0:
+            return ruleset()
+        open_ports = hop = ()
+        if "chain input" in output:
+            open_ports = [e for e in _nft_elements(output, "set open_ports").split(",") if e.strip()]
+        if "chain prerouting" in output:
+            hop = [(*_interval(key), int(target)) for key, _, target in
+                   (e.partition(":") for e in _nft_elements(output, "map hop_ports").split(","))
+                   if target.strip()]
+        return ruleset((e.strip() for e in open_ports), hop)
+
+    def apply(self, desired, live):
+        _check("nft -f -", render_nft(desired))
+        return 1
+
+    def render(self, rules):
+        return render_nft(rules)
+
+
+class Iptables(Backend):
+    """iptables: 自定义链，每个地址族一次 iptables-restore --noflush (IPv6 失败时忽略)"""
+
+    name = "iptables"
+    tool = "iptables-restore"
+    nat = True
+
+    def live(self):
+        from ..config import FIREWALL_INPUT_CHAIN, FIREWALL_HOP_CHAIN
+
+        saved = "\n".join(_run(f"iptables-save -t {table}")[1] for table in ("filter", "nat"))
+        lines = saved.splitlines()
+        open_ports, hop = [], []
+        if f"-A INPUT -j {FIREWALL_INPUT_CHAIN}" in lines:
+            pattern = re.compile(rf"^-A {FIREWALL_INPUT_CHAIN} .*--dport (\S+) -j ACCEPT$")
+            open_ports = [m.group(1) for m in map(pattern.match, lines) if m]
+        if f"-A PREROUTING -p udp -j {FIREWALL_HOP_CHAIN}" in lines:
+            pattern = re.compile(rf"^-A {FIREWALL_HOP_CHAIN} .*--dport (\S+) -j REDIRECT --to-ports (\d+)$")
+            hop = [(*_interval(m.group(1)), int(m.group(2))) for m in map(pattern.match, lines) if m]
+        return ruleset(open_ports, hop)
+
+    def apply(self, desired, live):
+        commands = 0
+        for tool in ("iptables", "ip6tables"):
+            try:
+                _check(f"{tool}-restore --noflush", render_iptables(desired))
+                _check(" ; ".join(iptables_jump_commands(tool, desired)), label=tool)
+                commands += 2
+            except FirewallError:
+                # 没有 IPv6 时 ip6tables 失败不影响 IPv4
+                if tool == "iptables":
+                    raise
+        return commands
+
+    def render(self, rules):
+        return render_iptables(rules)
+
+
+def _nft_elements(output, header):
+    """nft list 输出中某个集合或 map 的元素文本 (不含花括号)"""
+    lines = output.splitlines()
+    for i, line in enumerate(lines):
+        if line.strip() == f"{header} {{":
+            block = []
+            for inner in lines[i + 1:]:
+                if inner.strip() == "}":
+                    break
+                block.append(inner)
+            match = re.search(r"elements = \{(.*?)\}", "\n".join(block), re.S)
+            return match.group(1) if match else ""
+    return ""
+
+
+# ============ 规则文本 ============
+
+def render_nft(rules):
+    """
+    nftables 规则 (nft -f): 在一个事务中整体替换 inet 表，规则集为空时只删除该表
+
+    input 链的 accept 只对本表生效，其他表中的 drop 仍然有效，因此有 ufw/firewalld 时
+    由它们开放端口。
+
+    Returns:
+        str
+    """
+    from ..config import FIREWALL_TABLE
+
+    # 先声明再删除，表不存在时 delete 也不会失败
+    lines = [f"table inet {FIREWALL_TABLE}", f"delete table inet {FIREWALL_TABLE}"]
+    if not (rules["open"] or rules["hop"]):
+        return "\n".join(lines) + "\n"
+    lines.append(f"table inet {FIREWALL_TABLE} {{")
+    if rules["open"]:
+        elements = ", ".join(s.replace(":", "-") for s in sorted(rules["open"], key=_interval))
+        lines += [
+            "    set open_ports {",
+            "        type inet_service",
+            "        flags interval",
+            f"        elements = {{ {elements} }}",
+            "    }",
+            "",
+            "    chain input {",
+            "        type filter hook input priority 0; policy accept;",
+            "        udp dport @open_ports accept",
+            "    }",
+        ]
+    if rules["hop"]:
+        elements = ", ".join(f"{_spec(start, end).replace(':', '-')} : {target}"
+                             for start, end, target in rules["hop"])
+        if rules["open"]:
+            lines.append("")
+        lines += [
+            "    map hop_ports {",
+            "        type inet_service : inet_service",
+            "        flags interval",
+            f"        elements = {{ {elements} }}",
+            "    }",
+            "",
+            "    chain prerouting {",
+            "        type nat hook prerouting priority -100; policy accept;",
+            "        redirect to :udp dport map @hop_ports",
+            "    }",
+        ]
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def render_iptables(rules):
+    """
+    iptables-restore --noflush 的输入: 重建两条自定义链 (声明已存在的链会将其清空)
+
+    IPv4 和 IPv6 使用相同内容，内置链到自定义链的跳转由 iptables_jump_commands 维护。
+
+    Returns:
+        str
+    """
+    from ..config import FIREWALL_INPUT_CHAIN, FIREWALL_HOP_CHAIN
+
+    lines = ["*filter", f":{FIREWALL_INPUT_CHAIN} - [0:0]"]
+    lines += [f"-A {FIREWALL_INPUT_CHAIN} -p udp -m udp --dport {spec} -j ACCEPT"
+              for spec in sorted(rules["open"], key=_interval)]
+    lines += ["COMMIT", "*nat", f":{FIREWALL_HOP_CHAIN} - [0:0]"]
+    lines += [f"-A {FIREWALL_HOP_CHAIN} -p udp -m udp --dport {start}:{end} -j REDIRECT --to-ports {target}"
+              for start, end, target in rules["hop"]]
+    lines.append("COMMIT")
+    return "\n".join(lines) + "\n"
+
+
+def iptables_jump_commands(tool, rules):
+    """
+    内置链到自定义链的跳转: 有规则时添加 (已存在则跳过)，没有规则时删除跳转和空链
+
+    Returns:
+        list: shell 命令
+    """
+    from ..config import FIREWALL_INPUT_CHAIN, FIREWALL_HOP_CHAIN
+
+    commands = []
+    for table, jump, chain, needed in (
+            ("filter", f"INPUT -j {FIREWALL_INPUT_CHAIN}", FIREWALL_INPUT_CHAIN, rules["open"]),
+            ("nat", f"PREROUTING -p udp -j {FIREWALL_HOP_CHAIN}", FIREWALL_HOP_CHAIN, rules["hop"])):
+        if needed:
+            commands.append(f"{{ {tool} -t {table} -C {jump} 2>/dev/null || {tool} -t {table} -I {jump}; }}")
+        else:
+            commands.append(f"{{ while {tool} -t {table} -D {jump} 2>/dev/null; do :; done; "
+                            f"{tool} -t {table} -X {chain} 2>/dev/null; true; }}")
+    return commands
+
+
+# ============ 开机恢复 ============
+
+def rules_path(backend):
+    """开机恢复用的规则文件"""
+    from ..config import CONFIG_DIR
+    return CONFIG_DIR / ("firewall.nft" if backend == "nftables" else "firewall.rules")
+
+
+def render_service_unit(backend, rules):
+    """开机恢复规则的 systemd 单元 (在发行版自带的防火墙服务之后、hysteria-server 之前运行)"""
+    from ..config import SERVICE_NAME
+
+    path = rules_path(backend)
+    if backend == "nftables":
+        commands = [f"ExecStart={shutil.which('nft') or '/usr/sbin/nft'} -f {path}"]
+    else:
+        commands = []
+        for tool in ("iptables", "ip6tables"):
+            restore = shutil.which(f"{tool}-restore") or f"/usr/sbin/{tool}-restore"
+            jumps = " ; ".join(iptables_jump_commands(tool, rules))
+            # 没有 IPv6 时 ip6tables 失败不影响启动
+            prefix = "-" if tool == "ip6tables" else ""
+            commands.append(f"ExecStart={prefix}/bin/sh -c '{restore} --noflush < {path} && {jumps}'")
+    exec_lines = "\n".join(commands)
+    return f"""[Unit]
+Description=Hysteria 2 firewall rules
+Wants=network-pre.target
+After=network-pre.target nftables.service netfilter-persistent.service firewalld.service ufw.service
+Before={SERVICE_NAME}.service
+
+[Service]
+Type=oneshot
+RemainAfterExit=yes
+{exec_lines}
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+
+def _persist(backend, rules):
+    """写入开机恢复的规则文件和服务；规则集为空时删除。内容未变时不重载 systemd"""
+    from ..config import FIREWALL_SERVICE_FILE, FIREWALL_SERVICE_NAME
+    from ..utils.helpers import write_atomic
+
+    path = rules_path(backend)
+    if not (rules["open"] or rules["hop"]):
+        path.unlink(missing_ok=True)
+        if not any(rules_path(b).exists() for b in ("nftables", "iptables")) \
+                and FIREWALL_SERVICE_FILE.exists():
+            run_cmd(f"systemctl disable {FIREWALL_SERVICE_NAME}", check=False)
+            FIREWALL_SERVICE_FILE.unlink(missing_ok=True)
+            run_cmd("systemctl daemon-reload", check=False)
+        return
+    content = backend_class(backend)().render(rules)
+    unit = render_service_unit(backend, rules)
+    try:
+        unchanged = path.read_text() == content and FIREWALL_SERVICE_FILE.read_text() == unit
+    except OSError:
+        unchanged = False
+    if unchanged:
         return
+    write_atomic(path, content)
+    write_atomic(FIREWALL_SERVICE_FILE, unit)
+    run_cmd("systemctl daemon-reload", check=False)
+    run_cmd(f"systemctl enable {FIREWALL_SERVICE_NAME}", check=False)
+
+
+# ============ 同步 ============
+
+BACKENDS = (Ufw, Firewalld, Nftables, Iptables)
 
-    # firewalld
-    if run_cmd("which firewall-cmd", capture=True, check=False):
-        yellow("检测到 firewalld，正在添加规则...")
-        run_cmd(f"firewall-cmd --permanent --add-port={port}/udp", check=False)
-        green(f"已开放端口: {port}/udp")
+
+def backend_class(name):
+    return next(cls for cls in BACKENDS if cls.name == name)
+
+
+def select_backends():
+    """
+    选择后端
+
+    Returns:
+        tuple: (开放端口的 ufw/firewalld 后端或 None, nftables/iptables 后端或 None)
+    """
+    front = next((cls() for cls in (Ufw, Firewalld) if cls().available()), None)
+    native = next((cls() for cls in (Nftables, Iptables) if cls().available()), None)
+    return front, native
+
+
+def _apply(backend, desired, boot=None):
+    """
+    比较并应用一个后端的规则
+
+    Returns:
+        dict: {"backend", "added", "removed", "commands", "ms"}
+    """
+    start = time.perf_counter()
+    live = backend.live()
+    commands = 0 if live == desired else backend.apply(desired, live)
+    if backend.nat:
+        _persist(backend.name, desired if boot is None else boot)
+    added = len(desired["open"] - live["open"]) + len(set(desired["hop"]) - set(live["hop"]))
+    removed = len(live["open"] - desired["open"]) + len(set(live["hop"]) - set(desired["hop"]))
+    return {"backend": backend.name, "added": added, "removed": removed,
+            "commands": commands, "ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+def sync_firewall(port=None, hop_ports=None, open_ports=True):
+    """
+    按当前部署同步防火墙规则: 计算期望规则集，与现有规则比较后批量应用差异
+
+    Args:
+        port: 主端口，为 None 时读取 config.yaml (同时读取其中的 hop_ports)
+        hop_ports: 端口跳跃范围，为空时删除 NAT 规则
+        open_ports: 是否管理开放端口；False 时只更新端口跳跃 NAT，已开放的端口保持不变
+
+    Returns:
+        dict: {"backends": [各后端的增删数、命令数和耗时], "open": 开放端口的后端, "nat": NAT 后端,
+               "ms": 总耗时}
+
+    Raises:
+        FirewallError: 规则应用失败，或需要端口跳跃 NAT 但没有 nft / iptables-restore
+    """
+    start = time.perf_counter()
+    if port is None:
+        from ..server_config import ServerConfig
+        config = ServerConfig.load()
+        port, hop_ports = config.port, config.hop_ports
+    ports = desired_ports(port, hop_ports)
+    hop = hop_mappings(port, hop_ports) if hop_ports else ()
+    boot_hop = hop_mappings(port, hop_ports, active=False) if hop_ports else ()
+
+    front, native = select_backends()
+    if hop and native is None:
+        raise FirewallError("未找到 nft 或 iptables-restore，无法转发端口跳跃范围")
+    reports = []
+    if front and open_ports:
+        reports.append(_apply(front, ruleset(ports)))
+    if native:
+        if open_ports:
+            native_ports = () if front else ports
+        else:
+            native_ports = native.live()["open"]
+        try:
+            reports.append(_apply(native, ruleset(native_ports, hop), ruleset(native_ports, boot_hop)))
+        except FirewallError:
+            # 内核不支持 inet nat 等情况下改用 iptables
+            if not isinstance(native, Nftables) or not Iptables().available():
+                raise
+            native = Iptables()
+            reports.append(_apply(native, ruleset(native_ports, hop), ruleset(native_ports, boot_hop)))
+        # 切换工具后另一个后端中残留的本工具规则
+        for cls in (Nftables, Iptables):
+            other = cls()
+            if not isinstance(native, cls) and other.available() and other.live() != ruleset():
+                reports.append(_apply(other, ruleset()))
+
+    return {
+        "backends": reports,
+        "open": (front or native).name if open_ports and (front or native) else None,
+        "nat": native.name if hop else None,
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def remove_rules():
+    """删除本工具在各后端中的全部规则、规则文件和开机恢复服务 (卸载时调用)"""
+    for cls in BACKENDS:
+        backend = cls()
+        if backend.available():
+            try:
+                _apply(backend, ruleset())
+            except FirewallError:
+                pass
+    state_path().unlink(missing_ok=True)
+
+
+def format_report(report):
+    """同步结果的输出行"""
+    return [f"{r['backend']}: 新增 {r['added']} 条，删除 {r['removed']} 条 "
+            f"({r['commands']} 条命令，{r['ms']} ms)" for r in report["backends"]]
+
+
+def setup_firewall(port, hop_ports=None, open_ports=True):
+    """
+    配置防火墙开放端口，并安装 (hop_ports 为空时删除) 端口跳跃 NAT 规则
+
+    Args:
+        port: 主端口
+        hop_ports: 端口跳跃范围 (格式: "start:end")
+        open_ports: 是否管理开放端口
+
+    Returns:
+        dict: sync_firewall 的结果，失败时为 None
+    """
+    yellow("正在配置防火墙...")
+    try:
+        report = sync_firewall(port, hop_ports, open_ports)
+    except FirewallError as e:
+        red(f"防火墙规则应用失败: {e}")
         if hop_ports:
-            run_cmd(f"firewall-cmd --permanent --add-port={hop_ports}/udp", check=False)
-            green(f"已开放端口范围: {hop_ports}/udp")
-        run_cmd("firewall-cmd --reload", check=False)
-        green("firewalld 防火墙规则已添加!")
-        return
+            red(f"请手动将 {hop_ports}/udp 转发到 {port}/udp")
+        return None
+    for line in format_report(report):
+        green(line)
+    if report["nat"]:
+        green(f"端口跳跃 {hop_ports}/udp 已转发到 {port}/udp ({report['nat']})")
+    if open_ports and report["open"] is None:
+        yellow("未检测到 ufw、firewalld、nftables 或 iptables")
+        red(f"请手动开放端口: {port}/udp")
+        if hop_ports:
+            red(f"请手动开放端口范围: {hop_ports}/udp")
+    return report
 
-    yellow("未检测到 ufw 或 firewalld")
-    red(f"请手动开放端口: {port}/udp")
-    if hop_ports:
-        red(f"请手动开放端口范围: {hop_ports}/udp")
+
+def setup_hop_nat(port, hop_ports):
+    """只更新端口跳跃 NAT 规则 (不修改开放端口)"""
+    return setup_firewall(port, hop_ports, open_ports=False)
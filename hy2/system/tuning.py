@@ -0,0 +1,421 @@
+"""
+内核网络调优模块 - 面向 QUIC/UDP 的 sysctl 配置档
+
+Hysteria 2 基于 QUIC (UDP)，BBR 只影响 TCP。内核默认的 rmem_max / wmem_max
+(约 208 KB) 会限制 quic-go 的接收缓冲区并在日志中产生警告。
+本模块按配置档设置 UDP 缓冲区上限、网卡积压队列、busy-poll、GRO/GSO 和
+conntrack 上限 (端口跳跃会为每个客户端产生大量 UDP 连接跟踪条目)，
+数值按内存大小和网卡速率缩放。
+
+- 应用是幂等的: 只写入与当前值不同的项，上限类参数不会被调低；
+- 首次修改某项前记录原值，rollback 时恢复并删除持久化文件；
+- 所有路径都相对 root，测试时可指向伪造的 /proc/sys 目录树。
+"""
+
+import json
+from pathlib import Path
+
+from ..config import TUNING_CONFIG_FILE, TUNING_BACKUP_FILE
+
+# 配置档: 缓冲区上限 (字节)、积压队列、busy-poll (微秒)、conntrack 基准
+PROFILES = {
+    "low-memory": {
+        "description": "低内存 VPS (<1 GB)",
+        "buffer": 8 * 1024 * 1024,
+        "backlog": 4096,
+        "busy_poll": 0,
+        "conntrack": 65536,
+    },
+    "1g": {
+        "description": "1 Gbps 网卡",
+        "buffer": 16 * 1024 * 1024,
+        "backlog": 16384,
+        "busy_poll": 0,
+        "conntrack": 262144,
+    },
+    "10g": {
+        "description": "10 Gbps 网卡",
+        "buffer": 64 * 1024 * 1024,
+        "backlog": 65536,
+        "busy_poll": 50,
+        "conntrack": 1048576,
+    },
+}
+
+# quic-go 期望的最小接收缓冲区 (7 MB)，低于此值会输出警告
+QUIC_MIN_BUFFER = 7 * 1024 * 1024
+
+# 只允许调高的参数 (当前值更大时保留)
+CEILING_KEYS = (
+    "net.core.rmem_max",
+    "net.core.wmem_max",
+    "net.core.netdev_max_backlog",
+    "net.ipv4.udp_mem",
+    "net.netfilter.nf_conntrack_max",
+)
+
+# 需要开启的网卡特性: ethtool -k 中的名称 -> ethtool -K 中的名称
+NIC_FEATURES = {
+    "generic-receive-offload": "gro",
+    "generic-segmentation-offload": "gso",
+    "tx-udp-segmentation": "tx-udp-segmentation",
+}
+
+
+# ============ 读取系统信息 ============
+
+def _path(root, absolute):
+    return Path(root) / str(absolute).lstrip("/")
+
+
+def sysctl_path(key, root="/"):
+    """sysctl 名称对应的 /proc/sys 文件"""
+    return _path(root, "/proc/sys") / key.replace(".", "/")
+
+
+def read_sysctl(key, root="/"):
+    """
+    读取 sysctl 当前值
+
+    Returns:
+        str: 以单个空格分隔的值，不存在时返回 None
+    """
+    try:
+        return " ".join(sysctl_path(key, root).read_text().split())
+    except OSError:
+        return None
+
+
+def write_sysctl(key, value, root="/"):
+    """写入 sysctl (等同于 sysctl -w)"""
+    sysctl_path(key, root).write_text(f"{value}\n")
+
+
+def detect_memory(root="/"):
+    """
+    物理内存大小
+
+    Returns:
+        int: 字节数，无法读取时返回 0
+    """
+    try:
+        for line in _path(root, "/proc/meminfo").read_text().splitlines():
+            if line.startswith("MemTotal:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def default_interface(root="/"):
+    """默认路由所在的网卡名，无默认路由时返回 None"""
+    try:
+        lines = _path(root, "/proc/net/route").read_text().splitlines()[1:]
+    except OSError:
+        return None
+    for line in lines:
+        fields = line.split()
+        if len(fields) > 1 and fields[1] == "00000000":
+            return fields[0]
+    return None
+
+
+def detect_nic_speed(interface, root="/"):
+    """
+    网卡速率
+
+    Returns:
+        int: Mbps，虚拟网卡等无法读取时返回 0
+    """
+    if not interface:
+        return 0
+    try:
+        speed = int(_path(root, f"/sys/class/net/{interface}/speed").read_text().strip())
+    except (OSError, ValueError):
+        return 0
+    return max(speed, 0)
+
+
+def select_profile(memory, speed):
+    """
+    按内存和网卡速率自动选择配置档
+
+    Args:
+        memory: 内存字节数
+        speed: 网卡速率 Mbps (0 表示未知)
+
+    Returns:
+        str: 配置档名称
+    """
+    if memory and memory < 1024 ** 3:
+        return "low-memory"
+    if speed >= 10000:
+        return "10g"
+    return "1g"
+
+
+# ============ 计算目标值 ============
+
+def build_settings(profile, memory, speed=0):
+    """
+    计算配置档在当前机器上的目标 sysctl 值
+
+    Args:
+        profile: 配置档名称
+        memory: 内存字节数 (0 表示未知，不缩放)
+        speed: 网卡速率 Mbps
+
+    Returns:
+        dict: {sysctl 名称: 值字符串}
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"未知配置档: {profile} (可选: {', '.join(PROFILES)})")
+    spec = PROFILES[profile]
+
+    # 单个 socket 的缓冲区不超过内存的 1/32，但不低于 quic-go 的最低要求
+    buffer = spec["buffer"]
+    if memory:
+        buffer = max(QUIC_MIN_BUFFER, min(buffer, memory // 32))
+
+    backlog = spec["backlog"]
+    if speed >= 25000:
+        backlog *= 2
+
+    settings = {
+        "net.core.rmem_max": buffer,
+        "net.core.wmem_max": buffer,
+        "net.core.netdev_max_backlog": backlog,
+        "net.core.busy_poll": spec["busy_poll"],
+        "net.core.busy_read": spec["busy_poll"],
+    }
+
+    if memory:
+        # UDP 总内存 (页): 压力阈值为内存的 1/16 ~ 1/8 ~ 1/4
+        pages = memory // 4096
+        settings["net.ipv4.udp_mem"] = f"{pages // 16} {pages // 8} {pages // 4}"
+        # 每个 conntrack 条目约 320 字节，最多占用内存的 1/32
+        settings["net.netfilter.nf_conntrack_max"] = min(spec["conntrack"], memory // 320 // 32)
+    else:
+        settings["net.netfilter.nf_conntrack_max"] = spec["conntrack"]
+
+    # 端口跳跃下每个端口都是独立的 UDP 流，缩短超时避免条目堆积
+    settings["net.netfilter.nf_conntrack_udp_timeout"] = 30
+    settings["net.netfilter.nf_conntrack_udp_timeout_stream"] = 120
+    return {key: str(value) for key, value in settings.items()}
+
+
+def _raise_only(current, desired):
+    """逐项取较大值，用于只允许调高的参数"""
+    try:
+        cur = [int(v) for v in current.split()]
+        new = [int(v) for v in desired.split()]
+    except ValueError:
+        return desired
+    if len(cur) != len(new):
+        return desired
+    return " ".join(str(max(c, n)) for c, n in zip(cur, new))
+
+
+def plan_changes(settings, root="/"):
+    """
+    对比目标值与当前值
+
+    Args:
+        settings: build_settings 的结果
+        root: 根目录
+
+    Returns:
+        dict: {"changes": [(名称, 当前值, 目标值)], "unchanged": [名称],
+               "unsupported": [名称]}
+    """
+    result = {"changes": [], "unchanged": [], "unsupported": []}
+    for key, desired in settings.items():
+        current = read_sysctl(key, root)
+        if current is None:
+            result["unsupported"].append(key)
+            continue
+        if key in CEILING_KEYS:
+            desired = _raise_only(current, desired)
+        if current == desired:
+            result["unchanged"].append(key)
+        else:
+            result["changes"].append((key, current, desired))
+    return result
+
+
+def check_buffer_limits(conn_window, root="/"):
+    """
+    检查内核缓冲区限制是否满足 QUIC 配置
+
+    quic-go 会把 UDP socket 缓冲区设为 7 MB，rmem_max / wmem_max 更小时只能得到
+    内核上限；udp_mem 的上限小于一个连接窗口时，大流量下内核会丢弃数据报。
+
+    Args:
+        conn_window: 连接接收窗口 (字节)
+        root: 根目录
+
+    Returns:
+        list: 警告信息，满足时为空
+    """
+    warnings = []
+    for key in ("net.core.rmem_max", "net.core.wmem_max"):
+        value = read_sysctl(key, root)
+        if value and value.isdigit() and int(value) < QUIC_MIN_BUFFER:
+            warnings.append(f"{key} = {value}，小于 quic-go 需要的 {QUIC_MIN_BUFFER} 字节")
+
+    udp_mem = (read_sysctl("net.ipv4.udp_mem", root) or "").split()
+    if len(udp_mem) == 3 and udp_mem[2].isdigit() and int(udp_mem[2]) * 4096 < conn_window:
+        warnings.append(f"net.ipv4.udp_mem 上限 {int(udp_mem[2]) * 4096} 字节，"
+                        f"小于连接接收窗口 {conn_window} 字节")
+    return warnings
+
+
+# ============ 网卡特性 ============
+
+def read_nic_features(interface):
+    """
+    读取网卡 GRO/GSO 特性 (ethtool -k)
+
+    Returns:
+        dict: {ethtool -K 名称: "on"/"off"}，固定不可改的特性不包含在内；
+              没有 ethtool 或读取失败时返回空字典
+    """
+    import subprocess
+
+    try:
+        output = subprocess.run(["ethtool", "-k", interface], capture_output=True,
+                                text=True, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return {}
+    features = {}
+    for line in output.splitlines():
+        name, _, value = line.strip().partition(":")
+        if name in NIC_FEATURES and "[fixed]" not in value:
+            features[NIC_FEATURES[name]] = value.split()[0] if value.split() else "off"
+    return features
+
+
+def set_nic_features(interface, features):
+    """设置网卡特性 (ethtool -K)"""
+    from ..utils.helpers import run_cmd
+    args = " ".join(f"{name} {state}" for name, state in features.items())
+    if args:
+        run_cmd(f"ethtool -K {interface} {args}", check=False)
+
+
+# ============ 应用与回滚 ============
+
+def _load_backup(root):
+    path = _path(root, TUNING_BACKUP_FILE)
+    if not path.exists():
+        return {"sysctl": {}, "nic": {}}
+    return json.loads(path.read_text())
+
+
+def tune(profile="auto", root="/", dry_run=False, nic=True):
+    """
+    应用调优配置档
+
+    Args:
+        profile: 配置档名称或 auto
+        root: 根目录，测试时指向伪造的目录树
+        dry_run: 只计算差异，不写入
+        nic: 是否调整默认网卡的 GRO/GSO (仅 root 为 / 时)
+
+    Returns:
+        dict: 配置档、检测结果和差异
+    """
+    from ..utils.helpers import write_atomic
+
+    memory = detect_memory(root)
+    interface = default_interface(root)
+    speed = detect_nic_speed(interface, root)
+    if profile == "auto":
+        profile = select_profile(memory, speed)
+
+    settings = build_settings(profile, memory, speed)
+    plan = plan_changes(settings, root)
+
+    nic_changes = {}
+    if nic and interface and str(root) == "/":
+        current = read_nic_features(interface)
+        nic_changes = {name: state for name, state in current.items() if state != "on"}
+
+    report = {
+        "profile": profile,
+        "memory_mb": memory // (1024 * 1024),
+        "interface": interface,
+        "speed_mbps": speed,
+        "changes": [{"key": k, "current": c, "desired": d} for k, c, d in plan["changes"]],
+        "unchanged": plan["unchanged"],
+        "unsupported": plan["unsupported"],
+        "nic_features": sorted(nic_changes),
+        "applied": False,
+    }
+    if dry_run:
+        return report
+
+    # 只记录第一次修改前的原值，重复应用不会覆盖
+    backup = _load_backup(root)
+    for key, current, _ in plan["changes"]:
+        backup["sysctl"].setdefault(key, current)
+    if nic_changes:
+        backup["nic"].setdefault(interface, {}).update(
+            {name: state for name, state in nic_changes.items()
+             if name not in backup["nic"].get(interface, {})})
+    write_atomic(_path(root, TUNING_BACKUP_FILE), json.dumps(backup, indent=2))
+
+    for key, _, desired in plan["changes"]:
+        write_sysctl(key, desired, root)
+    if nic_changes:
+        set_nic_features(interface, {name: "on" for name in nic_changes})
+
+    # 持久化所有受支持的目标值 (包括已经满足的)，重启后由 systemd-sysctl 加载
+    persisted = {k: v for k, v in settings.items() if k not in plan["unsupported"]}
+    for key in plan["unchanged"]:
+        persisted[key] = read_sysctl(key, root)
+    lines = [f"# hy2 tuning profile: {profile}"] + [f"{k} = {v}" for k, v in persisted.items()]
+    write_atomic(_path(root, TUNING_CONFIG_FILE), "\n".join(lines) + "\n")
+
+    report["applied"] = True
+    return report
+
+
+def rollback(root="/"):
+    """
+    恢复调优前的值并删除持久化文件
+
+    Returns:
+        dict: {"restored": [(名称, 恢复后的值)], "nic": {网卡: 特性}}
+    """
+    backup = _load_backup(root)
+    restored = []
+    for key, value in backup["sysctl"].items():
+        if read_sysctl(key, root) is not None:
+            write_sysctl(key, value, root)
+            restored.append((key, value))
+    if str(root) == "/":
+        for interface, features in backup["nic"].items():
+            set_nic_features(interface, features)
+
+    _path(root, TUNING_CONFIG_FILE).unlink(missing_ok=True)
+    _path(root, TUNING_BACKUP_FILE).unlink(missing_ok=True)
+    return {"restored": restored, "nic": backup["nic"]}
+
+
+def print_report(report):
+    """以文本形式显示调优结果"""
+    from ..utils.output import green, yellow
+
+    spec = PROFILES[report["profile"]]
+    green(f"配置档: {report['profile']} ({spec['description']})")
+    yellow(f"内存: {report['memory_mb']} MB  网卡: {report['interface'] or '-'}"
+           f" ({report['speed_mbps'] or '未知'} Mbps)")
+    for change in report["changes"]:
+        yellow(f"  {change['key']}: {change['current']} -> {change['desired']}")
+    if report["nic_features"]:
+        yellow(f"  {report['interface']}: 开启 {', '.join(report['nic_features'])}")
+    if not report["changes"] and not report["nic_features"]:
+        green("当前值已满足配置档，无需修改")
+    if report["unsupported"]:
+        yellow(f"内核不支持 (已跳过): {', '.join(report['unsupported'])}")
@@ -0,0 +1,626 @@
+"""
+用户库 - 多用户模式下用户名、密码、流量配额和到期时间的存储
+
+用户库保存在 CONFIG_DIR/users.json，是多用户模式下的数据源；config.yaml 中的
+auth 段由用户库生成 (只包含未过期且未超出配额的用户)。文件格式为紧凑的行数组:
+
+    {"version": 1, "fields": ["name", "password", "quota", "expires", "used"],
+     "users": [["alice", "pwd", 10737418240, 1767139200, 0], ...]}
+
+quota 和 used 为字节数，expires 为 Unix 时间戳，未设置为 null。
+加载后以字典保存，按用户名查找为 O(1)；修改用户只重新生成 config.yaml 的
+auth 段 (见 sync_auth)，其余配置保持原样，不需要解析整个配置文件。
+使用 HTTP 认证后端 (见 authd) 时 auth 段只有后端地址，认证服务直接读取用户库。
+"""
+
+import csv
+import json
+import time
+from pathlib import Path
+
+FIELDS = ("name", "password", "quota", "expires", "used")
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def store_path():
+    """用户库文件路径"""
+    from .config import CONFIG_DIR
+    return CONFIG_DIR / "users.json"
+
+
+def usage_state_path():
+    """配额统计上次读到的各端点流量计数"""
+    from .config import CONFIG_DIR
+    return CONFIG_DIR / "usage-counters.json"
+
+
+# ============ 字段解析 ============
+
+def validate_name(name):
+    """
+    检查用户名: 非空，不含冒号 (客户端 auth 为 "用户名:密码") 和空白字符
+
+    Raises:
+        ValueError: 用户名无效
+    """
+    name = str(name)
+    if not name or ":" in name or any(ch.isspace() or ord(ch) < 0x20 for ch in name):
+        raise ValueError(f"用户名无效 (不能为空，不能包含冒号或空白): {name!r}")
+    return name
+
+
+def parse_size(value):
+    """
+    解析流量配额，如 500M、10G、1.5T 或字节数；空值或 0 表示不限
+
+    Returns:
+        int 或 None
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        size = int(value)
+    else:
+        text = str(value).strip().upper()
+        if text in ("", "NONE", "UNLIMITED"):
+            return None
+        # 10GiB / 10GB / 10G 均按 1024 进制
+        if text.endswith("IB"):
+            text = text[:-2]
+        elif text.endswith("B") and text[-2:-1] in ("K", "M", "G", "T"):
+            text = text[:-1]
+        unit = text[-1] if text[-1:] in _SIZE_UNITS else ""
+        try:
+            size = int(float(text[:-1] if unit else text) * _SIZE_UNITS[unit])
+        except ValueError:
+            raise ValueError(f"无效的流量配额: {value}") from None
+    if size < 0:
+        raise ValueError(f"无效的流量配额: {value}")
+    return size or None
+
+
+def parse_expiry(value, now=None):
+    """
+    解析到期时间: YYYY-MM-DD、YYYY-MM-DDTHH:MM[:SS] (本地时间)、
+    相对时间 +30d / +12h，或 Unix 时间戳；空值表示永不过期
+
+    Returns:
+        int 或 None
+    """
+    from datetime import datetime
+
+    if value is None or isinstance(value, (int, float)):
+        return None if value is None else int(value)
+    text = str(value).strip()
+    if text.lower() in ("", "never", "none"):
+        return None
+    if text.startswith("+") and text[-1:] in ("d", "h") and text[1:-1].isdigit():
+        seconds = int(text[1:-1]) * (86400 if text[-1] == "d" else 3600)
+        return int((now or time.time()) + seconds)
+    if text.isdigit():
+        return int(text)
+    for fmt in ("%Y-%m-%d", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return int(datetime.strptime(text, fmt).timestamp())
+        except ValueError:
+            pass
+    raise ValueError(f"无效的到期时间: {value}")
+
+
+def format_expiry(timestamp):
+    """到期时间戳格式化为本地时间 YYYY-MM-DDTHH:MM:SS，None 返回空字符串"""
+    from datetime import datetime
+
+    if timestamp is None:
+        return ""
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+# ============ 用户库 ============
+
+class UserStore:
+    """
+    用户库: {用户名: {"password", "quota", "expires", "used"}}，保持插入顺序
+
+    第一个用户为主用户，其凭据写入客户端配置和分享链接。
+    """
+
+    def __init__(self, users=None):
+        self.users = dict(users or {})
+
+    @classmethod
+    def load(cls, path=None):
+        """读取用户库，文件不存在时返回空用户库"""
+        path = Path(path or store_path())
+        if not path.exists():
+            return cls()
+        data = json.loads(path.read_text())
+        fields = data.get("fields", FIELDS)
+        users = {}
+        for row in data.get("users", []):
+            record = dict(zip(fields, row))
+            users[record.pop("name")] = {
+                "password": record.get("password"),
+                "quota": record.get("quota"),
+                "expires": record.get("expires"),
+                "used": record.get("used") or 0,
+            }
+        return cls(users)
+
+    @classmethod
+    def from_config(cls, config):
+        """由现有配置创建用户库 (单用户模式的用户命名为 user1)"""
+        users = config.users or {"user1": config.password}
+        return cls({name: _record(pwd) for name, pwd in users.items()})
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        由记录列表创建用户库
+
+        Args:
+            records: [{"name", "password", "quota", "expires"}]，未命名的用户依次命名为 user1、user2 ...
+        """
+        store = cls()
+        store.import_records(
+            {**r, "name": r.get("name") or f"user{i + 1}"} for i, r in enumerate(records))
+        return store
+
+    def save(self, path=None):
+        """原子写入用户库 (权限 600)"""
+        from .utils.helpers import write_atomic
+
+        path = Path(path or store_path())
+        rows = [[name, u["password"], u["quota"], u["expires"], u["used"]]
+                for name, u in self.users.items()]
+        data = {"version": 1, "fields": list(FIELDS), "users": rows}
+        write_atomic(path, json.dumps(data, ensure_ascii=False, separators=(",", ":")), mode=0o600)
+        return path
+
+    def __len__(self):
+        return len(self.users)
+
+    def __contains__(self, name):
+        return name in self.users
+
+    def get(self, name):
+        """按用户名查找，不存在时返回 None"""
+        return self.users.get(name)
+
+    # ============ 修改 ============
+
+    def add(self, name, password=None, quota=None, expires=None):
+        """
+        添加用户
+
+        Raises:
+            ValueError: 用户已存在或字段无效
+
+        Returns:
+            dict: 新用户记录
+        """
+        from .utils.helpers import generate_password
+
+        name = validate_name(name)
+        if name in self.users:
+            raise ValueError(f"用户已存在: {name}")
+        record = _record(password or generate_password(8), quota, expires)
+        self.users[name] = record
+        return record
+
+    def update(self, name, **fields):
+        """
+        修改用户的 password / quota / expires / used
+
+        Raises:
+            KeyError: 用户不存在
+        """
+        record = self.users[name]
+        if fields.get("password"):
+            record["password"] = str(fields["password"])
+        if "quota" in fields:
+            record["quota"] = parse_size(fields["quota"])
+        if "expires" in fields:
+            record["expires"] = parse_expiry(fields["expires"])
+        if "used" in fields:
+            record["used"] = int(fields["used"] or 0)
+        return record
+
+    def remove(self, name):
+        """
+        删除用户
+
+        Raises:
+            KeyError: 用户不存在
+        """
+        del self.users[name]
+
+    def rotate(self, names=None, length=8):
+        """
+        为指定用户 (默认全部) 生成新密码
+
+        Returns:
+            dict: {用户名: 新密码}
+
+        Raises:
+            KeyError: 用户不存在
+        """
+        from .utils.helpers import generate_password
+
+        rotated = {}
+        for name in (self.users if names is None else names):
+            record = self.users[name]
+            record["password"] = rotated[name] = generate_password(length)
+        return rotated
+
+    def import_records(self, records, replace=False, update=False):
+        """
+        批量导入
+
+        Args:
+            records: 可迭代的 {"name", "password", "quota", "expires"}，缺少密码时随机生成
+            replace: 导入前清空用户库
+            update: 已存在的用户覆盖其字段，否则跳过
+
+        Returns:
+            dict: {"added": n, "updated": n, "skipped": n}
+
+        Raises:
+            ValueError: 记录字段无效 (消息包含记录序号)
+        """
+        if replace:
+            self.users = {}
+        counts = {"added": 0, "updated": 0, "skipped": 0}
+        for i, record in enumerate(records, 1):
+            try:
+                name = validate_name(str(record.get("name") or "").strip())
+                fields = {k: record.get(k) for k in ("password", "quota", "expires")
+                          if record.get(k) not in (None, "")}
+                if name in self.users:
+                    if update:
+                        self.update(name, **fields)
+                        counts["updated"] += 1
+                    else:
+                        counts["skipped"] += 1
+                    continue
+                self.add(name, fields.get("password"), fields.get("quota"), fields.get("expires"))
+                counts["added"] += 1
+            except ValueError as e:
+                raise ValueError(f"第 {i} 条记录: {e}") from None
+        return counts
+
+    def export_records(self):
+        """逐条导出 {"name", "password", "quota", "expires", "used"} (expires 为本地时间文本)"""
+        for name, u in self.users.items():
+            yield {"name": name, "password": u["password"], "quota": u["quota"],
+                   "expires": format_expiry(u["expires"]), "used": u["used"]}
+
+    # ============ 状态 ============
+
+    def status(self, name, now=None):
+        """
+        用户状态
+
+        Returns:
+            str: active / expired / over_quota
+        """
+        record = self.users[name]
+        if record["expires"] is not None and record["expires"] <= (now or time.time()):
+            return "expired"
+        if record["quota"] is not None and record["used"] >= record["quota"]:
+            return "over_quota"
+        return "active"
+
+    def active(self, now=None):
+        """可登录的用户 {用户名: 密码} (未过期且未超出配额)"""
+        now = now or time.time()
+        return {name: u["password"] for name, u in self.users.items()
+                if (u["expires"] is None or u["expires"] > now)
+                and (u["quota"] is None or u["used"] < u["quota"])}
+
+    def auth_section(self, now=None):
+        """
+        config.yaml 的 auth 段
+
+        Raises:
+            ValueError: 没有可登录的用户 (Hysteria 要求至少一个)
+        """
+        active = self.active(now)
+        if not active:
+            raise ValueError("没有可登录的用户 (全部已过期或超出配额)")
+        return {"type": "userpass", "userpass": active}
+
+
+def _record(password, quota=None, expires=None):
+    if not password:
+        raise ValueError("密码不能为空")
+    return {"password": str(password), "quota": parse_size(quota),
+            "expires": parse_expiry(expires), "used": 0}
+
+
+# ============ 导入导出 ============
+
+def read_records(path, fmt=None):
+    """
+    读取用户文件
+
+    Args:
+        path: CSV (表头 name,password,quota,expires) 或 JSON (对象数组) 文件，- 表示标准输入
+        fmt: csv / json，默认按扩展名判断 (标准输入默认 csv)
+
+    Returns:
+        list: 记录列表
+    """
+    import io
+    import sys
+
+    if fmt is None:
+        fmt = "json" if str(path).lower().endswith(".json") else "csv"
+    text = sys.stdin.read() if str(path) == "-" else Path(path).read_text(encoding="utf-8-sig")
+    if fmt == "json":
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("users", [])
+        if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+            raise ValueError("JSON 用户文件应为对象数组")
+        return data
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def write_records(records, path, fmt=None):
+    """
+    写出用户文件 (权限 600，包含明文密码)
+
+    Args:
+        records: export_records 的结果
+        path: 目标路径，- 表示标准输出
+        fmt: csv / json，默认按扩展名判断
+    """
+    import io
+    import sys
+    from .utils.helpers import write_atomic
+
+    if fmt is None:
+        fmt = "json" if str(path).lower().endswith(".json") else "csv"
+    if fmt == "json":
+        text = json.dumps(list(records), ensure_ascii=False, indent=1) + "\n"
+    else:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        for record in records:
+            writer.writerow({k: "" if record[k] is None else record[k] for k in FIELDS})
+        text = buffer.getvalue()
+    if str(path) == "-":
+        sys.stdout.write(text)
+    else:
+        write_atomic(path, text, mode=0o600)
+
+
+# ============ 生成配置 ============
+
+def render_auth(auth):
+    """auth 段的 YAML 文本"""
+    from .utils.miniyaml import dumps
+    return dumps({"auth": auth})
+
+
+def _section_span(lines, key):
+    """顶层段 key 在行列表中的范围 (start, end)，不存在时返回 None"""
+    start = next((i for i, line in enumerate(lines)
+                  if line.rstrip() == f"{key}:" or line.startswith(f"{key}: ")), None)
+    if start is None:
+        return None
+    end = start + 1
+    # 段内容为缩进行、空行或顶格的列表项
+    while end < len(lines) and (lines[end][:1] in (" ", "\t", "\n", "\r")
+                                or lines[end].startswith("- ")):
+        end += 1
+    # 段末尾的空行留给下一段
+    while end > start + 1 and not lines[end - 1].strip():
+        end -= 1
+    return start, end
+
+
+def replace_section(text, key, block):
+    """
+    替换 YAML 文本中的一个顶层段，其余内容保持不变
+
+    Args:
+        text: 原 YAML 文本
+        key: 顶层键
+        block: 新的段文本 (包含 "key:" 行，以换行结尾)；段不存在时追加到末尾
+
+    Returns:
+        str
+    """
+    lines = text.splitlines(keepends=True)
+    span = _section_span(lines, key)
+    if span is None:
+        if text and not text.endswith("\n"):
+            text += "\n"
+        return text + block
+    start, end = span
+    return "".join(lines[:start]) + block + "".join(lines[end:])
+
+
+def read_section(text, key):
+    """
+    解析 YAML 文本中的一个顶层段 (不解析整个文件)
+
+    Returns:
+        段的值，不存在时返回 None
+    """
+    from .utils.miniyaml import loads
+
+    lines = text.splitlines(keepends=True)
+    span = _section_span(lines, key)
+    if span is None:
+        return None
+    return (loads("".join(lines[span[0]:span[1]])) or {}).get(key)
+
+
+def auth_backend():
+    """config.yaml 使用的 HTTP 认证后端地址，内联 auth 时返回 None"""
+    from .config import CONFIG_DIR
+
+    path = CONFIG_DIR / "config.yaml"
+    auth = read_section(path.read_text(), "auth") if path.exists() else None
+    if isinstance(auth, dict) and auth.get("type") == "http":
+        return (auth.get("http") or {}).get("url")
+    return None
+
+
+def write_auth(path, block):
+    """
+    将 auth 段写入配置文件，内容未变化时不写
+
+    Returns:
+        bool: 是否写入
+    """
+    from .utils.helpers import write_atomic
+
+    path = Path(path)
+    text = path.read_text()
+    new = replace_section(text, "auth", block)
+    if new == text:
+        return False
+    write_atomic(path, new, mode=path.stat().st_mode & 0o777)
+    return True
+
+
+def sync_auth(store=None, restart=True):
+    """
+    按用户库重新生成 config.yaml (及多实例配置) 的 auth 段
+
+    使用 HTTP 认证后端时配置不含用户，不写入也不重启: 调用方保存用户库后，
+    认证服务会自动重新加载。
+
+    Args:
+        store: UserStore，默认读取用户库
+        restart: auth 变化时是否重启服务 (Hysteria 不会重新读取配置)
+
+    Returns:
+        dict: {"changed": [写入的文件], "active": 可登录用户数, "primary": 主用户}
+
+    Raises:
+        ValueError: 没有可登录的用户
+    """
+    from .config import CONFIG_DIR
+    from .instances import load_manifest, instances_dir
+
+    store = store if store is not None else UserStore.load()
+    if auth_backend():
+        active = store.active()
+        if not active:
+            raise ValueError("没有可登录的用户 (全部已过期或超出配额)")
+        return {"changed": [], "active": len(active), "primary": next(iter(active))}
+    auth = store.auth_section()
+    block = render_auth(auth)
+
+    paths = [CONFIG_DIR / "config.yaml"]
+    manifest = load_manifest()
+    if manifest:
+        paths += [instances_dir() / f"{inst['index']}.yaml" for inst in manifest["instances"]]
+    changed = [str(p) for p in paths if p.exists() and write_auth(p, block)]
+
+    if changed and restart:
+        from .utils.output import green, yellow
+        from .service import restart_service
+        from .rollout import RolloutError, format_report
+
+        try:
+            report = restart_service(on_progress=yellow)
+        except RolloutError as e:
+            raise ValueError(f"平滑重启失败，服务仍在使用旧配置: {e}") from None
+        if report:
+            green(format_report(report))
+        green("服务已重启")
+    return {"changed": changed, "active": len(auth["userpass"]),
+            "primary": next(iter(auth["userpass"]))}
+
+
+def update_primary_password(config, password):
+    """
+    修改配置中主用户密码后同步到用户库 (单用户模式或没有用户库时不处理)
+
+    HTTP 认证后端模式下配置中没有密码，直接修改用户库中第一个可登录的用户。
+
+    Args:
+        config: 修改后的 ServerConfig
+        password: 新密码
+
+    Returns:
+        bool: 用户库是否被修改
+    """
+    if not store_path().exists():
+        return False
+    store = UserStore.load()
+    if config.auth_backend:
+        name = next(iter(store.active()), None)
+    elif config.users:
+        name = next(iter(config.users))
+    else:
+        return False
+    if name not in store:
+        return False
+    store.update(name, password=password)
+    store.save()
+    return True
+
+
+# ============ 配额 ============
+
+def enforce(store=None, clients=None, now=None):
+    """
+    统计用量并停用过期或超出配额的用户
+
+    从流量统计 API 读取各用户的累计流量，与上次读到的计数 (usage_state_path) 相减后
+    累加到用户库的 used 字段；不清零服务端计数，流量监控 (stats.MetricsCollector)
+    同时运行时不受影响。过期或超出配额的用户从 auth 段移除，并断开其现有连接 (/kick)。
+    适合由 cron 或 systemd timer 定期运行。
+
+    Args:
+        store: UserStore，默认读取用户库
+        clients: 流量统计端点，默认 stats_endpoints()
+        now: 当前时间戳
+
+    Returns:
+        dict: {"counted": {用户: 本次字节数}, "disabled": [用户], "errors": [...], ...sync_auth 结果}
+    """
+    from .stats import stats_endpoints, StatsError, CounterDeltas
+    from .utils.helpers import write_atomic
+
+    store = store if store is not None else UserStore.load()
+    clients = stats_endpoints() if clients is None else clients
+    state_file = usage_state_path()
+    try:
+        deltas = CounterDeltas(json.loads(state_file.read_text()))
+    except (OSError, ValueError):
+        deltas = CounterDeltas()
+    counted, errors = {}, []
+    for client in clients:
+        try:
+            traffic = client.traffic()
+        except StatsError as e:
+            errors.append(str(e))
+            continue
+        for name, (tx, rx) in deltas.update(client.name, traffic).items():
+            if name in store and tx + rx:
+                store.users[name]["used"] += tx + rx
+                counted[name] = counted.get(name, 0) + tx + rx
+    store.save()
+    write_atomic(state_file, json.dumps(deltas.state, separators=(",", ":")), mode=0o600)
+
+    now = now or time.time()
+    disabled = [name for name in store.users if store.status(name, now) != "active"]
+    result = sync_auth(store)
+    if disabled:
+        for client in clients:
+            try:
+                client.kick(disabled)
+            except StatsError as e:
+                errors.append(str(e))
+    result.update(counted=counted, disabled=disabled, errors=errors)
+    return result
@@ -1,6 +1,21 @@
 """
 工具函数模块
+
+output / helpers 中的函数在首次访问时才导入。
 """
 
-from .output import *
-from .helpers import *
+import importlib
+
+_MODULES = (".helpers", ".output")
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    for module_name in _MODULES:
+        module = importlib.import_module(module_name, __name__)
+        if hasattr(module, name):
+            value = getattr(module, name)
+            globals()[name] = value
+            return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
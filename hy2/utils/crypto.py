@@ -0,0 +1,450 @@
+"""
+密码学工具 - 纯 Python 实现的 P-256 ECDSA、DER 编码和自签 X.509 证书
+
+仅用于生成证书和签名，不依赖 openssl 或第三方库。
+"""
+
+import hmac
+import base64
+import hashlib
+import secrets
+import ipaddress
+from datetime import datetime, timedelta, timezone
+
+# ============ P-256 (secp256r1) ============
+
+P = 0xffffffff00000001000000000000000000000000ffffffffffffffffffffffff
+A = P - 3
+B = 0x5ac635d8aa3a93e7b3ebbd55769886bc651d06b0cc53b0f63bce3c3e27d2604b
+N = 0xffffffff00000000ffffffffffffffffbce6faada7179e84f3b9cac2fc632551
+G = (0x6b17d1f2e12c4247f8bce6e563a440f277037d812deb33a0f4a13945d898c296,
+     0x4fe342e2fe1a7f9b8ee7eb4a7c0f9e162bce33576b315ececbb6406837bf51f5)
+
+_INFINITY = (0, 1, 0)
+
+
+def _inverse(x, mod):
+    return pow(x, mod - 2, mod)
+
+
+def _double(pt):
+    x, y, z = pt
+    if z == 0 or y == 0:
+        return _INFINITY
+    delta = z * z % P
+    gamma = y * y % P
+    beta = x * gamma % P
+    alpha = 3 * (x - delta) * (x + delta) % P
+    x3 = (alpha * alpha - 8 * beta) % P
+    z3 = ((y + z) * (y + z) - gamma - delta) % P
+    y3 = (alpha * (4 * beta - x3) - 8 * gamma * gamma) % P
+    return x3, y3, z3
+
+
+def _add(p1, p2):
+    if p1[2] == 0:
+        return p2
+    if p2[2] == 0:
+        return p1
+    x1, y1, z1 = p1
+    x2, y2, z2 = p2
+    z1z1 = z1 * z1 % P
+    z2z2 = z2 * z2 % P
+    u1 = x1 * z2z2 % P
+    u2 = x2 * z1z1 % P
+    s1 = y1 * z2 * z2z2 % P
+    s2 = y2 * z1 * z1z1 % P
+    if u1 == u2:
+        return _double(p1) if s1 == s2 else _INFINITY
+    h = (u2 - u1) % P
+    r = (s2 - s1) % P
+    h2 = h * h % P
+    h3 = h * h2 % P
+    u1h2 = u1 * h2 % P
+    x3 = (r * r - h3 - 2 * u1h2) % P
+    y3 = (r * (u1h2 - x3) - s1 * h3) % P
+    z3 = h * z1 * z2 % P
+    return x3, y3, z3
+
+
+def scalar_mult(k, point=G):
+    """
+    椭圆曲线标量乘法
+
+    Args:
+        k: 标量
+        point: 仿射坐标点 (x, y)
+
+    Returns:
+        tuple: 仿射坐标 (x, y)，无穷远点返回 None
+    """
+    result = _INFINITY
+    addend = (point[0], point[1], 1)
+    for bit in bin(k % N)[2:]:
+        result = _double(result)
+        if bit == "1":
+            result = _add(result, addend)
+    x, y, z = result
+    if z == 0:
+        return None
+    zinv = _inverse(z, P)
+    zinv2 = zinv * zinv % P
+    return x * zinv2 % P, y * zinv2 * zinv % P
+
+
+class ECKey:
+    """P-256 私钥"""
+
+    def __init__(self, d=None):
+        self.d = d if d is not None else secrets.randbelow(N - 1) + 1
+        self.public = scalar_mult(self.d)
+
+    def public_bytes(self):
+        """未压缩格式的公钥 (0x04 || X || Y)"""
+        x, y = self.public
+        return b"\x04" + x.to_bytes(32, "big") + y.to_bytes(32, "big")
+
+    def _nonce(self, digest):
+        """RFC 6979 确定性随机数"""
+        x = self.d.to_bytes(32, "big")
+        h = (int.from_bytes(digest, "big") % N).to_bytes(32, "big")
+        v = b"\x01" * 32
+        k = b"\x00" * 32
+        k = hmac.new(k, v + b"\x00" + x + h, hashlib.sha256).digest()
+        v = hmac.new(k, v, hashlib.sha256).digest()
+        k = hmac.new(k, v + b"\x01" + x + h, hashlib.sha256).digest()
+        v = hmac.new(k, v, hashlib.sha256).digest()
+        while True:
+            v = hmac.new(k, v, hashlib.sha256).digest()
+            candidate = int.from_bytes(v, "big")
+            if 1 <= candidate < N:
+                yield candidate
+            k = hmac.new(k, v + b"\x00", hashlib.sha256).digest()
+            v = hmac.new(k, v, hashlib.sha256).digest()
+
+    def sign(self, message):
+        """
+        ECDSA-SHA256 签名
+
+        Args:
+            message: 待签名数据
+
+        Returns:
+            tuple: (r, s)
+        """
+        digest = hashlib.sha256(message).digest()
+        e = int.from_bytes(digest, "big")
+        for k in self._nonce(digest):
+            r = scalar_mult(k)[0] % N
+            if r == 0:
+                continue
+            s = _inverse(k, N) * (e + r * self.d) % N
+            if s != 0:
+                return r, s
+
+    def sign_der(self, message):
+        """返回 DER 编码的签名 (X.509 使用)"""
+        r, s = self.sign(message)
+        return der_sequence(der_integer(r), der_integer(s))
+
+    def sign_raw(self, message):
+        """返回 r || s 格式的签名 (JWS ES256 使用)"""
+        r, s = self.sign(message)
+        return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+
+    def to_pem(self):
+        """SEC1 格式的 PEM 私钥 (EC PRIVATE KEY)"""
+        der = der_sequence(
+            der_integer(1),
+            der_octet_string(self.d.to_bytes(32, "big")),
+            der_explicit(0, der_oid(OID_PRIME256V1)),
+            der_explicit(1, der_bit_string(self.public_bytes())),
+        )
+        return pem_encode("EC PRIVATE KEY", der)
+
+    @classmethod
+    def from_pem(cls, text):
+        """读取 to_pem 写出的 SEC1 私钥"""
+        der = pem_decode(text, "EC PRIVATE KEY")
+        # SEQUENCE { INTEGER 1, OCTET STRING d, ... }，d 固定 32 字节
+        idx = der.index(b"\x04\x20", 2)
+        return cls(int.from_bytes(der[idx + 2:idx + 34], "big"))
+
+
+# ============ DER ============
+
+OID_PRIME256V1 = "1.2.840.10045.3.1.7"
+OID_EC_PUBLIC_KEY = "1.2.840.10045.2.1"
+OID_ECDSA_SHA256 = "1.2.840.10045.4.3.2"
+OID_COMMON_NAME = "2.5.4.3"
+OID_SUBJECT_KEY_ID = "2.5.29.14"
+OID_KEY_USAGE = "2.5.29.15"
+OID_SUBJECT_ALT_NAME = "2.5.29.17"
+OID_BASIC_CONSTRAINTS = "2.5.29.19"
+OID_EXT_KEY_USAGE = "2.5.29.37"
+OID_SERVER_AUTH = "1.3.6.1.5.5.7.3.1"
+# RFC 8737 TLS-ALPN-01 挑战证书中的 acmeIdentifier 扩展
+OID_ACME_IDENTIFIER = "1.3.6.1.5.5.7.1.31"
+# PKCS#9 extensionRequest (CSR 中请求的扩展)
+OID_EXTENSION_REQUEST = "1.2.840.113549.1.9.14"
+
+
+def der_tlv(tag, content):
+    """编码一个 TLV"""
+    length = len(content)
+    if length < 0x80:
+        header = bytes([tag, length])
+    else:
+        size = length.to_bytes((length.bit_length() + 7) // 8, "big")
+        header = bytes([tag, 0x80 | len(size)]) + size
+    return header + content
+
+
+def der_integer(value):
+    size = max(1, (value.bit_length() + 8) // 8)
+    return der_tlv(0x02, value.to_bytes(size, "big"))
+
+
+def der_oid(dotted):
+    parts = [int(p) for p in dotted.split(".")]
+    body = bytearray([parts[0] * 40 + parts[1]])
+    for part in parts[2:]:
+        chunk = [part & 0x7F]
+        part >>= 7
+        while part:
+            chunk.append(0x80 | (part & 0x7F))
+            part >>= 7
+        body.extend(reversed(chunk))
+    return der_tlv(0x06, bytes(body))
+
+
+def der_sequence(*items):
+    return der_tlv(0x30, b"".join(items))
+
+
+def der_set(*items):
+    return der_tlv(0x31, b"".join(items))
+
+
+def der_bit_string(data):
+    return der_tlv(0x03, b"\x00" + data)
+
+
+def der_octet_string(data):
+    return der_tlv(0x04, data)
+
+
+def der_utf8(text):
+    return der_tlv(0x0C, text.encode("utf-8"))
+
+
+def der_boolean(value):
+    return der_tlv(0x01, b"\xff" if value else b"\x00")
+
+
+def der_explicit(number, content):
+    return der_tlv(0xA0 | number, content)
+
+
+def der_time(dt):
+    """UTCTime (1950-2049) 或 GeneralizedTime"""
+    dt = dt.astimezone(timezone.utc)
+    if 1950 <= dt.year < 2050:
+        return der_tlv(0x17, dt.strftime("%y%m%d%H%M%SZ").encode())
+    return der_tlv(0x18, dt.strftime("%Y%m%d%H%M%SZ").encode())
+
+
+def pem_encode(label, der):
+    body = base64.b64encode(der).decode()
+    lines = [body[i:i + 64] for i in range(0, len(body), 64)]
+    return f"-----BEGIN {label}-----\n" + "\n".join(lines) + f"\n-----END {label}-----\n"
+
+
+def pem_decode(text, label):
+    begin = f"-----BEGIN {label}-----"
+    end = f"-----END {label}-----"
+    start = text.index(begin) + len(begin)
+    return base64.b64decode("".join(text[start:text.index(end, start)].split()))
+
+
+def der_read(data, offset=0):
+    """
+    读取 offset 处的一个 TLV
+
+    Returns:
+        tuple: (tag, 内容, 下一个 TLV 的位置)
+
+    Raises:
+        ValueError: 数据不完整
+    """
+    if offset + 2 > len(data):
+        raise ValueError("DER 数据不完整")
+    tag, length = data[offset], data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        length = int.from_bytes(data[offset:offset + size], "big")
+        offset += size
+    end = offset + length
+    if end > len(data):
+        raise ValueError("DER 数据不完整")
+    return tag, data[offset:end], end
+
+
+def der_items(data):
+    """依次读取 data 中的 TLV，返回 [(tag, 内容, 完整编码)]"""
+    items, offset = [], 0
+    while offset < len(data):
+        tag, content, end = der_read(data, offset)
+        items.append((tag, content, data[offset:end]))
+        offset = end
+    return items
+
+
+def _read_time(tag, content):
+    text = content.decode("ascii")
+    if tag == 0x17:
+        # UTCTime: 50-99 为 19xx，00-49 为 20xx
+        year = int(text[:2])
+        text = str(year + (1900 if year >= 50 else 2000)) + text[2:]
+    return datetime.strptime(text, "%Y%m%d%H%M%SZ").replace(tzinfo=timezone.utc)
+
+
+# ============ X.509 ============
+
+def _name(common_name):
+    return der_sequence(der_set(der_sequence(der_oid(OID_COMMON_NAME), der_utf8(common_name))))
+
+
+def _extension(oid, value, critical=False):
+    items = [der_oid(oid)]
+    if critical:
+        items.append(der_boolean(True))
+    items.append(der_octet_string(value))
+    return der_sequence(*items)
+
+
+def _general_names(names):
+    encoded = []
+    for name in names:
+        try:
+            ip = ipaddress.ip_address(name)
+            encoded.append(der_tlv(0x87, ip.packed))
+        except ValueError:
+            encoded.append(der_tlv(0x82, name.encode("idna")))
+    return der_sequence(*encoded)
+
+
+def public_key_info(key):
+    """SubjectPublicKeyInfo 的 DER 编码"""
+    return der_sequence(
+        der_sequence(der_oid(OID_EC_PUBLIC_KEY), der_oid(OID_PRIME256V1)),
+        der_bit_string(key.public_bytes()),
+    )
+
+
+def build_self_signed_cert(key, common_name, sans=None, days=36500, not_before=None, serial=None,
+                           extra_extensions=()):
+    """
+    生成自签 X.509 v3 证书
+
+    Args:
+        key: ECKey 私钥
+        common_name: 证书 CN
+        sans: 附加的 SubjectAltName (域名或 IP)，CN 会自动加入
+        days: 有效期（天）
+        not_before: 生效时间，默认当前时间
+        serial: 序列号，默认随机
+        extra_extensions: 附加的扩展 (已编码，见 acme_identifier_extension)
+
+    Returns:
+        bytes: DER 编码的证书
+    """
+    not_before = (not_before or datetime.now(timezone.utc)).replace(microsecond=0)
+    not_after = not_before + timedelta(days=days)
+    serial = serial or (secrets.randbits(127) | 1)
+
+    names = [common_name] + [s for s in (sans or []) if s != common_name]
+    key_id = hashlib.sha1(key.public_bytes()).digest()
+    extensions = der_sequence(
+        _extension(OID_BASIC_CONSTRAINTS, der_sequence(), critical=True),
+        # digitalSignature
+        _extension(OID_KEY_USAGE, der_tlv(0x03, b"\x07\x80"), critical=True),
+        _extension(OID_EXT_KEY_USAGE, der_sequence(der_oid(OID_SERVER_AUTH))),
+        _extension(OID_SUBJECT_KEY_ID, der_octet_string(key_id)),
+        _extension(OID_SUBJECT_ALT_NAME, _general_names(names)),
+        *extra_extensions,
+    )
+
+    algorithm = der_sequence(der_oid(OID_ECDSA_SHA256))
+    tbs = der_sequence(
+        der_explicit(0, der_integer(2)),
+        der_integer(serial),
+        algorithm,
+        _name(common_name),
+        der_sequence(der_time(not_before), der_time(not_after)),
+        _name(common_name),
+        public_key_info(key),
+        der_explicit(3, extensions),
+    )
+    return der_sequence(tbs, algorithm, der_bit_string(key.sign_der(tbs)))
+
+
+def parse_certificate(der):
+    """
+    读取证书的签发者、主体、有效期和公钥 (不校验签名)
+
+    Args:
+        der: DER 编码的证书
+
+    Returns:
+        dict: {"issuer", "subject": Name 的 DER 编码,
+               "not_before", "not_after": datetime (UTC),
+               "public_key": SubjectPublicKeyInfo 的 DER 编码}
+
+    Raises:
+        ValueError: 不是有效的 X.509 证书
+    """
+    try:
+        tbs = der_items(der_items(der_read(der)[1])[0][1])
+        if tbs[0][0] == 0xA0:
+            tbs = tbs[1:]
+        _, _, issuer, validity, subject, spki = tbs[:6]
+        not_before, not_after = (_read_time(tag, content) for tag, content, _ in der_items(validity[1]))
+    except (IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"无法解析证书: {e}")
+    return {
+        "issuer": issuer[2],
+        "subject": subject[2],
+        "not_before": not_before,
+        "not_after": not_after,
+        "public_key": spki[2],
+    }
+
+
+def acme_identifier_extension(key_authorization):
+    """TLS-ALPN-01 挑战证书的 acmeIdentifier 扩展 (关键扩展，值为密钥授权的 SHA-256)"""
+    digest = hashlib.sha256(key_authorization.encode()).digest()
+    return _extension(OID_ACME_IDENTIFIER, der_octet_string(digest), critical=True)
+
+
+def build_csr(key, domains):
+    """
+    证书签名请求 (PKCS#10)，CN 为第一个域名，SubjectAltName 包含全部域名
+
+    Args:
+        key: ECKey 私钥
+        domains: 域名列表
+
+    Returns:
+        bytes: DER 编码的 CSR
+    """
+    extensions = der_sequence(_extension(OID_SUBJECT_ALT_NAME, _general_names(domains)))
+    info = der_sequence(
+        der_integer(0),
+        _name(domains[0]),
+        public_key_info(key),
+        der_explicit(0, der_sequence(der_oid(OID_EXTENSION_REQUEST), der_set(extensions))),
+    )
+    algorithm = der_sequence(der_oid(OID_ECDSA_SHA256))
+    return der_sequence(info, algorithm, der_bit_string(key.sign_der(info)))
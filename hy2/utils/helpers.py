@@ -4,13 +4,16 @@
 
 import os
 import sys
+import time
+import threading
 import subprocess
-import platform
-import secrets
-import string
-import random
 from pathlib import Path
 
+# 服务状态缓存: (获取时间, 状态)，菜单重绘时复用，避免每次都调用 systemctl
+_service_state = None
+_service_state_lock = threading.Lock()
+_service_state_refresh = None
+
 
 def run_cmd(cmd, check=True, capture=False, timeout=300):
     """
@@ -57,6 +60,7 @@ def get_arch():
     Returns:
         架构字符串 (amd64/arm64/arm)
     """
+    import platform
     machine = platform.machine()
     arch_map = {
         "x86_64": "amd64",
@@ -66,17 +70,22 @@ def get_arch():
     return arch_map.get(machine, "amd64")
 
 
-def get_server_ip():
+def get_server_ip(refresh=False):
     """
-    获取服务器IP
+    获取服务器公网IP (IPv4 优先)
+
+    多个来源并发探测，结果在进程内和磁盘上缓存，见 utils.publicip。
+
+    Args:
+        refresh: 忽略缓存重新探测
 
     Returns:
-        服务器IP地址字符串
+        服务器IP地址字符串，探测失败时为 your_server_ip
     """
-    ip = run_cmd("curl -s4m8 ip.sb -k", capture=True, check=False)
-    if not ip:
-        ip = run_cmd("curl -s6m8 ip.sb -k", capture=True, check=False)
-    return ip or "your_server_ip"
+    from .publicip import public_ip, wait_prefetch
+
+    wait_prefetch()
+    return public_ip(refresh=refresh) or "your_server_ip"
 
 
 def is_ipv6(ip):
@@ -92,21 +101,98 @@ def is_ipv6(ip):
     return ':' in str(ip)
 
 
-def is_port_available(port):
+def split_host_address(address):
+    """
+    从 SSH 地址中提取主机名/IP
+
+    Args:
+        address: 地址 (如 root@1.2.3.4)
+
+    Returns:
+        主机名或IP
+    """
+    return str(address).rsplit("@", 1)[-1]
+
+
+def get_bound_udp_ports(proc_root="/proc"):
+    """
+    读取已绑定的 UDP 端口 (IPv4 + IPv6)
+
+    直接解析 /proc/net/udp 和 /proc/net/udp6，结果可在多次查询间复用。
+
+    Args:
+        proc_root: proc 文件系统根目录
+
+    Returns:
+        frozenset: 已占用的端口号集合
+    """
+    ports = set()
+    for name in ("udp", "udp6"):
+        try:
+            with open(os.path.join(proc_root, "net", name)) as f:
+                next(f, None)
+                for line in f:
+                    fields = line.split(None, 2)
+                    if len(fields) >= 2:
+                        ports.add(int(fields[1].rsplit(":", 1)[-1], 16))
+        except (OSError, ValueError):
+            continue
+    return frozenset(ports)
+
+
+def is_port_available(port, bound=None):
     """
     检查端口是否可用
 
     Args:
         port: 端口号
+        bound: 已占用端口集合 (get_bound_udp_ports 的结果)，为空时重新读取
 
     Returns:
         端口是否可用
     """
-    result = run_cmd(
-        f"ss -tunlp | grep -w udp | awk '{{print $5}}' | sed 's/.*://g' | grep -w '{port}'",
-        capture=True, check=False
-    )
-    return not result
+    if bound is None:
+        bound = get_bound_udp_ports()
+    return int(port) not in bound
+
+
+def find_used_ports(start, end, bound=None):
+    """
+    查找端口范围内已被占用的端口
+
+    Args:
+        start: 起始端口
+        end: 结束端口 (含)
+        bound: 已占用端口集合，为空时重新读取
+
+    Returns:
+        list: 范围内已占用的端口 (升序)
+    """
+    if bound is None:
+        bound = get_bound_udp_ports()
+    return sorted(p for p in bound if start <= p <= end)
+
+
+def random_available_port(low=2000, high=65535, bound=None):
+    """
+    随机选择一个可用端口
+
+    Args:
+        low: 最小端口
+        high: 最大端口
+        bound: 已占用端口集合，为空时重新读取
+
+    Returns:
+        可用端口号
+    """
+    import random
+
+    if bound is None:
+        bound = get_bound_udp_ports()
+    while True:
+        port = random.randint(low, high)
+        if port not in bound:
+            return port
 
 
 def generate_password(length=8):
@@ -119,6 +205,9 @@ def generate_password(length=8):
     Returns:
         随机密码字符串
     """
+    import secrets
+    import string
+
     return ''.join(
         secrets.choice(string.ascii_letters + string.digits) for _ in range(length)
     )
@@ -134,15 +223,10 @@ def generate_qrcode(text):
     Returns:
         二维码ANSI字符串或None
     """
+    from .qrcode import render_ansi
     try:
-        # 使用双引号和转义来避免单引号问题
-        escaped_text = text.replace("'", "'\"'\"'")
-        result = run_cmd(
-            f"echo '{escaped_text}' | qrencode -t ANSIUTF8",
-            capture=True, check=False
-        )
-        return result
-    except Exception:
+        return render_ansi(text.strip())
+    except ValueError:
         return None
 
 
@@ -179,6 +263,59 @@ def get_install_status():
         return 2
 
 
+def _query_service_state():
+    """调用 systemctl 查询服务状态并写入缓存"""
+    global _service_state
+    from ..service import service_unit
+
+    result = run_cmd(f"systemctl is-active {service_unit()}", capture=True, check=False)
+    state = result if result else "unknown"
+    with _service_state_lock:
+        _service_state = (time.monotonic(), state)
+    return state
+
+
+def get_service_state(max_age=None):
+    """
+    获取服务运行状态 (systemctl is-active)，结果会缓存
+
+    Args:
+        max_age: 缓存有效期（秒），默认 STATUS_CACHE_TTL
+
+    Returns:
+        状态字符串 (active/inactive/failed/...)
+    """
+    from ..config import STATUS_CACHE_TTL
+
+    if max_age is None:
+        max_age = STATUS_CACHE_TTL
+
+    refresh = _service_state_refresh
+    if refresh is not None:
+        refresh.join()
+
+    with _service_state_lock:
+        cached = _service_state
+    if cached and time.monotonic() - cached[0] <= max_age:
+        return cached[1]
+    return _query_service_state()
+
+
+def refresh_service_state():
+    """
+    在后台线程中刷新服务状态缓存
+
+    在等待用户输入期间调用，下次绘制菜单时即可直接使用结果。
+    """
+    global _service_state_refresh
+
+    if get_install_status() < 2:
+        return
+    thread = threading.Thread(target=_query_service_state, daemon=True)
+    thread.start()
+    _service_state_refresh = thread
+
+
 def get_status_text():
     """
     获取状态文本
@@ -193,10 +330,7 @@ def get_status_text():
         return "部分安装 (需要配置)"
     else:
         # 检查服务状态
-        from ..config import SERVICE_NAME
-        from .output import Colors
-        result = run_cmd(f"systemctl is-active {SERVICE_NAME}", capture=True, check=False)
-        service_status = result if result else "unknown"
+        service_status = get_service_state()
         if service_status == "active":
             return "已安装 - 运行中"
         elif service_status == "inactive":
@@ -205,6 +339,34 @@ def get_status_text():
             return f"已安装 - {service_status}"
 
 
+def write_atomic(path, data, mode=0o644):
+    """
+    原子写入文件 - 先写同目录临时文件再重命名，权限在写入前设置
+
+    Args:
+        path: 目标路径
+        data: 文件内容 (str 或 bytes)
+        mode: 文件权限
+    """
+    import tempfile
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.")
+    try:
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
 def backup_config():
     """备份配置文件"""
     from ..config import CONFIG_DIR
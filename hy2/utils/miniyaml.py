@@ -0,0 +1,269 @@
+"""
+YAML 子集解析与序列化
+
+只支持 Hysteria 配置用到的块状语法: 映射、列表、标量 (字符串/整数/浮点/布尔/null)，
+以及空的 [] / {}。不支持锚点、多文档、多行字符串等特性。
+"""
+
+import re
+import json
+
+_INT_RE = re.compile(r"^[-+]?(0|[1-9][0-9]*)$")
+_FLOAT_RE = re.compile(r"^[-+]?([0-9]+\.[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$")
+# 在 YAML 1.1 / 1.2 中可能被解析为数字的字符串，序列化时需要加引号
+_NUMBER_LIKE_RE = re.compile(
+    r"^[-+]?(\.inf|\.nan|0[xXoObB][0-9a-fA-F_]+|[0-9][0-9_]*(\.[0-9_]*)?([eE][-+]?[0-9]+)?"
+    r"|\.[0-9]+([eE][-+]?[0-9]+)?|[0-9][0-9_]*(:[0-5]?[0-9])+)$",
+    re.IGNORECASE
+)
+_RESERVED = {"true", "false", "yes", "no", "on", "off", "null", "~", ""}
+
+
+class YAMLError(ValueError):
+    """YAML 语法不受支持或格式错误"""
+
+
+def _strip_comment(text):
+    """去掉引号外的行尾注释"""
+    quote = None
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            # 双引号内的转义字符、单引号内的 '' 都不结束引号
+            if quote == '"' and ch == "\\":
+                i += 1
+            elif ch == quote:
+                if quote == "'" and text[i + 1:i + 2] == "'":
+                    i += 1
+                else:
+                    quote = None
+        elif ch in ("'", '"') and (i == 0 or text[i - 1] in " :-[{,"):
+            quote = ch
+        elif ch == "#" and (i == 0 or text[i - 1] in " \t"):
+            return text[:i].rstrip()
+        i += 1
+    return text.rstrip()
+
+
+def _split_key(text):
+    """
+    拆分 "key: value"
+
+    Returns:
+        tuple: (键, 值文本) 或 None (不是映射项)
+    """
+    if text[:1] in ("'", '"'):
+        end = _closing_quote(text)
+        if end is None or text[end + 1:end + 2] != ":":
+            return None
+        rest = text[end + 2:]
+        if rest and not rest.startswith(" "):
+            return None
+        return parse_scalar(text[:end + 1]), rest.strip()
+
+    match = re.search(r":( |$)", text)
+    if not match:
+        return None
+    return text[:match.start()].strip(), text[match.end():].strip()
+
+
+def _closing_quote(text):
+    quote = text[0]
+    i = 1
+    while i < len(text):
+        if quote == '"' and text[i] == "\\":
+            i += 2
+            continue
+        if text[i] == quote:
+            if quote == "'" and text[i + 1:i + 2] == "'":
+                i += 2
+                continue
+            return i
+        i += 1
+    return None
+
+
+def parse_scalar(text):
+    """解析单个标量"""
+    text = text.strip()
+    if text.startswith('"'):
+        try:
+            return json.loads(text)
+        except ValueError:
+            raise YAMLError(f"无法解析的字符串: {text}")
+    if text.startswith("'"):
+        if not text.endswith("'") or len(text) < 2:
+            raise YAMLError(f"无法解析的字符串: {text}")
+        return text[1:-1].replace("''", "'")
+    if text == "[]":
+        return []
+    if text == "{}":
+        return {}
+    lower = text.lower()
+    if lower in ("true", "yes", "on"):
+        return True
+    if lower in ("false", "no", "off"):
+        return False
+    if lower in ("null", "~", ""):
+        return None
+    if _INT_RE.match(text):
+        return int(text)
+    if _FLOAT_RE.match(text):
+        return float(text)
+    if text[:1] in "[{&*!|>":
+        raise YAMLError(f"不支持的 YAML 语法: {text}")
+    return text
+
+
+def _is_list_item(content):
+    return content == "-" or content.startswith("- ")
+
+
+def loads(text):
+    """
+    解析 YAML 文本
+
+    Args:
+        text: YAML 文本
+
+    Returns:
+        dict / list / 标量
+    """
+    lines = []
+    for lineno, raw in enumerate(text.splitlines(), 1):
+        if "\t" in raw[:len(raw) - len(raw.lstrip())]:
+            raise YAMLError(f"第 {lineno} 行: 不能使用制表符缩进")
+        content = _strip_comment(raw.strip())
+        if content in ("", "---"):
+            continue
+        lines.append([len(raw) - len(raw.lstrip()), content, lineno])
+
+    pos = 0
+
+    def parse_block(indent):
+        if _is_list_item(lines[pos][1]):
+            return parse_list(indent)
+        return parse_map(indent)
+
+    def parse_nested(parent_indent, allow_same_indent_list):
+        if pos >= len(lines):
+            return None
+        indent, content, _ = lines[pos]
+        if indent > parent_indent or (
+                allow_same_indent_list and indent == parent_indent and _is_list_item(content)):
+            return parse_block(indent)
+        return None
+
+    def parse_map(indent):
+        nonlocal pos
+        result = {}
+        while pos < len(lines) and lines[pos][0] == indent and not _is_list_item(lines[pos][1]):
+            _, content, lineno = lines[pos]
+            pair = _split_key(content)
+            if pair is None:
+                raise YAMLError(f"第 {lineno} 行: 需要 \"键: 值\" 格式")
+            key, rest = pair
+            pos += 1
+            result[key] = parse_scalar(rest) if rest else parse_nested(indent, True)
+        if pos < len(lines) and lines[pos][0] > indent:
+            raise YAMLError(f"第 {lines[pos][2]} 行: 缩进错误")
+        return result
+
+    def parse_list(indent):
+        nonlocal pos
+        result = []
+        while pos < len(lines) and lines[pos][0] == indent and _is_list_item(lines[pos][1]):
+            _, content, lineno = lines[pos]
+            rest = content[1:].strip()
+            if not rest:
+                pos += 1
+                result.append(parse_nested(indent, False))
+                continue
+            if rest[:1] not in ("[", "{") and _split_key(rest):
+                # "- key: value" 开始的映射，改写为更深一层的映射行
+                lines[pos] = [indent + len(content) - len(rest), rest, lineno]
+                result.append(parse_map(lines[pos][0]))
+                continue
+            pos += 1
+            result.append(parse_scalar(rest))
+        return result
+
+    if not lines:
+        return None
+    data = parse_block(lines[0][0])
+    if pos < len(lines):
+        raise YAMLError(f"第 {lines[pos][2]} 行: 缩进错误")
+    return data
+
+
+def format_scalar(value):
+    """将标量格式化为 YAML 文本，必要时加引号"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+
+    text = str(value)
+    needs_quote = (
+        text.lower() in _RESERVED
+        or _NUMBER_LIKE_RE.match(text)
+        or text[0] in "!&*{}[],#|>@`\"'%?"
+        or text.startswith("- ") or text == "-"
+        or ": " in text or " #" in text or text.endswith(":")
+        or text != text.strip()
+        or any(ord(ch) < 0x20 for ch in text)
+    )
+    return json.dumps(text, ensure_ascii=False) if needs_quote else text
+
+
+def dumps(data, indent=2):
+    """
+    序列化为 YAML 文本
+
+    Args:
+        data: dict / list / 标量
+        indent: 每层缩进空格数
+
+    Returns:
+        str: YAML 文本
+    """
+    lines = []
+
+    def emit(value, level, prefix=""):
+        pad = " " * (level * indent)
+        if isinstance(value, dict):
+            first = True
+            for key, item in value.items():
+                lead = prefix if first else " " * len(prefix)
+                first = False
+                key_text = format_scalar(key)
+                if isinstance(item, (dict, list)) and item:
+                    lines.append(f"{pad}{lead}{key_text}:")
+                    emit(item, level + 1 + len(lead) // indent)
+                else:
+                    lines.append(f"{pad}{lead}{key_text}: {_format_leaf(item)}")
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict) and item:
+                    emit(item, level, "- ")
+                elif isinstance(item, list) and item:
+                    lines.append(f"{pad}-")
+                    emit(item, level + 1)
+                else:
+                    lines.append(f"{pad}- {_format_leaf(item)}")
+        else:
+            lines.append(f"{pad}{prefix}{_format_leaf(value)}")
+
+    emit(data, 0)
+    return "\n".join(lines) + "\n"
+
+
+def _format_leaf(value):
+    if isinstance(value, dict):
+        return "{}"
+    if isinstance(value, list):
+        return "[]"
+    return format_scalar(value)
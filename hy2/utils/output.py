@@ -65,6 +65,29 @@ def show_loading(msg, delay=0.1):
     return stop_event
 
 
+def show_progress(done, total, speed=None, width=30):
+    """
+    显示单行进度条
+
+    Args:
+        done: 已完成字节数
+        total: 总字节数 (未知时为 None)
+        speed: 速度（字节/秒）
+        width: 进度条宽度
+    """
+    import sys
+
+    speed_str = f" {speed / 1024 / 1024:.2f} MB/s" if speed is not None else ""
+    if total:
+        ratio = min(done / total, 1.0)
+        bar = "#" * int(width * ratio) + "-" * (width - int(width * ratio))
+        line = f"[{bar}] {ratio * 100:5.1f}% {done / 1024:.0f}/{total / 1024:.0f} KB{speed_str}"
+    else:
+        line = f"{done / 1024:.0f} KB{speed_str}"
+    sys.stdout.write(f"\r{Colors.YELLOW}  {line}{Colors.PLAIN}")
+    sys.stdout.flush()
+
+
 def print_header():
     """打印脚本标题"""
     print("\n" + "="*60)
@@ -117,10 +140,38 @@ def print_menu():
     print("-" * 60)
     print("8. 修改配置")
     print("9. 显示配置")
+    print("10. 流量统计")
     print("-" * 60)
     print("0. 退出")
 
 
+def display_width(text):
+    """终端显示宽度，中文等全角字符占两列"""
+    return sum(2 if ord(ch) > 0x2e7f else 1 for ch in str(text))
+
+
+def format_table(rows, right_align=()):
+    """
+    按显示宽度对齐的表格文本
+
+    Args:
+        rows: 行列表，第一行为表头
+        right_align: 右对齐的列序号
+
+    Returns:
+        list: 每行文本
+    """
+    widths = [max(display_width(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = []
+    for row in rows:
+        cells = []
+        for i, cell in enumerate(row):
+            pad = " " * (widths[i] - display_width(cell))
+            cells.append(pad + str(cell) if i in right_align else str(cell) + pad)
+        lines.append("  ".join(cells).rstrip())
+    return lines
+
+
 def os_system_clear():
     """清屏"""
     import os
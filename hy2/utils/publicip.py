@@ -0,0 +1,263 @@
+"""
+公网 IP 探测
+
+同时向多个来源查询 IPv4 / IPv6 公网地址，取最先得到两个来源一致的结果:
+
+    local                  本机默认路由的源地址 (不发送数据包)，仅当它是公网地址时有效
+    http(s)://...          回显客户端地址的 HTTP 服务，响应为纯文本 IP 或 {"ip": ...}
+
+所有来源都结束仍未达成一致时，取票数最多的结果 (票数相同取最先返回的)。
+结果在进程内和 CACHE_DIR/public-ip.json 中缓存 PUBLIC_IP_TTL 秒；
+本机默认路由源地址为公网地址且与缓存不同时，缓存失效。
+"""
+
+import json
+import time
+import queue
+import socket
+import threading
+import ipaddress
+
+FAMILIES = {"ipv4": socket.AF_INET, "ipv6": socket.AF_INET6}
+
+# local 来源用于选路的地址 (UDP connect 不发送数据)
+_ROUTE_PROBES = {"ipv4": "1.1.1.1", "ipv6": "2606:4700:4700::1111"}
+
+_cache = {}
+_cache_lock = threading.Lock()
+_prefetch = None
+
+
+def cache_path():
+    """磁盘缓存文件路径"""
+    from ..config import CACHE_DIR
+    return CACHE_DIR / "public-ip.json"
+
+
+def default_sources():
+    """探测来源: local + PUBLIC_IP_SOURCES (可用环境变量 HY2_IP_SOURCES 覆盖)"""
+    from ..config import PUBLIC_IP_SOURCES
+    return ["local"] + list(PUBLIC_IP_SOURCES)
+
+
+def _parse_ip(text, family):
+    """解析回显内容，不是 IP 或地址族不符时返回 None"""
+    text = text.strip()
+    if text.startswith("{"):
+        try:
+            text = str(json.loads(text).get("ip", ""))
+        except (ValueError, AttributeError):
+            return None
+    try:
+        ip = ipaddress.ip_address(text.split()[0] if text else "")
+    except ValueError:
+        return None
+    if ip.version != (4 if family == "ipv4" else 6):
+        return None
+    return str(ip)
+
+
+def local_address(family):
+    """
+    本机默认路由的源地址 (只查路由表，不发送数据包)
+
+    Returns:
+        str: 公网地址，没有路由或为私有地址时返回 None
+    """
+    sock = socket.socket(FAMILIES[family], socket.SOCK_DGRAM)
+    try:
+        sock.connect((_ROUTE_PROBES[family], 53))
+        ip = ipaddress.ip_address(sock.getsockname()[0].split("%")[0])
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+    return str(ip) if ip.is_global else None
+
+
+def query_echo(url, family, timeout):
+    """
+    向回显服务查询本机地址，连接强制使用指定地址族
+
+    Returns:
+        str 或 None
+    """
+    import http.client
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    host, https = parts.hostname, parts.scheme == "https"
+    port = parts.port or (443 if https else 80)
+    try:
+        addr = socket.getaddrinfo(host, port, FAMILIES[family], socket.SOCK_STREAM)[0][4]
+        sock = socket.create_connection(addr[:2], timeout=timeout)
+    except (OSError, IndexError):
+        return None
+    try:
+        if https:
+            import ssl
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        conn.sock = sock
+        conn.request("GET", parts.path or "/", headers={
+            "Host": parts.netloc, "User-Agent": "curl/8.0", "Accept": "text/plain"})
+        response = conn.getresponse()
+        if response.status != 200:
+            return None
+        return _parse_ip(response.read(256).decode("ascii", "replace"), family)
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        sock.close()
+
+
+def _query(source, family, timeout):
+    if source == "local":
+        return local_address(family)
+    return query_echo(source, family, timeout)
+
+
+def discover(family="ipv4", sources=None, timeout=None):
+    """
+    并发查询所有来源
+
+    Args:
+        family: ipv4 / ipv6
+        sources: 来源列表，默认 default_sources()
+        timeout: 总超时（秒），默认 PUBLIC_IP_TIMEOUT
+
+    Returns:
+        dict: {"ip", "family", "sources": [给出该结果的来源]}，全部失败时返回 None
+    """
+    from ..config import PUBLIC_IP_TIMEOUT
+
+    sources = list(sources if sources is not None else default_sources())
+    timeout = timeout or PUBLIC_IP_TIMEOUT
+    results = queue.Queue()
+    for source in sources:
+        threading.Thread(target=lambda s=source: results.put((s, _query(s, family, timeout))),
+                         daemon=True).start()
+
+    deadline = time.monotonic() + timeout
+    votes = {}
+    for _ in sources:
+        try:
+            source, ip = results.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        if not ip:
+            continue
+        votes.setdefault(ip, []).append(source)
+        # 只有一个来源时无法比较，直接采用
+        if len(votes[ip]) >= 2 or len(sources) == 1:
+            return {"ip": ip, "family": family, "sources": votes[ip]}
+    if not votes:
+        return None
+    # dict 保持插入顺序，票数相同时 max 取最先返回的
+    ip = max(votes, key=lambda k: len(votes[k]))
+    return {"ip": ip, "family": family, "sources": votes[ip]}
+
+
+# ============ 缓存 ============
+
+def _read_disk_cache():
+    try:
+        return json.loads(cache_path().read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_disk_cache(family, ip):
+    from .helpers import write_atomic
+
+    data = _read_disk_cache()
+    data[family] = {"ip": ip, "time": time.time()}
+    try:
+        write_atomic(cache_path(), json.dumps(data, indent=2))
+    except OSError:
+        pass
+
+
+def _cached(family, ttl):
+    """进程内缓存，其次磁盘缓存；本机公网地址与缓存不同时视为失效"""
+    with _cache_lock:
+        entry = _cache.get(family)
+    if entry and time.monotonic() - entry[1] <= ttl:
+        return entry[0]
+    entry = _read_disk_cache().get(family)
+    if not isinstance(entry, dict) or not entry.get("ip"):
+        return None
+    if not 0 <= time.time() - float(entry.get("time", 0)) <= ttl:
+        return None
+    local = local_address(family)
+    if local and local != entry["ip"]:
+        return None
+    with _cache_lock:
+        _cache[family] = (entry["ip"], time.monotonic())
+    return entry["ip"]
+
+
+def public_ip(families=("ipv4", "ipv6"), refresh=False, sources=None, timeout=None, ttl=None):
+    """
+    公网 IP，按 families 顺序优先 (默认 IPv4 优先，没有时用 IPv6)
+
+    各地址族并发探测，总耗时为最慢的一族而不是各族之和。
+
+    Args:
+        families: 地址族顺序
+        refresh: 忽略缓存重新探测
+        sources: 来源列表，默认 default_sources()
+        timeout: 总超时（秒）
+        ttl: 缓存有效期（秒），默认 PUBLIC_IP_TTL
+
+    Returns:
+        str 或 None
+    """
+    from ..config import PUBLIC_IP_TTL
+
+    ttl = PUBLIC_IP_TTL if ttl is None else ttl
+    if not refresh:
+        for family in families:
+            ip = _cached(family, ttl)
+            if ip:
+                return ip
+
+    found = {}
+
+    def run(family):
+        result = discover(family, sources, timeout)
+        if result:
+            found[family] = result["ip"]
+
+    threads = [threading.Thread(target=run, args=(f,), daemon=True) for f in families]
+    for thread in threads:
+        thread.start()
+    for family, thread in zip(families, threads):
+        thread.join()
+        if family in found:
+            # 优先的地址族已有结果，不再等待其余地址族
+            break
+
+    # 未等待的地址族线程可能仍在写入 found
+    found = dict(found)
+    for family, ip in found.items():
+        with _cache_lock:
+            _cache[family] = (ip, time.monotonic())
+        _write_disk_cache(family, ip)
+    return next((found[f] for f in families if f in found), None)
+
+
+def prefetch():
+    """在后台线程中探测公网 IP，之后 wait_prefetch / public_ip 直接使用缓存"""
+    global _prefetch
+
+    if _prefetch is None or not _prefetch.is_alive():
+        _prefetch = threading.Thread(target=public_ip, daemon=True)
+        _prefetch.start()
+
+
+def wait_prefetch():
+    """等待后台探测完成 (没有进行中的探测时立即返回)"""
+    thread = _prefetch
+    if thread is not None:
+        thread.join()
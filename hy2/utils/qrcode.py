@@ -0,0 +1,479 @@
+"""
+二维码生成 - 纯 Python 实现 (字节模式，版本 1-40)
+
+支持输出为终端 ANSI 半块字符、PNG 和 SVG，无需 qrencode。
+"""
+
+import zlib
+import struct
+from functools import lru_cache
+from pathlib import Path
+
+# 纠错等级 -> 格式信息中的编码
+ECC_FORMAT_BITS = {"L": 1, "M": 0, "Q": 3, "H": 2}
+
+# 每块纠错码字数 [纠错等级][版本]
+ECC_CODEWORDS_PER_BLOCK = {
+    "L": (-1, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28,
+          28, 28, 30, 30, 26, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    "M": (-1, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26,
+          26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28),
+    "Q": (-1, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30,
+          28, 30, 30, 30, 30, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+    "H": (-1, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28,
+          30, 24, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30),
+}
+
+# 纠错块数 [纠错等级][版本]
+NUM_ERROR_CORRECTION_BLOCKS = {
+    "L": (-1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8,
+          8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19, 19, 20, 21, 22, 24, 25),
+    "M": (-1, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16,
+          17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49),
+    "Q": (-1, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20,
+          23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68),
+    "H": (-1, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25,
+          25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 81),
+}
+
+_MASKS = (
+    lambda x, y: (x + y) % 2 == 0,
+    lambda x, y: y % 2 == 0,
+    lambda x, y: x % 3 == 0,
+    lambda x, y: (x + y) % 3 == 0,
+    lambda x, y: (x // 3 + y // 2) % 2 == 0,
+    lambda x, y: x * y % 2 + x * y % 3 == 0,
+    lambda x, y: (x * y % 2 + x * y % 3) % 2 == 0,
+    lambda x, y: ((x + y) % 2 + x * y % 3) % 2 == 0,
+)
+
+
+# ============ Reed-Solomon ============
+
+def _gf_multiply(x, y):
+    """GF(2^8) 乘法，模多项式 0x11D"""
+    z = 0
+    for i in reversed(range(8)):
+        z = (z << 1) ^ ((z >> 7) * 0x11D)
+        z ^= ((y >> i) & 1) * x
+    return z
+
+
+@lru_cache(maxsize=None)
+def _rs_divisor(degree):
+    result = [0] * (degree - 1) + [1]
+    root = 1
+    for _ in range(degree):
+        for j in range(degree):
+            result[j] = _gf_multiply(result[j], root)
+            if j + 1 < degree:
+                result[j] ^= result[j + 1]
+        root = _gf_multiply(root, 0x02)
+    return tuple(result)
+
+
+def _rs_remainder(data, divisor):
+    result = [0] * len(divisor)
+    for b in data:
+        factor = b ^ result.pop(0)
+        result.append(0)
+        for i, coef in enumerate(divisor):
+            result[i] ^= _gf_multiply(coef, factor)
+    return result
+
+
+# ============ 编码 ============
+
+def _num_raw_data_modules(ver):
+    result = (16 * ver + 128) * ver + 64
+    if ver >= 2:
+        num_align = ver // 7 + 2
+        result -= (25 * num_align - 10) * num_align - 55
+        if ver >= 7:
+            result -= 36
+    return result
+
+
+def _num_data_codewords(ver, ecl):
+    return (_num_raw_data_modules(ver) // 8
+            - ECC_CODEWORDS_PER_BLOCK[ecl][ver] * NUM_ERROR_CORRECTION_BLOCKS[ecl][ver])
+
+
+def _alignment_positions(ver):
+    if ver == 1:
+        return []
+    num_align = ver // 7 + 2
+    step = (ver * 8 + num_align * 3 + 5) // (num_align * 4 - 4) * 2
+    size = ver * 4 + 17
+    result = [size - 7 - i * step for i in range(num_align - 1)] + [6]
+    return list(reversed(result))
+
+
+def _add_ecc_and_interleave(data, ver, ecl):
+    num_blocks = NUM_ERROR_CORRECTION_BLOCKS[ecl][ver]
+    block_ecc_len = ECC_CODEWORDS_PER_BLOCK[ecl][ver]
+    raw_codewords = _num_raw_data_modules(ver) // 8
+    num_short_blocks = num_blocks - raw_codewords % num_blocks
+    short_block_len = raw_codewords // num_blocks
+
+    divisor = _rs_divisor(block_ecc_len)
+    blocks = []
+    k = 0
+    for i in range(num_blocks):
+        length = short_block_len - block_ecc_len + (0 if i < num_short_blocks else 1)
+        dat = list(data[k:k + length])
+        k += length
+        ecc = _rs_remainder(dat, divisor)
+        if i < num_short_blocks:
+            dat.append(0)
+        blocks.append(dat + ecc)
+
+    result = []
+    for i in range(len(blocks[0])):
+        for j, block in enumerate(blocks):
+            if i != short_block_len - block_ecc_len or j >= num_short_blocks:
+                result.append(block[i])
+    return result
+
+
+def _encode_data(payload, ecl, min_version=1):
+    """选择最小版本并生成数据码字"""
+    for ver in range(min_version, 41):
+        count_bits = 8 if ver <= 9 else 16
+        capacity_bits = _num_data_codewords(ver, ecl) * 8
+        used_bits = 4 + count_bits + len(payload) * 8
+        if used_bits <= capacity_bits:
+            break
+    else:
+        raise ValueError(f"数据过长，无法编码为二维码 ({len(payload)} 字节)")
+
+    # 在不增大版本的前提下提升纠错等级
+    for better in ("M", "Q", "H"):
+        if "LMQH".index(better) > "LMQH".index(ecl) and used_bits <= _num_data_codewords(ver, better) * 8:
+            ecl = better
+    capacity_bits = _num_data_codewords(ver, ecl) * 8
+
+    bits = []
+
+    def append(value, length):
+        bits.extend((value >> i) & 1 for i in reversed(range(length)))
+
+    append(0b0100, 4)
+    append(len(payload), count_bits)
+    for b in payload:
+        append(b, 8)
+    append(0, min(4, capacity_bits - len(bits)))
+    append(0, -len(bits) % 8)
+
+    codewords = [int("".join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8)]
+    pad = 0xEC
+    while len(codewords) * 8 < capacity_bits:
+        codewords.append(pad)
+        pad ^= 0xEC ^ 0x11
+    return ver, ecl, codewords
+
+
+class _Matrix:
+    """二维码模块矩阵"""
+
+    def __init__(self, ver):
+        self.size = ver * 4 + 17
+        self.ver = ver
+        self.modules = [[False] * self.size for _ in range(self.size)]
+        self.is_function = [[False] * self.size for _ in range(self.size)]
+
+    def set_function(self, x, y, dark):
+        self.modules[y][x] = dark
+        self.is_function[y][x] = True
+
+    def draw_function_patterns(self):
+        size = self.size
+        for i in range(size):
+            self.set_function(6, i, i % 2 == 0)
+            self.set_function(i, 6, i % 2 == 0)
+
+        for cx, cy in ((3, 3), (size - 4, 3), (3, size - 4)):
+            for dy in range(-4, 5):
+                for dx in range(-4, 5):
+                    x, y = cx + dx, cy + dy
+                    if 0 <= x < size and 0 <= y < size:
+                        self.set_function(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+
+        positions = _alignment_positions(self.ver)
+        last = len(positions) - 1
+        for i, ay in enumerate(positions):
+            for j, ax in enumerate(positions):
+                if (i, j) in ((0, 0), (0, last), (last, 0)):
+                    continue
+                for dy in range(-2, 3):
+                    for dx in range(-2, 3):
+                        self.set_function(ax + dx, ay + dy, max(abs(dx), abs(dy)) != 1)
+
+        # 预留格式信息区域，之后覆盖
+        self.draw_format_bits("M", 0)
+        self.draw_version()
+
+    def draw_format_bits(self, ecl, mask):
+        data = ECC_FORMAT_BITS[ecl] << 3 | mask
+        rem = data
+        for _ in range(10):
+            rem = (rem << 1) ^ ((rem >> 9) * 0x537)
+        bits = (data << 10 | rem) ^ 0x5412
+
+        def bit(i):
+            return (bits >> i) & 1 != 0
+
+        size = self.size
+        for i in range(6):
+            self.set_function(8, i, bit(i))
+        self.set_function(8, 7, bit(6))
+        self.set_function(8, 8, bit(7))
+        self.set_function(7, 8, bit(8))
+        for i in range(9, 15):
+            self.set_function(14 - i, 8, bit(i))
+        for i in range(8):
+            self.set_function(size - 1 - i, 8, bit(i))
+        for i in range(8, 15):
+            self.set_function(8, size - 15 + i, bit(i))
+        self.set_function(8, size - 8, True)
+
+    def draw_version(self):
+        if self.ver < 7:
+            return
+        rem = self.ver
+        for _ in range(12):
+            rem = (rem << 1) ^ ((rem >> 11) * 0x1F25)
+        bits = self.ver << 12 | rem
+        for i in range(18):
+            dark = (bits >> i) & 1 != 0
+            a = self.size - 11 + i % 3
+            b = i // 3
+            self.set_function(a, b, dark)
+            self.set_function(b, a, dark)
+
+    def draw_codewords(self, data):
+        size = self.size
+        i = 0
+        total = len(data) * 8
+        right = size - 1
+        while right >= 1:
+            if right == 6:
+                right = 5
+            upward = (right + 1) & 2 == 0
+            for vert in range(size):
+                y = size - 1 - vert if upward else vert
+                for j in range(2):
+                    x = right - j
+                    if not self.is_function[y][x] and i < total:
+                        self.modules[y][x] = (data[i >> 3] >> (7 - (i & 7))) & 1 != 0
+                        i += 1
+            right -= 2
+
+    def apply_mask(self, mask):
+        func = _MASKS[mask]
+        for y in range(self.size):
+            row, fn = self.modules[y], self.is_function[y]
+            for x in range(self.size):
+                if not fn[x] and func(x, y):
+                    row[x] = not row[x]
+
+    def penalty(self):
+        """按 ISO/IEC 18004 的四条规则计算掩码惩罚分"""
+        size = self.size
+        modules = self.modules
+        columns = [[modules[y][x] for y in range(size)] for x in range(size)]
+        score = 0
+        finder_a = [True, False, True, True, True, False, True, False, False, False, False]
+        finder_b = finder_a[::-1]
+
+        for line in modules + columns:
+            run = 1
+            for i in range(1, size):
+                if line[i] == line[i - 1]:
+                    run += 1
+                else:
+                    if run >= 5:
+                        score += run - 2
+                    run = 1
+            if run >= 5:
+                score += run - 2
+            for i in range(size - 10):
+                window = line[i:i + 11]
+                if window == finder_a or window == finder_b:
+                    score += 40
+
+        for y in range(size - 1):
+            for x in range(size - 1):
+                c = modules[y][x]
+                if c == modules[y][x + 1] == modules[y + 1][x] == modules[y + 1][x + 1]:
+                    score += 3
+
+        dark = sum(sum(row) for row in modules)
+        total = size * size
+        score += (abs(dark * 20 - total * 10) + total - 1) // total * 10 - 10
+        return score
+
+
+@lru_cache(maxsize=256)
+def encode(text, ecl="M", mask=None):
+    """
+    将文本编码为二维码矩阵
+
+    Args:
+        text: 要编码的文本 (UTF-8 字节模式)
+        ecl: 最低纠错等级 (L/M/Q/H)，版本不变时会自动提升
+        mask: 掩码编号 0-7，为空时自动选择惩罚分最低的掩码
+
+    Returns:
+        tuple: 每行为布尔值元组，True 表示深色模块
+    """
+    ver, ecl, data = _encode_data(text.encode("utf-8"), ecl)
+    codewords = _add_ecc_and_interleave(data, ver, ecl)
+
+    matrix = _Matrix(ver)
+    matrix.draw_function_patterns()
+    matrix.draw_codewords(codewords)
+
+    if mask is None:
+        best = None
+        for candidate in range(8):
+            matrix.apply_mask(candidate)
+            matrix.draw_format_bits(ecl, candidate)
+            score = matrix.penalty()
+            if best is None or score < best[0]:
+                best = (score, candidate)
+            matrix.apply_mask(candidate)
+        mask = best[1]
+
+    matrix.apply_mask(mask)
+    matrix.draw_format_bits(ecl, mask)
+    return tuple(tuple(row) for row in matrix.modules)
+
+
+def _with_border(modules, border):
+    size = len(modules)
+    blank = (False,) * (size + border * 2)
+    pad = (False,) * border
+    return [blank] * border + [pad + row + pad for row in modules] + [blank] * border
+
+
+# ============ 渲染 ============
+
+@lru_cache(maxsize=256)
+def render_ansi(text, border=2):
+    """
+    渲染为终端文本，每个字符表示上下两个模块
+
+    Args:
+        text: 要编码的文本
+        border: 静区宽度（模块）
+
+    Returns:
+        str: 带 ANSI 颜色的多行文本 (白底黑码，不依赖终端配色)
+    """
+    rows = _with_border(encode(text), border)
+    if len(rows) % 2:
+        rows.append((False,) * len(rows[0]))
+
+    # 浅色模块用前景色 (白) 绘制，深色模块留空显示背景色 (黑)
+    chars = {(False, False): "█", (False, True): "▀", (True, False): "▄", (True, True): " "}
+    lines = []
+    for top, bottom in zip(rows[0::2], rows[1::2]):
+        body = "".join(chars[pair] for pair in zip(top, bottom))
+        lines.append(f"\033[97;40m{body}\033[0m")
+    return "\n".join(lines)
+
+
+def render_png(text, scale=8, border=4):
+    """
+    渲染为 PNG (1 位灰度)
+
+    Args:
+        text: 要编码的文本
+        scale: 每个模块的像素数
+        border: 静区宽度（模块）
+
+    Returns:
+        bytes: PNG 文件内容
+    """
+    rows = _with_border(encode(text), border)
+    width = len(rows[0]) * scale
+
+    raw = bytearray()
+    for row in rows:
+        bits = 0
+        line = bytearray()
+        count = 0
+        for dark in row:
+            for _ in range(scale):
+                bits = (bits << 1) | (0 if dark else 1)
+                count += 1
+                if count == 8:
+                    line.append(bits)
+                    bits = count = 0
+        if count:
+            line.append(bits << (8 - count))
+        raw += (b"\x00" + line) * scale
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    header = struct.pack(">IIBBBBB", width, width, 1, 0, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(bytes(raw), 9)) + chunk(b"IEND", b""))
+
+
+def render_svg(text, border=4):
+    """
+    渲染为 SVG
+
+    Args:
+        text: 要编码的文本
+        border: 静区宽度（模块）
+
+    Returns:
+        str: SVG 文档
+    """
+    modules = encode(text)
+    size = len(modules) + border * 2
+    path = "".join(
+        f"M{x + border},{y + border}h1v1h-1z"
+        for y, row in enumerate(modules) for x, dark in enumerate(row) if dark
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        f'shape-rendering="crispEdges">'
+        f'<rect width="100%" height="100%" fill="#fff"/>'
+        f'<path d="{path}" fill="#000"/></svg>\n'
+    )
+
+
+def export_qrcodes(links, out_dir, fmt="png", scale=8):
+    """
+    批量导出二维码图片
+
+    Args:
+        links: {名称: 分享链接} 字典或 (名称, 分享链接) 序列
+        out_dir: 输出目录
+        fmt: png 或 svg
+        scale: PNG 每个模块的像素数
+
+    Returns:
+        list: 写入的文件路径
+    """
+    if fmt not in ("png", "svg"):
+        raise ValueError(f"不支持的格式: {fmt}")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    items = links.items() if isinstance(links, dict) else links
+
+    paths = []
+    for name, url in items:
+        path = out_dir / f"{name}.{fmt}"
+        if fmt == "png":
+            path.write_bytes(render_png(url, scale=scale))
+        else:
+            path.write_text(render_svg(url))
+        paths.append(path)
+    return paths
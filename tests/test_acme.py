@@ -0,0 +1,239 @@
+"""ACME 测试: 续期计划、证书安装、续期重试和 http-01 应答
+
+完整申请流程需要 Pebble (https://github.com/letsencrypt/pebble)，默认跳过:
+    HY2_TEST_PEBBLE=https://127.0.0.1:14000/dir HY2_TEST_PEBBLE_CA=pebble.minica.pem \\
+        python -m unittest tests.test_acme
+Pebble 需按 HY2_TEST_PEBBLE_HTTP_PORT (默认 5002) 验证 http-01，
+HY2_TEST_PEBBLE_DOMAIN (默认 hy2.test) 需解析到本机。
+"""
+
+import asyncio
+import os
+import random
+import shutil
+import socket
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+
+from hy2 import acme, config
+from hy2.service import ServiceError
+from hy2.utils.crypto import (ECKey, build_self_signed_cert, parse_certificate, pem_decode, pem_encode,
+                              public_key_info)
+
+DAY = 86400
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class PlanRenewalTest(unittest.TestCase):
+
+    def test_within_jitter_of_two_thirds(self):
+        not_before = 1_700_000_000
+        lifetime = 90 * DAY
+        low = not_before + lifetime * (config.ACME_RENEW_AT - config.ACME_RENEW_JITTER)
+        high = not_before + lifetime * (config.ACME_RENEW_AT + config.ACME_RENEW_JITTER)
+        rng = random.Random(1)
+        for _ in range(1000):
+            renew_at = acme.plan_renewal(not_before, not_before + lifetime, rng)
+            self.assertGreaterEqual(renew_at, low)
+            self.assertLessEqual(renew_at, high)
+        # 抖动的两端
+        edge = mock.Mock()
+        edge.random.return_value = 0.0
+        self.assertAlmostEqual(acme.plan_renewal(not_before, not_before + lifetime, edge), low)
+        edge.random.return_value = 1.0
+        self.assertAlmostEqual(acme.plan_renewal(not_before, not_before + lifetime, edge), high)
+
+    def test_seeded_rng_is_deterministic(self):
+        first = [acme.plan_renewal(0, 90 * DAY, random.Random(42)) for _ in range(3)]
+        self.assertEqual(len(set(first)), 1)
+        self.assertNotEqual(first[0], acme.plan_renewal(0, 90 * DAY, random.Random(43)))
+
+
+class InstallCertificateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.cert = self.dir / "cert.crt"
+        self.key = self.dir / "private.key"
+        self.cert.write_text("old certificate\n")
+        self.key.write_text("old key\n")
+
+    def chain(self, key, **kwargs):
+        return pem_encode("CERTIFICATE", build_self_signed_cert(key, "hy2.test", **kwargs))
+
+    def assert_untouched(self):
+        self.assertEqual(self.cert.read_text(), "old certificate\n")
+        self.assertEqual(self.key.read_text(), "old key\n")
+        self.assertEqual(sorted(p.name for p in self.dir.iterdir()), ["cert.crt", "private.key"])
+
+    def test_installs_matching_chain(self):
+        key = ECKey()
+        chain = self.chain(key, days=90)
+        acme.install_certificate(self.cert, self.key, chain, key)
+        self.assertEqual(self.cert.read_text(), chain)
+        self.assertEqual(self.key.read_text(), key.to_pem())
+        self.assertEqual(self.key.stat().st_mode & 0o777, 0o600)
+
+    def test_key_mismatch_keeps_old_files(self):
+        chain = self.chain(ECKey(), days=90)
+        with self.assertRaisesRegex(acme.AcmeError, "不匹配"):
+            acme.install_certificate(self.cert, self.key, chain, ECKey())
+        self.assert_untouched()
+
+    def test_expired_chain_keeps_old_files(self):
+        key = ECKey()
+        chain = self.chain(key, days=90, not_before=datetime.now(timezone.utc) - timedelta(days=91))
+        with self.assertRaisesRegex(acme.AcmeError, "已过期"):
+            acme.install_certificate(self.cert, self.key, chain, key)
+        self.assert_untouched()
+
+
+class RenewalSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        patcher = mock.patch.object(config, "CONFIG_DIR", Path(tmp))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 1_700_000_000
+        self.events = []
+        self.issued = 0
+
+        async def obtain(settings, on_progress=None):
+            self.issued += 1
+            return {"not_after": self.now + 90 * DAY}
+
+        patcher = mock.patch.object(acme, "obtain_certificate", obtain)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scheduler(self, reload):
+        return acme.RenewalScheduler(reload=reload, clock=lambda: self.now,
+                                     rng=random.Random(0), on_event=self.events.append)
+
+    def test_reload_failure_retries_only_reload(self):
+        reloads = []
+
+        def reload():
+            reloads.append(self.now)
+            if len(reloads) < 3:
+                raise ServiceError("restart failed")
+
+        scheduler = self.scheduler(reload)
+        asyncio.run(scheduler.run_once())
+        self.assertEqual((self.issued, len(reloads)), (1, 1))
+        self.assertTrue(scheduler.reload_pending)
+        self.assertEqual(scheduler.retry_at, self.now + config.ACME_RETRY_INTERVAL)
+
+        self.now = scheduler.retry_at
+        asyncio.run(scheduler.run_once())
+        self.assertEqual((self.issued, len(reloads)), (1, 2))
+        # 指数退避
+        self.assertEqual(scheduler.retry_at, self.now + 2 * config.ACME_RETRY_INTERVAL)
+
+        self.now = scheduler.retry_at
+        asyncio.run(scheduler.run_once())
+        self.assertEqual((self.issued, len(reloads)), (1, 3))
+        self.assertFalse(scheduler.reload_pending)
+        self.assertIsNone(scheduler.retry_at)
+        self.assertEqual((scheduler.failures, scheduler.renewals), (0, 1))
+
+    def test_issue_failure_does_not_reload(self):
+        async def fail(settings, on_progress=None):
+            self.issued += 1
+            raise acme.AcmeError("rate limited")
+
+        reloads = []
+        scheduler = self.scheduler(lambda: reloads.append(1))
+        with mock.patch.object(acme, "obtain_certificate", fail):
+            asyncio.run(scheduler.run_once())
+        self.assertEqual((self.issued, reloads), (1, []))
+        self.assertFalse(scheduler.reload_pending)
+        self.assertEqual(scheduler.failures, 1)
+
+
+class ChallengeResponderTest(unittest.TestCase):
+
+    def test_http01_serves_key_authorization(self):
+        port = free_port()
+
+        async def main():
+            responder = acme.ChallengeResponder("http-01", port, "127.0.0.1")
+            await responder.start()
+            try:
+                responder.add("hy2.test", "tok-1", "tok-1.thumbprint")
+                loop = asyncio.get_event_loop()
+                found = await loop.run_in_executor(None, fetch, "tok-1")
+                missing = await loop.run_in_executor(None, fetch, "tok-2")
+                responder.remove("hy2.test", "tok-1")
+                removed = await loop.run_in_executor(None, fetch, "tok-1")
+            finally:
+                await responder.stop()
+            return found, missing, removed
+
+        def fetch(token):
+            url = f"http://127.0.0.1:{port}/.well-known/acme-challenge/{token}"
+            try:
+                with urllib.request.urlopen(url, timeout=5) as resp:
+                    return resp.status, resp.read().decode()
+            except urllib.error.HTTPError as e:
+                return e.code, None
+
+        found, missing, removed = asyncio.run(main())
+        self.assertEqual(found, (200, "tok-1.thumbprint"))
+        self.assertEqual(missing[0], 404)
+        self.assertEqual(removed[0], 404)
+
+
+@unittest.skipUnless(os.getenv("HY2_TEST_PEBBLE"), "设置 HY2_TEST_PEBBLE 后对 Pebble 运行完整申请流程")
+class PebbleIssueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        patcher = mock.patch.object(config, "CONFIG_DIR", self.dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_issue_certificate(self):
+        domain = os.getenv("HY2_TEST_PEBBLE_DOMAIN", "hy2.test")
+        progress = []
+        result = acme.issue_certificate(
+            [domain], progress.append,
+            directory=os.environ["HY2_TEST_PEBBLE"],
+            ca_bundle=os.getenv("HY2_TEST_PEBBLE_CA"),
+            challenge="http-01",
+            http_port=int(os.getenv("HY2_TEST_PEBBLE_HTTP_PORT", "5002")),
+            cert=str(self.dir / "cert.crt"),
+            key=str(self.dir / "private.key"))
+
+        self.assertEqual(result["domains"], [domain])
+        self.assertTrue(progress)
+        leaf = parse_certificate(pem_decode((self.dir / "cert.crt").read_text(), "CERTIFICATE"))
+        key = ECKey.from_pem((self.dir / "private.key").read_text())
+        self.assertEqual(leaf["public_key"], public_key_info(key))
+        not_before, not_after = acme.certificate_validity(self.dir / "cert.crt")
+        self.assertEqual(int(not_after), result["not_after"])
+        self.assertGreater(not_after, not_before)
+        self.assertEqual((self.dir / "private.key").stat().st_mode & 0o777, 0o600)
+        # 设置已保存，供续期使用
+        settings = acme.load_settings()
+        self.assertEqual(settings["domains"], [domain])
+        self.assertEqual(settings["directory"], os.environ["HY2_TEST_PEBBLE"])
+        self.assertNotIn("renew_at", settings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""命令行 JSON 模式测试: stdout 只有一个 JSON 对象"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# status 换成同时由 Python 和子进程写 stdout 的处理函数
+SCRIPT = """
+import sys
+from hy2 import cli
+from hy2.utils.helpers import run_cmd
+
+def noisy(args):
+    print("python-output")
+    run_cmd("echo child-output")
+    return {"password": getattr(args, "password", None)}
+
+cli.cmd_status = noisy
+sys.exit(cli.run(sys.argv[1:]))
+"""
+
+
+class JsonModeTest(unittest.TestCase):
+
+    def run_cli(self, *argv):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, PYTHONPATH=str(REPO_ROOT), HY2_CONFIG_DIR=directory,
+                       HY2_CLIENT_DIR=directory, HY2_CACHE_DIR=directory)
+            return subprocess.run([sys.executable, "-c", SCRIPT, *argv],
+                                  capture_output=True, text=True, env=env, timeout=60)
+
+    def test_child_output_goes_to_stderr(self):
+        proc = self.run_cli("--json", "status")
+        outcome = json.loads(proc.stdout)
+        self.assertTrue(outcome["ok"])
+        self.assertIn("python-output", proc.stderr)
+        self.assertIn("child-output", proc.stderr)
+
+    def test_text_mode_keeps_stdout(self):
+        proc = self.run_cli("status")
+        self.assertIn("child-output", proc.stdout)
+        self.assertIn("python-output", proc.stdout)
+
+    def test_json_as_option_value(self):
+        # 子命令参数值恰好是 --json 时不切换到 JSON 模式
+        proc = self.run_cli("user", "add", "alice", "--password", "--json")
+        self.assertEqual(proc.returncode, 1)
+        self.assertIn("错误", proc.stdout)
+        self.assertFalse(proc.stdout.lstrip().startswith("{"))
+
+    def test_json_help(self):
+        proc = self.run_cli("--json", "--help")
+        self.assertTrue(json.loads(proc.stdout)["ok"])
+        self.assertIn("usage", proc.stderr)
+
+    def test_batch_json(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("status\nstatus\n")
+        self.addCleanup(os.unlink, f.name)
+        proc = self.run_cli("--json", "batch", f.name)
+        outcome = json.loads(proc.stdout)
+        self.assertEqual([r["ok"] for r in outcome["result"]["results"]], [True, True])
+        self.assertEqual(proc.stderr.count("child-output"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+"""下载测试: 本机限速 HTTP 服务，注入断线，校验断点续传、重试和单连接回退"""
+
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from hy2 import downloader
+from hy2.downloader import DownloadError, download_file
+
+MIB = 1024 * 1024
+DATA = b"".join(hashlib.sha256(i.to_bytes(4, "big")).digest() for i in range(5 * MIB // 32))
+SHA256 = hashlib.sha256(DATA).hexdigest()
+
+
+class FileServer:
+    """
+    文件服务
+
+    Args:
+        ranges: 是否支持 Range
+        drop_every: 每第 N 个请求只发送一半内容后断开
+        budget: 累计发送的字节数上限，用完后返回 503
+        status: 固定返回的状态码
+        rate: 每个连接的限速 (字节/秒)
+    """
+
+    CHUNK = 64 * 1024
+
+    def __init__(self, ranges=True, drop_every=0, budget=None, status=None, rate=None):
+        server = self
+        self.ranges, self.drop_every, self.budget = ranges, drop_every, budget
+        self.status, self.rate = status, rate
+        self.requests = []
+        self.sent = 0
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/hysteria"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handle(self, request):
+        header = request.headers.get("Range")
+        with self._lock:
+            self.requests.append(header)
+            number = len(self.requests)
+            exhausted = self.budget is not None and self.sent >= self.budget
+        if self.status or exhausted:
+            request.send_error(self.status or 503)
+            return
+
+        start, end = 0, len(DATA) - 1
+        if self.ranges and header:
+            first, _, last = header[len("bytes="):].partition("-")
+            start, end = int(first), int(last) if last else len(DATA) - 1
+            request.send_response(206)
+            request.send_header("Content-Range", f"bytes {start}-{end}/{len(DATA)}")
+        else:
+            request.send_response(200)
+        request.send_header("Content-Length", str(end - start + 1))
+        request.end_headers()
+
+        body = DATA[start:end + 1]
+        if self.drop_every and number % self.drop_every == 0:
+            body = body[:len(body) // 2]
+        try:
+            for offset in range(0, len(body), self.CHUNK):
+                chunk = body[offset:offset + self.CHUNK]
+                with self._lock:
+                    if self.budget is not None and self.sent >= self.budget:
+                        break
+                    self.sent += len(chunk)
+                request.wfile.write(chunk)
+                if self.rate:
+                    time.sleep(len(chunk) / self.rate)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        request.close_connection = True
+
+    def range_starts(self):
+        return [int(h[len("bytes="):].partition("-")[0]) for h in self.requests if h]
+
+
+class DownloaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.dest = self.dir / "hysteria"
+        self.part = self.dir / "hysteria.part"
+        self.state = self.dir / "hysteria.part.state"
+
+    def download(self, url, **kwargs):
+        kwargs.setdefault("backoff", 0.01)
+        return download_file(url, self.dest, show=False, interval=0.05, **kwargs)
+
+    def assert_complete(self):
+        self.assertEqual(hashlib.sha256(self.dest.read_bytes()).hexdigest(), SHA256)
+        self.assertFalse(self.part.exists())
+        self.assertFalse(self.state.exists())
+
+    def test_parallel_ranges_with_drops(self):
+        # 每第 3 个请求断开，分段从断开处继续
+        with FileServer(drop_every=3, rate=20 * MIB) as server:
+            self.assertEqual(self.download(server.url, connections=4), self.dest)
+        self.assert_complete()
+        self.assertGreater(len(server.requests), 5)
+        # 断开后的请求从中间位置继续，而不是从分段起点重新下载
+        segment_starts = {start for start, _, _ in downloader.split_segments(len(DATA), 4)}
+        self.assertTrue(set(server.range_starts()) - segment_starts - {0})
+
+    def test_retries_exhausted(self):
+        with FileServer(status=503) as server:
+            with self.assertRaises(DownloadError):
+                self.download(server.url, retries=2)
+        # 探测请求: 首次 + 2 次重试
+        self.assertEqual(len(server.requests), 3)
+        self.assertFalse(self.dest.exists())
+
+    def test_resume_from_state_after_interrupt(self):
+        with FileServer(budget=2 * MIB) as server:
+            with self.assertRaises(DownloadError):
+                self.download(server.url, connections=4, retries=1)
+        self.assertFalse(self.dest.exists())
+        self.assertTrue(self.part.exists())
+        state = json.loads(self.state.read_text())
+        self.assertEqual((state["url"], state["size"]), (server.url, len(DATA)))
+        done = sum(pos - start for start, _, pos in state["segments"])
+        self.assertGreater(done, 0)
+        self.assertLess(done, len(DATA))
+        # 已完成的部分与源文件一致
+        partial = self.part.read_bytes()
+        for start, _, pos in state["segments"]:
+            self.assertEqual(partial[start:pos], DATA[start:pos])
+
+        with FileServer() as server2:
+            # 状态文件中的地址需一致才会沿用
+            state["url"] = server2.url
+            self.state.write_text(json.dumps(state))
+            self.download(server2.url, connections=4)
+        self.assert_complete()
+        # 探测请求另外发送 1 字节
+        self.assertEqual(server2.sent, len(DATA) - done + 1)
+        resumed = {pos for _, end, pos in state["segments"] if pos <= end}
+        self.assertEqual(set(server2.range_starts()) - {0}, resumed - {0})
+
+    def test_stale_state_is_ignored(self):
+        self.part.write_bytes(b"\0" * len(DATA))
+        self.state.write_text(json.dumps({"url": "http://elsewhere/", "size": len(DATA),
+                                          "segments": [[0, len(DATA) - 1, len(DATA)]]}))
+        with FileServer() as server:
+            self.download(server.url, connections=2)
+        self.assert_complete()
+        self.assertEqual(server.sent, len(DATA) + 1)
+
+    def test_single_stream_fallback(self):
+        # 不支持 Range: 整体下载，断开后从头重试
+        with FileServer(ranges=False, drop_every=2, rate=50 * MIB) as server:
+            self.download(server.url, connections=4)
+        self.assert_complete()
+        # 探测 + 断开的一次 + 完整的一次
+        self.assertEqual(len(server.requests), 3)
+
+    def test_not_found_is_fatal(self):
+        with FileServer(status=404) as server:
+            with self.assertRaisesRegex(DownloadError, "404"):
+                self.download(server.url, retries=5, backoff=10)
+        self.assertEqual(len(server.requests), 1)
+        self.assertFalse(self.dest.exists())
+        self.assertFalse(self.part.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""防火墙规则集渲染测试 (只检查生成的文本，不调用 nft/iptables)"""
+
+import unittest
+
+from hy2.system.firewall import (
+    merge_ports, ruleset, render_nft, render_iptables, iptables_jump_commands)
+
+
+class MergePortsTest(unittest.TestCase):
+
+    def test_overlapping_and_adjacent(self):
+        self.assertEqual(merge_ports(["443", "20000-20099", "20100:20199", "20050", "444"]),
+                         frozenset({"443:444", "20000:20199"}))
+
+    def test_single_port_range(self):
+        self.assertEqual(merge_ports(["8443:8443"]), frozenset({"8443"}))
+
+
+class RenderTest(unittest.TestCase):
+
+    # 多实例: 跳跃范围分为两段，分别转到各实例的端口
+    RULES = ruleset(["443", "40001", "50000:50199"],
+                    [(50100, 50199, 40001), (50000, 50099, 443)])
+
+    def test_nft(self):
+        self.assertEqual(render_nft(self.RULES), """\
+table inet hy2
+delete table inet hy2
+table inet hy2 {
+    set open_ports {
+        type inet_service
+        flags interval
+        elements = { 443, 40001, 50000-50199 }
+    }
+
+    chain input {
+        type filter hook input priority 0; policy accept;
+        udp dport @open_ports accept
+    }
+
+    map hop_ports {
+        type inet_service : inet_service
+        flags interval
+        elements = { 50000-50099 : 443, 50100-50199 : 40001 }
+    }
+
+    chain prerouting {
+        type nat hook prerouting priority -100; policy accept;
+        redirect to :udp dport map @hop_ports
+    }
+}
+""")
+
+    def test_nft_nat_only(self):
+        # --no-firewall 时只安装端口跳跃的 NAT，不开放端口
+        text = render_nft(ruleset((), [(20000, 30000, 443)]))
+        self.assertNotIn("open_ports", text)
+        self.assertNotIn("chain input", text)
+        self.assertIn("elements = { 20000-30000 : 443 }", text)
+
+    def test_nft_empty(self):
+        self.assertEqual(render_nft(ruleset()), "table inet hy2\ndelete table inet hy2\n")
+
+    def test_iptables(self):
+        self.assertEqual(render_iptables(self.RULES), """\
+*filter
+:HY2_INPUT - [0:0]
+-A HY2_INPUT -p udp -m udp --dport 443 -j ACCEPT
+-A HY2_INPUT -p udp -m udp --dport 40001 -j ACCEPT
+-A HY2_INPUT -p udp -m udp --dport 50000:50199 -j ACCEPT
+COMMIT
+*nat
+:HY2_HOP - [0:0]
+-A HY2_HOP -p udp -m udp --dport 50000:50099 -j REDIRECT --to-ports 443
+-A HY2_HOP -p udp -m udp --dport 50100:50199 -j REDIRECT --to-ports 40001
+COMMIT
+""")
+
+    def test_iptables_jumps(self):
+        added = iptables_jump_commands("iptables", self.RULES)
+        self.assertEqual(added[0], "{ iptables -t filter -C INPUT -j HY2_INPUT 2>/dev/null "
+                                   "|| iptables -t filter -I INPUT -j HY2_INPUT; }")
+        self.assertIn("-I PREROUTING -p udp -j HY2_HOP", added[1])
+        removed = iptables_jump_commands("ip6tables", ruleset())
+        self.assertTrue(all("-D " in c and "-X " in c for c in removed))
+
+
+if __name__ == "__main__":
+    unittest.main()
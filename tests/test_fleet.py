@@ -0,0 +1,42 @@
+"""批量部署本地模拟测试: 每台主机只写入自己的临时根目录"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from hy2.fleet import LocalExecutor, _parse_result
+
+
+class LocalExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def provision(self, **host):
+        host = dict({"name": "node1", "port": 40000, "binary_source": shutil.which("true"),
+                     "server_ip": "192.0.2.1", "domain": "example.com"}, **host)
+        code, output = LocalExecutor(self.root).run(host, timeout=60)
+        self.assertEqual(code, 0, output)
+        return _parse_result(output)
+
+    def test_hop_ports_skip_nat(self):
+        result = self.provision(hop_ports="50000:50099")
+        self.assertNotIn("firewall", result["steps"])
+        self.assertIn("mport=50000-50099", result["share_url"])
+        units = self.root / "node1" / "etc" / "systemd" / "system"
+        self.assertTrue((units / "hysteria-server.service").exists())
+
+    def test_instances_get_own_hop_slice(self):
+        result = self.provision(hop_ports="50000:50199", instances=2)
+        slices = {inst["port"]: inst["hop_ports"] for inst in result["instances"]}
+        self.assertEqual(sorted(slices.values()), ["50000:50099", "50100:50199"])
+        self.assertIn("mport=50000-50099", result["share_url"])
+        for url in result["instance_urls"].values():
+            port = int(url.split("@192.0.2.1:")[1].split("/")[0])
+            self.assertIn("mport=" + slices[port].replace(":", "-"), url)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""多实例部署测试: 端口划分和生成的 systemd 单元"""
+
+import configparser
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from hy2 import config
+from hy2.instances import (
+    partition_range, allocate_ports, assign_cpus, plan_instances,
+    render_template_unit, render_target_unit, render_dropin)
+
+
+def parse_unit(text):
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    parser.optionxform = str
+    parser.read_string(text)
+    return parser
+
+
+class PartitionTest(unittest.TestCase):
+
+    def test_even_split(self):
+        self.assertEqual(partition_range("20000:20099", 4),
+                         ["20000:20024", "20025:20049", "20050:20074", "20075:20099"])
+
+    def test_uneven_split(self):
+        # 10 个端口分 3 段: 前面的段多一个端口，首尾相接且不重叠
+        self.assertEqual(partition_range("100:109", 3), ["100:103", "104:106", "107:109"])
+
+    def test_one_port_each(self):
+        self.assertEqual(partition_range("100:102", 3), ["100:100", "101:101", "102:102"])
+
+    def test_more_instances_than_ports(self):
+        with self.assertRaises(ValueError):
+            partition_range("100:102", 4)
+        with self.assertRaises(ValueError):
+            partition_range("100:200", 0)
+
+
+class AllocatePortsTest(unittest.TestCase):
+
+    def test_skips_bound_ports(self):
+        self.assertEqual(allocate_ports(443, 4, bound={444, 446}), [443, 445, 447, 448])
+
+    def test_skips_hop_range(self):
+        self.assertEqual(allocate_ports(20000, 3, "20001:20100", bound=set()), [20000, 20101, 20102])
+
+    def test_runs_out_of_ports(self):
+        with self.assertRaises(ValueError):
+            allocate_ports(65534, 3, bound={65535})
+
+    def test_plan(self):
+        plan = plan_instances(443, "20000:20009", 3, cpus=[0, 1, 2, 3], bound={444})
+        self.assertEqual([(p["port"], p["hop_ports"], p["cpus"]) for p in plan], [
+            (443, "20000:20003", [0, 1]),
+            (445, "20004:20006", [2]),
+            (446, "20007:20009", [3]),
+        ])
+
+    def test_cpus_reused_when_fewer_than_instances(self):
+        self.assertEqual(assign_cpus(3, [0, 1]), [[0], [1], [0]])
+
+
+class UnitTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.multiple(config, CONFIG_DIR=Path("/srv/hy2"),
+                                      BINARY_PATH=Path("/opt/hysteria"), SERVICE_NAME="hy-test")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_template_unit(self):
+        unit = parse_unit(render_template_unit())
+        self.assertEqual(unit["Unit"]["PartOf"], "hy-test.target")
+        self.assertEqual(unit["Service"]["ExecStart"], "/opt/hysteria server -c /srv/hy2/instances/%i.yaml")
+        self.assertEqual(unit["Install"]["WantedBy"], "hy-test.target")
+
+    def test_target_unit(self):
+        unit = parse_unit(render_target_unit(3))
+        self.assertEqual(unit["Unit"]["Wants"].split(),
+                         ["hy-test@0.service", "hy-test@1.service", "hy-test@2.service"])
+        self.assertEqual(unit["Install"]["WantedBy"], "multi-user.target")
+
+    def test_dropin(self):
+        unit = parse_unit(render_dropin({"index": 1, "port": 444, "hop_ports": None, "cpus": [2, 3]}))
+        self.assertEqual(unit["Service"]["CPUAffinity"], "2 3")
+        self.assertEqual(unit["Service"]["Environment"], "GOMAXPROCS=2")
+
+
+if __name__ == "__main__":
+    unittest.main()
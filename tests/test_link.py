@@ -0,0 +1,95 @@
+"""QUIC 接收窗口、带宽配置和内核缓冲区检查测试"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from hy2.server_config import (
+    ServerConfig, derive_quic_windows, link_settings,
+    DEFAULT_STREAM_WINDOW, DEFAULT_CONN_WINDOW, MAX_CONN_WINDOW)
+from hy2.system.tuning import check_buffer_limits
+
+MIB = 1024 * 1024
+
+
+class WindowTest(unittest.TestCase):
+
+    def windows(self, mbps, rtt):
+        quic = derive_quic_windows(mbps, rtt)
+        self.assertEqual(quic["initConnReceiveWindow"], quic["maxConnReceiveWindow"])
+        self.assertEqual(quic["initStreamReceiveWindow"], quic["maxStreamReceiveWindow"])
+        return quic["maxConnReceiveWindow"], quic["maxStreamReceiveWindow"]
+
+    def test_small_link_keeps_defaults(self):
+        self.assertEqual(self.windows(100, 50), (DEFAULT_CONN_WINDOW, DEFAULT_STREAM_WINDOW))
+
+    def test_bdp_rounded_up_to_mib(self):
+        # 1000 Mbps x 200 ms = 25 MB，1.5 倍为 37.5 MB -> 36 MiB；流窗口 2/5 -> 15 MiB
+        self.assertEqual(self.windows(1000, 200), (36 * MIB, 15 * MIB))
+
+    def test_clamped_to_max(self):
+        conn, stream = self.windows(10000, 1000)
+        self.assertEqual(conn, MAX_CONN_WINDOW)
+        self.assertEqual(stream, 205 * MIB)
+
+
+class LinkSettingsTest(unittest.TestCase):
+
+    def test_bandwidth_and_window_from_faster_direction(self):
+        settings = link_settings(1000, 100, 200)
+        self.assertEqual(settings["bandwidth"], {"up": "1000 mbps", "down": "100 mbps"})
+        self.assertEqual(settings["quic"]["maxConnReceiveWindow"], 36 * MIB)
+        self.assertEqual(settings["quic"]["maxIncomingStreams"], 1024)
+        self.assertEqual(link_settings(100, 1000, 200)["quic"], settings["quic"])
+
+    def test_client_settings_reverse_direction(self):
+        config = ServerConfig(link_settings(1000, 100, 200))
+        self.assertEqual(config.link, {"up": 1000, "down": 100})
+        client = config.client_link_settings()
+        self.assertEqual(client["bandwidth"], {"up": "100 mbps", "down": "1000 mbps"})
+        self.assertNotIn("maxIncomingStreams", client["quic"])
+        self.assertEqual(client["quic"]["maxConnReceiveWindow"], 36 * MIB)
+
+    def test_unparsed_bandwidth(self):
+        self.assertIsNone(ServerConfig({"bandwidth": {"up": "1 gbps", "down": "100 mbps"}}).link)
+        self.assertIsNone(ServerConfig({}).client_link_settings())
+
+
+class BufferLimitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def sysctl(self, **values):
+        for key, value in values.items():
+            path = self.root / "proc" / "sys" / key.replace("__", "/")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"{value}\n")
+
+    def test_within_limits(self):
+        self.sysctl(net__core__rmem_max=16 * MIB, net__core__wmem_max=16 * MIB,
+                    net__ipv4__udp_mem="190000\t253000\t380000")
+        self.assertEqual(check_buffer_limits(36 * MIB, self.root), [])
+
+    def test_small_rmem_max(self):
+        self.sysctl(net__core__rmem_max=212992, net__core__wmem_max=16 * MIB)
+        warnings = check_buffer_limits(36 * MIB, self.root)
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("net.core.rmem_max = 212992", warnings[0])
+
+    def test_udp_mem_below_window(self):
+        # udp_mem 以页为单位: 8192 页 = 32 MiB，小于 36 MiB 的连接窗口
+        self.sysctl(net__ipv4__udp_mem="2048 4096 8192")
+        warnings = check_buffer_limits(36 * MIB, self.root)
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("udp_mem 上限 33554432", warnings[0])
+        self.assertEqual(check_buffer_limits(32 * MIB, self.root), [])
+
+    def test_missing_sysctl(self):
+        self.assertEqual(check_buffer_limits(MAX_CONN_WINDOW, self.root), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""日志解析测试: console (含 ANSI 颜色) 和 json 格式"""
+
+import json
+import unittest
+
+from hy2.logs import LogStats, parse_line, parse_events
+
+FIELDS = {"addr": "203.0.113.7:51234", "id": "alice"}
+
+
+def console(level, message, fields=FIELDS):
+    return f"2024-05-01T10:00:00.000Z\t{level}\t{message}\t{json.dumps(fields)}"
+
+
+class ParseLineTest(unittest.TestCase):
+
+    def test_console(self):
+        event = parse_line(console("INFO", "client connected"))
+        self.assertEqual((event.level, event.kind), ("INFO", "connect"))
+        self.assertEqual(event.fields, FIELDS)
+        self.assertEqual(event.time, 1714557600.0)
+
+    def test_coloured_level(self):
+        # 未设置 HYSTERIA_LOG_DISABLE_COLOR 时 zap 给级别加颜色
+        event = parse_line(console("\x1b[34mINFO\x1b[0m", "client connected"))
+        self.assertEqual((event.level, event.message, event.kind), ("INFO", "client connected", "connect"))
+        self.assertEqual(event.fields, FIELDS)
+        error = parse_line(console("\x1b[31mERROR\x1b[0m", "TCP error",
+                                   dict(FIELDS, error="dial tcp 1.2.3.4:443: i/o timeout")))
+        self.assertEqual((error.level, error.kind), ("ERROR", "tcp_error"))
+
+    def test_json(self):
+        line = json.dumps({"level": "warn", "ts": 1714557600.5, "msg": "client disconnected", **FIELDS})
+        event = parse_line(line)
+        self.assertEqual((event.level, event.kind, event.time), ("WARN", "disconnect", 1714557600.5))
+        self.assertEqual(event.fields, FIELDS)
+
+    def test_unrecognised(self):
+        event = parse_line("random text without tabs", timestamp=5.0)
+        self.assertEqual((event.level, event.kind, event.time), ("", "other", 5.0))
+
+    def test_coloured_lines_are_counted(self):
+        stats = LogStats()
+        for event in parse_events([(1714557600.0 + i, console("\x1b[34mINFO\x1b[0m", "client connected"))
+                                   for i in range(3)]):
+            stats.add(event)
+        summary = stats.summary()
+        self.assertEqual(summary["kinds"], {"connect": 3})
+        self.assertEqual(summary["levels"], {"INFO": 3})
+        self.assertEqual(summary["top_client_ips"][0][0], "203.0.113.7")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""回环基准测试的配置生成: 本机已有服务端的流量统计 API 时不冲突"""
+
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# generate_configs 通过环境变量重定向目录，需要在新进程中导入 hy2
+SCRIPT = """
+import sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1] + "/benchmarks")
+import loopback
+workdir = Path(sys.argv[2])
+server, client = loopback.generate_configs(workdir, 40443, 41080, "127.0.0.1", None)
+print(server)
+"""
+
+
+class FakeStats(BaseHTTPRequestHandler):
+    """模拟本机正在运行的服务端的 trafficStats API"""
+
+    requests = []
+
+    def do_GET(self):
+        FakeStats.requests.append(self.path)
+        body = json.dumps({"prod-user": {"tx": 1, "rx": 1}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class GenerateConfigsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), FakeStats)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.listen = f"127.0.0.1:{self.server.server_address[1]}"
+        self.workdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+
+    def test_no_traffic_stats(self):
+        from hy2.utils.miniyaml import loads
+
+        env = {"HY2_STATS_LISTEN": self.listen, "PATH": "/usr/bin:/bin"}
+        result = subprocess.run(
+            [sys.executable, "-c", SCRIPT, str(REPO_ROOT), str(self.workdir)],
+            capture_output=True, text=True, env=env, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        config = loads(Path(result.stdout.strip()).read_text())
+        self.assertNotIn("trafficStats", config)
+        self.assertEqual(config["listen"], ":40443")
+        self.assertEqual(FakeStats.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""miniyaml 序列化与解析的往返测试"""
+
+import unittest
+
+from hy2.utils import miniyaml
+
+
+class RoundTripTest(unittest.TestCase):
+
+    VALUES = [
+        'a"b #c',
+        "it's #1",
+        "a'' #b",
+        "back\\slash #x",
+        'tail\\" #',
+        "key: value",
+        "x:#y",
+        "#start",
+        "tab\t#x",
+        '"',
+        "'",
+        "",
+        "123",
+        "true",
+        "1:30",
+    ]
+
+    def test_scalars(self):
+        for value in self.VALUES:
+            with self.subTest(value=value):
+                data = {"auth": {"type": "password", "password": value}}
+                self.assertEqual(miniyaml.loads(miniyaml.dumps(data)), data)
+
+    def test_keys_and_lists(self):
+        for value in self.VALUES:
+            with self.subTest(value=value):
+                data = {"users": [value, {value or "k": value}]}
+                self.assertEqual(miniyaml.loads(miniyaml.dumps(data)), data)
+
+    def test_trailing_comments(self):
+        text = 'password: "a\\"b #c" # 注释\nport: 443 # 端口\nname: \'x\'\' #y\'  # z\n'
+        self.assertEqual(miniyaml.loads(text), {"password": 'a"b #c', "port": 443, "name": "x' #y"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""公网 IP 探测测试: 本机假回显服务，不访问外网"""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+from hy2 import config
+from hy2.utils import publicip
+
+
+class EchoServer:
+    """回显服务: 返回固定内容，可设置状态码和延迟"""
+
+    def __init__(self, body, status=200, delay=0):
+        echo = self
+        self.body, self.status, self.delay = body, status, delay
+        self.hits = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                echo.hits += 1
+                time.sleep(echo.delay)
+                data = echo.body.encode()
+                self.send_response(echo.status)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/ip"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class PublicIPTest(unittest.TestCase):
+
+    def echo(self, body, **kwargs):
+        server = EchoServer(body, **kwargs)
+        self.addCleanup(server.close)
+        return server
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        for patcher in (mock.patch.object(config, "CACHE_DIR", directory),
+                        mock.patch.object(publicip, "local_address", lambda family: None),
+                        mock.patch.dict(publicip._cache, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_query_echo_formats(self):
+        self.assertEqual(publicip.query_echo(self.echo("203.0.113.7\n").url, "ipv4", 2), "203.0.113.7")
+        self.assertEqual(publicip.query_echo(self.echo('{"ip": "203.0.113.8"}').url, "ipv4", 2),
+                         "203.0.113.8")
+        self.assertIsNone(publicip.query_echo(self.echo("2001:db8::1").url, "ipv4", 2))
+        self.assertIsNone(publicip.query_echo(self.echo("<html>blocked</html>").url, "ipv4", 2))
+        self.assertIsNone(publicip.query_echo(self.echo("203.0.113.7", status=503).url, "ipv4", 2))
+
+    def test_two_sources_agree_without_waiting_for_slow_one(self):
+        slow = self.echo("198.51.100.1", delay=3)
+        sources = [slow.url, self.echo("203.0.113.7").url, self.echo("203.0.113.7").url]
+        start = time.monotonic()
+        result = publicip.discover("ipv4", sources, timeout=5)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(result["ip"], "203.0.113.7")
+        self.assertEqual(sorted(result["sources"]), sorted(sources[1:]))
+
+    def test_majority_when_no_early_agreement(self):
+        sources = [self.echo("203.0.113.7").url, self.echo("198.51.100.1").url,
+                   self.echo("garbage").url]
+        result = publicip.discover("ipv4", sources, timeout=5)
+        self.assertIn(result["ip"], ("203.0.113.7", "198.51.100.1"))
+        self.assertEqual(len(result["sources"]), 1)
+
+    def test_all_fail(self):
+        self.assertIsNone(publicip.discover("ipv4", [self.echo("", status=500).url], timeout=2))
+
+    def test_cached_after_discovery(self):
+        echo = self.echo("203.0.113.7")
+        self.assertEqual(publicip.public_ip(("ipv4",), sources=[echo.url], timeout=2), "203.0.113.7")
+        self.assertTrue(publicip.cache_path().exists())
+        publicip._cache.clear()
+        # 磁盘缓存命中，不再查询回显服务
+        self.assertEqual(publicip.public_ip(("ipv4",), sources=[echo.url], timeout=2), "203.0.113.7")
+        self.assertEqual(echo.hits, 1)
+        self.assertEqual(publicip.public_ip(("ipv4",), refresh=True, sources=[echo.url], timeout=2),
+                         "203.0.113.7")
+        self.assertEqual(echo.hits, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
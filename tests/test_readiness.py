@@ -0,0 +1,135 @@
+"""服务就绪探测测试: 假的 systemd、伪造的 /proc 和本机 QUIC 版本协商应答"""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from hy2.readiness import wait_ready, udp_bound
+
+PID = 4242
+INODE = "987654"
+
+
+class FakeSystemd:
+    """按顺序返回预设的属性，用完后一直返回最后一组"""
+
+    def __init__(self, *states):
+        self.states = list(states)
+        self.calls = 0
+
+    def show(self, unit):
+        self.calls += 1
+        return dict(self.states[0] if len(self.states) == 1 else self.states.pop(0))
+
+
+def active(pid=PID, restarts=0):
+    return {"ActiveState": "active", "SubState": "running", "Result": "success",
+            "MainPID": str(pid), "NRestarts": str(restarts)}
+
+
+class QuicResponder:
+    """对任何 Initial 包回复版本协商"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except OSError:
+                return
+            dcid = data[6:6 + data[5]]
+            offset = 6 + data[5]
+            scid = data[offset + 1:offset + 1 + data[offset]]
+            self.sock.sendto(b"\x80\x00\x00\x00\x00" + bytes([len(scid)]) + scid
+                             + bytes([len(dcid)]) + dcid + b"\x00\x00\x00\x01", addr)
+
+    def close(self):
+        self.sock.close()
+
+
+class WaitReadyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.proc = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.proc, ignore_errors=True)
+        self.responder = QuicResponder()
+        self.addCleanup(self.responder.close)
+        self.port = self.responder.port
+        self.target = {"unit": "hysteria-server.service", "port": self.port, "host": "127.0.0.1"}
+
+    def bind(self, pid=PID):
+        """伪造 pid 持有 UDP 端口的 /proc 条目"""
+        net, fd = self.proc / str(pid) / "net", self.proc / str(pid) / "fd"
+        net.mkdir(parents=True, exist_ok=True)
+        fd.mkdir(exist_ok=True)
+        (net / "udp").write_text(
+            "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt"
+            "   uid  timeout inode\n"
+            f"   0: 0100007F:{self.port:04X} 00000000:0000 07 00000000:00000000 00:00000000"
+            f" 00000000     0        0 {INODE} 2 0000000000000000 0\n")
+        os.symlink(f"socket:[{INODE}]", fd / "3")
+
+    def wait(self, systemd, **kwargs):
+        kwargs = dict({"timeout": 2, "settle": 0.05}, **kwargs)
+        return wait_ready([self.target], systemd=systemd, proc_root=self.proc, **kwargs)
+
+    def test_udp_bound(self):
+        self.assertFalse(udp_bound(PID, self.port, self.proc))
+        self.bind()
+        self.assertTrue(udp_bound(PID, self.port, self.proc))
+        self.assertFalse(udp_bound(PID, self.port + 1, self.proc))
+
+    def test_ready(self):
+        self.bind()
+        systemd = FakeSystemd({"ActiveState": "activating", "MainPID": str(PID), "NRestarts": "0"},
+                              active())
+        result = self.wait(systemd)
+        self.assertTrue(result["ready"], result["reason"])
+        self.assertEqual(result["units"][0]["pid"], PID)
+        self.assertLess(result["seconds"], 1.5)
+
+    def test_not_ready_without_quic_reply(self):
+        self.bind()
+        self.responder.close()
+        result = self.wait(FakeSystemd(active()), timeout=0.5)
+        self.assertFalse(result["ready"])
+        # 没有版本协商应答不算监听就绪
+        self.assertIn("未监听", result["reason"])
+
+    def test_crash_loop_fails_fast(self):
+        self.bind()
+        systemd = FakeSystemd(active(restarts=3), active(restarts=4))
+        result = self.wait(systemd, timeout=10)
+        self.assertFalse(result["ready"])
+        self.assertIn("自动重启 1 次", result["reason"])
+        self.assertLess(result["seconds"], 2)
+
+    def test_main_pid_replaced(self):
+        self.bind()
+        # 主进程退出 (/proc 中消失) 后 systemd 报告了新的 MainPID
+        systemd = FakeSystemd(active(), active(pid=PID + 1))
+        shutil.rmtree(self.proc / str(PID))
+        self.bind(PID + 1)
+        result = self.wait(systemd, timeout=10)
+        self.assertFalse(result["ready"])
+        self.assertIn(f"{PID} -> {PID + 1}", result["reason"])
+
+    def test_failed_unit(self):
+        systemd = FakeSystemd({"ActiveState": "failed", "SubState": "failed",
+                               "Result": "exit-code", "MainPID": "0", "NRestarts": "0"})
+        result = self.wait(systemd, timeout=10)
+        self.assertFalse(result["ready"])
+        self.assertIn("exit-code", result["reason"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""流量计数换算测试: 流量监控和配额统计读取同一端点时互不影响"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from hy2 import config
+from hy2.stats import CounterDeltas, MetricsCollector
+from hy2.users import UserStore, enforce
+
+
+class FakeEndpoint:
+    """模拟 trafficStats 端点: traffic(clear=True) 与 Hysteria 一样清零计数"""
+
+    def __init__(self, name="@0"):
+        self.name = name
+        self.counters = {}
+
+    def add(self, user, tx, rx):
+        counters = self.counters.setdefault(user, {"tx": 0, "rx": 0})
+        counters["tx"] += tx
+        counters["rx"] += rx
+
+    def traffic(self, clear=False):
+        result = {user: dict(c) for user, c in self.counters.items()}
+        if clear:
+            self.counters = {}
+        return result
+
+    def online(self):
+        return {}
+
+    def kick(self, users):
+        pass
+
+
+class CounterDeltasTest(unittest.TestCase):
+
+    def test_growth_and_restart(self):
+        deltas = CounterDeltas()
+        self.assertEqual(deltas.update("a", {"u": {"tx": 100, "rx": 10}}), {"u": (100, 10)})
+        self.assertEqual(deltas.update("a", {"u": {"tx": 150, "rx": 30}}), {"u": (50, 20)})
+        # 计数变小: 服务重启，新值即为增量
+        self.assertEqual(deltas.update("a", {"u": {"tx": 40, "rx": 5}}), {"u": (40, 5)})
+        # 端点各自换算
+        self.assertEqual(deltas.update("b", {"u": {"tx": 7, "rx": 0}}), {"u": (7, 0)})
+
+    def test_state_round_trip(self):
+        deltas = CounterDeltas()
+        deltas.update("a", {"u": {"tx": 100, "rx": 10}})
+        resumed = CounterDeltas(deltas.state)
+        self.assertEqual(resumed.update("a", {"u": {"tx": 120, "rx": 10}}), {"u": (20, 0)})
+
+
+class EnforceWithCollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        patcher = mock.patch.object(config, "CONFIG_DIR", directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = UserStore({"alice": {"password": "p", "quota": None, "expires": None, "used": 0}})
+
+    def test_both_count_everything(self):
+        endpoint = FakeEndpoint()
+        collector = MetricsCollector([endpoint], history=8, clock=iter(range(100)).__next__)
+
+        endpoint.add("alice", 1000, 100)
+        collector.poll()
+        enforce(self.store, [endpoint], now=1)
+        endpoint.add("alice", 500, 50)
+        enforce(self.store, [endpoint], now=2)
+        endpoint.add("alice", 200, 20)
+        snapshot = collector.poll()
+
+        alice = snapshot["users"][0]
+        self.assertEqual((alice["tx"], alice["rx"]), (1700, 170))
+        self.assertEqual(UserStore.load().users["alice"]["used"], 1650)
+
+
+if __name__ == "__main__":
+    unittest.main()
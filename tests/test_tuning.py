@@ -0,0 +1,101 @@
+"""内核调优测试: 在伪造的 /proc/sys 目录树上应用和回滚"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from hy2.config import TUNING_CONFIG_FILE, TUNING_BACKUP_FILE
+from hy2.system.tuning import build_settings, plan_changes, read_sysctl, rollback, tune
+
+MIB = 1024 * 1024
+
+# 调优前的值: wmem_max 和 nf_conntrack_max 已高于配置档，udp_mem 部分高于配置档
+ORIGINAL = {
+    "net.core.rmem_max": "212992",
+    "net.core.wmem_max": str(64 * MIB),
+    "net.core.netdev_max_backlog": "1000",
+    "net.core.busy_poll": "0",
+    "net.ipv4.udp_mem": "45000 60000 90000",
+    "net.netfilter.nf_conntrack_max": "262144",
+    "net.netfilter.nf_conntrack_udp_timeout": "30",
+    "net.netfilter.nf_conntrack_udp_timeout_stream": "180",
+}
+
+
+class TuningTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        for key, value in ORIGINAL.items():
+            self.write("proc/sys/" + key.replace(".", "/"), f"{value}\n")
+        # 2 GiB 内存，默认路由在 1 Gbps 的 eth0 上 -> 1g 配置档
+        self.write("proc/meminfo", f"MemTotal:       {2 * 1024 * 1024} kB\n")
+        self.write("proc/net/route", "Iface\tDestination\tGateway\n"
+                                     "eth0\t00000000\t0101A8C0\n")
+        self.write("sys/class/net/eth0/speed", "1000\n")
+        (self.root / "etc" / "sysctl.d").mkdir(parents=True)
+
+    def write(self, relative, text):
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+    def values(self):
+        return {key: read_sysctl(key, self.root) for key in ORIGINAL}
+
+    def test_ceilings_never_lowered(self):
+        plan = plan_changes(build_settings("1g", 2 * 1024 ** 3, 1000), self.root)
+        changes = {key: (current, desired) for key, current, desired in plan["changes"]}
+        self.assertNotIn("net.core.wmem_max", changes)
+        self.assertNotIn("net.netfilter.nf_conntrack_max", changes)
+        self.assertIn("net.core.wmem_max", plan["unchanged"])
+        # udp_mem 逐项取较大值
+        self.assertEqual(changes["net.ipv4.udp_mem"], ("45000 60000 90000", "45000 65536 131072"))
+        # 非上限类参数可以调低
+        self.assertEqual(changes["net.netfilter.nf_conntrack_udp_timeout_stream"], ("180", "120"))
+
+    def test_report_diff(self):
+        report = tune("auto", root=self.root)
+        self.assertEqual(report["profile"], "1g")
+        self.assertEqual((report["interface"], report["speed_mbps"]), ("eth0", 1000))
+        self.assertEqual(report["changes"], [
+            {"key": "net.core.rmem_max", "current": "212992", "desired": str(16 * MIB)},
+            {"key": "net.core.netdev_max_backlog", "current": "1000", "desired": "16384"},
+            {"key": "net.ipv4.udp_mem", "current": "45000 60000 90000", "desired": "45000 65536 131072"},
+            {"key": "net.netfilter.nf_conntrack_udp_timeout_stream", "current": "180", "desired": "120"},
+        ])
+        self.assertEqual(report["unsupported"], ["net.core.busy_read"])
+        self.assertEqual(report["nic_features"], [])
+        self.assertEqual(read_sysctl("net.core.rmem_max", self.root), str(16 * MIB))
+        persisted = (self.root / TUNING_CONFIG_FILE.lstrip("/")).read_text()
+        self.assertIn(f"net.core.wmem_max = {64 * MIB}", persisted)
+        self.assertNotIn("busy_read", persisted)
+
+    def test_dry_run_writes_nothing(self):
+        report = tune("1g", root=self.root, dry_run=True)
+        self.assertFalse(report["applied"])
+        self.assertEqual(self.values(), ORIGINAL)
+        self.assertFalse((self.root / TUNING_CONFIG_FILE.lstrip("/")).exists())
+
+    def test_idempotent(self):
+        tune("1g", root=self.root)
+        applied = self.values()
+        second = tune("1g", root=self.root)
+        self.assertEqual(second["changes"], [])
+        self.assertEqual(self.values(), applied)
+
+    def test_rollback_restores_original(self):
+        tune("1g", root=self.root)
+        # 再次应用不同的配置档，回滚仍恢复第一次修改前的值
+        tune("10g", root=self.root)
+        result = rollback(self.root)
+        self.assertEqual(self.values(), ORIGINAL)
+        self.assertIn(("net.core.rmem_max", "212992"), result["restored"])
+        self.assertFalse((self.root / TUNING_CONFIG_FILE.lstrip("/")).exists())
+        self.assertFalse((self.root / TUNING_BACKUP_FILE.lstrip("/")).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()